@@ -2,74 +2,114 @@ import datetime
 import json
 import logging
 
+from psycopg2.extensions import cursor
+
 from _dependencies.commons import sql_connect_by_psycopg2
 
 # from compose_notifications.main import LineInChangeLog
 
 
-def check_if_other_functions_are_working(func_name: str, interval_seconds: int) -> bool:
-    """Check in PSQL in there's the same function 'send_notifications' working in parallel"""
+def acquire_function_lease(
+    event_num: int, function_num: int, triggered_by_func_num: int, function_name: str, lease_seconds: int
+) -> bool:
+    """Take the lease of the function in PSQL and record into functions_registry that this function started working.
+    Only one function holds the lease, an expired lease (function crashed or timed out) is taken over.
+    If the lease is held by another function, the holder is asked to hand off the work when it finishes"""
 
     with sql_connect_by_psycopg2() as conn_psy, conn_psy.cursor() as cur:
-        sql_text_psy = f"""
-                        SELECT 
-                            event_id 
-                        FROM
-                            functions_registry
-                        WHERE
-                            time_start > NOW() - interval '{interval_seconds} seconds' AND
-                            time_finish IS NULL AND
-                            cloud_function_name  = '{func_name}'
-                        ;
-                        /*action='check_if_there_is_parallel_notif_function' */
+        sql_text_psy = """
+                        WITH lease AS (
+                            INSERT INTO function_leases AS l (function_name, holder_id, expires_at)
+                            VALUES (%(function_name)s, %(function_num)s, NOW() + %(lease_seconds)s * interval '1 second')
+                            ON CONFLICT (function_name) DO UPDATE SET
+                                holder_id = CASE WHEN l.expires_at < NOW() OR l.holder_id = EXCLUDED.holder_id
+                                    THEN EXCLUDED.holder_id ELSE l.holder_id END,
+                                expires_at = CASE WHEN l.expires_at < NOW() OR l.holder_id = EXCLUDED.holder_id
+                                    THEN EXCLUDED.expires_at ELSE l.expires_at END,
+                                handoff_requested = l.expires_at >= NOW() AND l.holder_id <> EXCLUDED.holder_id
+                            RETURNING holder_id
+                        ), registry AS (
+                            INSERT INTO functions_registry
+                                (event_id, time_start, cloud_function_name, function_id, triggered_by_func_id)
+                            VALUES
+                                (%(event_num)s, %(now)s, %(function_name)s, %(function_num)s, %(triggered_by_func_num)s)
+                        )
+                        SELECT holder_id = %(function_num)s FROM lease;
+                        /*action='acquire_function_lease' */
                         ;"""
 
-        cur.execute(sql_text_psy)
-        lines = cur.fetchone()
+        cur.execute(
+            sql_text_psy,
+            {
+                'event_num': event_num,
+                'function_num': function_num,
+                'triggered_by_func_num': triggered_by_func_num,
+                'function_name': function_name,
+                'lease_seconds': lease_seconds,
+                'now': datetime.datetime.now(),
+            },
+        )
+        lease_is_acquired = cur.fetchone()[0]
+        logging.info(f'function was triggered by event {event_num}, we assigned a function_id = {function_num}')
+
+    return lease_is_acquired
+
 
-        parallel_functions_are_running = bool(lines)
+def prolong_function_lease(cur: cursor, function_num: int, function_name: str, lease_seconds: int) -> bool:
+    """Heartbeat of the function: prolong its lease. False if the lease is held by another function"""
 
-    return parallel_functions_are_running
+    sql_text_psy = """
+                    WITH heartbeat AS (
+                        UPDATE function_leases
+                        SET expires_at = NOW() + %(lease_seconds)s * interval '1 second'
+                        WHERE function_name = %(function_name)s AND holder_id = %(function_num)s
+                    )
+                    SELECT NOT EXISTS (
+                        SELECT 1 FROM function_leases
+                        WHERE function_name = %(function_name)s AND holder_id <> %(function_num)s AND expires_at >= NOW()
+                    );
+                    /*action='prolong_function_lease' */
+                    ;"""
 
+    cur.execute(
+        sql_text_psy, {'function_num': function_num, 'function_name': function_name, 'lease_seconds': lease_seconds}
+    )
+    return cur.fetchone()[0]
 
-def record_start_of_function(event_num: int, function_num: int, triggered_by_func_num: int, function_name: str) -> None:
-    """Record into PSQL that this function started working (id = id of the respective pub/sub event)"""
+
+def release_function_lease(event_num: int, function_num: int, function_name: str, list_of_changed_ids: list) -> bool:
+    """Release the lease of the function and record into functions_registry that this function finished working.
+    True if another function was triggered meanwhile and exited, so this one should hand off the work to a new one"""
 
     with sql_connect_by_psycopg2() as conn_psy, conn_psy.cursor() as cur:
         sql_text_psy = """
-                        INSERT INTO 
-                            functions_registry
-                        (event_id, time_start, cloud_function_name, function_id, triggered_by_func_id)
-                        VALUES
-                        (%s, %s, %s, %s, %s);
-                        /*action='save_start_of_notif_function' */
+                        WITH lease AS (
+                            UPDATE function_leases
+                            SET expires_at = NOW()
+                            WHERE function_name = %(function_name)s AND holder_id = %(function_num)s
+                            RETURNING handoff_requested
+                        ), registry AS (
+                            UPDATE functions_registry
+                            SET time_finish = %(now)s, params = %(params)s
+                            WHERE event_id = %(event_num)s
+                        )
+                        SELECT COALESCE((SELECT handoff_requested FROM lease), FALSE);
+                        /*action='release_function_lease' */
                         ;"""
 
         cur.execute(
             sql_text_psy,
-            (event_num, datetime.datetime.now(), function_name, function_num, triggered_by_func_num),
+            {
+                'event_num': event_num,
+                'function_num': function_num,
+                'function_name': function_name,
+                'params': json.dumps({'ch_id': list_of_changed_ids}),
+                'now': datetime.datetime.now(),
+            },
         )
-        logging.info(f'function was triggered by event {event_num}, we assigned a function_id = {function_num}')
+        handoff_is_requested = cur.fetchone()[0]
 
-
-def record_finish_of_function(event_num: int, list_of_changed_ids: list) -> None:
-    """Record into PSQL that this function finished working (id = id of the respective pub/sub event)"""
-    with sql_connect_by_psycopg2() as conn_psy, conn_psy.cursor() as cur:
-        json_of_params = json.dumps({'ch_id': list_of_changed_ids})
-
-        sql_text_psy = """
-                        UPDATE 
-                            functions_registry
-                        SET
-                            time_finish = %s,
-                            params = %s
-                        WHERE
-                            event_id = %s
-                        ;
-                        /*action='save_finish_of_notif_function' */
-                        ;"""
-
-        cur.execute(sql_text_psy, (datetime.datetime.now(), json_of_params, event_num))
+    return handoff_is_requested
 
 
 def check_and_save_event_id(
@@ -81,8 +121,10 @@ def check_and_save_event_id(
     func_name: str,
     interval: int,
 ) -> bool:
-    """Work with PSQL table functions_registry. Goal of the table & function is to avoid parallel work of
-    two compose_notifications functions. Executed in the beginning and in the end of compose_notifications function"""
+    """Work with PSQL tables function_leases & functions_registry. Goal of the tables & function is to avoid parallel
+    work of two same functions. Executed in the beginning and in the end of the function.
+    In the beginning True means that another function is working in parallel (it holds the lease for interval seconds).
+    In the end True means that another function was triggered meanwhile, so the work should be handed off"""
     # TODO try decompose
     if not context or not event:
         return False
@@ -94,14 +136,10 @@ def check_and_save_event_id(
 
     # if this functions is triggered in the very beginning of the Google Cloud Function execution
     if event == 'start':
-        if check_if_other_functions_are_working(func_name, interval):
-            record_start_of_function(event_id, function_id, triggered_by_func_id, func_name)
-            return True
-
-        record_start_of_function(event_id, function_id, triggered_by_func_id, func_name)
-        return False
+        return not acquire_function_lease(event_id, function_id, triggered_by_func_id, func_name, interval)
 
     # if this functions is triggered in the very end of the Google Cloud Function execution
     elif event == 'finish':
-        record_finish_of_function(event_id, list_of_change_log_ids)
-        return False
+        return release_function_lease(event_id, function_id, func_name, list_of_change_log_ids)
+
+    return False
@@ -8,6 +8,8 @@ from typing import Any
 
 import google.cloud.logging
 import psycopg2
+import psycopg2.extensions
+import psycopg2.pool
 import sqlalchemy
 from google.cloud import pubsub_v1, secretmanager
 from pydantic_settings import BaseSettings
@@ -139,18 +141,89 @@ def _get_config():
     )
 
 
-def sql_connect_by_psycopg2() -> psycopg2.extensions.connection:
-    """connect to GCP SQL via PsycoPG2"""
-    # TODO pool instead of single connections
+PSYCOPG2_POOL_MIN_CONNECTIONS = 1  # kept open between the invocations of the function
+PSYCOPG2_POOL_MAX_CONNECTIONS = 10
+
+
+class PooledConnection(psycopg2.extensions.connection):
+    """connection of the pool: close() and the end of with-block give it back to the pool.
+    The pool closes its surplus connections by close() too, such connections are closed by garbage collector"""
+
+    pool: psycopg2.pool.AbstractConnectionPool | None = None
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        try:
+            if not self.closed:
+                return super().__exit__(exc_type, exc_value, traceback)
+        finally:
+            self.close()
+
+    def close(self) -> None:
+        pool, self.pool = self.pool, None
+        if pool is not None:
+            pool.putconn(self)
+
+    def discard(self) -> None:
+        super().close()
+
+
+def _get_psycopg2_connection_params() -> dict[str, Any]:
     config = get_app_config()
+    return {
+        'host': config.postgres_host,
+        'dbname': config.postgres_db,
+        'user': config.postgres_user,
+        'password': config.postgres_password,
+        'port': config.postgres_port,
+    }
 
-    conn_psy = psycopg2.connect(
-        host=config.postgres_host,
-        dbname=config.postgres_db,
-        user=config.postgres_user,
-        password=config.postgres_password,
-        port=config.postgres_port,
+
+@lru_cache
+def get_psycopg2_pool() -> psycopg2.pool.ThreadedConnectionPool:
+    return psycopg2.pool.ThreadedConnectionPool(
+        PSYCOPG2_POOL_MIN_CONNECTIONS,
+        PSYCOPG2_POOL_MAX_CONNECTIONS,
+        connection_factory=PooledConnection,
+        **_get_psycopg2_connection_params(),
     )
+
+
+def _is_alive(conn: PooledConnection) -> bool:
+    if conn.closed:
+        return False
+    try:
+        conn.autocommit = True
+        with conn.cursor() as cur:
+            cur.execute('SELECT 1;')
+    except psycopg2.Error:
+        return False
+    return True
+
+
+def _get_alive_connection(pool: psycopg2.pool.AbstractConnectionPool) -> PooledConnection:
+    """idle connection of the pool could be dropped by the server meanwhile, such connections are thrown away"""
+
+    for _ in range(PSYCOPG2_POOL_MAX_CONNECTIONS):
+        conn = pool.getconn()
+        if _is_alive(conn):
+            conn.pool = pool
+            return conn
+        conn.discard()
+        pool.putconn(conn, close=True)
+
+    raise psycopg2.OperationalError('no alive connection in psycopg2 pool')
+
+
+def sql_connect_by_psycopg2() -> psycopg2.extensions.connection:
+    """connect to GCP SQL via PsycoPG2: connection is taken from the pool of the process
+    and given back to it by close() or at the end of with-block"""
+
+    try:
+        return _get_alive_connection(get_psycopg2_pool())
+    except psycopg2.pool.PoolError:
+        logging.warning('psycopg2 pool is exhausted, connecting without the pool')
+
+    conn_psy = psycopg2.connect(**_get_psycopg2_connection_params())
     conn_psy.autocommit = True
 
     return conn_psy
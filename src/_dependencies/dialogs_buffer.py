@@ -0,0 +1,67 @@
+"""Write-behind buffer for the log of the conversations between the users and the bot (PSQL table dialogs)
+
+The rows are kept in the memory of the process while the update is processed and written by one multi-row INSERT
+at the end of it, when the reply is already sent to the user. If the INSERT fails, the rows are kept in the buffer
+and written together with the rows of the next update or when the process exits.
+"""
+
+import atexit
+import datetime
+import logging
+import threading
+from functools import lru_cache
+
+from psycopg2.extras import execute_values
+
+from _dependencies.commons import sql_connect_by_psycopg2
+
+# while DB is unavailable, the oldest rows are dropped to keep the memory of the instance bounded
+DIALOGS_BUFFER_MAX_PENDING_ROWS = 5000
+
+
+class DialogsBuffer:
+    """Thread-safe buffer of the rows for the table dialogs"""
+
+    def __init__(self):
+        self._rows: list[tuple[int, str, datetime.datetime, str]] = []
+        self._lock = threading.Lock()
+
+    def add(self, user_id: int, author: str, message_text: str) -> None:
+        """save the message with the current time, it's written to DB by flush()"""
+
+        with self._lock:
+            self._rows.append((user_id, author, datetime.datetime.now(), message_text))
+
+    def flush(self) -> bool:
+        """write all the buffered rows to DB. False if it failed, the rows are kept for the next attempt then"""
+
+        with self._lock:
+            rows, self._rows = self._rows, []
+        if not rows:
+            return True
+
+        try:
+            with sql_connect_by_psycopg2() as conn_psy, conn_psy.cursor() as cur:
+                execute_values(
+                    cur,
+                    """INSERT INTO dialogs (user_id, author, timestamp, message_text) VALUES %s;""",
+                    rows,
+                    page_size=len(rows),
+                )
+        except Exception as e:
+            logging.info(f'failed to save {len(rows)} rows of dialogs, they are kept for the next attempt')
+            logging.exception(e)
+            with self._lock:
+                self._rows = (rows + self._rows)[-DIALOGS_BUFFER_MAX_PENDING_ROWS:]
+            return False
+
+        return True
+
+
+@lru_cache
+def get_dialogs_buffer() -> DialogsBuffer:
+    """buffer of the process, it's flushed when the process exits too"""
+
+    buffer = DialogsBuffer()
+    atexit.register(buffer.flush)
+    return buffer
@@ -4,8 +4,8 @@ import datetime
 import json
 import logging
 import random
-import time
 import urllib.parse
+from functools import lru_cache
 from typing import Dict
 
 import google.auth.transport.requests
@@ -13,9 +13,15 @@ import google.cloud.logging
 import google.oauth2.id_token
 import requests
 from psycopg2.extensions import cursor
+from requests.adapters import HTTPAdapter
+from telegram import TelegramObject
 from telegram.ext import Application, ContextTypes
 
 from _dependencies.commons import Topics, get_app_config, publish_to_pubsub
+from _dependencies.rate_limiter import get_telegram_backoff
+
+TELEGRAM_API_URL = 'https://api.telegram.org'
+TELEGRAM_CONNECTIONS_POOL_SIZE = 10
 
 
 def notify_admin(message) -> None:
@@ -192,12 +198,40 @@ def process_sending_message_async_other_bot(user_id, data) -> None:
     asyncio.run(prepare_message_for_async(user_id, data, bot_token=get_app_config().bot_api_token))
 
 
-def process_sending_message_async(user_id: int, data) -> None:
-    asyncio.run(prepare_message_for_async(user_id, data, bot_token=get_app_config().bot_api_token__prod))
+def process_sending_message_async(user_id: int, data: dict) -> None:
+    """send message to user by Prod Bot via the shared session to Telegram API"""
+
+    response = call_telegram_api('sendMessage', get_app_config().bot_api_token__prod, {'chat_id': user_id, **data})
+    if response is not None and not response.ok:
+        logging.info(f'message to {user_id} was not sent: {response.status_code=}, {response.text=}')
 
     return None
 
 
+@lru_cache
+def get_telegram_session() -> requests.Session:
+    """keep-alive session to Telegram API shared by all the calls of the process,
+    so TLS handshake is made once per connection, not once per call"""
+
+    session = requests.Session()
+    session.mount(TELEGRAM_API_URL, HTTPAdapter(pool_connections=1, pool_maxsize=TELEGRAM_CONNECTIONS_POOL_SIZE))
+    return session
+
+
+def call_telegram_api(method: str, bot_token: str, params: dict) -> requests.Response | None:
+    """call the method of Telegram Bot API (e.g. sendMessage) with json params via the shared session"""
+
+    if isinstance(params.get('reply_markup'), TelegramObject):
+        params = {**params, 'reply_markup': params['reply_markup'].to_dict()}
+
+    try:
+        return get_telegram_session().post(f'{TELEGRAM_API_URL}/bot{bot_token}/{method}', json=params)
+    except Exception as e:
+        logging.info('Error in getting response from Telegram')
+        logging.exception(e)
+        return None
+
+
 def generate_random_function_id() -> int:
     """generates a random ID for every function – to track all function dependencies (no built-in ID in GCF)"""
 
@@ -229,6 +263,23 @@ def get_change_log_update_time(cur: cursor, change_log_id: int) -> datetime.date
     return parsed_time
 
 
+def get_change_log_update_times(cur: cursor, change_log_ids: set[int]) -> dict[int, datetime.datetime]:
+    """get the times of parsing of several changes in one query, saved in PSQL"""
+
+    change_log_ids = {x for x in change_log_ids if x}
+    if not change_log_ids:
+        return {}
+
+    sql_text_psy = """
+                    SELECT id, parsed_time 
+                    FROM change_log 
+                    WHERE id = ANY(%s);
+                    /*action='getting_change_log_parsing_times' */;"""
+    cur.execute(sql_text_psy, (list(change_log_ids),))
+
+    return {change_log_id: parsed_time for change_log_id, parsed_time in cur.fetchall()}
+
+
 def send_location_to_api(
     session: requests.Session, bot_token: str, user_id: int, params: dict
 ) -> requests.Response | None:
@@ -281,6 +332,45 @@ def save_sending_status_to_notif_by_user(cur: cursor, message_id: int, result: s
     cur.execute(sql_text_psy, (datetime.datetime.now(), message_id))
 
 
+def save_sending_statuses_to_notif_by_user(cur: cursor, statuses: list[tuple[int, str | None]]) -> None:
+    """save the telegram sending statuses of several messages to sql table notif_by_user,
+    one UPDATE per status instead of one per message"""
+
+    message_ids_by_status: dict[str, list[int]] = {}
+    for message_id, result in statuses:
+        if not result:
+            continue
+        if result.startswith('cancelled'):
+            result = 'cancelled'
+        elif result.startswith('failed'):
+            result = 'failed'
+        if result not in {'completed', 'cancelled', 'failed'}:
+            continue
+        message_ids_by_status.setdefault(result, []).append(message_id)
+
+    now = datetime.datetime.now()
+    for result, message_ids in message_ids_by_status.items():
+        sql_text_psy = f"""
+                    UPDATE notif_by_user
+                    SET {result} = %s
+                    WHERE message_id = ANY(%s);
+                    /*action='save_sending_statuses_to_notif_by_user_{result}' */
+                    ;"""
+
+        cur.execute(sql_text_psy, (now, message_ids))
+
+
+def mark_user_preferences_changed(cur: cursor, user_id: int) -> None:
+    """record that notification preferences of the user changed, so compose_notifications refreshes the user"""
+
+    cur.execute(
+        """INSERT INTO user_pref_changes (user_id, changed_at) VALUES (%s, clock_timestamp())
+        ON CONFLICT (user_id) DO UPDATE SET changed_at = EXCLUDED.changed_at
+        /*action='mark_user_preferences_changed' */;""",
+        (user_id,),
+    )
+
+
 def evaluate_city_locations(city_locations):
     if not city_locations:
         logging.info('no city_locations')
@@ -377,6 +467,18 @@ def send_message_to_api(
     return r
 
 
+def get_retry_after(response: requests.Response) -> int | None:
+    """get the number of seconds Telegram asks to wait in case of flood control"""
+
+    try:
+        retry_after = response.json().get('parameters', {}).get('retry_after')
+        if retry_after is None:
+            retry_after = response.headers.get('Retry-After')
+        return int(retry_after) if retry_after is not None else None
+    except Exception:  # noqa
+        return None
+
+
 def process_response(user_id: int, response: requests.Response | None) -> str:
     """process response received as a result of Telegram API call while sending message/location"""
 
@@ -404,16 +506,11 @@ def process_response(user_id: int, response: requests.Response | None) -> str:
             return 'cancelled'
 
         elif 420 <= response.status_code <= 429:  # 'Flood Control':
-            logging.info(f'Flood Control: message to {user_id} was not sent, {response.reason=}')
+            retry_after = get_retry_after(response)
+            logging.info(f'Flood Control: message to {user_id} was not sent, {response.reason=}, {retry_after=}')
             logging.exception('FLOOD CONTROL')
-            # fixme - try to get retry_after
-            try:
-                retry_after = response.parameters.retry_after
-                print(f'ho-ho, we did it! 429 worked! {retry_after}')
-            except:  # noqa
-                pass
-            # fixme ^^^
-            time.sleep(5)  # to mitigate flood control
+            # the sender decides when to retry, based on the pause registered here
+            get_telegram_backoff().register_flood_control(user_id, retry_after)
             return 'failed_flood_control'
 
         else:
@@ -0,0 +1,38 @@
+"""Parsing of the forum pages.
+
+A topic page holds the whole layout of the forum around the posts. Only the blocks which are needed
+are built into the soup: lxml still reads the whole page, but the tree is not created for the rest of it.
+"""
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+
+def _has_class(class_name: str):
+    """while the page is read, class of the tag is one string like "post has-profile bg2" """
+
+    return lambda value: bool(value) and class_name in value.split()
+
+
+def _is_title_or_post_content(name: str, attrs: dict) -> bool:
+    if name == 'h2':
+        return _has_class('topic-title')(attrs.get('class'))
+    if name == 'div':
+        return _has_class('content')(attrs.get('class'))
+    return False
+
+
+POSTS_STRAINER = SoupStrainer('div', {'class': _has_class('post')})
+TITLE_AND_POST_CONTENTS_STRAINER = SoupStrainer(_is_title_or_post_content)
+
+
+def cook_posts_soup(page_content: str | bytes) -> BeautifulSoup:
+    """soup with the posts of the topic page (div.post) only"""
+
+    return BeautifulSoup(page_content, features='lxml', parse_only=POSTS_STRAINER)
+
+
+def cook_first_post_soup(page_content: str | bytes) -> BeautifulSoup:
+    """soup with the title of the topic (h2.topic-title) and the texts of its posts (div.content) only,
+    the first div.content is the first post"""
+
+    return BeautifulSoup(page_content, features='lxml', parse_only=TITLE_AND_POST_CONTENTS_STRAINER)
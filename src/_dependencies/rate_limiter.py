@@ -0,0 +1,160 @@
+"""Token-bucket rate limiters for calls to external APIs (Telegram etc.)
+
+All the state here lives in the memory of one process: limiters and flood control pauses are not shared
+between send_notifications, send_notifications_helper and send_notifications_helper_2,
+nor between several instances of the same function. Each of them learns about a flood control pause
+only from its own HTTP 429 responses.
+"""
+
+import threading
+import time
+from functools import lru_cache
+
+# Telegram Bot API limits: ~30 messages per second for the bot in total, ~1 message per second per chat.
+# Short bursts within one chat (like text + location of the same notification) are tolerated by Telegram.
+TELEGRAM_GLOBAL_MESSAGES_PER_SECOND = 30
+TELEGRAM_CHAT_MESSAGES_PER_SECOND = 1
+TELEGRAM_CHAT_BURST = 2
+# if Telegram didn't tell how long to wait
+DEFAULT_RETRY_AFTER_SECONDS = 5
+# flood control for several different chats at once means the limit of the whole bot is hit, not of a single chat
+CHATS_IN_FLOOD_CONTROL_FOR_GLOBAL_PAUSE = 3
+
+
+class TokenBucket:
+    """Thread-safe token bucket: refills `rate` tokens per second up to `capacity`"""
+
+    def __init__(self, rate: float, capacity: float | None = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else rate
+        self._tokens = self.capacity
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+    def seconds_to_token(self) -> float:
+        """how long to wait till the next token is available, 0 if it's available now"""
+
+        with self._lock:
+            self._refill()
+            if self._tokens >= 1:
+                return 0.0
+            return (1 - self._tokens) / self.rate
+
+    def try_acquire(self) -> float:
+        """take a token if available; otherwise return seconds to wait till it's available"""
+
+        with self._lock:
+            self._refill()
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / self.rate
+
+    def acquire(self) -> None:
+        """block until a token is taken"""
+
+        while True:
+            wait_seconds = self.try_acquire()
+            if not wait_seconds:
+                return
+            time.sleep(wait_seconds)
+
+
+class TelegramBackoff:
+    """Pauses requested by Telegram flood control (HTTP 429 with retry_after): for one chat or for the whole bot"""
+
+    def __init__(self, chats_for_global_pause: int = CHATS_IN_FLOOD_CONTROL_FOR_GLOBAL_PAUSE):
+        self.chats_for_global_pause = chats_for_global_pause
+        self._chat_paused_till: dict[int, float] = {}
+        self._global_paused_till = 0.0
+        self._lock = threading.Lock()
+
+    def register_flood_control(self, chat_id: int, retry_after: float | None) -> None:
+        """pause the chat for retry_after seconds; pause everything if several chats are in flood control"""
+
+        now = time.monotonic()
+        paused_till = now + (retry_after or DEFAULT_RETRY_AFTER_SECONDS)
+
+        with self._lock:
+            self._chat_paused_till = {k: v for k, v in self._chat_paused_till.items() if v > now}
+            self._chat_paused_till[chat_id] = max(paused_till, self._chat_paused_till.get(chat_id, 0.0))
+
+            if len(self._chat_paused_till) >= self.chats_for_global_pause:
+                self._global_paused_till = max(self._global_paused_till, paused_till)
+
+    def seconds_to_wait(self, chat_id: int) -> float:
+        """how long a message to chat_id has to wait due to flood control, 0 if it can be sent now"""
+
+        with self._lock:
+            paused_till = max(self._global_paused_till, self._chat_paused_till.get(chat_id, 0.0))
+        return max(0.0, paused_till - time.monotonic())
+
+    def wait(self, chat_id: int) -> None:
+        """block till the flood control pause for chat_id is over"""
+
+        wait_seconds = self.seconds_to_wait(chat_id)
+        if wait_seconds:
+            time.sleep(wait_seconds)
+
+
+@lru_cache
+def get_telegram_backoff() -> TelegramBackoff:
+    """flood control state of this process, survives between invocations served by the same instance"""
+    return TelegramBackoff()
+
+
+class TelegramRateLimiter:
+    """Global limit for the whole bot plus a separate small bucket for every chat"""
+
+    def __init__(
+        self,
+        global_rate: float = TELEGRAM_GLOBAL_MESSAGES_PER_SECOND,
+        chat_rate: float = TELEGRAM_CHAT_MESSAGES_PER_SECOND,
+        chat_burst: float = TELEGRAM_CHAT_BURST,
+        backoff: TelegramBackoff | None = None,
+    ):
+        self.backoff = backoff or get_telegram_backoff()
+        self.global_bucket = TokenBucket(global_rate)
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self._chat_buckets: dict[int, TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    def try_acquire(self, chat_id: int) -> float:
+        """take a slot for a message to chat_id if both global and chat limits allow it;
+        otherwise return seconds to wait. Nothing is consumed if the message can't be sent now"""
+
+        backoff_wait = self.backoff.seconds_to_wait(chat_id)
+        if backoff_wait:
+            return backoff_wait
+
+        with self._lock:
+            chat_bucket = self._chat_buckets.get(chat_id)
+            if not chat_bucket:
+                chat_bucket = TokenBucket(self.chat_rate, self.chat_burst)
+                self._chat_buckets[chat_id] = chat_bucket
+
+            chat_wait = chat_bucket.seconds_to_token()
+            if chat_wait:
+                return chat_wait
+
+            global_wait = self.global_bucket.try_acquire()
+            if global_wait:
+                return global_wait
+
+            chat_bucket.try_acquire()
+            return 0.0
+
+    def acquire(self, chat_id: int) -> None:
+        """block until a message to chat_id is allowed"""
+
+        while True:
+            wait_seconds = self.try_acquire(chat_id)
+            if not wait_seconds:
+                return
+            time.sleep(wait_seconds)
@@ -0,0 +1,235 @@
+"""Catalog of the regions which user can pick in the settings of the bot: federal districts, their regions
+and forum folders of the regions.
+
+Texts of the buttons and grouping of the folders are not stored in PSQL, so the catalog of them is static:
+it's built once on import together with the keyboards, and all the lookups are made by dicts.
+Names of the folders are loaded from PSQL once per instance and reloaded after FOLDER_NAMES_TTL_SECONDS.
+"""
+
+import logging
+import time
+from dataclasses import dataclass
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Mapping
+
+from psycopg2.extensions import cursor
+from telegram import ReplyKeyboardMarkup
+
+FOLDER_NAMES_TTL_SECONDS = 600
+
+BACK_TO_START_BUTTON = 'в начало'
+FED_DIST_PICK_OTHER_BUTTON = 'выбрать другой Федеральный Округ'
+
+
+@dataclass(frozen=True)
+class Region:
+    button: str
+    folder_ids: tuple[int, ...]  # the first one is the main folder of the region
+
+
+@dataclass(frozen=True)
+class FederalDistrict:
+    button: str
+    regions: tuple[Region, ...]
+
+
+FEDERAL_DISTRICTS = (
+    FederalDistrict(
+        'Дальневосточный ФО',
+        (
+            Region('Бурятия', (274,)),
+            Region('Приморский край', (298,)),
+            Region('Хабаровский край', (154,)),
+            Region('Амурская обл.', (390,)),
+            Region('Прочие поиски по ДФО', (188,)),
+        ),
+    ),
+    FederalDistrict(
+        'Приволжский ФО',
+        (
+            Region('Башкортостан', (191, 235)),
+            Region('Кировская обл.', (211, 275)),
+            Region('Марий Эл', (295, 297)),
+            Region('Мордовия', (294,)),
+            Region('Нижегородская обл.', (121, 289)),
+            Region('Оренбургская обл.', (337,)),
+            Region('Пензенская обл.', (170, 322)),
+            Region('Пермский край', (143, 325)),
+            Region('Самарская обл.', (333, 334, 305)),
+            Region('Саратовская обл.', (212,)),
+            Region('Татарстан', (163, 231)),
+            Region('Удмуртия', (237, 239)),
+            Region('Ульяновская обл.', (290, 320)),
+            Region('Чувашия', (265, 327)),
+            Region('Прочие поиски по ПФО', (183,)),
+        ),
+    ),
+    FederalDistrict(
+        'Северо-Кавказский ФО',
+        (
+            Region('Дагестан', (292,)),
+            Region('Ставропольский край', (173,)),
+            Region('Чечня', (291,)),
+            Region('Кабардино-Балкария', (301,)),
+            Region('Ингушетия', (422,)),
+            Region('Северная Осетия', (423,)),
+            Region('Прочие поиски по СКФО', (184,)),
+        ),
+    ),
+    FederalDistrict(
+        'Северо-Западный ФО',
+        (
+            Region('Вологодская обл.', (370, 369, 368, 367)),
+            Region('Коми', (378, 377, 376)),
+            Region('Карелия', (403, 404)),
+            Region('Ленинградская обл.', (120, 300)),
+            Region('Мурманская обл.', (214, 371, 372, 373)),
+            Region('Псковская обл.', (210, 383, 382)),
+            Region('Архангельская обл.', (330,)),
+            Region('Прочие поиски по СЗФО', (181,)),
+        ),
+    ),
+    FederalDistrict(
+        'Сибирский ФО',
+        (
+            Region('Алтайский край', (161,)),
+            Region('Иркутская обл.', (137, 387, 386, 303)),
+            Region('Кемеровская обл.', (202, 308)),
+            Region('Красноярский край', (269, 318)),
+            Region('Новосибирская обл.', (177, 310)),
+            Region('Омская обл.', (153, 314)),
+            Region('Томская обл.', (215, 401)),
+            Region('Хакасия', (402,)),
+            Region('Прочие поиски по СФО', (182,)),
+        ),
+    ),
+    FederalDistrict(
+        'Уральский ФО',
+        (
+            Region('Свердловская обл.', (213,)),
+            Region('Курганская обл.', (391, 392)),
+            Region('Тюменская обл.', (339,)),
+            Region('Ханты-Мансийский АО', (338,)),
+            Region('Челябинская обл.', (280,)),
+            Region('Ямало-Ненецкий АО', (204,)),
+            Region('Прочие поиски по УФО', (187,)),
+        ),
+    ),
+    FederalDistrict(
+        'Центральный ФО',
+        (
+            Region('Белгородская обл.', (236,)),
+            Region('Брянская обл.', (138,)),
+            Region('Владимирская обл.', (123, 233)),
+            Region('Воронежская обл.', (271, 315)),
+            Region('Ивановская обл.', (132, 193)),
+            Region('Калужская обл.', (185,)),
+            Region('Костромская обл.', (151,)),
+            Region('Курская обл.', (186,)),
+            Region('Липецкая обл.', (272,)),
+            Region('Москва и МО: Активные Поиски', (276,)),
+            Region('Москва и МО: Инфо Поддержка', (41,)),
+            Region('Орловская обл.', (222, 324)),
+            Region('Рязанская обл.', (155,)),
+            Region('Смоленская обл.', (122,)),
+            Region('Тамбовская обл.', (273,)),
+            Region('Тверская обл.', (126,)),
+            Region('Тульская обл.', (125,)),
+            Region('Ярославская обл.', (264,)),
+            Region('Прочие поиски по ЦФО', (179,)),
+        ),
+    ),
+    FederalDistrict(
+        'Южный ФО',
+        (
+            Region('Адыгея', (299,)),
+            Region('Астраханская обл.', (336,)),
+            Region('Волгоградская обл.', (131,)),
+            Region('Краснодарский край', (162,)),
+            Region('Крым', (293,)),
+            Region('Ростовская обл.', (157,)),
+            Region('Прочие поиски по ЮФО', (180,)),
+        ),
+    ),
+)
+OTHER_SEARCHES_IN_RUSSIA = Region('Прочие поиски по РФ', (116,))
+
+
+class RegionCatalog:
+    """Immutable catalog of the federal districts and regions with O(1) lookups by button and by folder"""
+
+    def __init__(self, federal_districts: tuple[FederalDistrict, ...], other_region: Region):
+        self.federal_districts = federal_districts
+        self.fed_dist_by_button: Mapping[str, FederalDistrict] = MappingProxyType(
+            {fed_dist.button: fed_dist for fed_dist in federal_districts}
+        )
+
+        regions = [region for fed_dist in federal_districts for region in fed_dist.regions] + [other_region]
+        self.region_by_button: Mapping[str, Region] = MappingProxyType({region.button: region for region in regions})
+        self.region_by_main_folder: Mapping[int, Region] = MappingProxyType(
+            {region.folder_ids[0]: region for region in regions}
+        )
+        self.fed_dist_by_region_button: Mapping[str, FederalDistrict] = MappingProxyType(
+            {region.button: fed_dist for fed_dist in federal_districts for region in fed_dist.regions}
+        )
+
+        self.fed_dist_keyboard = tuple(
+            [(fed_dist.button,) for fed_dist in federal_districts] + [(other_region.button,), (BACK_TO_START_BUTTON,)]
+        )
+        self.fed_dist_reply_markup = ReplyKeyboardMarkup(self.fed_dist_keyboard, resize_keyboard=True)
+        self.region_reply_markups: Mapping[str, ReplyKeyboardMarkup] = MappingProxyType(
+            {
+                fed_dist.button: ReplyKeyboardMarkup(self._get_regions_keyboard(fed_dist), resize_keyboard=True)
+                for fed_dist in federal_districts
+            }
+        )
+
+        # all the buttons of the keyboards with regions, except "в начало"
+        self.region_keyboards_buttons = frozenset(self.region_by_button) | {FED_DIST_PICK_OTHER_BUTTON}
+
+    @staticmethod
+    def _get_regions_keyboard(fed_dist: FederalDistrict) -> tuple[tuple[str], ...]:
+        return tuple(
+            [(region.button,) for region in fed_dist.regions] + [(FED_DIST_PICK_OTHER_BUTTON,), (BACK_TO_START_BUTTON,)]
+        )
+
+    def get_reply_markup_for_region(self, region_button: str) -> ReplyKeyboardMarkup:
+        """keyboard of the federal district of the region, or keyboard of federal districts"""
+
+        fed_dist = self.fed_dist_by_region_button.get(region_button)
+        if fed_dist is None:
+            return self.fed_dist_reply_markup
+        return self.region_reply_markups[fed_dist.button]
+
+
+REGION_CATALOG = RegionCatalog(FEDERAL_DISTRICTS, OTHER_SEARCHES_IN_RUSSIA)
+
+
+class FolderNames:
+    """Display names of the forum folders with searches (geo_folders_view), reloaded by TTL"""
+
+    def __init__(self):
+        self._names: dict[int, str] = {}
+        self._loaded_at: float | None = None
+
+    def _reload(self, cur: cursor) -> None:
+        cur.execute(
+            """
+            SELECT folder_id, folder_display_name FROM geo_folders_view WHERE folder_type='searches';
+            /*action='get_folder_names' */
+            """
+        )
+        self._names = {folder_id: name for folder_id, name in cur.fetchall()}
+        self._loaded_at = time.monotonic()
+        logging.info(f'folder names: loaded {len(self._names)} folders')
+
+    def get(self, cur: cursor, folder_id: int) -> str:
+        if self._loaded_at is None or time.monotonic() - self._loaded_at > FOLDER_NAMES_TTL_SECONDS:
+            self._reload(cur)
+        return self._names.get(folder_id) or ''
+
+
+@lru_cache
+def get_folder_names() -> FolderNames:
+    return FolderNames()
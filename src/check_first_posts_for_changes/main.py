@@ -7,8 +7,11 @@ Updates are either saved in PSQL or send via pub/sub to other scripts"""
 import datetime
 import hashlib
 import logging
+import math
 import re
-from typing import Any, List, Optional, Tuple
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Iterator, Optional, Tuple
 
 import requests
 import sqlalchemy  # idea for optimization – to move to psycopg2
@@ -27,41 +30,166 @@ requests_session = requests.Session()
 
 bad_gateway_counter = 0
 
+# active searches are ranked by start time and split into groups: the newest group is due every minute,
+# every next one – twice as rarely. the number of checks per run is the same as with the fixed groups
+NUM_OF_TOPIC_GROUPS = 20
+# a topic with the first post changed at every check is due this number of times more often
+CHANGE_RATE_BOOST = 8
+# the function is triggered every minute
+TIME_BUDGET_SECONDS = 45
+MAX_PARALLEL_REQUESTS = 4
+
+search_first_posts_table = sqlalchemy.table(
+    'search_first_posts',
+    sqlalchemy.column('search_id'),
+    sqlalchemy.column('timestamp'),
+    sqlalchemy.column('actual'),
+    sqlalchemy.column('content_hash'),
+    sqlalchemy.column('content'),
+    sqlalchemy.column('num_of_checks'),
+)
+
+# dynamic parts of the first post, which change without any change of the post itself
+PICTURE_VIEWS_PATTERN = re.compile(r'\) \d+ просмотр(?:а|ов)?')
+DYNAMIC_CONTENT_PATTERNS = [
+    re.compile(r'value="\S{10}"'),
+    re.compile(r'value="\S{32}"'),
+    re.compile(r'value="\S{40}"'),
+    re.compile(r'sid=\S{32}&amp;'),
+    re.compile(r'всего редактировалось \d+ раз.'),  # AK:issue#9
+    re.compile(r'<span class="footer-info"><span title="SQL time:.{120,130}</span></span>'),
+]
+
 
 class Search:
-    def __init__(self, topic_id=None):
+    def __init__(self, topic_id=None, start_time=None, last_checked=None, num_of_checks=0, num_of_changes=0, rank=None):
         self.topic_id = topic_id
+        self.start_time = start_time
+        self.last_checked = last_checked
+        self.num_of_checks = num_of_checks
+        self.num_of_changes = num_of_changes
+        self.rank = rank
+
+
+def get_base_check_interval(rank: int, num_of_topics: int) -> int:
+    """minutes between checks by the freshness of the search only, rank 0 is the newest search"""
+
+    return 2 ** (rank * NUM_OF_TOPIC_GROUPS // num_of_topics)
+
+
+def get_check_priority(topic: Search, num_of_topics: int, now: datetime.datetime) -> float:
+    """how many desired intervals passed since the last check: the topic is due if it's 1 or more"""
+
+    if not topic.last_checked:
+        return math.inf
+
+    change_rate = topic.num_of_changes / (topic.num_of_checks + 1)
+    desired_interval = get_base_check_interval(topic.rank, num_of_topics) / (1 + CHANGE_RATE_BOOST * change_rate)
+    minutes_since_last_check = (now - topic.last_checked).total_seconds() / 60
+
+    return minutes_since_last_check / desired_interval
+
+
+def schedule_topics_to_check(topics: list[Search], now: datetime.datetime) -> list[Search]:
+    """topics due now, the most overdue first, as many as the fixed groups would check on average"""
+
+    num_of_topics = len(topics)
+    if not num_of_topics:
+        return []
+
+    for rank, topic in enumerate(topics):
+        topic.rank = rank
+    checks_per_run = math.ceil(sum(1 / get_base_check_interval(x.rank, num_of_topics) for x in topics))
+
+    priorities = {x.topic_id: get_check_priority(x, num_of_topics, now) for x in topics}
+    due_topics = [x for x in topics if priorities[x.topic_id] >= 1]
+    due_topics.sort(key=lambda x: priorities[x.topic_id], reverse=True)
+    logging.info(f'{len(due_topics)} topics of {num_of_topics} are due, {checks_per_run} will be checked')
+
+    return due_topics[:checks_per_run]
+
 
+def check_topics_in_parallel(check_topic: Callable, topic_ids: list, deadline: float) -> Iterator[Tuple[Any, Any]]:
+    """yield (topic_id, result of check_topic) for the topics, several topics are checked at once.
+    no new checks are started after the deadline (time.monotonic())"""
 
-class PercentGroup:
-    def __init__(
-        self,
-        n=None,
-        start_percent=None,
-        finish_percent=None,
-        start_num=None,
-        finish_num=None,
-        frequency=None,
-        first_delay=None,
-        searches=None,  # noqa
-    ):
-        searches = []
-        self.n = n
-        self.sp = start_percent
-        self.fp = finish_percent
-        self.sn = start_num
-        self.fn = finish_num
-        self.f = frequency
-        self.d = first_delay
-        self.s = searches
-
-    def __str__(self):
-        days = f' or {int(self.f // 1440)} day(s)' if self.f >= 1440 else ''
-        return (
-            f'N{self.n: <2}: {self.sp}%–{self.fp}%. Updated every {self.f} minute(s){days}. '
-            f'First delay = {self.d} minutes. nums {self.sn}-{self.fn}. num of searches {len(self.s)}'
+    with ThreadPoolExecutor(max_workers=MAX_PARALLEL_REQUESTS) as executor:
+        for i in range(0, len(topic_ids), MAX_PARALLEL_REQUESTS):
+            if time.monotonic() > deadline:
+                logging.info(f'time budget is over, {len(topic_ids) - i} topics are left for the next run')
+                return
+
+            chunk = topic_ids[i : i + MAX_PARALLEL_REQUESTS]
+            yield from zip(chunk, executor.map(check_topic, chunk))
+
+
+def get_actual_first_post_hashes(conn, topic_ids: list) -> dict:
+    """hashes of the actual first posts of the topics, by topic_id"""
+
+    if not topic_ids:
+        return {}
+
+    stmt = sqlalchemy.text("""
+        SELECT search_id, content_hash FROM search_first_posts WHERE search_id = ANY(:a) AND actual = TRUE
+        /*action='get_actual_first_post_hashes' */;""")
+    raw_data = conn.execute(stmt, a=list(topic_ids)).fetchall()
+
+    return {line[0]: line[1] for line in raw_data}
+
+
+def save_new_first_posts(conn, new_first_posts: list) -> None:
+    """save the new versions of the first posts: (topic_id, hash, content).
+    previous versions are kept, but are not actual any more"""
+
+    if not new_first_posts:
+        return None
+
+    now = datetime.datetime.now()
+    with conn.begin():
+        stmt = sqlalchemy.text("""
+            UPDATE search_first_posts SET actual = FALSE WHERE search_id = ANY(:a) AND actual = TRUE
+            /*action='outdate_first_posts' */;""")
+        conn.execute(stmt, a=[x[0] for x in new_first_posts])
+
+        conn.execute(
+            search_first_posts_table.insert().values(
+                [
+                    {
+                        'search_id': topic_id,
+                        'timestamp': now,
+                        'actual': True,
+                        'content_hash': act_hash,
+                        'content': act_content,
+                        'num_of_checks': 1,
+                    }
+                    for topic_id, act_hash, act_content in new_first_posts
+                ]
+            )
         )
 
+    return None
+
+
+def save_checks_to_schedule(conn, checks: list) -> None:
+    """record the checks of the first posts: (topic_id, if the first post was changed)"""
+
+    if not checks:
+        return None
+
+    stmt = sqlalchemy.text("""
+        INSERT INTO first_post_check_schedule (search_id, last_checked, num_of_checks, num_of_changes, last_changed)
+        VALUES (:a, :c, 1, :b, CASE WHEN :b > 0 THEN CAST(:c AS timestamp) END)
+        ON CONFLICT (search_id) DO UPDATE SET
+            last_checked = EXCLUDED.last_checked,
+            num_of_checks = first_post_check_schedule.num_of_checks + 1,
+            num_of_changes = first_post_check_schedule.num_of_changes + EXCLUDED.num_of_changes,
+            last_changed = COALESCE(EXCLUDED.last_changed, first_post_check_schedule.last_changed)
+        /*action='save_checks_to_schedule' */;""")
+    now = datetime.datetime.now()
+    conn.execute(stmt, [{'a': topic_id, 'b': int(changed), 'c': now} for topic_id, changed in checks])
+
+    return None
+
 
 def define_topic_visibility_by_content(content: str) -> str:
     """define visibility for the topic's content: regular, hidden or deleted"""
@@ -243,18 +371,26 @@ def update_first_posts_and_statuses():
                 f AS (SELECT folder_id, folder_type FROM geo_folders
                     WHERE folder_type IS NULL OR folder_type = 'searches')
 
-                SELECT s.search_forum_num, s.search_start_time FROM s
+                SELECT s.search_forum_num, s.search_start_time, c.last_checked, c.num_of_checks, c.num_of_changes
+                FROM s
                 LEFT JOIN h ON s.search_forum_num=h.search_forum_num
                 JOIN f ON s.forum_folder_id=f.folder_id
+                LEFT JOIN first_post_check_schedule AS c ON s.search_forum_num=c.search_id
                 WHERE (h.status != 'deleted' AND h.status != 'hidden') or h.status IS NULL
                 ORDER BY 2 DESC
-                /*action='get_list_of_searches_for_first_post_and_status_update 3.0' */
+                /*action='get_list_of_searches_for_first_post_and_status_update 4.0' */
                 ;""").fetchall()
 
             # form the list-like table
             if raw_sql_extract:
                 for line_2 in raw_sql_extract:
-                    new_object = Search(topic_id=line_2[0])
+                    new_object = Search(
+                        topic_id=line_2[0],
+                        start_time=line_2[1],
+                        last_checked=line_2[2],
+                        num_of_checks=line_2[3] or 0,
+                        num_of_changes=line_2[4] or 0,
+                    )
                     base_table_of_objects.append(new_object)
 
         except Exception as e2:
@@ -266,57 +402,6 @@ def update_first_posts_and_statuses():
 
         return base_table_of_objects
 
-    def generate_list_of_topic_groups() -> List[PercentGroup]:
-        """generate N search groups, groups needed to define which part of all searches will be checked now"""
-
-        percent_step = 5
-        list_of_groups = []
-        current_percent = 0
-
-        while current_percent < 100:
-            n = int(current_percent / percent_step)
-            new_group = PercentGroup(
-                n=n,
-                start_percent=current_percent,
-                finish_percent=min(100, current_percent + percent_step - 1),
-                frequency=2**n,
-                first_delay=2 ** (n - 1) - 1 if n != 0 else 0,
-            )
-            list_of_groups.append(new_group)
-            current_percent += percent_step
-
-        return list_of_groups
-
-    def define_which_topic_groups_to_be_checked(list_of_groups: List[PercentGroup]) -> List[PercentGroup]:
-        """gives an output of 2 groups that should be checked for this time"""
-
-        start_time = datetime.datetime(2023, 1, 1, 0, 0, 0)
-        curr_minute = int(((datetime.datetime.now() - start_time).total_seconds() / 60) // 1)
-
-        curr_minute_list = []
-        for group_2 in list_of_groups:
-            if not ((curr_minute - group_2.d) % group_2.f):
-                curr_minute_list.append(group_2)
-                logging.info(f'Group to be checked {group_2}')
-
-        return curr_minute_list
-
-    def enrich_groups_with_topics(list_of_groups: List[PercentGroup], list_of_s: List) -> List[PercentGroup]:
-        """add searches to the chosen groups"""
-
-        num_of_searches = len(list_of_s)
-
-        for group_2 in list_of_groups:
-            group_2.sn = int((group_2.sp * num_of_searches / 100) // 1)
-            group_2.fn = min(int(((group_2.fp + 1) * num_of_searches / 100) // 1 - 1), len(list_of_s))
-
-        for j, search in enumerate(list_of_s):
-            for group_2 in list_of_groups:
-                if group_2.sn <= j <= group_2.fn:
-                    group_2.s.append(search)
-
-        return list_of_groups
-
     def prettify_content(content: str) -> str:
         """remove the irrelevant code from the first page content"""
 
@@ -338,24 +423,15 @@ def update_first_posts_and_statuses():
         content = content[: (finish + 1)]
 
         # exclude dynamic info – views of the pictures
-        patterns = re.findall(r'\) \d+ просмотр(?:а|ов)?', content)
+        patterns = PICTURE_VIEWS_PATTERN.findall(content)
         if patterns:
             for word in patterns:
                 content = content.replace(word, ')')
 
         # exclude dynamic info - token / creation time / sid / etc / footer
-        patterns_list = [
-            r'value="\S{10}"',
-            r'value="\S{32}"',
-            r'value="\S{40}"',
-            r'sid=\S{32}&amp;',
-            r'всего редактировалось \d+ раз.',  # AK:issue#9
-            r'<span class="footer-info"><span title="SQL time:.{120,130}</span></span>',
-        ]
-
         patterns = []
-        for pat in patterns_list:
-            patterns += re.findall(pat, content)
+        for pat in DYNAMIC_CONTENT_PATTERNS:
+            patterns += pat.findall(content)
 
         if patterns:
             for word in patterns:
@@ -385,56 +461,38 @@ def update_first_posts_and_statuses():
 
         return hash_num, cont, forum_unavailable, not_found, topic_visibility
 
-    def update_first_posts_in_sql(searches_list):
+    def update_first_posts_in_sql(searches_list, deadline):
         """generate a list of topic_ids with updated first posts and record in it PSQL"""
 
         num_of_searches_counter = 0
         num_of_site_errors_counter = 0
         list_of_searches_with_updated_f_posts = []
+        checks = []
         pool = sql_connect()
         conn = pool.connect()
+        new_first_posts = []
         try:
-            for line in searches_list:
+            topic_ids = [line.topic_id for line in searches_list]
+            # the latest hashes of all the topics at once
+            last_hashes = get_actual_first_post_hashes(conn, topic_ids)
+
+            for topic_id, first_post in check_topics_in_parallel(get_first_post, topic_ids, deadline):
                 num_of_searches_counter += 1
-                topic_id = line.topic_id
-                act_hash, act_content, site_unavailable, topic_not_found, topic_visibility = get_first_post(topic_id)
+                act_hash, act_content, site_unavailable, topic_not_found, topic_visibility = first_post
 
                 if not site_unavailable and not topic_not_found:
-                    # check the latest hash
-                    stmt = sqlalchemy.text("""
-                            SELECT content_hash, num_of_checks, content from search_first_posts WHERE search_id=:a
-                            AND actual = TRUE;
-                            """)
-                    raw_data = conn.execute(stmt, a=topic_id).fetchone()
-
                     # if record for this search – exists
-                    if raw_data:
-                        last_hash = raw_data[0]
-
+                    if topic_id in last_hashes:
                         # if record for this search – outdated
-                        if act_hash != last_hash and topic_visibility == 'regular':
-                            # set all prev records as Actual = False
-                            stmt = sqlalchemy.text("""
-                                    UPDATE search_first_posts SET actual = FALSE WHERE search_id = :a;
-                                    """)
-                            conn.execute(stmt, a=topic_id)
-
-                            # add new record
-                            stmt = sqlalchemy.text("""
-                                    INSERT INTO search_first_posts
-                                    (search_id, timestamp, actual, content_hash, content, num_of_checks)
-                                    VALUES (:a, :b, TRUE, :c, :d, :e);
-                                    """)
-                            conn.execute(stmt, a=topic_id, b=datetime.datetime.now(), c=act_hash, d=act_content, e=1)
-
+                        if act_hash != last_hashes[topic_id] and topic_visibility == 'regular':
+                            new_first_posts.append((topic_id, act_hash, act_content))
                             list_of_searches_with_updated_f_posts.append(topic_id)
 
                     # if record for this search – does not exist – add a new record
                     else:
-                        stmt = sqlalchemy.text("""INSERT INTO search_first_posts
-                                                  (search_id, timestamp, actual, content_hash, content, num_of_checks)
-                                                  VALUES (:a, :b, TRUE, :c, :d, :e);""")
-                        conn.execute(stmt, a=topic_id, b=datetime.datetime.now(), c=act_hash, d=act_content, e=1)
+                        new_first_posts.append((topic_id, act_hash, act_content))
+
+                    checks.append((topic_id, topic_id in list_of_searches_with_updated_f_posts))
 
                 elif site_unavailable:
                     num_of_site_errors_counter += 1
@@ -450,6 +508,21 @@ def update_first_posts_and_statuses():
             logging.info('exception in update_first_posts_and_statuses')
             logging.exception(e)
 
+        # only the changed first posts are written, all of them at once
+        try:
+            save_new_first_posts(conn, new_first_posts)
+        except Exception as e:
+            logging.info('exception in save_new_first_posts')
+            logging.exception(e)
+            list_of_searches_with_updated_f_posts = []
+            checks = []
+
+        try:
+            save_checks_to_schedule(conn, checks)
+        except Exception as e:
+            logging.info('exception in save_checks_to_schedule')
+            logging.exception(e)
+
         conn.close()
         pool.dispose()
 
@@ -460,16 +533,15 @@ def update_first_posts_and_statuses():
     global bad_gateway_counter
     global requests_session
 
+    deadline = time.monotonic() + TIME_BUDGET_SECONDS
+
     list_of_searches = get_list_of_topics()
-    groups_list_all = generate_list_of_topic_groups()
-    groups_list_now = define_which_topic_groups_to_be_checked(groups_list_all)
-    groups_list_now = enrich_groups_with_topics(groups_list_now, list_of_searches)
-    topics_list_now = [line for group in groups_list_now for line in group.s]
+    topics_list_now = schedule_topics_to_check(list_of_searches, datetime.datetime.now())
 
     if not topics_list_now:
         return None
 
-    list_of_topics_with_updated_first_posts = update_first_posts_in_sql(topics_list_now)
+    list_of_topics_with_updated_first_posts = update_first_posts_in_sql(topics_list_now, deadline)
 
     if not list_of_topics_with_updated_first_posts:
         return None
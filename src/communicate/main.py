@@ -2,7 +2,6 @@
 
 """receives telegram messages from users, acts accordingly and sends back the reply"""
 
-import asyncio
 import datetime
 import hashlib
 import json
@@ -12,7 +11,9 @@ import re
 import urllib.parse
 import urllib.request
 from dataclasses import dataclass
-from typing import Any, Dict, List, Optional, Tuple, Union
+from functools import lru_cache
+from operator import attrgetter
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
 
 import requests
 from flask import Request
@@ -28,7 +29,6 @@ from telegram import (
     TelegramObject,
     Update,
 )
-from telegram.ext import Application, ContextTypes
 
 from _dependencies.commons import (
     Topics,
@@ -37,12 +37,17 @@ from _dependencies.commons import (
     setup_google_logging,
     sql_connect_by_psycopg2,
 )
+from _dependencies.dialogs_buffer import get_dialogs_buffer
 from _dependencies.misc import (
     age_writer,
+    call_telegram_api,
+    get_telegram_session,
+    mark_user_preferences_changed,
     notify_admin,
     process_sending_message_async,
     time_counter_since_search_start,
 )
+from _dependencies.region_catalog import FED_DIST_PICK_OTHER_BUTTON, REGION_CATALOG, get_folder_names
 
 setup_google_logging()
 
@@ -259,6 +264,13 @@ class AllButtons:
         return [k for k, v in self.__dict__.items()]
 
 
+@lru_cache
+def get_all_buttons() -> AllButtons:
+    """buttons are not changed after creation, so they are created once per instance"""
+
+    return AllButtons(full_buttons_dict)
+
+
 def compose_user_preferences_message(cur: cursor, user_id: int) -> List[Union[List[str], str]]:
     """Compose a text for user on which types of notifications are enabled for zir"""
 
@@ -667,21 +679,6 @@ def compose_full_message_on_list_of_searches_ikb(
     return ikb
 
 
-def check_if_new_user(cur: cursor, user_id: int) -> bool:
-    """check if the user is new or not"""
-
-    cur.execute("""SELECT user_id FROM users WHERE user_id=%s LIMIT 1;""", (user_id,))
-
-    info_on_user_from_users = str(cur.fetchone())
-
-    if info_on_user_from_users == 'None':
-        user_is_new = True
-    else:
-        user_is_new = False
-
-    return user_is_new
-
-
 def check_if_user_has_no_regions(cur, user_id):
     """check if the user has at least one region"""
 
@@ -714,6 +711,7 @@ def save_user_pref_role(cur, user_id, role_desc):
         role = 'unidentified'
 
     cur.execute("""UPDATE users SET role=%s where user_id=%s;""", (role, user_id))
+    mark_user_preferences_changed(cur, user_id)
 
     logging.info(f'[comm]: user {user_id} selected role {role}')
 
@@ -760,6 +758,7 @@ def save_user_coordinates(cur: cursor, user_id: int, input_latitude: float, inpu
         """INSERT INTO user_coordinates (user_id, latitude, longitude, upd_time) values (%s, %s, %s, %s);""",
         (user_id, input_latitude, input_longitude, now),
     )
+    mark_user_preferences_changed(cur, user_id)
 
     return None
 
@@ -782,6 +781,7 @@ def delete_user_coordinates(cur: cursor, user_id: int) -> None:
     """Delete the saved user "home" coordinates"""
 
     cur.execute('DELETE FROM user_coordinates WHERE user_id=%s;', (user_id,))
+    mark_user_preferences_changed(cur, user_id)
 
     return None
 
@@ -851,47 +851,6 @@ def distance_to_search(search_lat, search_lon, user_let, user_lon, coded_style=T
     return [dist, direction]
 
 
-def get_user_reg_folders_preferences(cur: cursor, user_id: int) -> List[int]:
-    """Return user's regional preferences"""
-
-    user_prefs_list = []
-
-    try:
-        cur.execute('SELECT forum_folder_num FROM user_regional_preferences WHERE user_id=%s;', (user_id,))
-        user_reg_prefs_array = cur.fetchall()
-
-        for line in user_reg_prefs_array:
-            user_prefs_list.append(line[0])
-
-        logging.info(str(user_prefs_list))
-
-    except Exception as e:
-        logging.info(f'failed to get user regional prefs for user {user_id}')
-        logging.exception(e)
-
-    return user_prefs_list
-
-
-def get_user_role(cur: cursor, user_id: int):
-    """Return user's role"""
-
-    user_role = None
-
-    try:
-        cur.execute('SELECT role FROM users WHERE user_id=%s LIMIT 1;', (user_id,))
-        user_role = cur.fetchone()
-        if user_role:
-            user_role = user_role[0]
-
-        logging.info(f'user {user_id} role is {user_role}')
-
-    except Exception as e:
-        logging.info(f'failed to get user role for user {user_id}')
-        logging.exception(e)
-
-    return user_role
-
-
 # issue#425
 def get_user_sys_roles(cur, user_id):
     """Return user's roles in system"""
@@ -1062,6 +1021,8 @@ def save_preference(cur: cursor, user_id: int, preference: str):
         preference = preference[1:]
         execute_delete(user_id, [preference])
 
+    mark_user_preferences_changed(cur, user_id)
+
     return None
 
 
@@ -1075,113 +1036,14 @@ def update_and_download_list_of_regions(
     region_was_in_db = None
     region_is_the_only = None
 
-    fed_okr_dict = {
-        'Дальневосточный ФО',
-        'Приволжский ФО',
-        'Северо-Кавказский ФО',
-        'Северо-Западный ФО',
-        'Сибирский ФО',
-        'Уральский ФО',
-        'Центральный ФО',
-        'Южный ФО',
-    }
-
-    # upload the new regional setting
-    folder_dict = {
-        'Москва и МО: Активные Поиски': [276],
-        'Москва и МО: Инфо Поддержка': [41],
-        'Белгородская обл.': [236],
-        'Брянская обл.': [138],
-        'Владимирская обл.': [123, 233],
-        'Воронежская обл.': [271, 315],
-        'Ивановская обл.': [132, 193],
-        'Калужская обл.': [185],
-        'Костромская обл.': [151],
-        'Курская обл.': [186],
-        'Липецкая обл.': [272],
-        'Орловская обл.': [222, 324],
-        'Рязанская обл.': [155],
-        'Смоленская обл.': [122],
-        'Тамбовская обл.': [273],
-        'Тверская обл.': [126],
-        'Тульская обл.': [125],
-        'Ярославская обл.': [264],
-        'Прочие поиски по ЦФО': [179],
-        'Адыгея': [299],
-        'Астраханская обл.': [336],
-        'Волгоградская обл.': [131],
-        'Краснодарский край': [162],
-        'Крым': [293],
-        'Ростовская обл.': [157],
-        'Прочие поиски по ЮФО': [180],
-        'Архангельская обл.': [330],
-        'Вологодская обл.': [370, 369, 368, 367],
-        'Карелия': [403, 404],
-        'Коми': [378, 377, 376],
-        'Ленинградская обл.': [120, 300],
-        'Мурманская обл.': [214, 371, 372, 373],
-        'Псковская обл.': [210, 383, 382],
-        'Прочие поиски по СЗФО': [181],
-        'Амурская обл.': [390],
-        'Бурятия': [274],
-        'Приморский край': [298],
-        'Хабаровский край': [154],
-        'Прочие поиски по ДФО': [188],
-        'Алтайский край': [161],
-        'Иркутская обл.': [137, 387, 386, 303],
-        'Кемеровская обл.': [202, 308],
-        'Красноярский край': [269, 318],
-        'Новосибирская обл.': [177, 310],
-        'Омская обл.': [153, 314],
-        'Томская обл.': [215, 401],
-        'Хакасия': [402],
-        'Прочие поиски по СФО': [182],
-        'Свердловская обл.': [213],
-        'Курганская обл.': [391, 392],
-        'Тюменская обл.': [339],
-        'Ханты-Мансийский АО': [338],
-        'Челябинская обл.': [280],
-        'Ямало-Ненецкий АО': [204],
-        'Прочие поиски по УФО': [187],
-        'Башкортостан': [191, 235],
-        'Кировская обл.': [211, 275],
-        'Марий Эл': [295, 297],
-        'Мордовия': [294],
-        'Нижегородская обл.': [121, 289],
-        'Оренбургская обл.': [337],
-        'Пензенская обл.': [170, 322],
-        'Пермский край': [143, 325],
-        'Самарская обл.': [333, 334, 305],
-        'Саратовская обл.': [212],
-        'Татарстан': [163, 231],
-        'Удмуртия': [237, 239],
-        'Ульяновская обл.': [290, 320],
-        'Чувашия': [265, 327],
-        'Прочие поиски по ПФО': [183],
-        'Дагестан': [292],
-        'Ставропольский край': [173],
-        'Чечня': [291],
-        'Кабардино-Балкария': [301],
-        'Ингушетия': [422],
-        'Северная Осетия': [423],
-        'Прочие поиски по СКФО': [184],
-        'Прочие поиски по РФ': [116],
-    }
-
-    # Reversed dict is needed on the last step
-    rev_reg_dict = {value[0]: key for (key, value) in folder_dict.items()}
-
-    # TODO - get the list of regions from PSQL
-    # TODO ^^^
-
     # case for the first entry to the screen of Reg Settings
     if got_message == b_menu_set_region:
         is_first_entry = 'yes'
-    elif got_message in fed_okr_dict or got_message == b_fed_dist_pick_other:
+    elif got_message in REGION_CATALOG.fed_dist_by_button or got_message == b_fed_dist_pick_other:
         pass
     else:
         try:
-            list_of_regs_to_upload = folder_dict[got_message]
+            list_of_regs_to_upload = REGION_CATALOG.region_by_button[got_message].folder_ids
 
             # any region
             cur.execute("""SELECT forum_folder_num from user_regional_preferences WHERE user_id=%s;""", (user_id,))
@@ -1204,6 +1066,7 @@ def update_and_download_list_of_regions(
                         """DELETE FROM user_regional_preferences WHERE user_id=%s and forum_folder_num=%s;""",
                         (user_id, region),
                     )
+                mark_user_preferences_changed(cur, user_id)
 
             # Scenario: this setting WAS in place, but now it's the last one - we cannot delete it
             elif region_was_in_db == 'yes' and region_is_the_only:
@@ -1216,6 +1079,7 @@ def update_and_download_list_of_regions(
                         """INSERT INTO user_regional_preferences (user_id, forum_folder_num) values (%s, %s);""",
                         (user_id, region),
                     )
+                mark_user_preferences_changed(cur, user_id)
 
         except Exception as e:
             logging.info("failed to upload & download the list of user's regions")
@@ -1228,8 +1092,8 @@ def update_and_download_list_of_regions(
     user_curr_regs_list = [reg[0] for reg in user_curr_regs]
 
     for reg in user_curr_regs_list:
-        if reg in rev_reg_dict:
-            msg += ',\n &#8226; ' + rev_reg_dict[reg]
+        if reg in REGION_CATALOG.region_by_main_folder:
+            msg += ',\n &#8226; ' + REGION_CATALOG.region_by_main_folder[reg].button
 
     msg = msg[1:]
 
@@ -1246,7 +1110,7 @@ def update_and_download_list_of_regions(
             'Ваш регион поисков настроен' + msg + '\n\nВы можете продолжить добавлять регионы, либо нажмите '
             'кнопку "в начало", чтобы продолжить работу с ботом.'
         )
-    elif got_message in fed_okr_dict or got_message == b_fed_dist_pick_other:
+    elif got_message in REGION_CATALOG.fed_dist_by_button or got_message == b_fed_dist_pick_other:
         if user_curr_regs_list:
             msg = 'Текущий список ваших регионов:' + msg
         else:
@@ -1261,33 +1125,6 @@ def update_and_download_list_of_regions(
     return msg
 
 
-def get_last_bot_msg(cur: cursor, user_id: int) -> str:
-    """Get the last bot message to user to define if user is expected to give exact answer"""
-
-    cur.execute(
-        """
-        SELECT msg_type FROM msg_from_bot WHERE user_id=%s LIMIT 1;
-        """,
-        (user_id,),
-    )
-
-    extract = cur.fetchone()
-    logging.info('get the last bot message to user to define if user is expected to give exact answer')
-    logging.info(str(extract))
-
-    if extract and extract != 'None':
-        msg_type = extract[0]
-    else:
-        msg_type = None
-
-    if msg_type:
-        logging.info(f'before this message bot was waiting for {msg_type} from user {user_id}')
-    else:
-        logging.info(f'before this message bot was NOT waiting anything from user {user_id}')
-
-    return msg_type
-
-
 def generate_yandex_maps_place_link(lat: Union[float, str], lon: Union[float, str], param: str) -> str:
     """Compose a link to yandex map with the given coordinates"""
 
@@ -1406,6 +1243,7 @@ def save_user_pref_topic_type(cur, user_id, pref_id, user_role):
                                             values (%s, %s, %s) ON CONFLICT (user_id, topic_type_id) DO NOTHING;""",
             (user_id, pref_type_id, datetime.datetime.now()),
         )
+        mark_user_preferences_changed(cur, user_id)
         return None
 
     if not (cur and user_id and pref_id):
@@ -1566,6 +1404,7 @@ def manage_topic_type(
         """Delete a certain topic_type for a certain user_id from the DB"""
 
         cur.execute("""DELETE FROM user_pref_topic_type WHERE user_id=%s AND topic_type_id=%s;""", (user, type_id))
+        mark_user_preferences_changed(cur, user)
         return None
 
     def record_topic_type(user: int, type_id: int) -> None:
@@ -1576,6 +1415,7 @@ def manage_topic_type(
                         VALUES (%s, %s, %s) ON CONFLICT (user_id, topic_type_id) DO NOTHING;""",
             (user, type_id, datetime.datetime.now()),
         )
+        mark_user_preferences_changed(cur, user)
         return None
 
     if not user_input:
@@ -1794,6 +1634,7 @@ def manage_if_moscow(
                 (%s, %s);""",
                 (user_id, 1),
             )
+            mark_user_preferences_changed(cur, user_id)
 
     # if region is NOT Moscow
     elif got_message == b_reg_not_moscow:
@@ -1931,55 +1772,8 @@ def save_onboarding_step(user_id: str, username: str, step: str) -> None:
     return None
 
 
-def check_onboarding_step(cur: cursor, user_id: int, user_is_new: bool) -> Tuple[int, str]:
-    """checks the latest step of onboarding"""
-
-    if user_is_new:
-        return 0, 'start'
-
-    try:
-        cur.execute(
-            """SELECT step_id, step_name, timestamp FROM user_onboarding 
-                               WHERE user_id=%s ORDER BY step_id DESC;""",
-            (user_id,),
-        )
-        raw_data = cur.fetchone()
-        if raw_data:
-            step_id, step_name, time = list(raw_data)
-        else:
-            step_id, step_name = 99, None
-
-    except Exception as e:
-        logging.exception(e)
-        step_id, step_name = 99, None
-
-    return step_id, step_name
-
-
-async def leave_chat_async(context: ContextTypes.DEFAULT_TYPE):
-    await context.bot.leave_chat(chat_id=context.job.chat_id)
-
-    return None
-
-
-async def prepare_message_for_leave_chat_async(user_id):
-    # TODO DOUBLE
-    bot_token = get_app_config().bot_api_token__prod
-    application = Application.builder().token(bot_token).build()
-    job_queue = application.job_queue
-    job_queue.run_once(leave_chat_async, 0, chat_id=user_id)
-
-    async with application:
-        await application.initialize()
-        await application.start()
-        await application.stop()
-        await application.shutdown()
-
-    return 'ok'
-
-
 def process_leaving_chat_async(user_id) -> None:
-    asyncio.run(prepare_message_for_leave_chat_async(user_id))
+    call_telegram_api('leaveChat', get_app_config().bot_api_token__prod, {'chat_id': user_id})
 
     return None
 
@@ -2048,25 +1842,12 @@ def make_api_call(method: str, bot_api_token: str, params: dict, call_context=''
     if 'chat_id' not in params.keys() and ('scope' not in params.keys() or 'chat_id' not in params['scope'].keys()):
         return None
 
-    url = f'https://api.telegram.org/bot{bot_api_token}/{method}'  # e.g. sendMessage
-    headers = {'Content-Type': 'application/json'}
-
     if 'reply_markup' in params and isinstance(params['reply_markup'], TelegramObject):
         params['reply_markup'] = params['reply_markup'].to_dict()
-    logging.info(f'({method=}, {call_context=})..before json_params = json.dumps(params) {params=}; {type(params)=}')
-    json_params = json.dumps(params)
-    logging.info(f'({method=}, {call_context=})..after json.dumps(params): {json_params=}; {type(json_params)=}')
 
-    with requests.Session() as session:
-        try:
-            response = session.post(url=url, data=json_params, headers=headers)
-            logging.info(f'After session.post: {response=}; {call_context=}')
-        except Exception as e:
-            response = None
-            logging.info('Error in getting response from Telegram')
-            logging.exception(e)
+    response = call_telegram_api(method, bot_api_token, params)
+    logging.info(f'({method=}, {call_context=}): {response=}; {params=}')
 
-    logging.info(f'Before return: {response=}; {call_context=}')
     return response
 
 
@@ -2121,9 +1902,8 @@ def send_message_to_api(bot_token, user_id, message, params):
             f'{message_encoded}{parse_mode}{disable_web_page_preview}{reply_markup}'
         )
 
-        with requests.Session() as session:
-            response = session.get(request_text)
-            logging.info(str(response))
+        response = get_telegram_session().get(request_text)
+        logging.info(str(response))
 
     except Exception as e:
         logging.exception(e)
@@ -2148,9 +1928,8 @@ def send_callback_answer_to_api(bot_token: str, callback_query_id: str, message:
             f'{callback_query_id}{message_encoded}'
         )
 
-        with requests.Session() as session:
-            response = session.get(request_text)
-            logging.info(f'send_callback_answer_to_api..{response.json()=}')
+        response = get_telegram_session().get(request_text)
+        logging.info(f'send_callback_answer_to_api..{response.json()=}')
 
     except Exception as e:
         logging.exception(e)
@@ -2381,27 +2160,21 @@ def process_block_unblock_user(user_id, user_new_status):
     return None
 
 
-def save_bot_reply_to_user(cur: cursor, user_id: int, bot_message: str) -> None:
-    """save bot's reply to user in psql"""
+def save_bot_reply_to_user(user_id: int, bot_message: str) -> None:
+    """save bot's reply to user in psql, it's written at the end of the update"""
 
     if len(bot_message) > 27 and bot_message[28] in {'Актуальные поиски за 60 дней', 'Последние 20 поисков в разде'}:
         bot_message = bot_message[28]
 
-    cur.execute(
-        """INSERT INTO dialogs (user_id, author, timestamp, message_text) values (%s, %s, %s, %s);""",
-        (user_id, 'bot', datetime.datetime.now(), bot_message),
-    )
+    get_dialogs_buffer().add(user_id, 'bot', bot_message)
 
     return None
 
 
-def save_user_message_to_bot(cur: cursor, user_id: int, got_message: str) -> None:
-    """save user's message to bot in psql"""
+def save_user_message_to_bot(user_id: int, got_message: str) -> None:
+    """save user's message to bot in psql, it's written at the end of the update"""
 
-    cur.execute(
-        """INSERT INTO dialogs (user_id, author, timestamp, message_text) values (%s, %s, %s, %s);""",
-        (user_id, 'user', datetime.datetime.now(), got_message),
-    )
+    get_dialogs_buffer().add(user_id, 'user', got_message)
 
     return None
 
@@ -2472,7 +2245,7 @@ def process_user_coordinates(
         logging.info('failed to update the last saved message from bot')
         logging.exception(e)
 
-    save_bot_reply_to_user(cur, user_id, bot_message)
+    save_bot_reply_to_user(user_id, bot_message)
 
     return None
 
@@ -2640,13 +2413,6 @@ def delete_last_user_inline_dialogue(cur, user_id: int) -> None:
     return None
 
 
-def get_search_follow_mode(cur, user_id: int):
-    cur.execute("""SELECT filter_name FROM user_pref_search_filtering WHERE user_id=%s LIMIT 1;""", (user_id,))
-    result_fetched = cur.fetchone()
-    result = result_fetched and 'whitelist' in result_fetched[0]
-    return result
-
-
 def set_search_follow_mode(cur: cursor, user_id: int, new_value: bool) -> None:
     filter_name_value = ['whitelist'] if new_value else ['']
     logging.info(f'{filter_name_value=}')
@@ -2658,6 +2424,1438 @@ def set_search_follow_mode(cur: cursor, user_id: int, new_value: bool) -> None:
     return None
 
 
+@dataclass
+class UserState:
+    """Everything about the user, which is needed to reply to the message.
+    It's read once per update, the handlers update it together with DB when they change the settings"""
+
+    is_new: bool
+    role: Optional[str]
+    onboarding_step_id: int
+    onboarding_step_name: Optional[str]
+    regions: List[int]
+    bot_request: Optional[str]  # the last request from bot, if bot is expecting user's input
+    search_follow_mode: bool
+    inline_message_ids: List[int]  # the user's last interaction via inline buttons
+
+
+def get_user_state(cur: cursor, user_id: int) -> UserState:
+    """Read the state of the user in one round trip to DB"""
+
+    cur.execute(
+        """
+        SELECT
+            u.user_id IS NULL,
+            u.role,
+            onboarding.step_id,
+            onboarding.step_name,
+            ARRAY(SELECT forum_folder_num FROM user_regional_preferences WHERE user_id=r.user_id),
+            (SELECT msg_type FROM msg_from_bot WHERE user_id=r.user_id LIMIT 1),
+            (SELECT filter_name FROM user_pref_search_filtering WHERE user_id=r.user_id LIMIT 1),
+            ARRAY(SELECT message_id FROM communications_last_inline_msg WHERE user_id=r.user_id)
+        FROM (SELECT %s::bigint AS user_id) AS r
+        LEFT JOIN users AS u ON u.user_id=r.user_id
+        LEFT JOIN LATERAL (
+            SELECT step_id, step_name FROM user_onboarding WHERE user_id=r.user_id ORDER BY step_id DESC LIMIT 1
+        ) AS onboarding ON TRUE;
+        """,
+        (user_id,),
+    )
+    (
+        is_new,
+        role,
+        onboarding_step_id,
+        onboarding_step_name,
+        regions,
+        bot_request,
+        search_filter,
+        inline_message_ids,
+    ) = cur.fetchone()
+
+    if is_new:
+        onboarding_step_id, onboarding_step_name = 0, 'start'
+    elif onboarding_step_id is None:
+        onboarding_step_id = 99
+
+    user_state = UserState(
+        is_new=is_new,
+        role=role,
+        onboarding_step_id=onboarding_step_id,
+        onboarding_step_name=onboarding_step_name,
+        regions=regions,
+        bot_request=bot_request,
+        search_follow_mode=bool(search_filter) and 'whitelist' in search_filter,
+        inline_message_ids=inline_message_ids,
+    )
+    logging.info(f'state of user {user_id}: {user_state}')
+
+    return user_state
+
+
+# Buttons & Keyboards
+# Start & Main menu
+c_start = '/start'
+c_view_act_searches = '/view_act_searches'
+c_view_latest_searches = '/view_latest_searches'
+c_settings = '/settings'
+c_other = '/other'
+c_map = '/map'
+
+b_role_iam_la = 'я состою в ЛизаАлерт'
+b_role_want_to_be_la = 'я хочу помогать ЛизаАлерт'
+b_role_looking_for_person = 'я ищу человека'
+b_role_other = 'у меня другая задача'
+b_role_secret = 'не хочу говорить'
+
+b_orders_done = 'да, заявки поданы'
+b_orders_tbd = 'нет, но я хочу продолжить'
+
+# TODO - WIP: FORUM
+b_forum_check_nickname = 'указать свой nickname с форума'  # noqa
+b_forum_dont_have = 'у меня нет аккаунта на форуме ЛА'  # noqa
+b_forum_dont_want = 'пропустить / не хочу говорить'  # noqa
+# TODO ^^^
+
+b_pref_urgency_highest = 'самым первым (<2 минуты)'
+b_pref_urgency_high = 'пораньше (<5 минут)'
+b_pref_urgency_medium = 'могу ждать (<10 минут)'
+b_pref_urgency_low = 'не сильно важно (>10 минут)'
+
+b_yes_its_me = 'да, это я'
+b_no_its_not_me = 'нет, это не я'
+
+b_view_act_searches = 'посмотреть актуальные поиски'
+b_settings = 'настроить бот'
+b_other = 'другие возможности'
+b_map = '🔥Карта Поисков 🔥'
+keyboard_main = [[b_map], [b_view_act_searches], [b_settings], [b_other]]
+reply_markup_main = ReplyKeyboardMarkup(keyboard_main, resize_keyboard=True)
+
+# Settings menu
+b_set_pref_notif_type = 'настроить виды уведомлений'
+b_set_pref_coords = 'настроить "домашние координаты"'
+b_set_pref_radius = 'настроить максимальный радиус'
+b_set_pref_age = 'настроить возрастные группы БВП'
+b_set_pref_urgency = 'настроить скорость уведомлений'  # <-- TODO: likely to be removed as redundant
+b_set_pref_role = 'настроить вашу роль'  # <-- TODO # noqa
+b_set_forum_nick = 'связать аккаунты бота и форума'
+b_change_forum_nick = 'изменить аккаунт форума'  # noqa
+b_set_topic_type = 'настроить вид поисков'
+
+b_back_to_start = 'в начало'
+
+# Settings - notifications
+b_act_all = 'включить: все уведомления'
+b_act_new_search = 'включить: о новых поисках'
+b_act_stat_change = 'включить: об изменениях статусов'
+b_act_all_comments = 'включить: о всех новых комментариях'
+b_act_inforg_com = 'включить: о комментариях Инфорга'
+b_act_field_trips_new = 'включить: о новых выездах'
+b_act_field_trips_change = 'включить: об изменениях в выездах'
+b_act_coords_change = 'включить: о смене места штаба'
+b_act_first_post_change = 'включить: об изменениях в первом посте'
+b_deact_all = 'настроить более гибко'
+b_deact_new_search = 'отключить: о новых поисках'
+b_deact_stat_change = 'отключить: об изменениях статусов'
+b_deact_all_comments = 'отключить: о всех новых комментариях'
+b_deact_inforg_com = 'отключить: о комментариях Инфорга'
+b_deact_field_trips_new = 'отключить: о новых выездах'
+b_deact_field_trips_change = 'отключить: об изменениях в выездах'
+b_deact_coords_change = 'отключить: о смене места штаба'
+b_deact_first_post_change = 'отключить: об изменениях в первом посте'
+
+# Settings - coordinates
+b_coords_auto_def = KeyboardButton(text='автоматически определить "домашние координаты"', request_location=True)
+b_coords_man_def = 'ввести "домашние координаты" вручную'
+b_coords_check = 'посмотреть сохраненные "домашние координаты"'
+b_coords_del = 'удалить "домашние координаты"'
+
+# Dialogue if Region – is Moscow
+b_reg_moscow = 'да, Москва – мой регион'
+b_reg_not_moscow = 'нет, я из другого региона'
+
+# Settings - Federal Districts & Regions
+b_fed_dist_pick_other = FED_DIST_PICK_OTHER_BUTTON
+b_menu_set_region = 'настроить регион поисков'
+
+# Other menu
+b_view_latest_searches = 'посмотреть последние поиски'
+b_goto_community = 'написать разработчику бота'
+b_goto_first_search = 'ознакомиться с информацией для новичка'
+b_goto_photos = 'посмотреть красивые фото с поисков'
+keyboard_other = [
+    [b_view_latest_searches],
+    [b_goto_first_search],
+    [b_goto_community],
+    [b_goto_photos],
+    [b_back_to_start],
+]
+
+# Admin - specially keep it for Admin, regular users unlikely will be interested in it
+
+b_act_titles = 'названия'  # these are "Title update notification" button
+
+b_admin_menu = 'admin'
+b_test_menu = 'test'
+b_test_search_follow_mode_on = 'test search follow mode on'  # noqa
+b_test_search_follow_mode_off = 'test search follow mode off'
+
+b_pref_age_0_6_act = 'отключить: Маленькие Дети 0-6 лет'
+b_pref_age_0_6_deact = 'включить: Маленькие Дети 0-6 лет'
+b_pref_age_7_13_act = 'отключить: Подростки 7-13 лет'
+b_pref_age_7_13_deact = 'включить: Подростки 7-13 лет'
+b_pref_age_14_20_act = 'отключить: Молодежь 14-20 лет'
+b_pref_age_14_20_deact = 'включить: Молодежь 14-20 лет'
+b_pref_age_21_50_act = 'отключить: Взрослые 21-50 лет'
+b_pref_age_21_50_deact = 'включить: Взрослые 21-50 лет'
+b_pref_age_51_80_act = 'отключить: Старшее Поколение 51-80 лет'
+b_pref_age_51_80_deact = 'включить: Старшее Поколение 51-80 лет'
+b_pref_age_81_on_act = 'отключить: Старцы более 80 лет'
+b_pref_age_81_on_deact = 'включить: Старцы более 80 лет'
+
+b_pref_radius_act = 'включить ограничение по расстоянию'
+b_pref_radius_deact = 'отключить ограничение по расстоянию'
+b_pref_radius_change = 'изменить ограничение по расстоянию'
+
+b_help_yes = 'да, помогите мне настроить бот'
+b_help_no = 'нет, помощь не требуется'
+
+
+@dataclass
+class Dialogue:
+    """The message from user with the state of the user. The handlers of the message compose the reply of the bot"""
+
+    cur: cursor
+    user_id: int
+    username: str
+    got_message: str
+    got_hash: Optional[str]
+    got_callback: Optional[dict]
+    callback_query_id: Optional[str]
+    callback_query: Optional[CallbackQuery]
+    bot_token: str
+    user: UserState
+    bot_message: str = ''
+    reply_markup: Any = reply_markup_main
+    bot_request_aft_usr_msg: str = ''
+    msg_sent_by_specific_code: bool = False
+
+    def reply_on_start(self) -> None:
+        """greeting on /start, newcomers are asked for their role"""
+
+        if self.user.is_new:
+            # FIXME – 02.12.2023 – hiding menu button for the newcomers
+            #  (in the future it should be done in manage_user script)
+            method = 'setMyCommands'
+            params = {'commands': [], 'scope': {'type': 'chat', 'chat_id': self.user_id}}
+            response = make_api_call(
+                method=method, bot_api_token=self.bot_token, params=params, call_context='if user_is_new'
+            )
+            result = process_response_of_api_call(self.user_id, response)
+            logging.info(f'hiding user {self.user_id} menu status = {result}')
+            # FIXME ^^^
+
+            self.bot_message = (
+                'Привет! Это Бот Поисковика ЛизаАлерт. Он помогает Поисковикам '
+                'оперативно получать информацию о новых поисках или об изменениях '
+                'в текущих поисках.'
+                '\n\nБот управляется кнопками, которые заменяют обычную клавиатуру. '
+                'Если кнопки не отображаются, справа от поля ввода сообщения '
+                'есть специальный значок, чтобы отобразить кнопки управления ботом.'
+                '\n\nДавайте настроим бот индивидуально под вас. Пожалуйста, '
+                'укажите вашу роль сейчас?'
+            )
+            keyboard_role = [
+                [b_role_iam_la],
+                [b_role_want_to_be_la],
+                [b_role_looking_for_person],
+                [b_role_other],
+                [b_role_secret],
+            ]
+            self.reply_markup = ReplyKeyboardMarkup(keyboard_role, resize_keyboard=True)
+
+        else:
+            self.bot_message = 'Привет! Бот управляется кнопками, которые заменяют обычную клавиатуру.'
+            self.reply_markup = reply_markup_main
+
+    def reply_on_finished_onboarding(self) -> None:
+        """the last step of onboarding: moscow or the first region is picked"""
+
+        # FIXME – 02.12.2023 – un-hiding menu button for the newcomers
+        #  (in the future it should be done in manage_user script)
+        method = 'deleteMyCommands'
+        params = {'scope': {'type': 'chat', 'chat_id': self.user_id}}
+        response = make_api_call(method=method, bot_api_token=self.bot_token, params=params)
+        process_response_of_api_call(self.user_id, response)
+        # FIXME ^^^
+
+        self.bot_message = (
+            '🎉 Отлично, вы завершили базовую настройку Бота.\n\n'
+            'Список того, что сейчас умеет бот:\n'
+            '- Высылает сводку по идущим поискам\n'
+            '- Высылает сводку по последним поисками\n'
+            '- Информирует о новых поисках с указанием расстояния до поиска\n'
+            '- Информирует об изменении Статуса / Первого поста Инфорга\n'
+            '- Информирует о новых комментариях Инфорга или пользователей\n'
+            '- Позволяет гибко настроить информирование на основе удаленности от '
+            'вас, возраста пропавшего и т.п.\n\n'
+            'С этого момента вы начнёте получать основные уведомления в '
+            'рамках выбранного региона, как только появятся новые изменения. '
+            'Или же вы сразу можете просмотреть списки Активных и Последних поисков.\n\n'
+            'Бот приглашает вас настроить дополнительные параметры (можно пропустить):\n'
+            '- Настроить виды уведомлений\n'
+            '- Указать домашние координаты\n'
+            '- Указать максимальный радиус до поиска\n'
+            '- Указать возрастные группы пропавших\n'
+            '- Связать бот с Форумом\n\n'
+            'Создатели Бота надеются, что Бот сможет помочь вам в ваших задачах! Удачи!'
+        )
+
+        keyboard_role = [
+            [b_set_pref_notif_type],
+            [b_set_pref_coords],
+            [b_set_pref_radius],
+            [b_set_pref_age],
+            [b_set_forum_nick],
+            [b_view_latest_searches],
+            [b_view_act_searches],
+            [b_back_to_start],
+        ]
+        self.reply_markup = ReplyKeyboardMarkup(keyboard_role, resize_keyboard=True)
+
+        if self.got_message == b_reg_moscow:
+            self.bot_message, self.reply_markup = manage_if_moscow(
+                self.cur,
+                self.user_id,
+                self.username,
+                self.got_message,
+                b_reg_moscow,
+                b_reg_not_moscow,
+                self.reply_markup,
+                REGION_CATALOG.fed_dist_keyboard,
+                self.bot_message,
+                self.user.role,
+            )
+        else:
+            save_onboarding_step(self.user_id, self.username, 'region_set')
+            save_user_pref_topic_type(self.cur, self.user_id, 'default', self.user.role)
+            update_and_download_list_of_regions(
+                self.cur, self.user_id, self.got_message, b_menu_set_region, b_fed_dist_pick_other
+            )
+
+    def reply_on_role(self) -> None:
+        """onboarding: role of the user and whether the orders for the search are made"""
+
+        # save user role & onboarding stage
+        if self.got_message in {
+            b_role_want_to_be_la,
+            b_role_iam_la,
+            b_role_looking_for_person,
+            b_role_other,
+            b_role_secret,
+        }:
+            self.user.role = save_user_pref_role(self.cur, self.user_id, self.got_message)
+            save_onboarding_step(self.user_id, self.username, 'role_set')
+
+        # get user role = relatives looking for a person
+        if self.got_message == b_role_looking_for_person:
+            self.bot_message = (
+                'Тогда вам следует:\n\n'
+                '1. Подайте заявку на поиск в ЛизаАлерт ОДНИМ ИЗ ДВУХ способов:\n'
+                '  1.1. САМОЕ БЫСТРОЕ – звоните на 88007005452 (бесплатная горячая '
+                'линия ЛизаАлерт). Вам зададут ряд вопросов, который максимально '
+                'ускорит поиск, и посоветуют дальнейшие действия. \n'
+                '  1.2. Заполните форму поиска https://lizaalert.org/zayavka-na-poisk/ \n'
+                'После заполнения формы на сайте нужно ожидать звонка от ЛизаАлерт. На '
+                'обработку может потребоваться более часа. Если нет возможности ждать, '
+                'после заполнения заявки следует позвонить на горячую линию отряда '
+                '88007005452, сообщив, что вы уже оформили заявку на сайте.\n\n'
+                '2. Подать заявление в Полицию. Если иное не посоветовали на горячей линии,'
+                'заявка в Полицию – поможет ускорить и упростить поиск. Самый быстрый '
+                'способ – позвонить на 102.\n\n'
+                '3. Отслеживайте ход поиска.\n'
+                'Когда заявки в ЛизаАлерт и Полицию сделаны, отряд начнет первые '
+                'мероприятия для поиска человека: уточнение деталей, прозвоны '
+                'в госучреждения, формирование плана и команды поиска и т.п. Весь этот'
+                'процесс вам не будет виден, но часто люди находятся именно на этой стадии'
+                'поиска. Если первые меры не помогут и отряд примет решение проводить'
+                'выезд "на место поиска" – тогда вы сможете отслеживать ход поиска '
+                'через данный Бот, для этого продолжите настройку бота: вам нужно будет'
+                'указать ваш регион и выбрать, какие уведомления от бота вы будете '
+                'получать. '
+                'Как альтернатива, вы можете зайти на форум https://lizaalert.org/forum/, '
+                'и отслеживать статус поиска там.\n'
+                'Отряд сделает всё возможное, чтобы найти вашего близкого как можно '
+                'скорее.\n\n'
+                'Сообщите, подали ли вы заявки в ЛизаАлерт и Полицию?'
+            )
+
+            keyboard_orders = [[b_orders_done], [b_orders_tbd]]
+            self.reply_markup = ReplyKeyboardMarkup(keyboard_orders, resize_keyboard=True)
+
+        # get user role = potential LA volunteer
+        elif self.got_message == b_role_want_to_be_la:
+            self.bot_message = (
+                'Супер! \n'
+                'Знаете ли вы, как можно помогать ЛизаАлерт? Определились ли вы, как '
+                'вы готовы помочь? Если еще нет – не беда – рекомендуем '
+                'ознакомиться со статьёй: '
+                'https://takiedela.ru/news/2019/05/25/instrukciya-liza-alert/\n\n'
+                'Задачи, которые можно выполнять даже без специальной подготовки, '
+                'выполняют Поисковики "на месте поиска". Этот Бот как раз старается '
+                'помогать именно Поисковикам. '
+                'Есть хороший сайт, рассказывающий, как начать участвовать в поиске: '
+                'https://xn--b1afkdgwddgp9h.xn--p1ai/\n\n'
+                'В случае любых вопросов – не стесняйтесь, обращайтесь на общий телефон, '
+                '8 800 700-54-52, где вам помогут с любыми вопросами при вступлении в отряд.\n\n'
+                'А если вы "из мира IT" и готовы помогать развитию этого Бота,'
+                'пишите нам в специальный чат https://t.me/+2J-kV0GaCgwxY2Ni\n\n'
+                'Надеемся, эта информацию оказалась полезной. '
+                'Если вы готовы продолжить настройку Бота, уточните, пожалуйста: '
+                'ваш основной регион – это Москва и Московская Область?'
+            )
+            keyboard_coordinates_admin = [[b_reg_moscow], [b_reg_not_moscow]]
+            self.reply_markup = ReplyKeyboardMarkup(keyboard_coordinates_admin, resize_keyboard=True)
+
+        # get user role = all others
+        elif self.got_message in {b_role_iam_la, b_role_other, b_role_secret, b_orders_done, b_orders_tbd}:
+            self.bot_message = (
+                'Спасибо. Теперь уточните, пожалуйста, ваш основной регион – это ' 'Москва и Московская Область?'
+            )
+            keyboard_coordinates_admin = [[b_reg_moscow], [b_reg_not_moscow]]
+            self.reply_markup = ReplyKeyboardMarkup(keyboard_coordinates_admin, resize_keyboard=True)
+
+    def reply_on_not_moscow(self) -> None:
+        """onboarding: the region is not moscow, so it is picked from the list"""
+
+        self.bot_message, self.reply_markup = manage_if_moscow(
+            self.cur,
+            self.user_id,
+            self.username,
+            self.got_message,
+            b_reg_moscow,
+            b_reg_not_moscow,
+            reply_markup_main,
+            REGION_CATALOG.fed_dist_keyboard,
+            None,
+            self.user.role,
+        )
+
+    def reply_on_help_no(self) -> None:
+        """the user does not need help with settings"""
+
+        self.bot_message = (
+            'Спасибо, понятно. Мы записали. Тогда бот более не будет вас беспокоить, '
+            'пока вы сами не напишите в бот.\n\n'
+            'На прощание, бот хотел бы посоветовать следующие вещи, делающие мир лучше:\n\n'
+            '1. Посмотреть <a href="https://t.me/+6LYNNEy8BeI1NGUy">позитивные фото '
+            'с поисков ЛизаАлерт</a>.\n\n'
+            '2. <a href="https://lizaalert.org/otryadnye-nuzhdy/">Помочь '
+            'отряду ЛизаАлерт, пожертвовав оборудование для поисков людей</a>.\n\n'
+            '3. Помочь создателям данного бота, присоединившись к группе разработчиков'
+            'или оплатив облачную инфраструктуру для бесперебойной работы бота. Для этого'
+            '<a href="https://t.me/MikeMikeT">просто напишите разработчику бота</a>.\n\n'
+            'Бот еще раз хотел подчеркнуть, что как только вы напишите что-то в бот – он'
+            'сразу же "забудет", что вы ранее просили вас не беспокоить:)\n\n'
+            'Обнимаем:)'
+        )
+        keyboard = [[b_back_to_start]]
+        self.reply_markup = ReplyKeyboardMarkup(keyboard, resize_keyboard=True)
+
+    def reply_on_help_yes(self) -> None:
+        """the user asked for help with settings"""
+
+        self.bot_message = (
+            'Супер! Тогда давайте посмотрим, что у вас не настроено.\n\n'
+            'У вас не настроен Регион поисков – без него Бот не может определить, '
+            'какие поиски вас интересуют. Вы можете настроить регион двумя способами:\n'
+            '1. Либо автоматически на основании ваших координат – нужно будет отправить '
+            'вашу геолокацию (работает только с мобильных устройств),\n'
+            '2. Либо выбрав регион вручную: для этого нужно сначала выбрать ФО = '
+            'Федеральный Округ, где находится ваш регион, а потом кликнуть на сам регион. '
+            '\n\n'
+        )
+
+    def reply_on_urgency(self) -> None:
+        """save the preferred urgency of notifications"""
+
+        save_user_pref_urgency(
+            self.cur,
+            self.user_id,
+            self.got_message,
+            b_pref_urgency_highest,
+            b_pref_urgency_high,
+            b_pref_urgency_medium,
+            b_pref_urgency_low,
+        )
+        self.bot_message = 'Хорошо, спасибо. Бот запомнил ваш выбор.'
+
+    def reply_on_missing_region(self) -> None:
+        """the bot does not work until the user picks at least one region"""
+
+        self.bot_message = (
+            'Для корректной работы бота, пожалуйста, задайте свой регион. Для этого '
+            'с помощью кнопок меню выберите сначала ФО (федеральный округ), а затем и '
+            'регион. Можно выбирать несколько регионов из разных ФО. Выбор региона '
+            'также можно отменить, повторно нажав на кнопку с названием региона. '
+            'Функционал бота не будет активирован, пока не выбран хотя бы один регион.'
+        )
+
+        keyboard_coordinates_admin = [[b_menu_set_region]]
+        self.reply_markup = ReplyKeyboardMarkup(keyboard_coordinates_admin, resize_keyboard=True)
+
+        logging.info(f'user {self.user_id} is forced to fill in the region')
+
+    def reply_on_search_whiteness(self) -> None:
+        """issue#425: mark the search to follow or to ignore"""
+
+        self.bot_message, self.reply_markup = manage_search_whiteness(
+            self.cur, self.user_id, self.got_callback, self.callback_query_id, self.callback_query, self.bot_token
+        )
+
+    def reply_on_search_follow_mode(self) -> None:
+        """issue#425: switch on/off the mode of following the picked searches"""
+
+        self.bot_message = manage_search_follow_mode(
+            self.cur, self.user_id, self.got_callback, self.callback_query_id, self.callback_query, self.bot_token
+        )
+        self.user.search_follow_mode = self.got_callback['action'] == 'search_follow_mode_on'
+        self.reply_markup = reply_markup_main
+
+    def reply_on_searches_summary(self) -> None:
+        """send the lists of active / latest searches in the regions of the user"""
+
+        self.msg_sent_by_specific_code = True
+
+        temp_dict = {
+            b_view_latest_searches: 'all',
+            b_view_act_searches: 'active',
+            c_view_latest_searches: 'all',
+            c_view_act_searches: 'active',
+        }
+
+        if self.user.search_follow_mode:
+            # issue#425 make inline keyboard - list of searches
+            keyboard = []  # to combine monolit ikb for all user's regions
+            ikb_searches_count = 0
+
+            for region in self.user.regions:
+                region_name = get_folder_names().get(self.cur, region)
+
+                logging.info(f'Before if region_name.find...: bot_message={self.bot_message!r}; {keyboard=}')
+                # check if region – is an archive folder: if so – it can be sent only to 'all'
+                if region_name.find('аверш') == -1 or temp_dict[self.got_message] == 'all':
+                    new_region_ikb_list = compose_full_message_on_list_of_searches_ikb(
+                        self.cur, temp_dict[self.got_message], self.user_id, region, region_name
+                    )
+                    keyboard.append(new_region_ikb_list)
+                    ikb_searches_count += len(new_region_ikb_list) - 1  ##number of searches in the region
+                    logging.info(f'After += compose_full_message_on_list_of_searches_ikb: {keyboard=}')
+
+            ##self.msg_sent_by_specific_code for combined ikb start
+            if ikb_searches_count == 0:
+                self.bot_message = 'Незавершенные поиски в соответствии с Вашей настройкой видов поисков не найдены.'
+                params = {
+                    'parse_mode': 'HTML',
+                    'disable_web_page_preview': True,
+                    'reply_markup': self.reply_markup,
+                    'chat_id': self.user_id,
+                    'text': self.bot_message,
+                }
+                context = f'user_id={self.user_id!r}, context_step=b1'
+                response = make_api_call('sendMessage', self.bot_token, params, context)
+                logging.info(f'{response=}; user_id={self.user_id!r}; context_step=b2')
+                result = process_response_of_api_call(self.user_id, response)
+                logging.info(f'{result=}; user_id={self.user_id!r}; context_step=b3')
+                inline_processing(self.cur, response, params)
+            else:
+                # issue#425 show the inline keyboard
+
+                ##TBD. May be will be useful to show quantity of marked searches
+                #                        searches_marked = 0
+                #                        for region_keyboard in keyboard:
+                #                            for ikb_line in region_keyboard:
+                #                                if ikb_line[0].get("callback_data") and not ikb_line[0]["text"][:1]=='  ':
+                #                                    searches_marked += 1
+
+                for i, region_keyboard in enumerate(keyboard):
+                    if i == 0:
+                        self.bot_message = """МЕНЮ АКТУАЛЬНЫХ ПОИСКОВ ДЛЯ ОТСЛЕЖИВАНИЯ.
+Каждый поиск ниже дан строкой из пары кнопок: кнопка пометки для отслеживания и кнопка перехода на форум.
+👀 - знак пометки поиска для отслеживания, уведомления будут приходить только по помеченным поискам. 
+Если таких нет, то уведомления будут приходить по всем поискам согласно настройкам.
+❌ - пометка поиска для игнорирования ("черный список") - уведомления по таким поискам не будут приходить в любом случае."""
+                    else:
+                        self.bot_message = ''
+
+                    # Pop region caption from the region_keyboard and put it into bot-message
+                    self.bot_message += '\n' if len(self.bot_message) > 0 else ''
+                    self.bot_message += f'<a href="{region_keyboard[0][0]["url"]}">{region_keyboard[0][0]["text"]}</a>'
+                    region_keyboard.pop(0)
+
+                    if i == (len(keyboard) - 1):
+                        region_keyboard += [
+                            [
+                                {
+                                    'text': 'Отключить выбор поисков для отслеживания',
+                                    'callback_data': '{"action":"search_follow_mode_off"}',
+                                }
+                            ]
+                        ]
+
+                    self.reply_markup = InlineKeyboardMarkup(region_keyboard)
+                    logging.info(f'bot_message={self.bot_message!r}; {region_keyboard=}; context_step=b00')
+                    # process_sending_message_async(user_id=self.user_id, data=data)
+                    context = f'Before if reply_markup and not isinstance(reply_markup, dict): reply_markup={self.reply_markup!r}, context_step=b01'
+                    logging.info(f'{context=}: reply_markup={self.reply_markup!r}')
+                    if self.reply_markup and not isinstance(self.reply_markup, dict):
+                        self.reply_markup = self.reply_markup.to_dict()
+                        context = f'After reply_markup.to_dict(): reply_markup={self.reply_markup!r}; user_id={self.user_id!r}; context_step=b02a'
+                        logging.info(f'{context=}: reply_markup={self.reply_markup!r}')
+
+                    params = {
+                        'parse_mode': 'HTML',
+                        'disable_web_page_preview': True,
+                        'reply_markup': self.reply_markup,
+                        'chat_id': self.user_id,
+                        'text': self.bot_message,
+                    }
+                    context = f'user_id={self.user_id!r}, context_step=b1'
+                    response = make_api_call('sendMessage', self.bot_token, params, context)
+                    logging.info(f'{response=}; user_id={self.user_id!r}; context_step=b2')
+                    result = process_response_of_api_call(self.user_id, response)
+                    logging.info(f'{result=}; user_id={self.user_id!r}; context_step=b3')
+                    inline_processing(self.cur, response, params)
+            ##self.msg_sent_by_specific_code for combined ikb end
+
+            # saving the last message from bot
+            try:
+                self.cur.execute("""DELETE FROM msg_from_bot WHERE user_id=%s;""", (self.user_id,))
+                self.cur.execute(
+                    'INSERT INTO msg_from_bot (user_id, time, msg_type) values (%s, %s, %s);',
+                    (self.user_id, datetime.datetime.now(), 'report'),
+                )
+            except Exception as e:
+                logging.info('failed to save the last message from bot')
+                logging.exception(e)
+
+        else:
+            for region in self.user.regions:
+                region_name = get_folder_names().get(self.cur, region)
+
+                # check if region – is an archive folder: if so – it can be sent only to 'all'
+                if region_name.find('аверш') == -1 or temp_dict[self.got_message] == 'all':
+                    self.bot_message = compose_full_message_on_list_of_searches(
+                        self.cur, temp_dict[self.got_message], self.user_id, region, region_name
+                    )
+                    self.reply_markup = reply_markup_main
+                    data = {
+                        'text': self.bot_message,
+                        'reply_markup': self.reply_markup,
+                        'parse_mode': 'HTML',
+                        'disable_web_page_preview': True,
+                    }
+                    process_sending_message_async(user_id=self.user_id, data=data)
+
+                    # saving the last message from bot
+                    try:
+                        self.cur.execute("""DELETE FROM msg_from_bot WHERE user_id=%s;""", (self.user_id,))
+                        self.cur.execute(
+                            'INSERT INTO msg_from_bot (user_id, time, msg_type) values (%s, %s, %s);',
+                            (self.user_id, datetime.datetime.now(), 'report'),
+                        )
+                    except Exception as e:
+                        logging.info('failed to save the last message from bot')
+                        logging.exception(e)
+            # issue425 Button for turn on search following mode
+            try:
+                search_follow_mode_ikb = [
+                    [
+                        {
+                            'text': 'Включить выбор поисков для отслеживания',
+                            'callback_data': '{"action":"search_follow_mode_on"}',
+                        }
+                    ]
+                ]
+                self.reply_markup = InlineKeyboardMarkup(search_follow_mode_ikb)
+                if self.reply_markup and not isinstance(self.reply_markup, dict):
+                    self.reply_markup = self.reply_markup.to_dict()
+                    context = f'After reply_markup.to_dict(): reply_markup={self.reply_markup!r}; user_id={self.user_id!r}; context_step=a00'
+                    logging.info(f'{context=}: reply_markup={self.reply_markup!r}')
+                params = {
+                    'parse_mode': 'HTML',
+                    'disable_web_page_preview': True,
+                    'reply_markup': self.reply_markup,
+                    'chat_id': self.user_id,
+                    'text': """Вы можете включить возможность выбора поисков для отслеживания, 
+чтобы получать уведомления не со всех актуальных поисков, 
+а только с выбранных Вами.""",
+                }
+                context = f'user_id={self.user_id!r}, context_step=a01'
+                response = make_api_call('sendMessage', self.bot_token, params, context)
+                logging.info(f'{response=}; user_id={self.user_id!r}; context_step=a02')
+                result = process_response_of_api_call(self.user_id, response)
+                logging.info(f'{result=}; user_id={self.user_id!r}; context_step=a03')
+                inline_processing(self.cur, response, params)
+            except Exception as e:
+                logging.info('failed to show button for turn on search following mode')
+                logging.exception(e)
+
+    def reply_on_admin_menu(self) -> None:
+        """special test admin menu"""
+
+        self.bot_message = 'Вы вошли в специальный тестовый админ-раздел'
+
+        # keyboard for Home Coordinates sharing
+        keyboard_coordinates_admin = [[b_back_to_start], [b_back_to_start]]
+        self.reply_markup = ReplyKeyboardMarkup(keyboard_coordinates_admin, resize_keyboard=True)
+
+    def reply_on_test_menu(self) -> None:
+        """secret test menu, the user gets the tester role"""
+
+        add_user_sys_role(self.cur, self.user_id, 'tester')
+        self.bot_message = (
+            'Вы в секретном тестовом разделе, где всё может работать не так :) '
+            'Если что – пишите, пожалуйста, в телеграм-чат '
+            'https://t.me/joinchat/2J-kV0GaCgwxY2Ni'
+            '\n💡 А еще Вам добавлена роль tester - некоторые тестовые функции включены автоматически.'
+            '\nДля отказа от роли tester нужно отправить команду notest'
+        )
+        # keyboard_coordinates_admin = [[b_set_topic_type], [b_back_to_start]]
+        # [b_set_pref_urgency], [b_set_forum_nick]
+
+        map_button = {'text': 'Открыть карту поисков', 'web_app': {'url': get_app_config().web_app_url_test}}
+        keyboard = [[map_button]]
+        self.reply_markup = InlineKeyboardMarkup(keyboard)
+
+    def reply_on_notest(self) -> None:
+        """remove the tester role"""
+
+        delete_user_sys_role(self.cur, self.user_id, 'tester')
+        self.bot_message = 'Роль tester удалена. Приходите еще! :-) Возвращаемся в главное меню.'
+        self.reply_markup = reply_markup_main
+
+    def reply_on_search_follow_mode_off(self) -> None:
+        """remains for some time for emergency case"""
+
+        set_search_follow_mode(self.cur, self.user_id, False)
+        self.user.search_follow_mode = False
+        self.bot_message = 'Возможность отслеживания поисков вЫключена. Возвращаемся в главное меню.'
+        self.reply_markup = reply_markup_main
+
+    def reply_on_map(self) -> None:
+        """link to the map of searches"""
+
+        self.bot_message = (
+            'В Боте Поисковика теперь можно посмотреть 🗺️Карту Поисков📍.\n\n'
+            'На карте вы сможете увидеть все активные поиски, '
+            'построить к каждому из них маршрут с учетом пробок, '
+            'а также открыть этот маршрут в сервисах Яндекс.\n\n'
+            'Карта работает в тестовом режиме.\n'
+            'Если карта будет работать некорректно, или вы видите, как ее необходимо '
+            'доработать – напишите в '
+            '<a href="https://t.me/joinchat/2J-kV0GaCgwxY2Ni">чат разработчиков</a>.'
+            ''
+        )
+
+        map_button = {'text': 'Открыть карту поисков', 'web_app': {'url': get_app_config().web_app_url}}
+        keyboard = [[map_button]]
+        self.reply_markup = InlineKeyboardMarkup(keyboard)
+
+    def reply_on_topic_type(self) -> None:
+        """settings: types of searches"""
+
+        callback_query_message_id = self.callback_query.message.id if self.callback_query else None
+        self.bot_message, self.reply_markup = manage_topic_type(
+            self.cur,
+            self.user_id,
+            self.got_message,
+            get_all_buttons(),
+            self.got_callback,
+            self.callback_query_id,
+            self.bot_token,
+            callback_query_message_id,
+        )
+
+    def reply_on_age(self) -> None:
+        """settings: age groups of the lost persons"""
+
+        input_data = None if self.got_message == b_set_pref_age else self.got_message
+        keyboard, first_visit = manage_age(self.cur, self.user_id, input_data)
+        keyboard.append([b_back_to_start])
+        self.reply_markup = ReplyKeyboardMarkup(keyboard, resize_keyboard=True)
+
+        if self.got_message.lower() == b_set_pref_age:
+            self.bot_message = (
+                'Чтобы включить или отключить уведомления по определенной возрастной '
+                'группе, нажмите на неё. Настройку можно изменить в любой момент.'
+            )
+            if first_visit:
+                self.bot_message = (
+                    'Данное меню позволяет выбрать возрастные категории БВП '
+                    '(без вести пропавших), по которым вы хотели бы получать уведомления. '
+                    'Важно, что если бот не сможет распознать возраст БВП, тогда вы '
+                    'всё равно получите уведомление.\nТакже данная настройка не влияет на '
+                    'разделы Актуальные Поиски и Последние Поиски – в них вы всё также '
+                    'сможете увидеть полный список поисков.\n\n' + self.bot_message
+                )
+        else:
+            self.bot_message = 'Спасибо, записали.'
+
+    def reply_on_radius(self) -> None:
+        """settings: max distance to the search"""
+
+        self.bot_message, self.reply_markup, self.bot_request_aft_usr_msg = manage_radius(
+            self.cur,
+            self.user_id,
+            self.got_message,
+            b_set_pref_radius,
+            b_pref_radius_act,
+            b_pref_radius_deact,
+            b_pref_radius_change,
+            b_back_to_start,
+            b_set_pref_coords,
+            self.user.bot_request,
+        )
+
+    def reply_on_forum_linking(self) -> None:
+        """settings: link the accounts of the bot and the forum"""
+
+        self.bot_message, self.reply_markup, self.bot_request_aft_usr_msg = manage_linking_to_forum(
+            self.cur,
+            self.got_message,
+            self.user_id,
+            b_set_forum_nick,
+            b_back_to_start,
+            self.user.bot_request,
+            b_admin_menu,
+            b_test_menu,
+            b_yes_its_me,
+            b_no_its_not_me,
+            b_settings,
+            reply_markup_main,
+        )
+
+    def reply_on_urgency_menu(self) -> None:
+        """settings: urgency of notifications"""
+
+        self.bot_message = (
+            'Очень многие поисковики пользуются этим Ботом. При любой рассылке нотификаций'
+            ' Бот ставит все сообщения в очередь, и они обрабатываются '
+            'со скоростью, ограниченной технологиями Телеграма. Иногда, в случае нескольких'
+            ' больших поисков, очередь вырастает и кто-то получает сообщения практически '
+            'сразу, а кому-то они приходят с задержкой.\n'
+            'Вы можете помочь сделать рассылки уведомлений более "нацеленными", обозначив '
+            'с какой срочностью вы бы хотели получать уведомления от Бота. В скобках '
+            'указаны примерные сроки задержки относительно появления информации на форуме. '
+            'Выберите наиболее подходящий Вам вариант'
+        )
+        keyboard = [
+            [b_pref_urgency_highest],
+            [b_pref_urgency_high],
+            [b_pref_urgency_medium],
+            [b_pref_urgency_low],
+            [b_back_to_start],
+        ]
+        self.reply_markup = ReplyKeyboardMarkup(keyboard, resize_keyboard=True)
+
+    def reply_on_go(self) -> None:
+        """DEBUG: for debugging purposes only"""
+
+        publish_to_pubsub(Topics.topic_notify_admin, 'test_admin_check')
+
+    def reply_on_other_menu(self) -> None:
+        """menu of other features"""
+
+        self.bot_message = (
+            'Здесь можно посмотреть статистику по 20 последним поискам, перейти в '
+            'канал Коммъюнити или Прочитать важную информацию для Новичка и посмотреть '
+            'душевные фото с поисков'
+        )
+        self.reply_markup = ReplyKeyboardMarkup(keyboard_other, resize_keyboard=True)
+
+    def reply_on_region_menu(self) -> None:
+        """settings: list of federal districts to pick the region from"""
+
+        self.bot_message = update_and_download_list_of_regions(
+            self.cur, self.user_id, self.got_message, b_menu_set_region, b_fed_dist_pick_other
+        )
+        self.reply_markup = REGION_CATALOG.fed_dist_reply_markup
+
+    def reply_on_fed_dist(self) -> None:
+        """settings: list of regions of the federal district"""
+
+        updated_regions = update_and_download_list_of_regions(
+            self.cur, self.user_id, self.got_message, b_menu_set_region, b_fed_dist_pick_other
+        )
+        self.bot_message = updated_regions
+        self.reply_markup = REGION_CATALOG.region_reply_markups[self.got_message]
+
+    def reply_on_region(self) -> None:
+        """settings: add / remove the region"""
+
+        updated_regions = update_and_download_list_of_regions(
+            self.cur, self.user_id, self.got_message, b_menu_set_region, b_fed_dist_pick_other
+        )
+        self.bot_message = updated_regions
+        self.reply_markup = REGION_CATALOG.get_reply_markup_for_region(self.got_message)
+
+        if self.user.onboarding_step_id == 20:  # "moscow_replied"
+            save_onboarding_step(self.user_id, self.username, 'region_set')
+            save_user_pref_topic_type(self.cur, self.user_id, 'default', self.user.role)
+
+    def reply_on_settings(self) -> None:
+        """menu of settings"""
+
+        self.bot_message = (
+            'Это раздел с настройками. Здесь вы можете выбрать удобные для вас '
+            'уведомления, а также ввести свои "домашние координаты", на основе которых '
+            'будет рассчитываться расстояние и направление до места поиска. Вы в любой '
+            'момент сможете изменить эти настройки.'
+        )
+
+        message_prefix = compose_msg_on_user_setting_fullness(self.cur, self.user_id)
+        if message_prefix:
+            self.bot_message = f'{self.bot_message}\n\n{message_prefix}'
+
+        keyboard_settings = [
+            [b_set_pref_notif_type],
+            [b_menu_set_region],
+            [b_set_topic_type],
+            [b_set_pref_coords],
+            [b_set_pref_radius],
+            [b_set_pref_age],
+            [b_set_forum_nick],
+            [b_back_to_start],
+        ]  # #AK added b_set_forum_nick for issue #6
+        self.reply_markup = ReplyKeyboardMarkup(keyboard_settings, resize_keyboard=True)
+
+    def reply_on_coords_menu(self) -> None:
+        """settings: home coordinates"""
+
+        self.bot_message = (
+            'АВТОМАТИЧЕСКОЕ ОПРЕДЕЛЕНИЕ координат работает только для носимых устройств'
+            ' (для настольных компьютеров – НЕ работает: используйте, пожалуйста, '
+            'кнопку ручного ввода координат). '
+            'При автоматическом определении координат – нажмите на кнопку и '
+            'разрешите определить вашу текущую геопозицию. '
+            'Координаты, загруженные вручную или автоматически, будут считаться '
+            'вашим "домом", откуда будут рассчитаны расстояние и '
+            'направление до поисков.'
+        )
+        keyboard_coordinates_1 = [
+            [b_coords_auto_def],
+            [b_coords_man_def],
+            [b_coords_check],
+            [b_coords_del],
+            [b_back_to_start],
+        ]
+        self.reply_markup = ReplyKeyboardMarkup(keyboard_coordinates_1, resize_keyboard=True)
+
+    def reply_on_coords_delete(self) -> None:
+        """delete home coordinates"""
+
+        delete_user_coordinates(self.cur, self.user_id)
+        self.bot_message = (
+            'Ваши "домашние координаты" удалены. Теперь расстояние и направление '
+            'до поисков не будет отображаться.\n'
+            'Вы в любой момент можете заново ввести новые "домашние координаты". '
+            'Функция Автоматического определения координат работает только для '
+            'носимых устройств, для настольного компьютера – воспользуйтесь '
+            'ручным вводом.'
+        )
+        keyboard_coordinates_1 = [[b_coords_auto_def], [b_coords_man_def], [b_coords_check], [b_back_to_start]]
+        self.reply_markup = ReplyKeyboardMarkup(keyboard_coordinates_1, resize_keyboard=True)
+
+    def reply_on_coords_manual(self) -> None:
+        """ask to type home coordinates"""
+
+        self.bot_message = (
+            'Введите координаты вашего дома вручную в теле сообщения и просто '
+            'отправьте. Формат: XX.XXXХХ, XX.XXXХХ, где количество цифр после точки '
+            'может быть различным. Широта (первое число) должна быть между 30 '
+            'и 80, Долгота (второе число) – между 10 и 190.'
+        )
+        self.bot_request_aft_usr_msg = 'input_of_coords_man'
+        self.reply_markup = ReplyKeyboardRemove()
+
+    def reply_on_coords_check(self) -> None:
+        """show saved home coordinates"""
+
+        lat, lon = show_user_coordinates(self.cur, self.user_id)
+        if lat and lon:
+            self.bot_message = 'Ваши "домашние координаты" '
+            self.bot_message += generate_yandex_maps_place_link(lat, lon, 'coords')
+
+        else:
+            self.bot_message = 'Ваши координаты пока не сохранены. Введите их автоматически или вручную.'
+
+        keyboard_coordinates_1 = [
+            [b_coords_auto_def],
+            [b_coords_man_def],
+            [b_coords_check],
+            [b_coords_del],
+            [b_back_to_start],
+        ]
+        self.reply_markup = ReplyKeyboardMarkup(keyboard_coordinates_1, resize_keyboard=True)
+
+    def reply_on_back_to_start(self) -> None:
+        """back to main menu"""
+
+        self.bot_message = 'возвращаемся в главное меню'
+        self.reply_markup = reply_markup_main
+
+    def reply_on_community(self) -> None:
+        """link to the chat of the bot community"""
+
+        self.bot_message = (
+            'Бот можно обсудить с соотрядниками в '
+            '<a href="https://t.me/joinchat/2J-kV0GaCgwxY2Ni">Специальном Чате '
+            'в телеграм</a>. Там можно предложить свои идеи, указать на проблемы '
+            'и получить быструю обратную связь от разработчика.'
+        )
+        keyboard_other = [[b_view_latest_searches], [b_goto_first_search], [b_goto_photos], [b_back_to_start]]
+        self.reply_markup = ReplyKeyboardMarkup(keyboard_other, resize_keyboard=True)
+
+    def reply_on_first_search(self) -> None:
+        """info for the newcomers"""
+
+        self.bot_message = (
+            'Если вы хотите стать добровольцем ДПСО «ЛизаАлерт», пожалуйста, '
+            '<a href="https://lizaalert.org/forum/viewtopic.php?t=56934">'
+            'посетите страницу форума</a>, там можно ознакомиться с базовой информацией '
+            'для новичков и задать свои вопросы.'
+            'Если вы готовитесь к своему первому поиску – приглашаем '
+            '<a href="https://xn--b1afkdgwddgp9h.xn--p1ai/">ознакомиться с основами '
+            'работы ЛА</a>. Всю теорию работы ЛА необходимо получать от специально '
+            'обученных волонтеров ЛА. Но если у вас еще не было возможности пройти '
+            'официальное обучение, а вы уже готовы выехать на поиск – этот ресурс '
+            'для вас.'
+        )
+        keyboard_other = [[b_view_latest_searches], [b_goto_community], [b_goto_photos], [b_back_to_start]]
+        self.reply_markup = ReplyKeyboardMarkup(keyboard_other, resize_keyboard=True)
+
+    def reply_on_photos(self) -> None:
+        """link to the channel with photos from searches"""
+
+        self.bot_message = (
+            'Если вам хочется окунуться в атмосферу ПСР, приглашаем в замечательный '
+            '<a href="https://t.me/+6LYNNEy8BeI1NGUy">телеграм-канал с красивыми фото с '
+            'поисков</a>. Все фото – сделаны поисковиками во время настоящих ПСР.'
+        )
+        keyboard_other = [
+            [b_view_latest_searches],
+            [b_goto_community],
+            [b_goto_first_search],
+            [b_back_to_start],
+        ]
+        self.reply_markup = ReplyKeyboardMarkup(keyboard_other, resize_keyboard=True)
+
+    def reply_on_notifications_preferences(self) -> None:
+        """settings: flexible menu of the types of notifications"""
+
+        # save preference for +ALL
+        if self.got_message == b_act_all:
+            self.bot_message = (
+                'Супер! теперь вы будете получать уведомления в телеграм в случаях: '
+                'появление нового поиска, изменение статуса поиска (стоп, НЖ, НП), '
+                'появление новых комментариев по всем поискам. Вы в любой момент '
+                'можете изменить список уведомлений'
+            )
+            save_preference(self.cur, self.user_id, 'all')
+
+        # save preference for -ALL
+        elif self.got_message == b_deact_all:
+            self.bot_message = 'Вы можете настроить типы получаемых уведомлений более гибко'
+            save_preference(self.cur, self.user_id, '-all')
+
+        # save preference for +NEW SEARCHES
+        elif self.got_message == b_act_new_search:
+            self.bot_message = (
+                'Отлично! Теперь вы будете получать уведомления в телеграм при '
+                'появлении нового поиска. Вы в любой момент можете изменить '
+                'список уведомлений'
+            )
+            save_preference(self.cur, self.user_id, 'new_searches')
+
+        # save preference for -NEW SEARCHES
+        elif self.got_message == b_deact_new_search:
+            self.bot_message = 'Записали'
+            save_preference(self.cur, self.user_id, '-new_searches')
+
+        # save preference for +STATUS UPDATES
+        elif self.got_message == b_act_stat_change:
+            self.bot_message = (
+                'Отлично! теперь вы будете получать уведомления в телеграм при '
+                'изменении статуса поисков (НЖ, НП, СТОП и т.п.). Вы в любой момент '
+                'можете изменить список уведомлений'
+            )
+            save_preference(self.cur, self.user_id, 'status_changes')
+
+        # save preference for -STATUS UPDATES
+        elif self.got_message == b_deact_stat_change:
+            self.bot_message = 'Записали'
+            save_preference(self.cur, self.user_id, '-status_changes')
+
+        # save preference for TITLE UPDATES
+        elif self.got_message == b_act_titles:
+            self.bot_message = 'Отлично!'
+            save_preference(self.cur, self.user_id, 'title_changes')
+
+        # save preference for +COMMENTS
+        elif self.got_message == b_act_all_comments:
+            self.bot_message = (
+                'Отлично! Теперь все новые комментарии будут у вас! Вы в любой момент '
+                'можете изменить список уведомлений'
+            )
+            save_preference(self.cur, self.user_id, 'comments_changes')
+
+        # save preference for -COMMENTS
+        elif self.got_message == b_deact_all_comments:
+            self.bot_message = (
+                'Записали. Мы только оставили вам включенными уведомления о '
+                'комментариях Инфорга. Их тоже можно отключить'
+            )
+            save_preference(self.cur, self.user_id, '-comments_changes')
+
+        # save preference for +InforgComments
+        elif self.got_message == b_act_inforg_com:
+            self.bot_message = (
+                'Если вы не подписаны на уведомления по всем комментариям, то теперь '
+                'вы будете получать уведомления о комментариях от Инфорга. Если же вы '
+                'уже подписаны на все комментарии – то всё остаётся без изменений: бот '
+                'уведомит вас по всем комментариям, включая от Инфорга'
+            )
+            save_preference(self.cur, self.user_id, 'inforg_comments')
+
+        # save preference for -InforgComments
+        elif self.got_message == b_deact_inforg_com:
+            self.bot_message = 'Вы отписались от уведомлений по новым комментариям от Инфорга'
+            save_preference(self.cur, self.user_id, '-inforg_comments')
+
+        # save preference for +FieldTripsNew
+        elif self.got_message == b_act_field_trips_new:
+            self.bot_message = (
+                'Теперь вы будете получать уведомления о новых выездах по уже идущим '
+                'поискам. Обратите внимание, что это не рассылка по новым темам на '
+                'форуме, а именно о том, что в существующей теме в ПЕРВОМ посте '
+                'появилась информация о новом выезде'
+            )
+            save_preference(self.cur, self.user_id, 'field_trips_new')
+
+        # save preference for -FieldTripsNew
+        elif self.got_message == b_deact_field_trips_new:
+            self.bot_message = 'Вы отписались от уведомлений по новым выездам'
+            save_preference(self.cur, self.user_id, '-field_trips_new')
+
+        # save preference for +FieldTripsChange
+        elif self.got_message == b_act_field_trips_change:
+            self.bot_message = (
+                'Теперь вы будете получать уведомления о ключевых изменениях при '
+                'выездах, в т.ч. изменение или завершение выезда. Обратите внимание, '
+                'что эта рассылка отражает изменения только в ПЕРВОМ посте поиска.'
+            )
+            save_preference(self.cur, self.user_id, 'field_trips_change')
+
+        # save preference for -FieldTripsChange
+        elif self.got_message == b_deact_field_trips_change:
+            self.bot_message = 'Вы отписались от уведомлений по изменениям выездов'
+            save_preference(self.cur, self.user_id, '-field_trips_change')
+
+        # save preference for +CoordsChange
+        elif self.got_message == b_act_coords_change:
+            self.bot_message = (
+                'Если у штаба поменяются координаты (и об этом будет написано в первом '
+                'посте на форуме) – бот уведомит вас об этом'
+            )
+            save_preference(self.cur, self.user_id, 'coords_change')
+
+        # save preference for -CoordsChange
+        elif self.got_message == b_deact_coords_change:
+            self.bot_message = 'Вы отписались от уведомлений о смене места (координат) штаба'
+            save_preference(self.cur, self.user_id, '-coords_change')
+
+        # save preference for -FirstPostChanges
+        elif self.got_message == b_act_first_post_change:
+            self.bot_message = (
+                'Теперь вы будете получать уведомления о важных изменениях в Первом Посте'
+                ' Инфорга, где обозначено описание каждого поиска'
+            )
+            save_preference(self.cur, self.user_id, 'first_post_changes')
+
+        # save preference for -FirstPostChanges
+        elif self.got_message == b_deact_first_post_change:
+            self.bot_message = (
+                'Вы отписались от уведомлений о важных изменениях в Первом Посте' ' Инфорга c описанием каждого поиска'
+            )
+            save_preference(self.cur, self.user_id, '-first_post_changes')
+
+        # GET what are preferences
+        elif self.got_message == b_set_pref_notif_type:
+            prefs = compose_user_preferences_message(self.cur, self.user_id)
+            if prefs[0] == 'пока нет включенных уведомлений' or prefs[0] == 'неизвестная настройка':
+                self.bot_message = 'Выберите, какие уведомления вы бы хотели получать'
+            else:
+                self.bot_message = 'Сейчас у вас включены следующие виды уведомлений:\n'
+                self.bot_message += prefs[0]
+
+        else:
+            self.bot_message = 'empty message'
+
+        if self.got_message == b_act_all:
+            keyboard_notifications_flexible = [[b_deact_all], [b_back_to_start]]
+        elif self.got_message == b_deact_all:
+            keyboard_notifications_flexible = [
+                [b_act_all],
+                [b_deact_new_search],
+                [b_deact_stat_change],
+                [b_act_all_comments],
+                [b_deact_inforg_com],
+                [b_deact_first_post_change],
+                [b_back_to_start],
+            ]
+        else:
+            # getting the list of user notification preferences
+            prefs = compose_user_preferences_message(self.cur, self.user_id)
+            keyboard_notifications_flexible = [
+                [b_act_all],
+                [b_act_new_search],
+                [b_act_stat_change],
+                [b_act_all_comments],
+                [b_act_inforg_com],
+                [b_act_first_post_change],
+                [b_back_to_start],
+            ]
+
+            for line in prefs[1]:
+                if line == 'all':
+                    keyboard_notifications_flexible = [[b_deact_all], [b_back_to_start]]
+                elif line == 'new_searches':
+                    keyboard_notifications_flexible[1] = [b_deact_new_search]
+                elif line == 'status_changes':
+                    keyboard_notifications_flexible[2] = [b_deact_stat_change]
+                elif line == 'comments_changes':
+                    keyboard_notifications_flexible[3] = [b_deact_all_comments]
+                elif line == 'inforg_comments':
+                    keyboard_notifications_flexible[4] = [b_deact_inforg_com]
+                elif line == 'first_post_changes':
+                    keyboard_notifications_flexible[5] = [b_deact_first_post_change]
+
+        self.reply_markup = ReplyKeyboardMarkup(keyboard_notifications_flexible, resize_keyboard=True)
+
+    def reply_on_unknown_command(self) -> None:
+        """in case of other user messages"""
+
+        # If command in unknown
+        self.bot_message = 'не понимаю такой команды, пожалуйста, используйте кнопки со стандартными ' 'командами ниже'
+        self.reply_markup = reply_markup_main
+
+
+@dataclass(frozen=True)
+class Route:
+    """The handler of the message. If several routes match the message, the one with the lowest priority wins"""
+
+    priority: int
+    handler: Callable[[Dialogue], None]
+    condition: Optional[Callable[[Dialogue], bool]] = None
+
+
+class MessageRouter:
+    """Finds the handler of the message by dict lookups of the text, the command, the callback action etc.
+    Routes are added in the order of precedence, so the first added route wins as it was in the chain of if/elif"""
+
+    def __init__(self, default_handler: Callable[[Dialogue], None]):
+        self.default_handler = default_handler
+        self._routes_count = 0
+        self._routes_by_text: Dict[str, List[Route]] = {}
+        self._routes_by_lowered_text: Dict[str, List[Route]] = {}
+        self._routes_by_callback_action: Dict[str, List[Route]] = {}
+        self._routes_by_hash: Dict[str, List[Route]] = {}
+        self._routes_by_bot_request: Dict[str, List[Route]] = {}
+        self._routes_by_any_message: List[Route] = []
+
+    def add(
+        self,
+        handler: Callable[[Dialogue], None],
+        texts: Iterable[str] = (),
+        lowered_texts: Iterable[str] = (),
+        callback_actions: Iterable[str] = (),
+        hashes: Iterable[str] = (),
+        bot_requests: Iterable[str] = (),
+        condition: Optional[Callable[[Dialogue], bool]] = None,
+    ) -> None:
+        """add the route of the messages, matching any of the given keys and the condition"""
+
+        route = Route(self._routes_count, handler, condition)
+        self._routes_count += 1
+
+        for routes, keys in (
+            (self._routes_by_text, texts),
+            (self._routes_by_lowered_text, lowered_texts),
+            (self._routes_by_callback_action, callback_actions),
+            (self._routes_by_hash, hashes),
+            (self._routes_by_bot_request, bot_requests),
+        ):
+            for key in keys:
+                routes.setdefault(key, []).append(route)
+
+    def add_for_any_message(self, handler: Callable[[Dialogue], None], condition: Callable[[Dialogue], bool]) -> None:
+        """add the route which is checked for every message, e.g. the one forcing the user to pick a region"""
+
+        self._routes_by_any_message.append(Route(self._routes_count, handler, condition))
+        self._routes_count += 1
+
+    def route(self, dialogue: Dialogue) -> Callable[[Dialogue], None]:
+        """handler of the message"""
+
+        callback_action = dialogue.got_callback.get('action') if dialogue.got_callback else None
+        routes = [
+            *self._routes_by_text.get(dialogue.got_message, ()),
+            *self._routes_by_lowered_text.get(dialogue.got_message.lower(), ()),
+            *self._routes_by_callback_action.get(callback_action, ()),
+            *self._routes_by_hash.get(dialogue.got_hash, ()),
+            *self._routes_by_bot_request.get(dialogue.user.bot_request, ()),
+            *self._routes_by_any_message,
+        ]
+        for route in sorted(routes, key=attrgetter('priority')):
+            if route.condition is None or route.condition(dialogue):
+                return route.handler
+
+        return self.default_handler
+
+
+@lru_cache
+def get_message_router() -> MessageRouter:
+    """routes are not changed after creation, so they are created once per instance"""
+
+    b = get_all_buttons()
+    region_setting_messages = {
+        *REGION_CATALOG.region_keyboards_buttons,
+        *REGION_CATALOG.fed_dist_by_button,
+        b_menu_set_region,
+        c_start,
+        b_settings,
+        c_settings,
+    }
+
+    router = MessageRouter(Dialogue.reply_on_unknown_command)
+    router.add(Dialogue.reply_on_start, texts=[c_start])
+    router.add(Dialogue.reply_on_finished_onboarding, texts=[b_reg_moscow])
+    router.add(
+        Dialogue.reply_on_finished_onboarding,
+        texts=REGION_CATALOG.region_keyboards_buttons,
+        condition=lambda dialogue: dialogue.user.onboarding_step_id == 20,  # "moscow_replied"
+    )
+    router.add(
+        Dialogue.reply_on_role,
+        texts=[
+            b_role_looking_for_person,
+            b_role_want_to_be_la,
+            b_role_iam_la,
+            b_role_secret,
+            b_role_other,
+            b_orders_done,
+            b_orders_tbd,
+        ],
+    )
+    router.add(Dialogue.reply_on_not_moscow, texts=[b_reg_not_moscow])
+    router.add(Dialogue.reply_on_help_no, texts=[b_help_no])
+    router.add(Dialogue.reply_on_help_yes, texts=[b_help_yes])
+    router.add(
+        Dialogue.reply_on_urgency,
+        texts=[b_pref_urgency_highest, b_pref_urgency_high, b_pref_urgency_medium, b_pref_urgency_low],
+    )
+    router.add_for_any_message(
+        Dialogue.reply_on_missing_region,
+        condition=lambda dialogue: not dialogue.user.regions and dialogue.got_message not in region_setting_messages,
+    )
+    router.add(Dialogue.reply_on_search_whiteness, callback_actions=['search_follow_mode'])  # issue#425
+    router.add(
+        Dialogue.reply_on_search_follow_mode, callback_actions=['search_follow_mode_on', 'search_follow_mode_off']
+    )  # issue#425
+    router.add(
+        Dialogue.reply_on_searches_summary,
+        texts=[b_view_latest_searches, b_view_act_searches, c_view_latest_searches, c_view_act_searches],
+    )
+    router.add(Dialogue.reply_on_admin_menu, lowered_texts=[b_admin_menu])
+    router.add(Dialogue.reply_on_test_menu, lowered_texts=[b_test_menu])
+    router.add(Dialogue.reply_on_notest, lowered_texts=['notest'])
+    router.add(Dialogue.reply_on_search_follow_mode_off, lowered_texts=[b_test_search_follow_mode_off])
+    router.add(Dialogue.reply_on_map, texts=[b_map, c_map])
+    topic_types = b.topic_types.any_text + b.topic_types.any_hash
+    router.add(Dialogue.reply_on_topic_type, texts=[b.set.topic_type.text, *topic_types], hashes=topic_types)
+    router.add(
+        Dialogue.reply_on_age,
+        texts=[
+            b_set_pref_age,
+            b_pref_age_0_6_act,
+            b_pref_age_0_6_deact,
+            b_pref_age_7_13_act,
+            b_pref_age_7_13_deact,
+            b_pref_age_14_20_act,
+            b_pref_age_14_20_deact,
+            b_pref_age_21_50_act,
+            b_pref_age_21_50_deact,
+            b_pref_age_51_80_act,
+            b_pref_age_51_80_deact,
+            b_pref_age_81_on_act,
+            b_pref_age_81_on_deact,
+        ],
+    )
+    router.add(
+        Dialogue.reply_on_radius,
+        texts=[b_set_pref_radius, b_pref_radius_act, b_pref_radius_deact, b_pref_radius_change],
+        bot_requests=['radius_input'],
+    )
+    router.add(
+        Dialogue.reply_on_forum_linking,
+        texts=[b_set_forum_nick, b_yes_its_me, b_no_its_not_me],
+        bot_requests=['input_of_forum_username'],
+    )
+    router.add(Dialogue.reply_on_urgency_menu, texts=[b_set_pref_urgency])
+    router.add(Dialogue.reply_on_go, lowered_texts=['go'])
+    router.add(Dialogue.reply_on_other_menu, texts=[b_other, c_other])
+    router.add(Dialogue.reply_on_region_menu, texts=[b_menu_set_region, b_fed_dist_pick_other])
+    router.add(Dialogue.reply_on_fed_dist, texts=REGION_CATALOG.fed_dist_by_button)
+    router.add(Dialogue.reply_on_region, texts=REGION_CATALOG.region_keyboards_buttons)
+    router.add(Dialogue.reply_on_settings, texts=[b_settings, c_settings])
+    router.add(Dialogue.reply_on_coords_menu, texts=[b_set_pref_coords])
+    router.add(Dialogue.reply_on_coords_delete, texts=[b_coords_del])
+    router.add(Dialogue.reply_on_coords_manual, texts=[b_coords_man_def])
+    router.add(Dialogue.reply_on_coords_check, texts=[b_coords_check])
+    router.add(Dialogue.reply_on_back_to_start, texts=[b_back_to_start])
+    router.add(Dialogue.reply_on_community, texts=[b_goto_community])
+    router.add(Dialogue.reply_on_first_search, texts=[b_goto_first_search])
+    router.add(Dialogue.reply_on_photos, texts=[b_goto_photos])
+    router.add(
+        Dialogue.reply_on_notifications_preferences,
+        texts=[
+            b_act_all,
+            b_deact_all,
+            b_act_new_search,
+            b_act_stat_change,
+            b_act_titles,
+            b_act_all_comments,
+            b_set_pref_notif_type,
+            b_deact_stat_change,
+            b_deact_all_comments,
+            b_deact_new_search,
+            b_act_inforg_com,
+            b_deact_inforg_com,
+            b_act_field_trips_new,
+            b_deact_field_trips_new,
+            b_act_field_trips_change,
+            b_deact_field_trips_change,
+            b_act_coords_change,
+            b_deact_coords_change,
+            b_act_first_post_change,
+            b_deact_first_post_change,
+        ],
+    )
+
+    return router
+
+
 def main(request: Request) -> str:
     """Main function to orchestrate the whole script"""
 
@@ -2716,428 +3914,35 @@ def process_update(update: Update) -> str:
         process_block_unblock_user(user_id, user_new_status)
         return 'finished successfully. it was a system message on bot block/unblock'
 
-    b = AllButtons(full_buttons_dict)
-
-    # Buttons & Keyboards
-    # Start & Main menu
-    c_start = '/start'
-    c_view_act_searches = '/view_act_searches'
-    c_view_latest_searches = '/view_latest_searches'
-    c_settings = '/settings'
-    c_other = '/other'
-    c_map = '/map'
-
-    b_role_iam_la = 'я состою в ЛизаАлерт'
-    b_role_want_to_be_la = 'я хочу помогать ЛизаАлерт'
-    b_role_looking_for_person = 'я ищу человека'
-    b_role_other = 'у меня другая задача'
-    b_role_secret = 'не хочу говорить'
-
-    b_orders_done = 'да, заявки поданы'
-    b_orders_tbd = 'нет, но я хочу продолжить'
-
-    # TODO - WIP: FORUM
-    b_forum_check_nickname = 'указать свой nickname с форума'  # noqa
-    b_forum_dont_have = 'у меня нет аккаунта на форуме ЛА'  # noqa
-    b_forum_dont_want = 'пропустить / не хочу говорить'  # noqa
-    # TODO ^^^
-
-    b_pref_urgency_highest = 'самым первым (<2 минуты)'
-    b_pref_urgency_high = 'пораньше (<5 минут)'
-    b_pref_urgency_medium = 'могу ждать (<10 минут)'
-    b_pref_urgency_low = 'не сильно важно (>10 минут)'
-
-    b_yes_its_me = 'да, это я'
-    b_no_its_not_me = 'нет, это не я'
-
-    b_view_act_searches = 'посмотреть актуальные поиски'
-    b_settings = 'настроить бот'
-    b_other = 'другие возможности'
-    b_map = '🔥Карта Поисков 🔥'
-    keyboard_main = [[b_map], [b_view_act_searches], [b_settings], [b_other]]
-    reply_markup_main = ReplyKeyboardMarkup(keyboard_main, resize_keyboard=True)
-
-    # Settings menu
-    b_set_pref_notif_type = 'настроить виды уведомлений'
-    b_set_pref_coords = 'настроить "домашние координаты"'
-    b_set_pref_radius = 'настроить максимальный радиус'
-    b_set_pref_age = 'настроить возрастные группы БВП'
-    b_set_pref_urgency = 'настроить скорость уведомлений'  # <-- TODO: likely to be removed as redundant
-    b_set_pref_role = 'настроить вашу роль'  # <-- TODO # noqa
-    b_set_forum_nick = 'связать аккаунты бота и форума'
-    b_change_forum_nick = 'изменить аккаунт форума'  # noqa
-    b_set_topic_type = 'настроить вид поисков'
-
-    b_back_to_start = 'в начало'
-
-    # Settings - notifications
-    b_act_all = 'включить: все уведомления'
-    b_act_new_search = 'включить: о новых поисках'
-    b_act_stat_change = 'включить: об изменениях статусов'
-    b_act_all_comments = 'включить: о всех новых комментариях'
-    b_act_inforg_com = 'включить: о комментариях Инфорга'
-    b_act_field_trips_new = 'включить: о новых выездах'
-    b_act_field_trips_change = 'включить: об изменениях в выездах'
-    b_act_coords_change = 'включить: о смене места штаба'
-    b_act_first_post_change = 'включить: об изменениях в первом посте'
-    b_deact_all = 'настроить более гибко'
-    b_deact_new_search = 'отключить: о новых поисках'
-    b_deact_stat_change = 'отключить: об изменениях статусов'
-    b_deact_all_comments = 'отключить: о всех новых комментариях'
-    b_deact_inforg_com = 'отключить: о комментариях Инфорга'
-    b_deact_field_trips_new = 'отключить: о новых выездах'
-    b_deact_field_trips_change = 'отключить: об изменениях в выездах'
-    b_deact_coords_change = 'отключить: о смене места штаба'
-    b_deact_first_post_change = 'отключить: об изменениях в первом посте'
-
-    # Settings - coordinates
-    b_coords_auto_def = KeyboardButton(text='автоматически определить "домашние координаты"', request_location=True)
-    b_coords_man_def = 'ввести "домашние координаты" вручную'
-    b_coords_check = 'посмотреть сохраненные "домашние координаты"'
-    b_coords_del = 'удалить "домашние координаты"'
-
-    # Dialogue if Region – is Moscow
-    b_reg_moscow = 'да, Москва – мой регион'
-    b_reg_not_moscow = 'нет, я из другого региона'
-
-    # Settings - Federal Districts
-    b_fed_dist_dal_vos = 'Дальневосточный ФО'
-    b_fed_dist_privolz = 'Приволжский ФО'
-    b_fed_dist_sev_kaz = 'Северо-Кавказский ФО'
-    b_fed_dist_sev_zap = 'Северо-Западный ФО'
-    b_fed_dist_sibiria = 'Сибирский ФО'
-    b_fed_dist_uralsky = 'Уральский ФО'
-    b_fed_dist_central = 'Центральный ФО'
-    b_fed_dist_yuzhniy = 'Южный ФО'
-    b_fed_dist_other_r = 'Прочие поиски по РФ'
-    b_fed_dist_pick_other = 'выбрать другой Федеральный Округ'
-    keyboard_fed_dist_set = [
-        [b_fed_dist_dal_vos],
-        [b_fed_dist_privolz],
-        [b_fed_dist_sev_kaz],
-        [b_fed_dist_sev_zap],
-        [b_fed_dist_sibiria],
-        [b_fed_dist_uralsky],
-        [b_fed_dist_central],
-        [b_fed_dist_yuzhniy],
-        [b_fed_dist_other_r],
-        [b_back_to_start],
-    ]
-
-    # Settings - Dalnevostochniy Fed Dist - Regions
-    b_reg_buryatiya = 'Бурятия'
-    b_reg_prim_kray = 'Приморский край'
-    b_reg_habarovsk = 'Хабаровский край'
-    b_reg_amur = 'Амурская обл.'
-    b_reg_dal_vost_other = 'Прочие поиски по ДФО'
-    keyboard_dal_vost_reg_choice = [
-        [b_reg_buryatiya],
-        [b_reg_prim_kray],
-        [b_reg_habarovsk],
-        [b_reg_amur],
-        [b_reg_dal_vost_other],
-        [b_fed_dist_pick_other],
-        [b_back_to_start],
-    ]
-
-    # Settings - Privolzhskiy Fed Dist - Regions
-    b_reg_bashkorkostan = 'Башкортостан'
-    b_reg_kirov = 'Кировская обл.'
-    b_reg_mariy_el = 'Марий Эл'
-    b_reg_mordovia = 'Мордовия'
-    b_reg_nizhniy = 'Нижегородская обл.'
-    b_reg_orenburg = 'Оренбургская обл.'
-    b_reg_penza = 'Пензенская обл.'
-    b_reg_perm = 'Пермский край'
-    b_reg_samara = 'Самарская обл.'
-    b_reg_saratov = 'Саратовская обл.'
-    b_reg_tatarstan = 'Татарстан'
-    b_reg_udmurtiya = 'Удмуртия'
-    b_reg_ulyanovsk = 'Ульяновская обл.'
-    b_reg_chuvashiya = 'Чувашия'
-    b_reg_privolz_other = 'Прочие поиски по ПФО'
-    keyboard_privolz_reg_choice = [
-        [b_reg_bashkorkostan],
-        [b_reg_kirov],
-        [b_reg_mariy_el],
-        [b_reg_mordovia],
-        [b_reg_nizhniy],
-        [b_reg_orenburg],
-        [b_reg_penza],
-        [b_reg_perm],
-        [b_reg_samara],
-        [b_reg_saratov],
-        [b_reg_tatarstan],
-        [b_reg_udmurtiya],
-        [b_reg_ulyanovsk],
-        [b_reg_chuvashiya],
-        [b_reg_privolz_other],
-        [b_fed_dist_pick_other],
-        [b_back_to_start],
-    ]
-
-    # Settings - Severo-Kavkazskiy Fed Dist - Regions
-    b_reg_dagestan = 'Дагестан'
-    b_reg_stavropol = 'Ставропольский край'
-    b_reg_chechnya = 'Чечня'
-    b_reg_kabarda = 'Кабардино-Балкария'
-    b_reg_ingushetia = 'Ингушетия'
-    b_reg_sev_osetia = 'Северная Осетия'
-    b_reg_sev_kav_other = 'Прочие поиски по СКФО'
-    keyboard_sev_kav_reg_choice = [
-        [b_reg_dagestan],
-        [b_reg_stavropol],
-        [b_reg_chechnya],
-        [b_reg_kabarda],
-        [b_reg_ingushetia],
-        [b_reg_sev_osetia],
-        [b_reg_sev_kav_other],
-        [b_fed_dist_pick_other],
-        [b_back_to_start],
-    ]
-
-    # Settings - Severo-Zapadniy Fed Dist - Regions
-    b_reg_vologda = 'Вологодская обл.'
-    b_reg_karelia = 'Карелия'
-    b_reg_komi = 'Коми'
-    b_reg_piter = 'Ленинградская обл.'
-    b_reg_murmansk = 'Мурманская обл.'
-    b_reg_pskov = 'Псковская обл.'
-    b_reg_archangelsk = 'Архангельская обл.'
-    b_reg_sev_zap_other = 'Прочие поиски по СЗФО'
-    keyboard_sev_zap_reg_choice = [
-        [b_reg_vologda],
-        [b_reg_komi],
-        [b_reg_karelia],
-        [b_reg_piter],
-        [b_reg_murmansk],
-        [b_reg_pskov],
-        [b_reg_archangelsk],
-        [b_reg_sev_zap_other],
-        [b_fed_dist_pick_other],
-        [b_back_to_start],
-    ]
-
-    # Settings - Sibirskiy Fed Dist - Regions
-    b_reg_altay = 'Алтайский край'
-    b_reg_irkutsk = 'Иркутская обл.'
-    b_reg_kemerovo = 'Кемеровская обл.'
-    b_reg_krasnoyarsk = 'Красноярский край'
-    b_reg_novosib = 'Новосибирская обл.'
-    b_reg_omsk = 'Омская обл.'
-    b_reg_tomsk = 'Томская обл.'
-    b_reg_hakasiya = 'Хакасия'
-    b_reg_sibiria_reg_other = 'Прочие поиски по СФО'
-    keyboard_sibiria_reg_choice = [
-        [b_reg_altay],
-        [b_reg_irkutsk],
-        [b_reg_kemerovo],
-        [b_reg_krasnoyarsk],
-        [b_reg_novosib],
-        [b_reg_omsk],
-        [b_reg_tomsk],
-        [b_reg_hakasiya],
-        [b_reg_sibiria_reg_other],
-        [b_fed_dist_pick_other],
-        [b_back_to_start],
-    ]
-
-    # Settings - Uralskiy Fed Dist - Regions
-    b_reg_ekat = 'Свердловская обл.'
-    b_reg_kurgan = 'Курганская обл.'
-    b_reg_tyumen = 'Тюменская обл.'
-    b_reg_hanty_mansi = 'Ханты-Мансийский АО'
-    b_reg_chelyabinks = 'Челябинская обл.'
-    b_reg_yamal = 'Ямало-Ненецкий АО'
-    b_reg_urals_reg_other = 'Прочие поиски по УФО'
-    keyboard_urals_reg_choice = [
-        [b_reg_ekat],
-        [b_reg_kurgan],
-        [b_reg_tyumen],
-        [b_reg_hanty_mansi],
-        [b_reg_chelyabinks],
-        [b_reg_yamal],
-        [b_reg_urals_reg_other],
-        [b_fed_dist_pick_other],
-        [b_back_to_start],
-    ]
-
-    # Settings - Central Fed Dist - Regions
-    b_reg_belogorod = 'Белгородская обл.'
-    b_reg_bryansk = 'Брянская обл.'
-    b_reg_vladimir = 'Владимирская обл.'
-    b_reg_voronezh = 'Воронежская обл.'
-    b_reg_ivanovo = 'Ивановская обл.'
-    b_reg_kaluga = 'Калужская обл.'
-    b_reg_kostroma = 'Костромская обл.'
-    b_reg_kursk = 'Курская обл.'
-    b_reg_lipetsk = 'Липецкая обл.'
-    b_reg_msk_act = 'Москва и МО: Активные Поиски'
-    b_reg_msk_inf = 'Москва и МО: Инфо Поддержка'
-    b_reg_orel = 'Орловская обл.'
-    b_reg_ryazan = 'Рязанская обл.'
-    b_reg_smolensk = 'Смоленская обл.'
-    b_reg_tambov = 'Тамбовская обл.'
-    b_reg_tver = 'Тверская обл.'
-    b_reg_tula = 'Тульская обл.'
-    b_reg_yaroslavl = 'Ярославская обл.'
-    b_reg_central_reg_other = 'Прочие поиски по ЦФО'
-    keyboard_central_reg_choice = [
-        [b_reg_belogorod],
-        [b_reg_bryansk],
-        [b_reg_vladimir],
-        [b_reg_voronezh],
-        [b_reg_ivanovo],
-        [b_reg_kaluga],
-        [b_reg_kostroma],
-        [b_reg_kursk],
-        [b_reg_lipetsk],
-        [b_reg_msk_act],
-        [b_reg_msk_inf],
-        [b_reg_orel],
-        [b_reg_ryazan],
-        [b_reg_smolensk],
-        [b_reg_tambov],
-        [b_reg_tver],
-        [b_reg_tula],
-        [b_reg_yaroslavl],
-        [b_reg_central_reg_other],
-        [b_fed_dist_pick_other],
-        [b_back_to_start],
-    ]
-
-    # Settings - Yuzhniy Fed Dist - Regions
-    b_reg_adygeya = 'Адыгея'
-    b_reg_astrahan = 'Астраханская обл.'
-    b_reg_volgograd = 'Волгоградская обл.'
-    b_reg_krasnodar = 'Краснодарский край'
-    b_reg_krym = 'Крым'
-    b_reg_rostov = 'Ростовская обл.'
-    b_reg_yuzhniy_reg_other = 'Прочие поиски по ЮФО'
-    keyboard_yuzhniy_reg_choice = [
-        [b_reg_adygeya],
-        [b_reg_astrahan],
-        [b_reg_volgograd],
-        [b_reg_krasnodar],
-        [b_reg_krym],
-        [b_reg_rostov],
-        [b_reg_yuzhniy_reg_other],
-        [b_fed_dist_pick_other],
-        [b_back_to_start],
-    ]
-
-    # Settings - Fed Dist - Regions
-    b_menu_set_region = 'настроить регион поисков'
-
-    full_list_of_regions = (
-        keyboard_dal_vost_reg_choice[:-1]
-        + keyboard_privolz_reg_choice[:-1]
-        + keyboard_sev_kav_reg_choice[:-1]
-        + keyboard_sev_zap_reg_choice[:-1]
-        + keyboard_sibiria_reg_choice[:-1]
-        + keyboard_urals_reg_choice[:-1]
-        + keyboard_central_reg_choice[:-1]
-        + keyboard_yuzhniy_reg_choice[:-1]
-        + [[b_fed_dist_other_r]]
-    )  # noqa – for strange pycharm indent warning
-    full_dict_of_regions = {word[0] for word in full_list_of_regions}
-
-    dict_of_fed_dist = {
-        b_fed_dist_dal_vos: keyboard_dal_vost_reg_choice,
-        b_fed_dist_privolz: keyboard_privolz_reg_choice,
-        b_fed_dist_sev_kaz: keyboard_sev_kav_reg_choice,
-        b_fed_dist_sev_zap: keyboard_sev_zap_reg_choice,
-        b_fed_dist_sibiria: keyboard_sibiria_reg_choice,
-        b_fed_dist_uralsky: keyboard_urals_reg_choice,
-        b_fed_dist_central: keyboard_central_reg_choice,
-        b_fed_dist_yuzhniy: keyboard_yuzhniy_reg_choice,
-    }
-
-    # Other menu
-    b_view_latest_searches = 'посмотреть последние поиски'
-    b_goto_community = 'написать разработчику бота'
-    b_goto_first_search = 'ознакомиться с информацией для новичка'
-    b_goto_photos = 'посмотреть красивые фото с поисков'
-    keyboard_other = [
-        [b_view_latest_searches],
-        [b_goto_first_search],
-        [b_goto_community],
-        [b_goto_photos],
-        [b_back_to_start],
-    ]
-
-    # Admin - specially keep it for Admin, regular users unlikely will be interested in it
-
-    b_act_titles = 'названия'  # these are "Title update notification" button
-
-    b_admin_menu = 'admin'
-    b_test_menu = 'test'
-    b_test_search_follow_mode_on = 'test search follow mode on'  # noqa
-    b_test_search_follow_mode_off = 'test search follow mode off'
-
-    b_pref_age_0_6_act = 'отключить: Маленькие Дети 0-6 лет'
-    b_pref_age_0_6_deact = 'включить: Маленькие Дети 0-6 лет'
-    b_pref_age_7_13_act = 'отключить: Подростки 7-13 лет'
-    b_pref_age_7_13_deact = 'включить: Подростки 7-13 лет'
-    b_pref_age_14_20_act = 'отключить: Молодежь 14-20 лет'
-    b_pref_age_14_20_deact = 'включить: Молодежь 14-20 лет'
-    b_pref_age_21_50_act = 'отключить: Взрослые 21-50 лет'
-    b_pref_age_21_50_deact = 'включить: Взрослые 21-50 лет'
-    b_pref_age_51_80_act = 'отключить: Старшее Поколение 51-80 лет'
-    b_pref_age_51_80_deact = 'включить: Старшее Поколение 51-80 лет'
-    b_pref_age_81_on_act = 'отключить: Старцы более 80 лет'
-    b_pref_age_81_on_deact = 'включить: Старцы более 80 лет'
-
-    b_pref_radius_act = 'включить ограничение по расстоянию'
-    b_pref_radius_deact = 'отключить ограничение по расстоянию'
-    b_pref_radius_change = 'изменить ограничение по расстоянию'
-
-    b_help_yes = 'да, помогите мне настроить бот'
-    b_help_no = 'нет, помощь не требуется'
-
-    # basic markup which will be substituted for all specific cases
-    reply_markup = reply_markup_main
-
     conn_psy = sql_connect_by_psycopg2()
     cur = conn_psy.cursor()
 
+    user = get_user_state(cur, user_id)
+
     logging.info(f'Before if got_message and not got_callback: {got_message=}')
 
     if got_message and not got_callback:
-        last_inline_message_ids = get_last_user_inline_dialogue(cur, user_id)
-        if last_inline_message_ids:
-            for last_inline_message_id in last_inline_message_ids:
+        if user.inline_message_ids:
+            for last_inline_message_id in user.inline_message_ids:
                 params = {'chat_id': user_id, 'message_id': last_inline_message_id}
                 make_api_call('editMessageReplyMarkup', bot_token, params, 'main() if got_message and not got_callback')
             delete_last_user_inline_dialogue(cur, user_id)
+            user.inline_message_ids = []
 
     if got_message:
-        save_user_message_to_bot(cur, user_id, got_message)
+        save_user_message_to_bot(user_id, got_message)
 
     bot_request_aft_usr_msg = ''
-    msg_sent_by_specific_code = False
 
-    user_is_new = check_if_new_user(cur, user_id)
-    logging.info(f'After check_if_new_user: {user_is_new=}')
-    if user_is_new:
+    if user.is_new:
         save_new_user(user_id, username)
 
-    onboarding_step_id, onboarding_step_name = check_onboarding_step(cur, user_id, user_is_new)
-    user_regions = get_user_reg_folders_preferences(cur, user_id)
-    user_role = get_user_role(cur, user_id)
-
-    # Check what was last request from bot and if bot is expecting user's input
-    bot_request_bfr_usr_msg = get_last_bot_msg(cur, user_id)
-
-    # placeholder for the New message from bot as reply to "update". Placed here – to avoid errors of GCF
-    bot_message = ''
-
     # ONBOARDING PHASE
-    if onboarding_step_id < 80:
-        onboarding_step_id = run_onboarding(user_id, username, onboarding_step_id, got_message)
+    if user.onboarding_step_id < 80:
+        user.onboarding_step_id = run_onboarding(user_id, username, user.onboarding_step_id, got_message)
 
     # get coordinates from the text
-    if bot_request_bfr_usr_msg == 'input_of_coords_man':
+    if user.bot_request == 'input_of_coords_man':
         user_latitude, user_longitude = get_coordinates_from_string(got_message, user_latitude, user_longitude)
 
     # if there is any coordinates from user
@@ -3154,1062 +3959,32 @@ def process_update(update: Update) -> str:
         )
         cur.close()
         conn_psy.close()
+        # the reply is already sent, so the user doesn't wait for the dialogs to be written
+        get_dialogs_buffer().flush()
 
         return 'finished successfully. in was a message with user coordinates'
 
+    dialogue = Dialogue(
+        cur=cur,
+        user_id=user_id,
+        username=username,
+        got_message=got_message,
+        got_hash=got_hash,
+        got_callback=got_callback,
+        callback_query_id=callback_query_id,
+        callback_query=callback_query,
+        bot_token=bot_token,
+        user=user,
+    )
+
     try:
         # if there is a text message from user
         if got_message:
-            # if pushed \start
-            if got_message == c_start:
-                if user_is_new:
-                    # FIXME – 02.12.2023 – hiding menu button for the newcomers
-                    #  (in the future it should be done in manage_user script)
-                    method = 'setMyCommands'
-                    params = {'commands': [], 'scope': {'type': 'chat', 'chat_id': user_id}}
-                    response = make_api_call(
-                        method=method, bot_api_token=bot_token, params=params, call_context='if user_is_new'
-                    )
-                    result = process_response_of_api_call(user_id, response)
-                    logging.info(f'hiding user {user_id} menu status = {result}')
-                    # FIXME ^^^
-
-                    bot_message = (
-                        'Привет! Это Бот Поисковика ЛизаАлерт. Он помогает Поисковикам '
-                        'оперативно получать информацию о новых поисках или об изменениях '
-                        'в текущих поисках.'
-                        '\n\nБот управляется кнопками, которые заменяют обычную клавиатуру. '
-                        'Если кнопки не отображаются, справа от поля ввода сообщения '
-                        'есть специальный значок, чтобы отобразить кнопки управления ботом.'
-                        '\n\nДавайте настроим бот индивидуально под вас. Пожалуйста, '
-                        'укажите вашу роль сейчас?'
-                    )
-                    keyboard_role = [
-                        [b_role_iam_la],
-                        [b_role_want_to_be_la],
-                        [b_role_looking_for_person],
-                        [b_role_other],
-                        [b_role_secret],
-                    ]
-                    reply_markup = ReplyKeyboardMarkup(keyboard_role, resize_keyboard=True)
-
-                else:
-                    bot_message = 'Привет! Бот управляется кнопками, которые заменяют обычную клавиатуру.'
-                    reply_markup = reply_markup_main
-
-            elif (
-                onboarding_step_id == 20 and got_message in full_dict_of_regions
-            ) or got_message == b_reg_moscow:  # "moscow_replied"
-                # FIXME – 02.12.2023 – un-hiding menu button for the newcomers
-                #  (in the future it should be done in manage_user script)
-                method = 'deleteMyCommands'
-                params = {'scope': {'type': 'chat', 'chat_id': user_id}}
-                response = make_api_call(method=method, bot_api_token=bot_token, params=params)
-                result = process_response_of_api_call(user_id, response)
-                # FIXME ^^^
-
-                bot_message = (
-                    '🎉 Отлично, вы завершили базовую настройку Бота.\n\n'
-                    'Список того, что сейчас умеет бот:\n'
-                    '- Высылает сводку по идущим поискам\n'
-                    '- Высылает сводку по последним поисками\n'
-                    '- Информирует о новых поисках с указанием расстояния до поиска\n'
-                    '- Информирует об изменении Статуса / Первого поста Инфорга\n'
-                    '- Информирует о новых комментариях Инфорга или пользователей\n'
-                    '- Позволяет гибко настроить информирование на основе удаленности от '
-                    'вас, возраста пропавшего и т.п.\n\n'
-                    'С этого момента вы начнёте получать основные уведомления в '
-                    'рамках выбранного региона, как только появятся новые изменения. '
-                    'Или же вы сразу можете просмотреть списки Активных и Последних поисков.\n\n'
-                    'Бот приглашает вас настроить дополнительные параметры (можно пропустить):\n'
-                    '- Настроить виды уведомлений\n'
-                    '- Указать домашние координаты\n'
-                    '- Указать максимальный радиус до поиска\n'
-                    '- Указать возрастные группы пропавших\n'
-                    '- Связать бот с Форумом\n\n'
-                    'Создатели Бота надеются, что Бот сможет помочь вам в ваших задачах! Удачи!'
-                )
-
-                keyboard_role = [
-                    [b_set_pref_notif_type],
-                    [b_set_pref_coords],
-                    [b_set_pref_radius],
-                    [b_set_pref_age],
-                    [b_set_forum_nick],
-                    [b_view_latest_searches],
-                    [b_view_act_searches],
-                    [b_back_to_start],
-                ]
-                reply_markup = ReplyKeyboardMarkup(keyboard_role, resize_keyboard=True)
-
-                if got_message == b_reg_moscow:
-                    bot_message, reply_markup = manage_if_moscow(
-                        cur,
-                        user_id,
-                        username,
-                        got_message,
-                        b_reg_moscow,
-                        b_reg_not_moscow,
-                        reply_markup,
-                        keyboard_fed_dist_set,
-                        bot_message,
-                        user_role,
-                    )
-                else:
-                    save_onboarding_step(user_id, username, 'region_set')
-                    save_user_pref_topic_type(cur, user_id, 'default', user_role)
-                    updated_regions = update_and_download_list_of_regions(
-                        cur, user_id, got_message, b_menu_set_region, b_fed_dist_pick_other
-                    )
-
-            elif got_message in {
-                b_role_looking_for_person,
-                b_role_want_to_be_la,
-                b_role_iam_la,
-                b_role_secret,
-                b_role_other,
-                b_orders_done,
-                b_orders_tbd,
-            }:
-                # save user role & onboarding stage
-                if got_message in {
-                    b_role_want_to_be_la,
-                    b_role_iam_la,
-                    b_role_looking_for_person,
-                    b_role_other,
-                    b_role_secret,
-                }:
-                    user_role = save_user_pref_role(cur, user_id, got_message)
-                    save_onboarding_step(user_id, username, 'role_set')
-
-                # get user role = relatives looking for a person
-                if got_message == b_role_looking_for_person:
-                    bot_message = (
-                        'Тогда вам следует:\n\n'
-                        '1. Подайте заявку на поиск в ЛизаАлерт ОДНИМ ИЗ ДВУХ способов:\n'
-                        '  1.1. САМОЕ БЫСТРОЕ – звоните на 88007005452 (бесплатная горячая '
-                        'линия ЛизаАлерт). Вам зададут ряд вопросов, который максимально '
-                        'ускорит поиск, и посоветуют дальнейшие действия. \n'
-                        '  1.2. Заполните форму поиска https://lizaalert.org/zayavka-na-poisk/ \n'
-                        'После заполнения формы на сайте нужно ожидать звонка от ЛизаАлерт. На '
-                        'обработку может потребоваться более часа. Если нет возможности ждать, '
-                        'после заполнения заявки следует позвонить на горячую линию отряда '
-                        '88007005452, сообщив, что вы уже оформили заявку на сайте.\n\n'
-                        '2. Подать заявление в Полицию. Если иное не посоветовали на горячей линии,'
-                        'заявка в Полицию – поможет ускорить и упростить поиск. Самый быстрый '
-                        'способ – позвонить на 102.\n\n'
-                        '3. Отслеживайте ход поиска.\n'
-                        'Когда заявки в ЛизаАлерт и Полицию сделаны, отряд начнет первые '
-                        'мероприятия для поиска человека: уточнение деталей, прозвоны '
-                        'в госучреждения, формирование плана и команды поиска и т.п. Весь этот'
-                        'процесс вам не будет виден, но часто люди находятся именно на этой стадии'
-                        'поиска. Если первые меры не помогут и отряд примет решение проводить'
-                        'выезд "на место поиска" – тогда вы сможете отслеживать ход поиска '
-                        'через данный Бот, для этого продолжите настройку бота: вам нужно будет'
-                        'указать ваш регион и выбрать, какие уведомления от бота вы будете '
-                        'получать. '
-                        'Как альтернатива, вы можете зайти на форум https://lizaalert.org/forum/, '
-                        'и отслеживать статус поиска там.\n'
-                        'Отряд сделает всё возможное, чтобы найти вашего близкого как можно '
-                        'скорее.\n\n'
-                        'Сообщите, подали ли вы заявки в ЛизаАлерт и Полицию?'
-                    )
-
-                    keyboard_orders = [[b_orders_done], [b_orders_tbd]]
-                    reply_markup = ReplyKeyboardMarkup(keyboard_orders, resize_keyboard=True)
-
-                # get user role = potential LA volunteer
-                elif got_message == b_role_want_to_be_la:
-                    bot_message = (
-                        'Супер! \n'
-                        'Знаете ли вы, как можно помогать ЛизаАлерт? Определились ли вы, как '
-                        'вы готовы помочь? Если еще нет – не беда – рекомендуем '
-                        'ознакомиться со статьёй: '
-                        'https://takiedela.ru/news/2019/05/25/instrukciya-liza-alert/\n\n'
-                        'Задачи, которые можно выполнять даже без специальной подготовки, '
-                        'выполняют Поисковики "на месте поиска". Этот Бот как раз старается '
-                        'помогать именно Поисковикам. '
-                        'Есть хороший сайт, рассказывающий, как начать участвовать в поиске: '
-                        'https://xn--b1afkdgwddgp9h.xn--p1ai/\n\n'
-                        'В случае любых вопросов – не стесняйтесь, обращайтесь на общий телефон, '
-                        '8 800 700-54-52, где вам помогут с любыми вопросами при вступлении в отряд.\n\n'
-                        'А если вы "из мира IT" и готовы помогать развитию этого Бота,'
-                        'пишите нам в специальный чат https://t.me/+2J-kV0GaCgwxY2Ni\n\n'
-                        'Надеемся, эта информацию оказалась полезной. '
-                        'Если вы готовы продолжить настройку Бота, уточните, пожалуйста: '
-                        'ваш основной регион – это Москва и Московская Область?'
-                    )
-                    keyboard_coordinates_admin = [[b_reg_moscow], [b_reg_not_moscow]]
-                    reply_markup = ReplyKeyboardMarkup(keyboard_coordinates_admin, resize_keyboard=True)
-
-                # get user role = all others
-                elif got_message in {b_role_iam_la, b_role_other, b_role_secret, b_orders_done, b_orders_tbd}:
-                    bot_message = (
-                        'Спасибо. Теперь уточните, пожалуйста, ваш основной регион – это '
-                        'Москва и Московская Область?'
-                    )
-                    keyboard_coordinates_admin = [[b_reg_moscow], [b_reg_not_moscow]]
-                    reply_markup = ReplyKeyboardMarkup(keyboard_coordinates_admin, resize_keyboard=True)
-
-            elif got_message in {b_reg_not_moscow}:
-                bot_message, reply_markup = manage_if_moscow(
-                    cur,
-                    user_id,
-                    username,
-                    got_message,
-                    b_reg_moscow,
-                    b_reg_not_moscow,
-                    reply_markup_main,
-                    keyboard_fed_dist_set,
-                    None,
-                    user_role,
-                )
-
-            elif got_message == b_help_no:
-                bot_message = (
-                    'Спасибо, понятно. Мы записали. Тогда бот более не будет вас беспокоить, '
-                    'пока вы сами не напишите в бот.\n\n'
-                    'На прощание, бот хотел бы посоветовать следующие вещи, делающие мир лучше:\n\n'
-                    '1. Посмотреть <a href="https://t.me/+6LYNNEy8BeI1NGUy">позитивные фото '
-                    'с поисков ЛизаАлерт</a>.\n\n'
-                    '2. <a href="https://lizaalert.org/otryadnye-nuzhdy/">Помочь '
-                    'отряду ЛизаАлерт, пожертвовав оборудование для поисков людей</a>.\n\n'
-                    '3. Помочь создателям данного бота, присоединившись к группе разработчиков'
-                    'или оплатив облачную инфраструктуру для бесперебойной работы бота. Для этого'
-                    '<a href="https://t.me/MikeMikeT">просто напишите разработчику бота</a>.\n\n'
-                    'Бот еще раз хотел подчеркнуть, что как только вы напишите что-то в бот – он'
-                    'сразу же "забудет", что вы ранее просили вас не беспокоить:)\n\n'
-                    'Обнимаем:)'
-                )
-                keyboard = [[b_back_to_start]]
-                reply_markup = ReplyKeyboardMarkup(keyboard, resize_keyboard=True)
-
-            elif got_message == b_help_yes:
-                bot_message = (
-                    'Супер! Тогда давайте посмотрим, что у вас не настроено.\n\n'
-                    'У вас не настроен Регион поисков – без него Бот не может определить, '
-                    'какие поиски вас интересуют. Вы можете настроить регион двумя способами:\n'
-                    '1. Либо автоматически на основании ваших координат – нужно будет отправить '
-                    'вашу геолокацию (работает только с мобильных устройств),\n'
-                    '2. Либо выбрав регион вручную: для этого нужно сначала выбрать ФО = '
-                    'Федеральный Округ, где находится ваш регион, а потом кликнуть на сам регион. '
-                    '\n\n'
-                )
-
-            # set user pref: urgency
-            elif got_message in {
-                b_pref_urgency_highest,
-                b_pref_urgency_high,
-                b_pref_urgency_medium,
-                b_pref_urgency_low,
-            }:
-                save_user_pref_urgency(
-                    cur,
-                    user_id,
-                    got_message,
-                    b_pref_urgency_highest,
-                    b_pref_urgency_high,
-                    b_pref_urgency_medium,
-                    b_pref_urgency_low,
-                )
-                bot_message = 'Хорошо, спасибо. Бот запомнил ваш выбор.'
-
-            # force user to input a region
-            elif not user_regions and not (
-                got_message in full_dict_of_regions
-                or got_message in dict_of_fed_dist
-                or got_message in {b_menu_set_region, c_start, b_settings, c_settings}
-            ):
-                bot_message = (
-                    'Для корректной работы бота, пожалуйста, задайте свой регион. Для этого '
-                    'с помощью кнопок меню выберите сначала ФО (федеральный округ), а затем и '
-                    'регион. Можно выбирать несколько регионов из разных ФО. Выбор региона '
-                    'также можно отменить, повторно нажав на кнопку с названием региона. '
-                    'Функционал бота не будет активирован, пока не выбран хотя бы один регион.'
-                )
-
-                keyboard_coordinates_admin = [[b_menu_set_region]]
-                reply_markup = ReplyKeyboardMarkup(keyboard_coordinates_admin, resize_keyboard=True)
-
-                logging.info(f'user {user_id} is forced to fill in the region')
-
-            elif got_callback and got_callback['action'] == 'search_follow_mode':  # issue#425
-                bot_message, reply_markup = manage_search_whiteness(
-                    cur, user_id, got_callback, callback_query_id, callback_query, bot_token
-                )
-
-            elif got_callback and got_callback['action'] in [
-                'search_follow_mode_on',
-                'search_follow_mode_off',
-            ]:  # issue#425
-                bot_message = manage_search_follow_mode(
-                    cur, user_id, got_callback, callback_query_id, callback_query, bot_token
-                )
-                reply_markup = reply_markup_main
-
-            # Send summaries
-            elif got_message in {
-                b_view_latest_searches,
-                b_view_act_searches,
-                c_view_latest_searches,
-                c_view_act_searches,
-            }:
-                msg_sent_by_specific_code = True
-
-                temp_dict = {
-                    b_view_latest_searches: 'all',
-                    b_view_act_searches: 'active',
-                    c_view_latest_searches: 'all',
-                    c_view_act_searches: 'active',
-                }
-
-                cur.execute(
-                    """
-                    SELECT folder_id, folder_display_name FROM geo_folders_view WHERE folder_type='searches';
-                    """
-                )
-
-                folders_list = cur.fetchall()
-
-                if get_search_follow_mode(cur, user_id):
-                    # issue#425 make inline keyboard - list of searches
-                    keyboard = []  # to combine monolit ikb for all user's regions
-                    ikb_searches_count = 0
-
-                    region_name = ''
-                    for region in user_regions:
-                        for line in folders_list:
-                            if line[0] == region:
-                                region_name = line[1]
-                                break
-
-                        logging.info(f'Before if region_name.find...: {bot_message=}; {keyboard=}')
-                        # check if region – is an archive folder: if so – it can be sent only to 'all'
-                        if region_name.find('аверш') == -1 or temp_dict[got_message] == 'all':
-                            new_region_ikb_list = compose_full_message_on_list_of_searches_ikb(
-                                cur, temp_dict[got_message], user_id, region, region_name
-                            )
-                            keyboard.append(new_region_ikb_list)
-                            ikb_searches_count += len(new_region_ikb_list) - 1  ##number of searches in the region
-                            logging.info(f'After += compose_full_message_on_list_of_searches_ikb: {keyboard=}')
-
-                    ##msg_sent_by_specific_code for combined ikb start
-                    if ikb_searches_count == 0:
-                        bot_message = 'Незавершенные поиски в соответствии с Вашей настройкой видов поисков не найдены.'
-                        params = {
-                            'parse_mode': 'HTML',
-                            'disable_web_page_preview': True,
-                            'reply_markup': reply_markup,
-                            'chat_id': user_id,
-                            'text': bot_message,
-                        }
-                        context = f'{user_id=}, context_step=b1'
-                        response = make_api_call('sendMessage', bot_token, params, context)
-                        logging.info(f'{response=}; {user_id=}; context_step=b2')
-                        result = process_response_of_api_call(user_id, response)
-                        logging.info(f'{result=}; {user_id=}; context_step=b3')
-                        inline_processing(cur, response, params)
-                    else:
-                        # issue#425 show the inline keyboard
-
-                        ##TBD. May be will be useful to show quantity of marked searches
-                        #                        searches_marked = 0
-                        #                        for region_keyboard in keyboard:
-                        #                            for ikb_line in region_keyboard:
-                        #                                if ikb_line[0].get("callback_data") and not ikb_line[0]["text"][:1]=='  ':
-                        #                                    searches_marked += 1
-
-                        for i, region_keyboard in enumerate(keyboard):
-                            if i == 0:
-                                bot_message = """МЕНЮ АКТУАЛЬНЫХ ПОИСКОВ ДЛЯ ОТСЛЕЖИВАНИЯ.
-Каждый поиск ниже дан строкой из пары кнопок: кнопка пометки для отслеживания и кнопка перехода на форум.
-👀 - знак пометки поиска для отслеживания, уведомления будут приходить только по помеченным поискам. 
-Если таких нет, то уведомления будут приходить по всем поискам согласно настройкам.
-❌ - пометка поиска для игнорирования ("черный список") - уведомления по таким поискам не будут приходить в любом случае."""
-                            else:
-                                bot_message = ''
-
-                            # Pop region caption from the region_keyboard and put it into bot-message
-                            bot_message += '\n' if len(bot_message) > 0 else ''
-                            bot_message += (
-                                f'<a href="{region_keyboard[0][0]["url"]}">{region_keyboard[0][0]["text"]}</a>'
-                            )
-                            region_keyboard.pop(0)
-
-                            if i == (len(keyboard) - 1):
-                                region_keyboard += [
-                                    [
-                                        {
-                                            'text': 'Отключить выбор поисков для отслеживания',
-                                            'callback_data': '{"action":"search_follow_mode_off"}',
-                                        }
-                                    ]
-                                ]
-
-                            reply_markup = InlineKeyboardMarkup(region_keyboard)
-                            logging.info(f'{bot_message=}; {region_keyboard=}; context_step=b00')
-                            # process_sending_message_async(user_id=user_id, data=data)
-                            context = f'Before if reply_markup and not isinstance(reply_markup, dict): {reply_markup=}, context_step=b01'
-                            logging.info(f'{context=}: {reply_markup=}')
-                            if reply_markup and not isinstance(reply_markup, dict):
-                                reply_markup = reply_markup.to_dict()
-                                context = (
-                                    f'After reply_markup.to_dict(): {reply_markup=}; {user_id=}; context_step=b02a'
-                                )
-                                logging.info(f'{context=}: {reply_markup=}')
-
-                            params = {
-                                'parse_mode': 'HTML',
-                                'disable_web_page_preview': True,
-                                'reply_markup': reply_markup,
-                                'chat_id': user_id,
-                                'text': bot_message,
-                            }
-                            context = f'{user_id=}, context_step=b1'
-                            response = make_api_call('sendMessage', bot_token, params, context)
-                            logging.info(f'{response=}; {user_id=}; context_step=b2')
-                            result = process_response_of_api_call(user_id, response)
-                            logging.info(f'{result=}; {user_id=}; context_step=b3')
-                            inline_processing(cur, response, params)
-                    ##msg_sent_by_specific_code for combined ikb end
-
-                    # saving the last message from bot
-                    try:
-                        cur.execute("""DELETE FROM msg_from_bot WHERE user_id=%s;""", (user_id,))
-                        cur.execute(
-                            'INSERT INTO msg_from_bot (user_id, time, msg_type) values (%s, %s, %s);',
-                            (user_id, datetime.datetime.now(), 'report'),
-                        )
-                    except Exception as e:
-                        logging.info('failed to save the last message from bot')
-                        logging.exception(e)
-
-                else:
-                    region_name = ''
-                    for region in user_regions:
-                        for line in folders_list:
-                            if line[0] == region:
-                                region_name = line[1]
-                                break
-
-                        # check if region – is an archive folder: if so – it can be sent only to 'all'
-                        if region_name.find('аверш') == -1 or temp_dict[got_message] == 'all':
-                            bot_message = compose_full_message_on_list_of_searches(
-                                cur, temp_dict[got_message], user_id, region, region_name
-                            )
-                            reply_markup = reply_markup_main
-                            data = {
-                                'text': bot_message,
-                                'reply_markup': reply_markup,
-                                'parse_mode': 'HTML',
-                                'disable_web_page_preview': True,
-                            }
-                            process_sending_message_async(user_id=user_id, data=data)
-
-                            # saving the last message from bot
-                            try:
-                                cur.execute("""DELETE FROM msg_from_bot WHERE user_id=%s;""", (user_id,))
-                                cur.execute(
-                                    'INSERT INTO msg_from_bot (user_id, time, msg_type) values (%s, %s, %s);',
-                                    (user_id, datetime.datetime.now(), 'report'),
-                                )
-                            except Exception as e:
-                                logging.info('failed to save the last message from bot')
-                                logging.exception(e)
-                    # issue425 Button for turn on search following mode
-                    try:
-                        search_follow_mode_ikb = [
-                            [
-                                {
-                                    'text': 'Включить выбор поисков для отслеживания',
-                                    'callback_data': '{"action":"search_follow_mode_on"}',
-                                }
-                            ]
-                        ]
-                        reply_markup = InlineKeyboardMarkup(search_follow_mode_ikb)
-                        if reply_markup and not isinstance(reply_markup, dict):
-                            reply_markup = reply_markup.to_dict()
-                            context = f'After reply_markup.to_dict(): {reply_markup=}; {user_id=}; context_step=a00'
-                            logging.info(f'{context=}: {reply_markup=}')
-                        params = {
-                            'parse_mode': 'HTML',
-                            'disable_web_page_preview': True,
-                            'reply_markup': reply_markup,
-                            'chat_id': user_id,
-                            'text': """Вы можете включить возможность выбора поисков для отслеживания, 
-чтобы получать уведомления не со всех актуальных поисков, 
-а только с выбранных Вами.""",
-                        }
-                        context = f'{user_id=}, context_step=a01'
-                        response = make_api_call('sendMessage', bot_token, params, context)
-                        logging.info(f'{response=}; {user_id=}; context_step=a02')
-                        result = process_response_of_api_call(user_id, response)
-                        logging.info(f'{result=}; {user_id=}; context_step=a03')
-                        inline_processing(cur, response, params)
-                    except Exception as e:
-                        logging.info('failed to show button for turn on search following mode')
-                        logging.exception(e)
-
-            # Perform individual replies
-
-            # Admin mode
-            elif got_message.lower() == b_admin_menu:
-                bot_message = 'Вы вошли в специальный тестовый админ-раздел'
-
-                # keyboard for Home Coordinates sharing
-                keyboard_coordinates_admin = [[b_back_to_start], [b_back_to_start]]
-                reply_markup = ReplyKeyboardMarkup(keyboard_coordinates_admin, resize_keyboard=True)
-
-            # FIXME - WIP
-            elif got_message.lower() == b_test_menu:
-                add_user_sys_role(cur, user_id, 'tester')
-                bot_message = (
-                    'Вы в секретном тестовом разделе, где всё может работать не так :) '
-                    'Если что – пишите, пожалуйста, в телеграм-чат '
-                    'https://t.me/joinchat/2J-kV0GaCgwxY2Ni'
-                    '\n💡 А еще Вам добавлена роль tester - некоторые тестовые функции включены автоматически.'
-                    '\nДля отказа от роли tester нужно отправить команду notest'
-                )
-                # keyboard_coordinates_admin = [[b_set_topic_type], [b_back_to_start]]
-                # [b_set_pref_urgency], [b_set_forum_nick]
-
-                map_button = {'text': 'Открыть карту поисков', 'web_app': {'url': get_app_config().web_app_url_test}}
-                keyboard = [[map_button]]
-                reply_markup = InlineKeyboardMarkup(keyboard)
-            # FIXME ^^^
-
-            elif got_message.lower() == 'notest':
-                delete_user_sys_role(cur, user_id, 'tester')
-                bot_message = 'Роль tester удалена. Приходите еще! :-) Возвращаемся в главное меню.'
-                reply_markup = reply_markup_main
-
-            ###            elif got_message.lower() == b_test_search_follow_mode_on: #issue425
-            ###                set_search_follow_mode(cur, user_id, True)
-            ###                bot_message = 'Возможность отслеживания поисков включена. Возвращаемся в главное меню.'
-            ###                reply_markup = reply_markup_main
-
-            elif got_message.lower() == b_test_search_follow_mode_off:  ##remains for some time for emrgency case
-                set_search_follow_mode(cur, user_id, False)
-                bot_message = 'Возможность отслеживания поисков вЫключена. Возвращаемся в главное меню.'
-                reply_markup = reply_markup_main
-
-            elif got_message in {b_map, c_map}:
-                bot_message = (
-                    'В Боте Поисковика теперь можно посмотреть 🗺️Карту Поисков📍.\n\n'
-                    'На карте вы сможете увидеть все активные поиски, '
-                    'построить к каждому из них маршрут с учетом пробок, '
-                    'а также открыть этот маршрут в сервисах Яндекс.\n\n'
-                    'Карта работает в тестовом режиме.\n'
-                    'Если карта будет работать некорректно, или вы видите, как ее необходимо '
-                    'доработать – напишите в '
-                    '<a href="https://t.me/joinchat/2J-kV0GaCgwxY2Ni">чат разработчиков</a>.'
-                    ''
-                )
-
-                map_button = {'text': 'Открыть карту поисков', 'web_app': {'url': get_app_config().web_app_url}}
-                keyboard = [[map_button]]
-                reply_markup = InlineKeyboardMarkup(keyboard)
-
-            elif (
-                got_message == b.set.topic_type.text
-                or b.topic_types.contains(got_message)
-                or (got_hash and b.topic_types.contains(got_hash))
-            ):  # noqa
-                callback_query_message_id = callback_query.message.id if callback_query else None
-                bot_message, reply_markup = manage_topic_type(
-                    cur, user_id, got_message, b, got_callback, callback_query_id, bot_token, callback_query_message_id
-                )
-
-            elif got_message in {
-                b_set_pref_age,
-                b_pref_age_0_6_act,
-                b_pref_age_0_6_deact,
-                b_pref_age_7_13_act,
-                b_pref_age_7_13_deact,
-                b_pref_age_14_20_act,
-                b_pref_age_14_20_deact,
-                b_pref_age_21_50_act,
-                b_pref_age_21_50_deact,
-                b_pref_age_51_80_act,
-                b_pref_age_51_80_deact,
-                b_pref_age_81_on_act,
-                b_pref_age_81_on_deact,
-            }:
-                input_data = None if got_message == b_set_pref_age else got_message
-                keyboard, first_visit = manage_age(cur, user_id, input_data)
-                keyboard.append([b_back_to_start])
-                reply_markup = ReplyKeyboardMarkup(keyboard, resize_keyboard=True)
-
-                if got_message.lower() == b_set_pref_age:
-                    bot_message = (
-                        'Чтобы включить или отключить уведомления по определенной возрастной '
-                        'группе, нажмите на неё. Настройку можно изменить в любой момент.'
-                    )
-                    if first_visit:
-                        bot_message = (
-                            'Данное меню позволяет выбрать возрастные категории БВП '
-                            '(без вести пропавших), по которым вы хотели бы получать уведомления. '
-                            'Важно, что если бот не сможет распознать возраст БВП, тогда вы '
-                            'всё равно получите уведомление.\nТакже данная настройка не влияет на '
-                            'разделы Актуальные Поиски и Последние Поиски – в них вы всё также '
-                            'сможете увидеть полный список поисков.\n\n' + bot_message
-                        )
-                else:
-                    bot_message = 'Спасибо, записали.'
-
-            elif (
-                got_message in {b_set_pref_radius, b_pref_radius_act, b_pref_radius_deact, b_pref_radius_change}
-                or bot_request_bfr_usr_msg == 'radius_input'
-            ):
-                bot_message, reply_markup, bot_request_aft_usr_msg = manage_radius(
-                    cur,
-                    user_id,
-                    got_message,
-                    b_set_pref_radius,
-                    b_pref_radius_act,
-                    b_pref_radius_deact,
-                    b_pref_radius_change,
-                    b_back_to_start,
-                    b_set_pref_coords,
-                    bot_request_bfr_usr_msg,
-                )
-
-            elif (
-                got_message in {b_set_forum_nick, b_yes_its_me, b_no_its_not_me}
-                or bot_request_bfr_usr_msg == 'input_of_forum_username'
-            ):
-                bot_message, reply_markup, bot_request_aft_usr_msg = manage_linking_to_forum(
-                    cur,
-                    got_message,
-                    user_id,
-                    b_set_forum_nick,
-                    b_back_to_start,
-                    bot_request_bfr_usr_msg,
-                    b_admin_menu,
-                    b_test_menu,
-                    b_yes_its_me,
-                    b_no_its_not_me,
-                    b_settings,
-                    reply_markup_main,
-                )
-
-            elif got_message == b_set_pref_urgency:
-                bot_message = (
-                    'Очень многие поисковики пользуются этим Ботом. При любой рассылке нотификаций'
-                    ' Бот ставит все сообщения в очередь, и они обрабатываются '
-                    'со скоростью, ограниченной технологиями Телеграма. Иногда, в случае нескольких'
-                    ' больших поисков, очередь вырастает и кто-то получает сообщения практически '
-                    'сразу, а кому-то они приходят с задержкой.\n'
-                    'Вы можете помочь сделать рассылки уведомлений более "нацеленными", обозначив '
-                    'с какой срочностью вы бы хотели получать уведомления от Бота. В скобках '
-                    'указаны примерные сроки задержки относительно появления информации на форуме. '
-                    'Выберите наиболее подходящий Вам вариант'
-                )
-                keyboard = [
-                    [b_pref_urgency_highest],
-                    [b_pref_urgency_high],
-                    [b_pref_urgency_medium],
-                    [b_pref_urgency_low],
-                    [b_back_to_start],
-                ]
-                reply_markup = ReplyKeyboardMarkup(keyboard, resize_keyboard=True)
-
-            # DEBUG: for debugging purposes only
-            elif got_message.lower() == 'go':
-                publish_to_pubsub(Topics.topic_notify_admin, 'test_admin_check')
-
-            elif got_message in {b_other, c_other}:
-                bot_message = (
-                    'Здесь можно посмотреть статистику по 20 последним поискам, перейти в '
-                    'канал Коммъюнити или Прочитать важную информацию для Новичка и посмотреть '
-                    'душевные фото с поисков'
-                )
-                reply_markup = ReplyKeyboardMarkup(keyboard_other, resize_keyboard=True)
-
-            elif got_message in {b_menu_set_region, b_fed_dist_pick_other}:
-                bot_message = update_and_download_list_of_regions(
-                    cur, user_id, got_message, b_menu_set_region, b_fed_dist_pick_other
-                )
-                reply_markup = ReplyKeyboardMarkup(keyboard_fed_dist_set, resize_keyboard=True)
-
-            elif got_message in dict_of_fed_dist:
-                updated_regions = update_and_download_list_of_regions(
-                    cur, user_id, got_message, b_menu_set_region, b_fed_dist_pick_other
-                )
-                bot_message = updated_regions
-                reply_markup = ReplyKeyboardMarkup(dict_of_fed_dist[got_message], resize_keyboard=True)
-
-            elif got_message in full_dict_of_regions:
-                updated_regions = update_and_download_list_of_regions(
-                    cur, user_id, got_message, b_menu_set_region, b_fed_dist_pick_other
-                )
-                bot_message = updated_regions
-                keyboard = keyboard_fed_dist_set
-                for fed_dist in dict_of_fed_dist:
-                    for region in dict_of_fed_dist[fed_dist]:
-                        if region[0] == got_message:
-                            keyboard = dict_of_fed_dist[fed_dist]
-                            break
-                    else:
-                        continue
-                    break
-                reply_markup = ReplyKeyboardMarkup(keyboard, resize_keyboard=True)
-
-                if onboarding_step_id == 20:  # "moscow_replied"
-                    save_onboarding_step(user_id, username, 'region_set')
-                    save_user_pref_topic_type(cur, user_id, 'default', user_role)
-
-            elif got_message in {b_settings, c_settings}:
-                bot_message = (
-                    'Это раздел с настройками. Здесь вы можете выбрать удобные для вас '
-                    'уведомления, а также ввести свои "домашние координаты", на основе которых '
-                    'будет рассчитываться расстояние и направление до места поиска. Вы в любой '
-                    'момент сможете изменить эти настройки.'
-                )
-
-                message_prefix = compose_msg_on_user_setting_fullness(cur, user_id)
-                if message_prefix:
-                    bot_message = f'{bot_message}\n\n{message_prefix}'
-
-                keyboard_settings = [
-                    [b_set_pref_notif_type],
-                    [b_menu_set_region],
-                    [b_set_topic_type],
-                    [b_set_pref_coords],
-                    [b_set_pref_radius],
-                    [b_set_pref_age],
-                    [b_set_forum_nick],
-                    [b_back_to_start],
-                ]  # #AK added b_set_forum_nick for issue #6
-                reply_markup = ReplyKeyboardMarkup(keyboard_settings, resize_keyboard=True)
-
-            elif got_message == b_set_pref_coords:
-                bot_message = (
-                    'АВТОМАТИЧЕСКОЕ ОПРЕДЕЛЕНИЕ координат работает только для носимых устройств'
-                    ' (для настольных компьютеров – НЕ работает: используйте, пожалуйста, '
-                    'кнопку ручного ввода координат). '
-                    'При автоматическом определении координат – нажмите на кнопку и '
-                    'разрешите определить вашу текущую геопозицию. '
-                    'Координаты, загруженные вручную или автоматически, будут считаться '
-                    'вашим "домом", откуда будут рассчитаны расстояние и '
-                    'направление до поисков.'
-                )
-                keyboard_coordinates_1 = [
-                    [b_coords_auto_def],
-                    [b_coords_man_def],
-                    [b_coords_check],
-                    [b_coords_del],
-                    [b_back_to_start],
-                ]
-                reply_markup = ReplyKeyboardMarkup(keyboard_coordinates_1, resize_keyboard=True)
-
-            elif got_message == b_coords_del:
-                delete_user_coordinates(cur, user_id)
-                bot_message = (
-                    'Ваши "домашние координаты" удалены. Теперь расстояние и направление '
-                    'до поисков не будет отображаться.\n'
-                    'Вы в любой момент можете заново ввести новые "домашние координаты". '
-                    'Функция Автоматического определения координат работает только для '
-                    'носимых устройств, для настольного компьютера – воспользуйтесь '
-                    'ручным вводом.'
-                )
-                keyboard_coordinates_1 = [[b_coords_auto_def], [b_coords_man_def], [b_coords_check], [b_back_to_start]]
-                reply_markup = ReplyKeyboardMarkup(keyboard_coordinates_1, resize_keyboard=True)
-
-            elif got_message == b_coords_man_def:
-                bot_message = (
-                    'Введите координаты вашего дома вручную в теле сообщения и просто '
-                    'отправьте. Формат: XX.XXXХХ, XX.XXXХХ, где количество цифр после точки '
-                    'может быть различным. Широта (первое число) должна быть между 30 '
-                    'и 80, Долгота (второе число) – между 10 и 190.'
-                )
-                bot_request_aft_usr_msg = 'input_of_coords_man'
-                reply_markup = ReplyKeyboardRemove()
-
-            elif got_message == b_coords_check:
-                lat, lon = show_user_coordinates(cur, user_id)
-                if lat and lon:
-                    bot_message = 'Ваши "домашние координаты" '
-                    bot_message += generate_yandex_maps_place_link(lat, lon, 'coords')
-
-                else:
-                    bot_message = 'Ваши координаты пока не сохранены. Введите их автоматически или вручную.'
-
-                keyboard_coordinates_1 = [
-                    [b_coords_auto_def],
-                    [b_coords_man_def],
-                    [b_coords_check],
-                    [b_coords_del],
-                    [b_back_to_start],
-                ]
-                reply_markup = ReplyKeyboardMarkup(keyboard_coordinates_1, resize_keyboard=True)
-
-            elif got_message == b_back_to_start:
-                bot_message = 'возвращаемся в главное меню'
-                reply_markup = reply_markup_main
-
-            elif got_message == b_goto_community:
-                bot_message = (
-                    'Бот можно обсудить с соотрядниками в '
-                    '<a href="https://t.me/joinchat/2J-kV0GaCgwxY2Ni">Специальном Чате '
-                    'в телеграм</a>. Там можно предложить свои идеи, указать на проблемы '
-                    'и получить быструю обратную связь от разработчика.'
-                )
-                keyboard_other = [[b_view_latest_searches], [b_goto_first_search], [b_goto_photos], [b_back_to_start]]
-                reply_markup = ReplyKeyboardMarkup(keyboard_other, resize_keyboard=True)
-
-            elif got_message == b_goto_first_search:
-                bot_message = (
-                    'Если вы хотите стать добровольцем ДПСО «ЛизаАлерт», пожалуйста, '
-                    '<a href="https://lizaalert.org/forum/viewtopic.php?t=56934">'
-                    'посетите страницу форума</a>, там можно ознакомиться с базовой информацией '
-                    'для новичков и задать свои вопросы.'
-                    'Если вы готовитесь к своему первому поиску – приглашаем '
-                    '<a href="https://xn--b1afkdgwddgp9h.xn--p1ai/">ознакомиться с основами '
-                    'работы ЛА</a>. Всю теорию работы ЛА необходимо получать от специально '
-                    'обученных волонтеров ЛА. Но если у вас еще не было возможности пройти '
-                    'официальное обучение, а вы уже готовы выехать на поиск – этот ресурс '
-                    'для вас.'
-                )
-                keyboard_other = [[b_view_latest_searches], [b_goto_community], [b_goto_photos], [b_back_to_start]]
-                reply_markup = ReplyKeyboardMarkup(keyboard_other, resize_keyboard=True)
-
-            elif got_message == b_goto_photos:
-                bot_message = (
-                    'Если вам хочется окунуться в атмосферу ПСР, приглашаем в замечательный '
-                    '<a href="https://t.me/+6LYNNEy8BeI1NGUy">телеграм-канал с красивыми фото с '
-                    'поисков</a>. Все фото – сделаны поисковиками во время настоящих ПСР.'
-                )
-                keyboard_other = [
-                    [b_view_latest_searches],
-                    [b_goto_community],
-                    [b_goto_first_search],
-                    [b_back_to_start],
-                ]
-                reply_markup = ReplyKeyboardMarkup(keyboard_other, resize_keyboard=True)
-
-            # special block for flexible menu on notification preferences
-            elif got_message in {
-                b_act_all,
-                b_deact_all,
-                b_act_new_search,
-                b_act_stat_change,
-                b_act_titles,
-                b_act_all_comments,
-                b_set_pref_notif_type,
-                b_deact_stat_change,
-                b_deact_all_comments,
-                b_deact_new_search,
-                b_act_inforg_com,
-                b_deact_inforg_com,
-                b_act_field_trips_new,
-                b_deact_field_trips_new,
-                b_act_field_trips_change,
-                b_deact_field_trips_change,
-                b_act_coords_change,
-                b_deact_coords_change,
-                b_act_first_post_change,
-                b_deact_first_post_change,
-            }:
-                # save preference for +ALL
-                if got_message == b_act_all:
-                    bot_message = (
-                        'Супер! теперь вы будете получать уведомления в телеграм в случаях: '
-                        'появление нового поиска, изменение статуса поиска (стоп, НЖ, НП), '
-                        'появление новых комментариев по всем поискам. Вы в любой момент '
-                        'можете изменить список уведомлений'
-                    )
-                    save_preference(cur, user_id, 'all')
-
-                # save preference for -ALL
-                elif got_message == b_deact_all:
-                    bot_message = 'Вы можете настроить типы получаемых уведомлений более гибко'
-                    save_preference(cur, user_id, '-all')
-
-                # save preference for +NEW SEARCHES
-                elif got_message == b_act_new_search:
-                    bot_message = (
-                        'Отлично! Теперь вы будете получать уведомления в телеграм при '
-                        'появлении нового поиска. Вы в любой момент можете изменить '
-                        'список уведомлений'
-                    )
-                    save_preference(cur, user_id, 'new_searches')
-
-                # save preference for -NEW SEARCHES
-                elif got_message == b_deact_new_search:
-                    bot_message = 'Записали'
-                    save_preference(cur, user_id, '-new_searches')
-
-                # save preference for +STATUS UPDATES
-                elif got_message == b_act_stat_change:
-                    bot_message = (
-                        'Отлично! теперь вы будете получать уведомления в телеграм при '
-                        'изменении статуса поисков (НЖ, НП, СТОП и т.п.). Вы в любой момент '
-                        'можете изменить список уведомлений'
-                    )
-                    save_preference(cur, user_id, 'status_changes')
-
-                # save preference for -STATUS UPDATES
-                elif got_message == b_deact_stat_change:
-                    bot_message = 'Записали'
-                    save_preference(cur, user_id, '-status_changes')
-
-                # save preference for TITLE UPDATES
-                elif got_message == b_act_titles:
-                    bot_message = 'Отлично!'
-                    save_preference(cur, user_id, 'title_changes')
-
-                # save preference for +COMMENTS
-                elif got_message == b_act_all_comments:
-                    bot_message = (
-                        'Отлично! Теперь все новые комментарии будут у вас! Вы в любой момент '
-                        'можете изменить список уведомлений'
-                    )
-                    save_preference(cur, user_id, 'comments_changes')
-
-                # save preference for -COMMENTS
-                elif got_message == b_deact_all_comments:
-                    bot_message = (
-                        'Записали. Мы только оставили вам включенными уведомления о '
-                        'комментариях Инфорга. Их тоже можно отключить'
-                    )
-                    save_preference(cur, user_id, '-comments_changes')
-
-                # save preference for +InforgComments
-                elif got_message == b_act_inforg_com:
-                    bot_message = (
-                        'Если вы не подписаны на уведомления по всем комментариям, то теперь '
-                        'вы будете получать уведомления о комментариях от Инфорга. Если же вы '
-                        'уже подписаны на все комментарии – то всё остаётся без изменений: бот '
-                        'уведомит вас по всем комментариям, включая от Инфорга'
-                    )
-                    save_preference(cur, user_id, 'inforg_comments')
-
-                # save preference for -InforgComments
-                elif got_message == b_deact_inforg_com:
-                    bot_message = 'Вы отписались от уведомлений по новым комментариям от Инфорга'
-                    save_preference(cur, user_id, '-inforg_comments')
-
-                # save preference for +FieldTripsNew
-                elif got_message == b_act_field_trips_new:
-                    bot_message = (
-                        'Теперь вы будете получать уведомления о новых выездах по уже идущим '
-                        'поискам. Обратите внимание, что это не рассылка по новым темам на '
-                        'форуме, а именно о том, что в существующей теме в ПЕРВОМ посте '
-                        'появилась информация о новом выезде'
-                    )
-                    save_preference(cur, user_id, 'field_trips_new')
-
-                # save preference for -FieldTripsNew
-                elif got_message == b_deact_field_trips_new:
-                    bot_message = 'Вы отписались от уведомлений по новым выездам'
-                    save_preference(cur, user_id, '-field_trips_new')
-
-                # save preference for +FieldTripsChange
-                elif got_message == b_act_field_trips_change:
-                    bot_message = (
-                        'Теперь вы будете получать уведомления о ключевых изменениях при '
-                        'выездах, в т.ч. изменение или завершение выезда. Обратите внимание, '
-                        'что эта рассылка отражает изменения только в ПЕРВОМ посте поиска.'
-                    )
-                    save_preference(cur, user_id, 'field_trips_change')
-
-                # save preference for -FieldTripsChange
-                elif got_message == b_deact_field_trips_change:
-                    bot_message = 'Вы отписались от уведомлений по изменениям выездов'
-                    save_preference(cur, user_id, '-field_trips_change')
-
-                # save preference for +CoordsChange
-                elif got_message == b_act_coords_change:
-                    bot_message = (
-                        'Если у штаба поменяются координаты (и об этом будет написано в первом '
-                        'посте на форуме) – бот уведомит вас об этом'
-                    )
-                    save_preference(cur, user_id, 'coords_change')
-
-                # save preference for -CoordsChange
-                elif got_message == b_deact_coords_change:
-                    bot_message = 'Вы отписались от уведомлений о смене места (координат) штаба'
-                    save_preference(cur, user_id, '-coords_change')
-
-                # save preference for -FirstPostChanges
-                elif got_message == b_act_first_post_change:
-                    bot_message = (
-                        'Теперь вы будете получать уведомления о важных изменениях в Первом Посте'
-                        ' Инфорга, где обозначено описание каждого поиска'
-                    )
-                    save_preference(cur, user_id, 'first_post_changes')
-
-                # save preference for -FirstPostChanges
-                elif got_message == b_deact_first_post_change:
-                    bot_message = (
-                        'Вы отписались от уведомлений о важных изменениях в Первом Посте'
-                        ' Инфорга c описанием каждого поиска'
-                    )
-                    save_preference(cur, user_id, '-first_post_changes')
-
-                # GET what are preferences
-                elif got_message == b_set_pref_notif_type:
-                    prefs = compose_user_preferences_message(cur, user_id)
-                    if prefs[0] == 'пока нет включенных уведомлений' or prefs[0] == 'неизвестная настройка':
-                        bot_message = 'Выберите, какие уведомления вы бы хотели получать'
-                    else:
-                        bot_message = 'Сейчас у вас включены следующие виды уведомлений:\n'
-                        bot_message += prefs[0]
-
-                else:
-                    bot_message = 'empty message'
-
-                if got_message == b_act_all:
-                    keyboard_notifications_flexible = [[b_deact_all], [b_back_to_start]]
-                elif got_message == b_deact_all:
-                    keyboard_notifications_flexible = [
-                        [b_act_all],
-                        [b_deact_new_search],
-                        [b_deact_stat_change],
-                        [b_act_all_comments],
-                        [b_deact_inforg_com],
-                        [b_deact_first_post_change],
-                        [b_back_to_start],
-                    ]
-                else:
-                    # getting the list of user notification preferences
-                    prefs = compose_user_preferences_message(cur, user_id)
-                    keyboard_notifications_flexible = [
-                        [b_act_all],
-                        [b_act_new_search],
-                        [b_act_stat_change],
-                        [b_act_all_comments],
-                        [b_act_inforg_com],
-                        [b_act_first_post_change],
-                        [b_back_to_start],
-                    ]
-
-                    for line in prefs[1]:
-                        if line == 'all':
-                            keyboard_notifications_flexible = [[b_deact_all], [b_back_to_start]]
-                        elif line == 'new_searches':
-                            keyboard_notifications_flexible[1] = [b_deact_new_search]
-                        elif line == 'status_changes':
-                            keyboard_notifications_flexible[2] = [b_deact_stat_change]
-                        elif line == 'comments_changes':
-                            keyboard_notifications_flexible[3] = [b_deact_all_comments]
-                        elif line == 'inforg_comments':
-                            keyboard_notifications_flexible[4] = [b_deact_inforg_com]
-                        elif line == 'first_post_changes':
-                            keyboard_notifications_flexible[5] = [b_deact_first_post_change]
-
-                reply_markup = ReplyKeyboardMarkup(keyboard_notifications_flexible, resize_keyboard=True)
-
-            # in case of other user messages:
-            else:
-                # If command in unknown
-                bot_message = (
-                    'не понимаю такой команды, пожалуйста, используйте кнопки со стандартными ' 'командами ниже'
-                )
-                reply_markup = reply_markup_main
+            handler = get_message_router().route(dialogue)
+            handler(dialogue)
+            bot_message, reply_markup = dialogue.bot_message, dialogue.reply_markup
 
-            if not msg_sent_by_specific_code:
+            if not dialogue.msg_sent_by_specific_code:
                 # FIXME – 17.11.2023 – migrating from async to pure api call
                 """
                 admin_id = get_app_config().my_telegram_id
@@ -4280,6 +4055,7 @@ def process_update(update: Update) -> str:
                 # FIXME ^^^
 
             # saving the last message from bot
+            bot_request_aft_usr_msg = dialogue.bot_request_aft_usr_msg
             if not bot_request_aft_usr_msg:
                 bot_request_aft_usr_msg = 'not_defined'
 
@@ -4304,7 +4080,7 @@ def process_update(update: Update) -> str:
             text_for_admin = (
                 f'[comm]: Empty message in Comm, user={user_id}, username={username}, '
                 f'got_message={got_message}, update={update}, '
-                f'bot_request_bfr_usr_msg={bot_request_bfr_usr_msg}'
+                f'bot_request_bfr_usr_msg={user.bot_request}'
             )
             logging.info(text_for_admin)
             notify_admin(text_for_admin)
@@ -4314,10 +4090,12 @@ def process_update(update: Update) -> str:
         logging.exception(e)
         notify_admin('[comm] general script fail')
 
-    if bot_message:
-        save_bot_reply_to_user(cur, user_id, bot_message)
+    if dialogue.bot_message:
+        save_bot_reply_to_user(user_id, dialogue.bot_message)
 
     cur.close()
     conn_psy.close()
+    # the reply is already sent, so the user doesn't wait for the dialogs to be written
+    get_dialogs_buffer().flush()
 
     return 'finished successfully. in was a regular conversational message'
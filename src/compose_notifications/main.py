@@ -3,10 +3,14 @@
 import ast
 import datetime
 import logging
-import math
 import re
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from functools import lru_cache
 from typing import Any, List, Optional, Tuple
 
+import numpy as np
 import sqlalchemy
 from sqlalchemy.engine.base import Connection
 
@@ -25,11 +29,44 @@ setup_google_logging()
 
 WINDOW_FOR_NOTIFICATIONS_DAYS = 60
 INTERVAL_TO_CHECK_PARALLEL_FUNCTION_SECONDS = 130
+# rows of notif_by_user in one multi-row INSERT (postgres has a limit of 32767 params per query)
+NOTIF_BY_USER_INSERT_BATCH_SIZE = 1000
+# change_log records composed in one run (one transaction per record), the rest is left for the re-run
+COMPOSE_BATCH_SIZE = 10
+# recipients index is fully reloaded once in a while, in between only users from user_pref_changes are reloaded
+RECIPIENTS_INDEX_FULL_RELOAD_SECONDS = 3600
+# changes are re-read with an overlap: a transaction could be committed later than its changed_at
+RECIPIENTS_INDEX_CHANGES_OVERLAP_SECONDS = 60
 
 coord_format = '{0:.5f}'
 stat_list_of_recipients = []  # list of users who received notification on new search
 fib_list = [1, 2, 3, 5, 8, 13, 21, 34, 55, 89, 144, 233, 377, 610, 987]
 coord_pattern = r'0?[3-8]\d\.\d{1,10}[\s\w,]{0,10}[01]?[2-9]\d\.\d{1,10}'
+EARTH_RADIUS_KM = 6373.0
+DIRECTION_ARROWS = [
+    '&#8593;&#xFE0E;',
+    '&#x2197;&#xFE0F;',
+    '&#8594;&#xFE0E;',
+    '&#8600;&#xFE0E;',
+    '&#8595;&#xFE0E;',
+    '&#8601;&#xFE0E;',
+    '&#8592;&#xFE0E;',
+    '&#8598;&#xFE0E;',
+]
+
+
+notif_by_user_table = sqlalchemy.table(
+    'notif_by_user',
+    sqlalchemy.column('mailing_id'),
+    sqlalchemy.column('user_id'),
+    sqlalchemy.column('message_content'),
+    sqlalchemy.column('message_text'),
+    sqlalchemy.column('message_type'),
+    sqlalchemy.column('message_params'),
+    sqlalchemy.column('message_group_id'),
+    sqlalchemy.column('change_log_id'),
+    sqlalchemy.column('created'),
+)
 
 
 class Comment:
@@ -317,102 +354,93 @@ def define_family_name(title_string: str, predefined_fam_name: str | None) -> st
     return fam_name
 
 
-def define_dist_and_dir_to_search(search_lat, search_lon, user_let, user_lon):
-    """define direction & distance from user's home coordinates to search coordinates"""
+def calc_distances_and_directions(search_coords, user_coords) -> tuple[np.ndarray, np.ndarray]:
+    """define distances (km) & directions from users' home coordinates to search coordinates
+    for all the pairs at once: result[i, j] is for search point i and user j.
+    directions are indexes in DIRECTION_ARROWS"""
 
-    def calc_bearing(lat_2, lon_2, lat_1, lon_1):
-        d_lon_ = lon_2 - lon_1
-        x = math.cos(math.radians(lat_2)) * math.sin(math.radians(d_lon_))
-        y = math.cos(math.radians(lat_1)) * math.sin(math.radians(lat_2)) - math.sin(math.radians(lat_1)) * math.cos(
-            math.radians(lat_2)
-        ) * math.cos(math.radians(d_lon_))
-        bearing = math.atan2(x, y)  # used to determine the quadrant
-        bearing = math.degrees(bearing)
-
-        return bearing
-
-    def calc_direction(lat_1, lon_1, lat_2, lon_2):
-        points = [
-            '&#8593;&#xFE0E;',
-            '&#x2197;&#xFE0F;',
-            '&#8594;&#xFE0E;',
-            '&#8600;&#xFE0E;',
-            '&#8595;&#xFE0E;',
-            '&#8601;&#xFE0E;',
-            '&#8592;&#xFE0E;',
-            '&#8598;&#xFE0E;',
-        ]
-        bearing = calc_bearing(lat_1, lon_1, lat_2, lon_2)
-        bearing += 22.5
-        bearing = bearing % 360
-        bearing = int(bearing / 45)  # values 0 to 7
-        nsew = points[bearing]
+    search_points = np.radians(np.asarray(search_coords, dtype=float).reshape(-1, 2))
+    user_points = np.radians(np.asarray(user_coords, dtype=float).reshape(-1, 2))
 
-        return nsew
+    # search points as a column, users as a row – numpy broadcasts them into a matrix
+    s_lat, s_lon = search_points[:, :1], search_points[:, 1:]
+    u_lat, u_lon = user_points[:, 0], user_points[:, 1]
 
-    earth_radius = 6373.0  # radius of the Earth
+    # Haversine formula
+    d_lat = u_lat - s_lat
+    d_lon = u_lon - s_lon
+    a = np.sin(d_lat / 2) ** 2 + np.cos(s_lat) * np.cos(u_lat) * np.sin(d_lon / 2) ** 2
+    c = 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+    distances = np.round(EARTH_RADIUS_KM * c, 1)
 
-    # coordinates in radians
-    lat1 = math.radians(float(search_lat))
-    lon1 = math.radians(float(search_lon))
-    lat2 = math.radians(float(user_let))
-    lon2 = math.radians(float(user_lon))
+    # initial bearing from user to search
+    x = np.cos(s_lat) * np.sin(-d_lon)
+    y = np.cos(u_lat) * np.sin(s_lat) - np.sin(u_lat) * np.cos(s_lat) * np.cos(-d_lon)
+    bearings = np.degrees(np.arctan2(x, y))
+    directions = (((bearings + 22.5) % 360) // 45).astype(int)  # values 0 to 7
 
-    # change in coordinates
-    d_lon = lon2 - lon1
+    return distances, directions
 
-    d_lat = lat2 - lat1
 
-    # Haversine formula
-    a = math.sin(d_lat / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin(d_lon / 2) ** 2
-    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+def define_dist_and_dir_to_search(search_lat, search_lon, user_let, user_lon):
+    """define direction & distance from user's home coordinates to search coordinates"""
 
-    distance = earth_radius * c
-    dist = round(distance, 1)
+    distances, directions = calc_distances_and_directions(
+        [float(search_lat), float(search_lon)], [float(user_let), float(user_lon)]
+    )
 
-    # define direction
-    direction = calc_direction(lat1, lon1, lat2, lon2)
+    return float(distances[0, 0]), DIRECTION_ARROWS[directions[0, 0]]
 
-    return dist, direction
 
+def define_dist_and_dir_for_users(search_lat, search_lon, list_of_users: list) -> dict[int, tuple[float, str]]:
+    """define distance & direction to search for all the users with home coordinates, by user_id"""
 
-def compose_new_records_from_change_log(conn: Connection) -> LineInChangeLog:
-    """compose the New Records list of the unique New Records in Change Log: one Record = One line in Change Log"""
+    users_with_coords = [x for x in list_of_users if x.user_latitude and x.user_longitude]
+    if not (search_lat and search_lon and users_with_coords):
+        return {}
 
-    delta_in_cl = conn.execute(
-        """SELECT search_forum_num, changed_field, new_value, id, change_type FROM change_log
-        WHERE notification_sent is NULL
-        OR notification_sent='s' ORDER BY id LIMIT 1; """
-    ).fetchall()
+    user_coords = [[x.user_latitude, x.user_longitude] for x in users_with_coords]
+    distances, directions = calc_distances_and_directions([search_lat, search_lon], user_coords)
 
-    if not delta_in_cl:
-        logging.info('no new records found in PSQL')
-        return None
+    return {
+        user.user_id: (float(distances[0, i]), DIRECTION_ARROWS[directions[0, i]])
+        for i, user in enumerate(users_with_coords)
+    }
 
-    if not len(list(delta_in_cl)) > 0:
-        logging.info(f'new record is found in PSQL, however it is not list: {delta_in_cl}')
-        return None
 
-    one_line_in_change_log = [i for i in delta_in_cl[0]]
+def compose_new_records_from_change_log(conn: Connection, batch_size: int = 1) -> List[LineInChangeLog]:
+    """compose the New Records list of the unique New Records in Change Log: one Record = One line in Change Log.
+    Lines are locked till the end of transaction, lines locked by another transaction are skipped"""
 
-    if not one_line_in_change_log:
-        logging.info(f'new record is found in PSQL, however it is not list: {delta_in_cl}, {one_line_in_change_log}')
-        return None
+    sql_text = sqlalchemy.text("""
+        SELECT search_forum_num, changed_field, new_value, id, change_type FROM change_log
+        WHERE notification_sent is NULL
+        OR notification_sent='s' ORDER BY id LIMIT :a
+        FOR UPDATE SKIP LOCKED
+        /*action='claim_new_records_from_change_log' */;""")
+    delta_in_cl = conn.execute(sql_text, a=batch_size).fetchall()
 
-    logging.info(f'new record is {one_line_in_change_log}')
-    new_record = LineInChangeLog()
-    new_record.forum_search_num = one_line_in_change_log[0]
-    new_record.changed_field = one_line_in_change_log[1]
-    new_record.new_value = one_line_in_change_log[2]
-    new_record.change_id = one_line_in_change_log[3]
-    new_record.change_type = one_line_in_change_log[4]
+    if not delta_in_cl:
+        logging.info('no new records found in PSQL')
+        return []
 
-    # TODO – there was a filtering for duplication: Inforg comments vs All Comments, but after restructuring
-    #  of the scrip tech solution stopped working. The new filtering solution to be developed
+    new_records = []
+    for one_line_in_change_log in delta_in_cl:
+        logging.info(f'new record is {list(one_line_in_change_log)}')
+        new_record = LineInChangeLog()
+        new_record.forum_search_num = one_line_in_change_log[0]
+        new_record.changed_field = one_line_in_change_log[1]
+        new_record.new_value = one_line_in_change_log[2]
+        new_record.change_id = one_line_in_change_log[3]
+        new_record.change_type = one_line_in_change_log[4]
 
-    logging.info(f'New Record composed from Change Log: {str(new_record)}')
+        # TODO – there was a filtering for duplication: Inforg comments vs All Comments, but after restructuring
+        #  of the scrip tech solution stopped working. The new filtering solution to be developed
 
-    return new_record
+        logging.info(f'New Record composed from Change Log: {str(new_record)}')
+        new_records.append(new_record)
+
+    return new_records
 
 
 def enrich_new_record_from_searches(conn: Connection, r_line: LineInChangeLog):
@@ -966,8 +994,155 @@ def enrich_new_record_with_com_message_texts(line: LineInChangeLog) -> LineInCha
     return line
 
 
+@dataclass
+class RecipientPrefs:
+    """notification preferences of one active user, as stored in the recipients index"""
+
+    user_id: int
+    username_telegram: Optional[str]
+    role: Optional[str]
+    notif_pref_ids: frozenset
+    folders: tuple
+    topic_type_ids: frozenset
+    latitude: Optional[str]
+    longitude: Optional[str]
+
+    def matches(self, forum_folder: int, change_type: int, topic_type_id: int) -> bool:
+        """check if user wants notifications of this type, topic type and folder"""
+
+        if not (30 in self.notif_pref_ids or change_type in self.notif_pref_ids):
+            return False
+        if 4 in self.notif_pref_ids and change_type == 2:  # topic_inforg_comment_new & topic_title_change, issue13
+            return False
+        if forum_folder not in self.folders:
+            return False
+        return 30 in self.topic_type_ids or topic_type_id in self.topic_type_ids
+
+
+class RecipientsIndex:
+    """In-memory snapshot of notification preferences of all active users, indexed by forum folder.
+    Lives as long as the instance. Users, whose preferences were changed by communicate / manage_users,
+    are reloaded by user_pref_changes before every lookup; the whole snapshot – once an hour"""
+
+    _users_sql = """
+        WITH
+            notif_prefs AS (
+                SELECT user_id, array_agg(pref_id) AS agg FROM user_preferences {condition} GROUP BY user_id),
+            folders AS (
+                SELECT user_id, array_agg(forum_folder_num) AS agg
+                FROM user_regional_preferences {condition} GROUP BY user_id),
+            topic_types AS (
+                SELECT user_id, array_agg(topic_type_id) AS agg FROM user_pref_topic_type {condition} GROUP BY user_id),
+            coords AS (
+                SELECT DISTINCT ON (user_id) user_id, latitude, longitude
+                FROM user_coordinates {condition} ORDER BY user_id, upd_time DESC)
+        SELECT u.user_id, u.username_telegram, u.role, np.agg, f.agg, tt.agg, c.latitude, c.longitude
+        FROM users AS u
+        JOIN notif_prefs AS np ON u.user_id=np.user_id
+        JOIN folders AS f ON u.user_id=f.user_id
+        JOIN topic_types AS tt ON u.user_id=tt.user_id
+        LEFT JOIN coords AS c ON u.user_id=c.user_id
+        WHERE (u.status IS NULL OR u.status='unblocked')
+        /*action='load_recipients_index' */;"""
+
+    def __init__(self):
+        self._users: dict[int, RecipientPrefs] = {}
+        self._user_ids_by_folder: dict[int, set[int]] = defaultdict(set)
+        self._recipients_by_key: dict[tuple[int, int, int], list[RecipientPrefs]] = {}
+        self._loaded_at: Optional[float] = None
+        self._synced_till: Optional[datetime.datetime] = None
+
+    def _add_user(self, user: RecipientPrefs) -> None:
+        self._users[user.user_id] = user
+        for folder in user.folders:
+            self._user_ids_by_folder[folder].add(user.user_id)
+
+    def _remove_user(self, user_id: int) -> None:
+        user = self._users.pop(user_id, None)
+        if user:
+            for folder in user.folders:
+                self._user_ids_by_folder[folder].discard(user_id)
+
+    def _load_users(self, conn: Connection, user_ids: Optional[List[int]] = None) -> List[RecipientPrefs]:
+        if user_ids is None:
+            raw_data = conn.execute(self._users_sql.format(condition='')).fetchall()
+        else:
+            sql_text = sqlalchemy.text(self._users_sql.format(condition='WHERE user_id = ANY(:ids)'))
+            raw_data = conn.execute(sql_text, ids=user_ids).fetchall()
+
+        return [
+            RecipientPrefs(
+                user_id=line[0],
+                username_telegram=line[1],
+                role=line[2],
+                notif_pref_ids=frozenset(line[3]),
+                folders=tuple(line[4]),
+                topic_type_ids=frozenset(line[5]),
+                latitude=line[6],
+                longitude=line[7],
+            )
+            for line in raw_data
+        ]
+
+    def _full_reload(self, conn: Connection) -> None:
+        synced_till = conn.execute('SELECT now()::timestamp;').fetchone()[0]
+
+        self._users = {}
+        self._user_ids_by_folder = defaultdict(set)
+        self._recipients_by_key = {}
+        for user in self._load_users(conn):
+            self._add_user(user)
+
+        self._loaded_at = time.monotonic()
+        self._synced_till = synced_till
+        logging.info(f'recipients index: fully loaded, {len(self._users)} users')
+
+    def _reload_changed_users(self, conn: Connection) -> None:
+        sql_text = sqlalchemy.text("""
+            SELECT now()::timestamp, array(SELECT user_id FROM user_pref_changes WHERE changed_at >= :a)
+            /*action='get_users_with_changed_preferences' */;""")
+        changes_since = self._synced_till - datetime.timedelta(seconds=RECIPIENTS_INDEX_CHANGES_OVERLAP_SECONDS)
+        synced_till, changed_user_ids = conn.execute(sql_text, a=changes_since).fetchone()
+
+        if changed_user_ids:
+            for user_id in changed_user_ids:
+                self._remove_user(user_id)
+            for user in self._load_users(conn, changed_user_ids):
+                self._add_user(user)
+            self._recipients_by_key = {}
+            logging.info(f'recipients index: {len(changed_user_ids)} users reloaded')
+
+        self._synced_till = synced_till
+
+    def refresh(self, conn: Connection) -> None:
+        """bring the index up to date with the preferences in PSQL"""
+
+        if self._loaded_at is None or time.monotonic() - self._loaded_at > RECIPIENTS_INDEX_FULL_RELOAD_SECONDS:
+            self._full_reload(conn)
+        else:
+            self._reload_changed_users(conn)
+
+    def get_recipients(self, forum_folder: int, change_type: int, topic_type_id: int) -> List[RecipientPrefs]:
+        """all the users who want to get notifications on such change"""
+
+        key = (forum_folder, change_type, topic_type_id)
+        if key not in self._recipients_by_key:
+            users_in_folder = (self._users[x] for x in self._user_ids_by_folder.get(forum_folder, ()))
+            self._recipients_by_key[key] = [
+                x for x in users_in_folder if x.matches(forum_folder, change_type, topic_type_id)
+            ]
+
+        return self._recipients_by_key[key]
+
+
+@lru_cache
+def get_recipients_index() -> RecipientsIndex:
+    """recipients index is shared by all invocations in the instance"""
+    return RecipientsIndex()
+
+
 def compose_users_list_from_users(conn: Connection, new_record: LineInChangeLog) -> List:
-    """compose the Users list from the tables Users & User Coordinates: one Record = one user"""
+    """compose the Users list from the recipients index: one Record = one user"""
 
     list_of_users = []
 
@@ -975,98 +1150,47 @@ def compose_users_list_from_users(conn: Connection, new_record: LineInChangeLog)
         analytics_prefix = 'users list'
         analytics_start = datetime.datetime.now()
 
-        sql_text_psy = sqlalchemy.text("""
-                WITH
-                    user_list AS (
-                        SELECT user_id, username_telegram, role
-                        FROM users WHERE status IS NULL or status='unblocked'),
-                    user_notif_pref_prep AS (
-                        SELECT user_id, array_agg(pref_id) aS agg
-                        FROM user_preferences GROUP BY user_id),
-                    user_notif_type_pref AS (
-                        SELECT user_id, CASE WHEN 30 = ANY(agg) THEN True ELSE False END AS all_notifs
-                        FROM user_notif_pref_prep
-                        WHERE (30 = ANY(agg) OR :a = ANY(agg))
-                            AND NOT (4/*topic_inforg_comment_new*/ = ANY(agg)
-                                AND :a = 2/*topic_title_change*/)),/*AK20240409:issue13*/
-                    user_folders_prep AS (
-                        SELECT user_id, forum_folder_num,
-                            CASE WHEN count(forum_folder_num) OVER (PARTITION BY user_id) > 1
-                                THEN TRUE ELSE FALSE END as multi_folder
-                        FROM user_regional_preferences),
-                    user_folders AS (
-                        SELECT user_id, forum_folder_num, multi_folder
-                        FROM user_folders_prep WHERE forum_folder_num= :b),
-                    user_topic_pref_prep AS (
-                        SELECT user_id, array_agg(topic_type_id) aS agg
-                        FROM user_pref_topic_type GROUP BY user_id),
-                    user_topic_type_pref AS (
-                        SELECT user_id, agg AS all_types
-                        FROM user_topic_pref_prep
-                        WHERE 30 = ANY(agg) OR :c = ANY(agg)),
-                    user_short_list AS (
-                        SELECT ul.user_id, ul.username_telegram, ul.role , uf.multi_folder, up.all_notifs
-                        FROM user_list as ul
-                        LEFT JOIN user_notif_type_pref AS up
-                        ON ul.user_id=up.user_id
-                        LEFT JOIN user_folders AS uf
-                        ON ul.user_id=uf.user_id
-                        LEFT JOIN user_topic_type_pref AS ut
-                        ON ul.user_id=ut.user_id
-                        WHERE
-                            uf.forum_folder_num IS NOT NULL AND
-                            up.all_notifs IS NOT NULL AND
-                            ut.all_types IS NOT NULL),
-                    user_with_loc AS (
-                        SELECT u.user_id, u.username_telegram, uc.latitude, uc.longitude,
-                            u.role, u.multi_folder, u.all_notifs
-                        FROM user_short_list AS u
-                        LEFT JOIN user_coordinates as uc
-                        ON u.user_id=uc.user_id)
-
-                SELECT ns.user_id, ns.username_telegram, ns.latitude, ns.longitude, ns.role,
-                    st.num_of_new_search_notifs, ns.multi_folder, ns.all_notifs
-                FROM user_with_loc AS ns
-                LEFT JOIN user_stat st
-                ON ns.user_id=st.user_id
-                /*action='get_user_list_filtered_by_folder_and_notif_type' */;""")
-
-        users_short_version = conn.execute(
-            sql_text_psy, a=new_record.change_type, b=new_record.forum_folder, c=new_record.topic_type_id
-        ).fetchall()
-
-        analytics_sql_finish = datetime.datetime.now()
-        duration_sql = round((analytics_sql_finish - analytics_start).total_seconds(), 2)
-        logging.info(f'time: {analytics_prefix} sql – {duration_sql} sec')
-
-        if users_short_version:
-            logging.info(f'{users_short_version}')
-            users_short_version = list(users_short_version)
-
-        for line in users_short_version:
+        recipients = get_recipients_index().get_recipients(
+            new_record.forum_folder, new_record.change_type, new_record.topic_type_id
+        )
+
+        analytics_index_finish = datetime.datetime.now()
+        duration_index = round((analytics_index_finish - analytics_start).total_seconds(), 2)
+        logging.info(f'time: {analytics_prefix} index – {duration_index} sec')
+
+        num_of_new_search_notifs = {}
+        if recipients:
+            sql_text = sqlalchemy.text("""
+                SELECT user_id, num_of_new_search_notifs FROM user_stat WHERE user_id = ANY(:a)
+                /*action='get_user_stat_for_recipients' */;""")
+            raw_data = conn.execute(sql_text, a=[x.user_id for x in recipients]).fetchall()
+            num_of_new_search_notifs = {line[0]: line[1] for line in raw_data}
+
+        for recipient in recipients:
             new_line = User(
-                user_id=line[0],
-                username_telegram=line[1],
-                user_latitude=line[2],
-                user_longitude=line[3],
-                user_role=line[4],
-                user_in_multi_folders=line[6],
-                all_notifs=line[7],
+                user_id=recipient.user_id,
+                username_telegram=recipient.username_telegram,
+                user_latitude=recipient.latitude,
+                user_longitude=recipient.longitude,
+                user_role=recipient.role,
+                user_in_multi_folders=len(recipient.folders) > 1,
+                all_notifs=30 in recipient.notif_pref_ids,
             )
-            if line[5] == 'None' or line[5] is None:
+            user_stat = num_of_new_search_notifs.get(recipient.user_id)
+            if user_stat == 'None' or user_stat is None:
                 new_line.user_new_search_notifs = 0
             else:
-                new_line.user_new_search_notifs = int(line[5])
+                new_line.user_new_search_notifs = int(user_stat)
 
             list_of_users.append(new_line)
 
         analytics_match_finish = datetime.datetime.now()
-        duration_match = round((analytics_match_finish - analytics_sql_finish).total_seconds(), 2)
+        duration_match = round((analytics_match_finish - analytics_index_finish).total_seconds(), 2)
         logging.info(f'time: {analytics_prefix} match – {duration_match} sec')
         duration_full = round((analytics_match_finish - analytics_start).total_seconds(), 2)
         logging.info(f'time: {analytics_prefix} end-to-end – {duration_full} sec')
 
-        logging.info('User List composed')
+        logging.info(f'User List composed, {len(list_of_users)} users')
 
     except Exception as e:
         logging.error('Not able to compose Users List: ' + repr(e))
@@ -1079,22 +1203,21 @@ def enrich_users_list_with_age_periods(conn, list_of_users):
     """add the data on Lost people age notification preferences from user_pref_age into users List"""
 
     try:
-        notif_prefs = conn.execute("""SELECT user_id, period_min, period_max FROM user_pref_age;""").fetchall()
-
-        if not notif_prefs:
+        users_by_id = {user.user_id: user for user in list_of_users}
+        if not users_by_id:
             return list_of_users
 
-        number_of_enrichments_old = 0
-        number_of_enrichments = 0
-        for np_line in notif_prefs:
-            new_period = [np_line[1], np_line[2]]
+        sql_text = sqlalchemy.text("""SELECT user_id, period_min, period_max FROM user_pref_age
+                                   WHERE user_id = ANY(:a);""")
+        notif_prefs = conn.execute(sql_text, a=list(users_by_id)).fetchall()
 
-            for u_line in list_of_users:
-                if u_line.user_id == np_line[0]:
-                    u_line.age_periods.append(new_period)
-                    number_of_enrichments += 1
+        number_of_enrichments = 0
+        for user_id, period_min, period_max in notif_prefs:
+            user = users_by_id.get(user_id)
+            if user:
+                user.age_periods.append([period_min, period_max])
+                number_of_enrichments += 1
 
-        logging.info(f'Users List enriched with Age Prefs, OLD num of enrichments is {number_of_enrichments_old}')
         logging.info(f'Users List enriched with Age Prefs, num of enrichments is {number_of_enrichments}')
 
     except Exception as e:
@@ -1108,18 +1231,19 @@ def enrich_users_list_with_radius(conn, list_of_users):
     """add the data on distance notification preferences from user_pref_radius into users List"""
 
     try:
-        notif_prefs = conn.execute("""SELECT user_id, radius FROM user_pref_radius;""").fetchall()
+        users_by_id = {user.user_id: user for user in list_of_users}
+        if not users_by_id:
+            return list_of_users
 
-        if not notif_prefs:
-            return None
+        sql_text = sqlalchemy.text("""SELECT user_id, radius FROM user_pref_radius WHERE user_id = ANY(:a);""")
+        notif_prefs = conn.execute(sql_text, a=list(users_by_id)).fetchall()
 
         number_of_enrichments = 0
-        for np_line in notif_prefs:
-            for u_line in list_of_users:
-                if u_line.user_id == np_line[0]:
-                    u_line.radius = int(round(np_line[1], 0))
-                    number_of_enrichments += 1
-                    print(f'TEMP - RADIUS user_id = {u_line.user_id}, radius = {u_line.radius}')
+        for user_id, radius in notif_prefs:
+            user = users_by_id.get(user_id)
+            if user:
+                user.radius = int(round(radius, 0))
+                number_of_enrichments += 1
 
         logging.info(f'Users List enriched with Radius, num of enrichments is {number_of_enrichments}')
 
@@ -1182,49 +1306,46 @@ def record_notification_statistics(conn):
     return None
 
 
-def iterate_over_all_users(conn, admins_list, new_record, list_of_users, function_id) -> LineInChangeLog:
+def save_notifications_to_notif_by_user(conn: Connection, notifications: List[dict]) -> None:
+    """save to sql table notif_by_user all the new messages: one multi-row INSERT per batch"""
+
+    for i in range(0, len(notifications), NOTIF_BY_USER_INSERT_BATCH_SIZE):
+        batch = notifications[i : i + NOTIF_BY_USER_INSERT_BATCH_SIZE]
+        conn.execute(notif_by_user_table.insert().values(batch))
+        logging.info(f'saved {len(batch)} messages to notif_by_user')
+
+
+def iterate_over_all_users(conn, admins_list, new_record, list_of_users) -> LineInChangeLog:
     """initiates a full cycle for all messages composition for all the users"""
 
     def save_to_sql_notif_by_user(
-        mailing_id_,
         user_id_,
         message_,
         message_without_html_,
         message_type_,
         message_params_,
         message_group_id_,
-        change_log_id_,
     ):
-        """save to sql table notif_by_user the new message"""
-
-        # record into SQL table notif_by_user
-        sql_text_ = sqlalchemy.text("""
-                            INSERT INTO notif_by_user (
-                                mailing_id,
-                                user_id,
-                                message_content,
-                                message_text,
-                                message_type,
-                                message_params,
-                                message_group_id,
-                                change_log_id,
-                                created)
-                            VALUES (:a, :b, :c, :d, :e, :f, :g, :h, :i);
-                            """)
-
-        conn.execute(
-            sql_text_,
-            a=mailing_id_,
-            b=user_id_,
-            c=message_,
-            d=message_without_html_,
-            e=message_type_,
-            f=message_params_,
-            g=message_group_id_,
-            h=change_log_id_,
-            i=datetime.datetime.now(),
+        """add the new message to the buffer for sql table notif_by_user, flush the buffer if it's full"""
+
+        notifs_to_save.append(
+            {
+                'mailing_id': mailing_id,
+                'user_id': user_id_,
+                'message_content': message_,
+                'message_text': message_without_html_,
+                'message_type': message_type_,
+                'message_params': message_params_,
+                'message_group_id': message_group_id_,
+                'change_log_id': change_log_id,
+                'created': datetime.datetime.now(),
+            }
         )
 
+        if len(notifs_to_save) >= NOTIF_BY_USER_INSERT_BATCH_SIZE:
+            save_notifications_to_notif_by_user(conn, notifs_to_save)
+            notifs_to_save.clear()
+
         return None
 
     def get_from_sql_if_was_notified_already(user_id_, message_type_, change_log_id_):
@@ -1278,19 +1399,19 @@ def iterate_over_all_users(conn, admins_list, new_record, list_of_users, functio
 
         return users_who_were_composed
 
-    def get_the_new_group_id():
-        """define the max message_group_id in notif_by_user and add +1"""
+    def get_new_group_ids(number_of_ids: int) -> List[int]:
+        """take a block of new message_group_ids from the sequence, one per user.
+        ids from the sequence are never given twice, so parallel composers cannot get the same ones"""
 
-        raw_data_ = conn.execute("""SELECT MAX(message_group_id) FROM notif_by_user
-        /*action='get_the_new_group_id'*/
-        ;""").fetchone()
+        if not number_of_ids:
+            return []
 
-        if raw_data_[0]:
-            next_id = raw_data_[0] + 1
-        else:
-            next_id = 0
+        sql_text_ = sqlalchemy.text("""SELECT nextval('notif_by_user_message_group_id_seq') FROM generate_series(1, :n)
+        /*action='get_new_group_ids'*/
+        ;""")
+        raw_data_ = conn.execute(sql_text_, n=number_of_ids).fetchall()
 
-        return next_id
+        return [line[0] for line in raw_data_]
 
     def process_mailing_id(change_log_item):
         """TODO"""
@@ -1416,46 +1537,32 @@ def iterate_over_all_users(conn, admins_list, new_record, list_of_users, functio
             search_lon = record.search_longitude
             list_of_city_coords = None
             if record.city_locations and record.city_locations != 'None':
-                non_geolocated = [x for x in eval(record.city_locations) if isinstance(x, str)]
-                list_of_city_coords = eval(record.city_locations) if not non_geolocated else None
-
-            temp_user_list = []
+                city_locations = ast.literal_eval(record.city_locations)
+                non_geolocated = [x for x in city_locations if isinstance(x, str)]
+                list_of_city_coords = city_locations if not non_geolocated else None
 
             # CASE 3.1. When exact coordinates of Search Headquarters are indicated
             if search_lat and search_lon:
-                for user_line in users_list_outcome:
-                    if not (user_line.radius and user_line.user_latitude and user_line.user_longitude):
-                        temp_user_list.append(user_line)
-                        continue
-                    user_lat = user_line.user_latitude
-                    user_lon = user_line.user_longitude
-                    actual_distance, direction = define_dist_and_dir_to_search(
-                        search_lat, search_lon, user_lat, user_lon
-                    )
-                    actual_distance = int(actual_distance)
-                    if actual_distance <= user_line.radius:
-                        temp_user_list.append(user_line)
-
+                search_points = [[search_lat, search_lon]]
             # CASE 3.2. When exact coordinates of a Place are geolocated
             elif list_of_city_coords:
-                for user_line in users_list_outcome:
-                    if not (user_line.radius and user_line.user_latitude and user_line.user_longitude):
-                        temp_user_list.append(user_line)
-                        continue
-                    user_lat = user_line.user_latitude
-                    user_lon = user_line.user_longitude
-
-                    for city_coords in list_of_city_coords:
-                        search_lat, search_lon = city_coords
-                        actual_distance, direction = define_dist_and_dir_to_search(
-                            search_lat, search_lon, user_lat, user_lon
-                        )
-                        actual_distance = int(actual_distance)
-                        if actual_distance <= user_line.radius:
-                            temp_user_list.append(user_line)
-                            break
-
+                search_points = list_of_city_coords
             # CASE 3.3. No coordinates available
+            else:
+                search_points = None
+
+            users_with_radius = [x for x in users_list_outcome if x.radius and x.user_latitude and x.user_longitude]
+            if search_points and users_with_radius:
+                user_coords = [[x.user_latitude, x.user_longitude] for x in users_with_radius]
+                distances, _ = calc_distances_and_directions(search_points, user_coords)
+                # user is in if any of search points is within the radius
+                closest_distances = distances.min(axis=0).astype(int)
+                users_out_of_radius = {
+                    user.user_id
+                    for user, distance in zip(users_with_radius, closest_distances)
+                    if distance > user.radius
+                }
+                temp_user_list = [x for x in users_list_outcome if x.user_id not in users_out_of_radius]
             else:
                 temp_user_list = users_list_outcome
 
@@ -1526,6 +1633,7 @@ def iterate_over_all_users(conn, admins_list, new_record, list_of_users, functio
     number_of_situations_checked = 0
     number_of_messages_sent = 0
     cleaner = re.compile('<.*?>')
+    notifs_to_save = []
 
     try:
         # skip ignored lines which don't require a notification
@@ -1547,8 +1655,13 @@ def iterate_over_all_users(conn, admins_list, new_record, list_of_users, functio
 
         list_of_users = crop_user_list(list_of_users, users_who_should_not_be_informed, new_record)
 
-        message_for_pubsub = {'triggered_by_func_id': function_id, 'text': 'initiate notifs send out'}
-        publish_to_pubsub(Topics.topic_to_send_notifications, message_for_pubsub)
+        # distances & directions for all the users at once – for the new search messages
+        dist_and_dir_by_user = {}
+        if change_type == 0 and topic_type_id in {0, 1, 2, 3, 4, 5}:
+            dist_and_dir_by_user = define_dist_and_dir_for_users(s_lat, s_lon, list_of_users)
+
+        # messages followed by coordinates (sendMessage + sendLocation) have same group, one per user
+        group_ids = iter(get_new_group_ids(len(list_of_users)) if change_type in {0, 8} else [])
 
         for user in list_of_users:
             u_lat = user.user_latitude
@@ -1563,7 +1676,14 @@ def iterate_over_all_users(conn, admins_list, new_record, list_of_users, functio
 
                 if topic_type_id in {0, 1, 2, 3, 4, 5}:  # if it's a new search
                     message = compose_individual_message_on_new_search(
-                        new_record, s_lat, s_lon, u_lat, u_lon, region_to_show, num_of_msgs_sent_already
+                        new_record,
+                        s_lat,
+                        s_lon,
+                        u_lat,
+                        u_lon,
+                        region_to_show,
+                        num_of_msgs_sent_already,
+                        dist_and_dir_by_user.get(user.user_id),
                     )
                 else:  # new event
                     message = new_record.message[0]
@@ -1590,9 +1710,8 @@ def iterate_over_all_users(conn, admins_list, new_record, list_of_users, functio
                 message = compose_individual_message_on_first_post_change(new_record, region_to_show)
 
             # TODO: to delete msg_group at all ?
-            # messages followed by coordinates (sendMessage + sendLocation) have same group
-            msg_group_id = get_the_new_group_id() if change_type in {0, 8} else None
             # not None for new_search, field_trips_new, field_trips_change,  coord_change
+            msg_group_id = next(group_ids, None)
 
             # define if user received this message already
             this_user_was_notified = False
@@ -1619,23 +1738,9 @@ def iterate_over_all_users(conn, admins_list, new_record, list_of_users, functio
                     map_button = {'text': 'Смотреть на Карте Поисков', 'web_app': {'url': get_app_config().web_app_url}}
                     message_params['reply_markup'] = {'inline_keyboard': [[map_button]]}
 
-                # TODO: Debug only - to delete
-                print(
-                    f'what we are saving to SQL: {mailing_id}, {user.user_id}, {message_without_html}, '
-                    f'{message_params}, {msg_group_id}, {change_log_id}'
-                )
-                # TODO: Debug only - to delete
-
                 # record into SQL table notif_by_user
                 save_to_sql_notif_by_user(
-                    mailing_id,
-                    user.user_id,
-                    message,
-                    message_without_html,
-                    'text',
-                    message_params,
-                    msg_group_id,
-                    change_log_id,
+                    user.user_id, message, message_without_html, 'text', message_params, msg_group_id
                 )
 
                 # for user tips in "new search" notifs – to increase sent messages counter
@@ -1648,9 +1753,7 @@ def iterate_over_all_users(conn, admins_list, new_record, list_of_users, functio
                     message_params = {'latitude': s_lat, 'longitude': s_lon}
 
                     # record into SQL table notif_by_user (not text, but coords only)
-                    save_to_sql_notif_by_user(
-                        mailing_id, user.user_id, None, None, 'coords', message_params, msg_group_id, change_log_id
-                    )
+                    save_to_sql_notif_by_user(user.user_id, None, None, 'coords', message_params, msg_group_id)
                 if change_type == 8:
                     try:
                         list_of_coords = re.findall(r'<code>', message)
@@ -1663,14 +1766,7 @@ def iterate_over_all_users(conn, admins_list, new_record, list_of_users, functio
                                 new_lon = re.search(r'(?<=\D)[\d.]{2,12}$', both_coordinates).group()
                                 message_params = {'latitude': new_lat, 'longitude': new_lon}
                                 save_to_sql_notif_by_user(
-                                    mailing_id,
-                                    user.user_id,
-                                    None,
-                                    None,
-                                    'coords',
-                                    message_params,
-                                    msg_group_id,
-                                    change_log_id,
+                                    user.user_id, None, None, 'coords', message_params, msg_group_id
                                 )
                     except Exception as ee:
                         logging.info('exception happened')
@@ -1678,6 +1774,8 @@ def iterate_over_all_users(conn, admins_list, new_record, list_of_users, functio
 
                 number_of_messages_sent += 1
 
+        save_notifications_to_notif_by_user(conn, notifs_to_save)
+
         # mark this line as all-processed
         new_record.processed = 'yes'
         logging.info('Iterations over all Users and Updates are done')
@@ -1698,8 +1796,11 @@ def generate_yandex_maps_place_link2(lat, lon, param):
     return msg
 
 
-def compose_individual_message_on_new_search(new_record, s_lat, s_lon, u_lat, u_lon, region_to_show, num_of_sent):
-    """compose individual message for notification of every user on new search"""
+def compose_individual_message_on_new_search(
+    new_record, s_lat, s_lon, u_lat, u_lon, region_to_show, num_of_sent, dist_and_dir=None
+):
+    """compose individual message for notification of every user on new search.
+    dist_and_dir – distance & direction to search, if already calculated for all the users at once"""
 
     place_link = ''
     clickable_coords = ''
@@ -1719,10 +1820,17 @@ def compose_individual_message_on_new_search(new_record, s_lat, s_lon, u_lat, u_
     message += '\n' + new_record.message[0]
 
     # 3. Dist & Dir – individual part for every user
+    if s_lat and s_lon and u_lat and u_lon and not dist_and_dir:
+        try:
+            dist_and_dir = define_dist_and_dir_to_search(s_lat, s_lon, u_lat, u_lon)
+        except Exception as e:
+            logging.exception(e)
+
     if s_lat and s_lon and u_lat and u_lon:
         try:
-            dist, direct = define_dist_and_dir_to_search(s_lat, s_lon, u_lat, u_lon)
+            dist, direct = dist_and_dir
             dist = int(dist)
+            dist_and_dir = dist, direct
             direction = f'\n\nОт вас ~{dist} км {direct}'
 
             message += generate_yandex_maps_place_link2(s_lat, s_lon, direction)
@@ -1734,6 +1842,7 @@ def compose_individual_message_on_new_search(new_record, s_lat, s_lon, u_lat, u_
                 f'[{new_record}, {s_lat}, {s_lon}, {u_lat}, {u_lon}]'
             )
             logging.exception(e)
+            dist_and_dir = None
 
     if s_lat and s_lon and not u_lat and not u_lon:
         try:
@@ -1765,9 +1874,8 @@ def compose_individual_message_on_new_search(new_record, s_lat, s_lon, u_lat, u_
 
     if s_lat and s_lon:
         clickable_coords = f'<code>{coord_format.format(float(s_lat))}, {coord_format.format(float(s_lon))}</code>'
-        if u_lat and u_lon:
-            dist, direct = define_dist_and_dir_to_search(s_lat, s_lon, u_lat, u_lon)
-            dist = int(dist)
+        if u_lat and u_lon and dist_and_dir:
+            dist, direct = dist_and_dir
             place = f'От вас ~{dist} км {direct}'
         else:
             place = 'Карта'
@@ -1844,6 +1952,15 @@ def mark_new_record_as_processed(conn, new_record: LineInChangeLog):
     return None
 
 
+def mark_new_record_as_failed(conn, new_record: LineInChangeLog):
+    """mark the record which failed to be composed, so it is not claimed again and again"""
+
+    sql_text = sqlalchemy.text("""UPDATE change_log SET notification_sent = 'e' WHERE id=:a;""")
+    conn.execute(sql_text, a=new_record.change_id)
+    logging.info(f'The New Record {new_record.change_id} was marked as FAILED in PSQL')
+    notify_admin(f'compose_notifications failed to compose the change_log record {new_record.change_id}')
+
+
 def mark_new_comments_as_processed(conn, record):
     """mark in SQL table Comments all the comments that were processed at this step, basing on search_forum_id"""
 
@@ -1884,11 +2001,13 @@ FUNC_NAME = 'compose_notifications'
 
 
 def check_if_need_compose_more(conn, function_id: int):
-    """check if there are any notifications remained to be composed"""
+    """check if there are any notifications remained to be composed.
+    records being composed by a parallel function are locked and not counted"""
 
     check = conn.execute("""SELECT search_forum_num, changed_field, new_value, id, change_type FROM change_log
                             WHERE notification_sent is NULL
-                            OR notification_sent='s' LIMIT 1; """).fetchall()
+                            OR notification_sent='s' LIMIT 1
+                            FOR UPDATE SKIP LOCKED; """).fetchall()
     if check:
         logging.info('we checked – there is still something to compose: re-initiating [compose_notification]')
         message_for_pubsub = {'triggered_by_func_id': function_id, 'text': 're-run from same script'}
@@ -1912,6 +2031,48 @@ def delete_ended_search_following(conn: Connection, new_record: LineInChangeLog)
     return None
 
 
+def compose_notifications_for_record(conn: Connection, admins_list: list, new_record: LineInChangeLog) -> None:
+    """compose and save notifications on one change_log record for all the users"""
+
+    analytics_start = datetime.datetime.now()
+
+    delete_ended_search_following(conn, new_record)  # issue425
+    # enrich New Records List with all the updates that should be in notifications
+    new_record = enrich_new_record_from_searches(conn, new_record)
+    new_record = enrich_new_record_with_search_activities(conn, new_record)
+    new_record = enrich_new_record_with_managers(conn, new_record)
+    new_record = enrich_new_record_with_comments(conn, 'all', new_record)
+    new_record = enrich_new_record_with_comments(conn, 'inforg', new_record)
+    new_record = enrich_new_record_with_clickable_name(new_record)
+    new_record = enrich_new_record_with_emoji(new_record)
+    new_record = enrich_new_record_with_com_message_texts(new_record)
+
+    # compose Users List: all the notifications recipients' details
+    list_of_users = compose_users_list_from_users(conn, new_record)
+    list_of_users = enrich_users_list_with_age_periods(conn, list_of_users)
+    list_of_users = enrich_users_list_with_radius(conn, list_of_users)
+
+    analytics_match_finish = datetime.datetime.now()
+    duration_match = round((analytics_match_finish - analytics_start).total_seconds(), 2)
+    logging.info(f'time: record {new_record.change_id} match end-to-end – {duration_match} sec')
+
+    # check the matrix: new update - user and save the notifications
+    new_record = iterate_over_all_users(conn, admins_list, new_record, list_of_users)
+
+    analytics_iterations_finish = datetime.datetime.now()
+    duration_iterations = round((analytics_iterations_finish - analytics_match_finish).total_seconds(), 2)
+    logging.info(f'time: record {new_record.change_id} iterations end-to-end – {duration_iterations} sec')
+
+    # mark all the "new" lines in tables Change Log & Comments as "old"
+    mark_new_record_as_processed(conn, new_record)
+    mark_new_comments_as_processed(conn, new_record)
+
+    # final step – update statistics on how many users received notifications on new searches
+    record_notification_statistics(conn)
+
+    return None
+
+
 def main(event, context):  # noqa
     """key function which is initiated by Pub/Sub"""
 
@@ -1933,69 +2094,46 @@ def main(event, context):  # noqa
             INTERVAL_TO_CHECK_PARALLEL_FUNCTION_SECONDS,
         )
         if there_is_function_working_in_parallel:
-            logging.info('function execution stopped due to parallel run with another function')
-            check_and_save_event_id(
-                context,
-                'finish',
-                function_id,
-                None,
-                triggered_by_func_id,
-                FUNC_NAME,
-                INTERVAL_TO_CHECK_PARALLEL_FUNCTION_SECONDS,
-            )
-            logging.info('script finished')
-            conn.close()
-            pool.dispose()
-            return None
-
-        # compose New Records List: the delta from Change log
-        new_record = compose_new_records_from_change_log(conn)
-
-        # only if there are updates in Change Log
-        if new_record:
-            delete_ended_search_following(conn, new_record)  # issue425
-            # enrich New Records List with all the updates that should be in notifications
-            new_record = enrich_new_record_from_searches(conn, new_record)
-            new_record = enrich_new_record_with_search_activities(conn, new_record)
-            new_record = enrich_new_record_with_managers(conn, new_record)
-            new_record = enrich_new_record_with_comments(conn, 'all', new_record)
-            new_record = enrich_new_record_with_comments(conn, 'inforg', new_record)
-            new_record = enrich_new_record_with_clickable_name(new_record)
-            new_record = enrich_new_record_with_emoji(new_record)
-            new_record = enrich_new_record_with_com_message_texts(new_record)
-
-            # compose Users List: all the notifications recipients' details
-            admins_list, testers_list = get_list_of_admins_and_testers(conn)  # for debug purposes
-            list_of_users = compose_users_list_from_users(conn, new_record)
-            list_of_users = enrich_users_list_with_age_periods(conn, list_of_users)
-            list_of_users = enrich_users_list_with_radius(conn, list_of_users)
-
-            analytics_match_finish = datetime.datetime.now()
-            duration_match = round((analytics_match_finish - analytics_start_of_func).total_seconds(), 2)
-            logging.info(f'time: function match end-to-end – {duration_match} sec')
-
-            # check the matrix: new update - user and initiate sending notifications
-            new_record = iterate_over_all_users(conn, admins_list, new_record, list_of_users, function_id)
-
-            analytics_iterations_finish = datetime.datetime.now()
-            duration_iterations = round((analytics_iterations_finish - analytics_match_finish).total_seconds(), 2)
-            logging.info(f'time: function iterations end-to-end – {duration_iterations} sec')
-
-            # mark all the "new" lines in tables Change Log & Comments as "old"
-            mark_new_record_as_processed(conn, new_record)
-            mark_new_comments_as_processed(conn, new_record)
-
-            # final step – update statistics on how many users received notifications on new searches
-            record_notification_statistics(conn)
+            # change_log records are claimed with SKIP LOCKED, so parallel runs take different records
+            logging.info('another function is working in parallel, it will compose other records')
+
+        # compose New Records one by one: every record is claimed, composed and committed in its own transaction,
+        # so the sending can start right after the commit of the first one
+        new_records = []
+        admins_list = None
+        for _ in range(COMPOSE_BATCH_SIZE):
+            with conn.begin():
+                claimed_records = compose_new_records_from_change_log(conn)
+                if not claimed_records:
+                    break
+                new_record = claimed_records[0]
+
+                # admins and recipients are loaded once for all the records of the run
+                if admins_list is None:
+                    admins_list, testers_list = get_list_of_admins_and_testers(conn)  # for debug purposes
+                    get_recipients_index().refresh(conn)
+
+                # plain savepoint, not begin_nested(): errors of SQL statements are swallowed in several places
+                # of composing, and only ROLLBACK TO SAVEPOINT brings the aborted transaction back
+                conn.execute(sqlalchemy.text('SAVEPOINT compose_record;'))
+                try:
+                    compose_notifications_for_record(conn, admins_list, new_record)
+                    conn.execute(sqlalchemy.text('RELEASE SAVEPOINT compose_record;'))
+                except Exception as e:
+                    logging.info(f'Not able to compose notifications for the New Record {new_record.change_id}')
+                    logging.exception(e)
+                    conn.execute(sqlalchemy.text('ROLLBACK TO SAVEPOINT compose_record;'))
+                    mark_new_record_as_failed(conn, new_record)
+
+            new_records.append(new_record)
+            message_for_pubsub = {'triggered_by_func_id': function_id, 'text': 'initiate notifs send out'}
+            publish_to_pubsub(Topics.topic_to_send_notifications, message_for_pubsub)
+
+        analytics_iterations_finish = datetime.datetime.now()
 
         check_if_need_compose_more(conn, function_id)
 
-        list_of_change_log_ids = []
-        if new_record:
-            try:
-                list_of_change_log_ids = [new_record.change_id]
-            except Exception as e:  # noqa
-                logging.exception(e)
+        list_of_change_log_ids = [x.change_id for x in new_records]
         check_and_save_event_id(
             context,
             'finish',
@@ -2007,7 +2145,7 @@ def main(event, context):  # noqa
         )
 
         analytics_finish = datetime.datetime.now()
-        if new_record:
+        if new_records:
             duration_saving = round((analytics_finish - analytics_iterations_finish).total_seconds(), 2)
             logging.info(f'time: function data saving – {duration_saving} sec')
 
@@ -13,7 +13,7 @@ from typing import Any, Dict, Optional
 
 import requests
 from bs4 import BeautifulSoup
-from telegram import Bot, ReplyKeyboardMarkup
+from telegram import ReplyKeyboardMarkup
 from telegram.ext import Application, ContextTypes
 
 from _dependencies.commons import get_app_config, setup_google_logging, sql_connect_by_psycopg2
@@ -264,10 +264,6 @@ def main(event: Dict[str, bytes], context: str) -> None:
     message_in_ascii = data_in_ascii['message']
     tg_user_id, f_username = list(message_in_ascii)
 
-    # initiate Prod Bot
-    bot_token = get_app_config().bot_api_token__prod
-    bot = Bot(token=bot_token)  # noqa
-
     user = None
     if message_in_ascii:
         f_usr_id = get_user_id(f_username)
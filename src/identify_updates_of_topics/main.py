@@ -3,12 +3,16 @@ and saves into PSQL if there are any updates"""
 
 import ast
 import copy
+import hashlib
 import json
 import logging
 import re
 import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
-from datetime import datetime, timedelta, timezone
+from datetime import datetime, timezone
+from functools import lru_cache
 from typing import Any, List, Optional, Tuple, Union
 
 import requests
@@ -18,11 +22,15 @@ from geopy.geocoders import Nominatim
 from google.cloud import storage
 from google.cloud.storage.blob import Blob
 from psycopg2.extensions import connection
-from sqlalchemy.engine.base import Engine
+from requests.adapters import HTTPAdapter
+from sqlalchemy.engine.base import Connection, Engine
 from yandex_geocoder import Client, exceptions
 
 from _dependencies.commons import Topics, get_app_config, publish_to_pubsub, setup_google_logging, sqlalchemy_get_pool
-from _dependencies.misc import generate_random_function_id, make_api_call, notify_admin, process_pubsub_message_v3
+from _dependencies.misc import generate_random_function_id, notify_admin, process_pubsub_message_v3
+from _dependencies.parsing import cook_first_post_soup, cook_posts_soup
+from _dependencies.rate_limiter import TokenBucket
+from _dependencies.title_recognition import compose_recognition_response, recognize_titles
 
 setup_google_logging()
 
@@ -30,9 +38,71 @@ setup_google_logging()
 # Sessions – to reuse for reoccurring requests
 requests_session = None
 
+# all the pages are requested from the same forum host: not more than this number of requests at once
+FORUM_MAX_PARALLEL_REQUESTS = 4
+FORUM_REQUEST_TIMEOUT_SECONDS = 10
+
 # to be reused by different functions
 block_of_profile_rough_code = None
 
+# phpBB adds the session id to the links for the clients without cookies, it's not a change of the folder
+FORUM_SESSION_ID_PATTERN = re.compile(rb'(&amp;|&|\?)sid=[0-9a-f]{32}')
+# parts of the topic blocks, which change with every view or post, but are not parsed: views and the last post
+FORUMBG_VOLATILE_TAGS = (('dd', 'views'), ('dd', 'lastpost'), ('div', 'responsive-show'))
+
+# Nominatim usage policy: not more than 1 request per second from all the instances
+GEOCODER_CALLS_PER_SECOND = 1
+
+# topic types which are saved to searches, the rest of topics in folders are ignored
+RELEVANT_TOPIC_TYPES = {'search', 'search training', 'search reverse', 'search patrol', 'event'}
+
+# process-level tier of the geocoding cache, psql table geocoding is the second one.
+# address -> (status, latitude, longitude, geocoder), least recently used addresses are dropped first
+GEOCODING_MEMORY_CACHE_SIZE = 5000
+geocoding_memory_cache: OrderedDict[str, tuple] = OrderedDict()
+
+change_log_table = sqlalchemy.table(
+    'change_log',
+    sqlalchemy.column('id'),
+    sqlalchemy.column('parsed_time'),
+    sqlalchemy.column('search_forum_num'),
+    sqlalchemy.column('changed_field'),
+    sqlalchemy.column('new_value'),
+    sqlalchemy.column('parameters'),
+    sqlalchemy.column('change_type'),
+)
+
+comments_table = sqlalchemy.table(
+    'comments',
+    sqlalchemy.column('comment_url'),
+    sqlalchemy.column('comment_text'),
+    sqlalchemy.column('comment_author_nickname'),
+    sqlalchemy.column('comment_author_link'),
+    sqlalchemy.column('search_forum_num'),
+    sqlalchemy.column('comment_num'),
+    sqlalchemy.column('comment_global_num'),
+    sqlalchemy.column('notification_sent'),
+)
+
+searches_table = sqlalchemy.table(
+    'searches',
+    sqlalchemy.column('search_forum_num'),
+    sqlalchemy.column('parsed_time'),
+    sqlalchemy.column('forum_search_title'),
+    sqlalchemy.column('search_start_time'),
+    sqlalchemy.column('num_of_replies'),
+    sqlalchemy.column('age'),
+    sqlalchemy.column('family_name'),
+    sqlalchemy.column('forum_folder_id'),
+    sqlalchemy.column('topic_type'),
+    sqlalchemy.column('display_name'),
+    sqlalchemy.column('age_min'),
+    sqlalchemy.column('age_max'),
+    sqlalchemy.column('status'),
+    sqlalchemy.column('city_locations'),
+    sqlalchemy.column('topic_type_id'),
+)
+
 dict_status_words = {
     'жив': 'one',
     'жива': 'one',
@@ -74,6 +144,30 @@ class ChangeLogLine:
     change_type: Any = None
 
 
+@dataclass
+class ForumComment:
+    comment_url: str | None = None
+    search_num: Any = None
+    comment_num: Any = None
+    global_num: Any = None
+    author_nickname: str | None = None
+    author_link: Any = None
+    text: str | None = None
+    is_inforg: bool = False
+    ignore: bool = False
+
+
+@dataclass
+class FolderPageState:
+    """what was known about the folder page after it was processed last time"""
+
+    folder_id: int
+    etag: str | None = None
+    last_modified: str | None = None
+    forumbg_hash: str | None = None
+    snapshot: str | None = None
+
+
 @dataclass
 class SearchSummary:
     topic_type: Any = None
@@ -119,28 +213,6 @@ def set_cloud_storage(bucket_name: str, folder_num: int) -> Blob:
     return blob
 
 
-def write_snapshot_to_cloud_storage(bucket_to_write, what_to_write, folder_num):
-    """writes current search's snapshot to txt file in cloud storage"""
-
-    blob = set_cloud_storage(bucket_to_write, folder_num)
-    blob.upload_from_string(what_to_write)
-
-    return None
-
-
-def read_snapshot_from_cloud_storage(bucket_to_read, folder_num):
-    """reads previous search's snapshot from txt file in cloud storage"""
-
-    try:
-        blob = set_cloud_storage(bucket_to_read, folder_num)
-        contents_as_bytes = blob.download_as_string()
-        contents = str(contents_as_bytes, 'utf-8')
-    except:  # noqa
-        contents = None
-
-    return contents
-
-
 def read_yaml_from_cloud_storage(bucket_to_read, folder_num):
     """reads yaml in cloud storage"""
 
@@ -154,113 +226,121 @@ def read_yaml_from_cloud_storage(bucket_to_read, folder_num):
     return contents
 
 
-def save_last_api_call_time_to_psql(db: Engine, geocoder: str) -> bool:
-    """Used to track time of the last api call to geocoders. Saves the current timestamp in UTC in psql"""
+class GeocoderLease:
+    """Time slots for the calls to a geocoder, shared by all the instances through psql table geocode_last_api_call.
+    A batch of calls reserves its slots at once with one UPDATE, then the calls are spaced in-process by a token
+    bucket: no db round-trips per call"""
 
-    conn = None
-    try:
-        conn = db.connect()
-        stmt = sqlalchemy.text(
-            """UPDATE geocode_last_api_call SET timestamp=:a AT TIME ZONE 'UTC' WHERE geocoder=:b;"""
-        )
-        conn.execute(stmt, a=datetime.now(timezone.utc), b=geocoder)
-        conn.close()
+    def __init__(self, geocoder: str, calls_per_second: float):
+        self.geocoder = geocoder
+        self.calls_per_second = calls_per_second
+        self._bucket = TokenBucket(rate=calls_per_second, capacity=1)
+        self._first_call_at = 0.0
 
-        return True
+    def reserve(self, db: Engine, number_of_calls: int) -> None:
+        """take the next free slots for the batch of calls: timestamp in psql is moved to the last of them"""
 
-    except Exception as e:
-        logging.info(f'UNSUCCESSFUL saving last api call time to geocoder {geocoder}')
-        logging.exception(e)
-        notify_admin(f'UNSUCCESSFUL saving last api call time to geocoder {geocoder}')
-        if conn:
-            conn.close()
+        if not number_of_calls:
+            return None
 
-        return False
+        interval_seconds = 1 / self.calls_per_second
+        try:
+            with db.connect() as conn:
+                stmt = sqlalchemy.text(
+                    """UPDATE geocode_last_api_call
+                    SET timestamp = GREATEST(timestamp + :interval * interval '1 second', NOW())
+                        + :reserved * interval '1 second'
+                    WHERE geocoder=:geocoder
+                    RETURNING EXTRACT(EPOCH FROM timestamp - NOW())
+                    /*action='reserve_geocoder_slots' */;"""
+                )
+                reserved_till = conn.execute(
+                    stmt,
+                    interval=interval_seconds,
+                    reserved=(number_of_calls - 1) * interval_seconds,
+                    geocoder=self.geocoder,
+                ).fetchone()
 
+        except Exception as e:
+            logging.info(f'UNSUCCESSFUL reserving api calls to geocoder {self.geocoder}')
+            logging.exception(e)
+            notify_admin(f'UNSUCCESSFUL reserving api calls to geocoder {self.geocoder}')
+            reserved_till = None
 
-def get_last_api_call_time_from_psql(db: sqlalchemy.engine, geocoder: str):
-    """Used to track time of the last api call to geocoders. Gets the last timestamp in UTC saved in psql"""
+        if reserved_till:
+            seconds_to_first_call = float(reserved_till[0]) - (number_of_calls - 1) * interval_seconds
+            self._first_call_at = time.monotonic() + max(seconds_to_first_call, 0)
+            logging.info(f'{number_of_calls} calls to {self.geocoder} reserved, first in {seconds_to_first_call} sec')
 
-    conn = None
-    last_call = None
-    try:
-        conn = db.connect()
-        stmt = sqlalchemy.text("""SELECT timestamp FROM geocode_last_api_call WHERE geocoder=:a LIMIT 1;""")
-        last_call = conn.execute(stmt, a=geocoder).fetchone()
-        last_call = last_call[0]
-        conn.close()
+        return None
 
-    except Exception as e:
-        logging.info(f'UNSUCCESSFUL getting last api call time of geocoder {geocoder}')
-        logging.exception(e)
-        notify_admin(f'UNSUCCESSFUL getting last api call time of geocoder {geocoder}')
-        if conn:
-            conn.close()
+    def wait(self) -> None:
+        """block until the next call to the geocoder is allowed"""
 
-    return last_call
+        seconds_to_first_call = self._first_call_at - time.monotonic()
+        if seconds_to_first_call > 0:
+            time.sleep(seconds_to_first_call)
+        self._bucket.acquire()
 
 
-def rate_limit_for_api(db: Engine, geocoder: str) -> None:
-    """sleeps certain time if api calls are too frequent"""
+@lru_cache
+def get_geocoder_lease(geocoder: str) -> GeocoderLease:
+    """in-process limiter for the geocoder, survives between invocations served by the same instance"""
 
-    # check that next request won't be in less a SECOND from previous
-    prev_api_call_time = get_last_api_call_time_from_psql(db=db, geocoder=geocoder)
+    return GeocoderLease(geocoder, GEOCODER_CALLS_PER_SECOND)
 
-    if not prev_api_call_time:
-        return None
 
-    if geocoder == 'yandex':
-        return None
+def remember_geolocation(address: str, saved_result: tuple) -> None:
+    """save the result of geocoding (status, latitude, longitude, geocoder) to the process-level cache"""
 
-    now_utc = datetime.now(timezone.utc)
-    time_delta_bw_now_and_next_request = prev_api_call_time - now_utc + timedelta(seconds=1)
+    geocoding_memory_cache[address] = saved_result
+    geocoding_memory_cache.move_to_end(address)
+    while len(geocoding_memory_cache) > GEOCODING_MEMORY_CACHE_SIZE:
+        geocoding_memory_cache.popitem(last=False)
 
-    logging.info(f'{prev_api_call_time=}')
-    logging.info(f'{now_utc=}')
-    logging.info(f'{time_delta_bw_now_and_next_request=}')
 
-    if time_delta_bw_now_and_next_request.total_seconds() > 0:
-        time.sleep(time_delta_bw_now_and_next_request.total_seconds())
-        logging.info(f'rate limit for {geocoder}: sleep {time_delta_bw_now_and_next_request.total_seconds()}')
-        notify_admin(f'rate limit for {geocoder}: sleep {time_delta_bw_now_and_next_request.total_seconds()}')
+def get_coordinates(db: Engine, address: str) -> Tuple[None, None]:
+    """convert address string into a pair of coordinates"""
 
-    return None
+    return get_coordinates_many(db, [address])[address]
 
 
-def get_coordinates(db: Engine, address: str) -> Tuple[None, None]:
-    """convert address string into a pair of coordinates"""
+def get_coordinates_many(db: Engine, addresses: list) -> dict[str, tuple]:
+    """convert address strings into pairs of coordinates. Addresses geocoded earlier are taken from the memory
+    or from psql in one query, only the rest are geocoded by the rate-limited geocoders one by one"""
 
-    def get_geolocation_form_psql(db2, address_string: str):
+    def get_geolocations_from_psql(db2, address_strings: list) -> dict[str, tuple]:
         """get results of geocoding from psql"""
 
+        if not address_strings:
+            return {}
+
         with db2.connect() as conn:
             stmt = sqlalchemy.text(
-                """SELECT address, status, latitude, longitude, geocoder from geocoding WHERE address=:a
-                ORDER BY id DESC LIMIT 1; """
+                """SELECT DISTINCT ON (address) address, status, latitude, longitude, geocoder from geocoding
+                WHERE address = ANY(:a) ORDER BY address, id DESC; """
             )
-            saved_result = conn.execute(stmt, a=address_string).fetchone()
+            saved_results = conn.execute(stmt, a=address_strings).fetchall()
             conn.close()
 
-        logging.info(f'{address_string=}')
-        logging.info(f'{saved_result=}')
+        logging.info(f'geocoding found in psql for {len(saved_results)} of {len(address_strings)} addresses')
 
         # there is a psql record on this address - no geocoding activities are required
-        if saved_result:
+        geolocations = {}
+        for saved_result in saved_results:
             if saved_result[1] == 'ok':
-                latitude = saved_result[2]
-                longitude = saved_result[3]
-                geocoder = saved_result[4]
-                return 'ok', latitude, longitude, geocoder
-
+                geolocations[saved_result[0]] = ('ok', saved_result[2], saved_result[3], saved_result[4])
             elif saved_result[1] == 'fail':
-                return 'fail', None, None, None
+                geolocations[saved_result[0]] = ('fail', None, None, saved_result[4])
 
-        return None, None, None, None
+        return geolocations
 
     def save_geolocation_in_psql(db2: Engine, address_string: str, status: str, latitude, longitude, geocoder: str):
         """save results of geocoding to avoid multiple requests to openstreetmap service"""
         """the Geocoder HTTP API may not exceed 1000 per day"""
 
+        remember_geolocation(address_string, (status, latitude, longitude, geocoder))
+
         try:
             with db2.connect() as conn:
                 stmt = sqlalchemy.text(
@@ -335,50 +415,79 @@ def get_coordinates(db: Engine, address: str) -> Tuple[None, None]:
 
         return latitude, longitude
 
-    try:
-        # check if this address was already geolocated and saved to psql
-        saved_status, lat, lon, saved_geocoder = get_geolocation_form_psql(db, address)
+    def geocode_address(address_string: str, saved_status, saved_geocoder) -> tuple:
+        """geocode the address which is not in the cache, or which osm failed to geocode"""
+
+        lat, lon = None, None
+        try:
+            if not saved_status:
+                # when there's no saved record
+                osm_lease.wait()
+                lat, lon = get_coordinates_from_address_by_osm(address_string)
+
+                if lat and lon:
+                    saved_status = 'ok'
+                    save_geolocation_in_psql(db, address_string, saved_status, lat, lon, 'osm')
+                else:
+                    saved_status = 'fail'
+
+            if saved_status == 'fail' and (saved_geocoder == 'osm' or not saved_geocoder):
+                # then we need to geocode with yandex
+                lat, lon = get_coordinates_from_address_by_yandex(address_string)
+
+                if lat and lon:
+                    saved_status = 'ok'
+                else:
+                    saved_status = 'fail'
+                save_geolocation_in_psql(db, address_string, saved_status, lat, lon, 'yandex')
 
-        if lat and lon:
             return lat, lon
 
-        elif saved_status == 'fail' and saved_geocoder == 'yandex':
-            return None, None
-
-        elif not saved_status:
-            # when there's no saved record
-            rate_limit_for_api(db=db, geocoder='osm')
-            lat, lon = get_coordinates_from_address_by_osm(address)
-            api_call_time_saved = save_last_api_call_time_to_psql(db=db, geocoder='osm')
-            logging.info(f'{api_call_time_saved=}')
-
-            if lat and lon:
-                saved_status = 'ok'
-                save_geolocation_in_psql(db, address, saved_status, lat, lon, 'osm')
-            else:
-                saved_status = 'fail'
+        except Exception as e:
+            logging.info('TEMP - LOC - New getting coordinates from title failed')
+            logging.exception(e)
+            notify_admin('ERROR: major geocoding script failed')
 
-        if saved_status == 'fail' and (saved_geocoder == 'osm' or not saved_geocoder):
-            # then we need to geocode with yandex
-            rate_limit_for_api(db=db, geocoder='yandex')
-            lat, lon = get_coordinates_from_address_by_yandex(address)
-            api_call_time_saved = save_last_api_call_time_to_psql(db=db, geocoder='yandex')
-            logging.info(f'{api_call_time_saved=}')
+        return None, None
 
-            if lat and lon:
-                saved_status = 'ok'
-            else:
-                saved_status = 'fail'
-            save_geolocation_in_psql(db, address, saved_status, lat, lon, 'yandex')
+    unique_addresses = list(dict.fromkeys(addresses))
 
-        return lat, lon
+    # check if the addresses were already geolocated: first in memory, then in psql
+    saved_results = {}
+    for address in unique_addresses:
+        if address in geocoding_memory_cache:
+            geocoding_memory_cache.move_to_end(address)
+            saved_results[address] = geocoding_memory_cache[address]
 
+    try:
+        psql_results = get_geolocations_from_psql(db, [x for x in unique_addresses if x not in saved_results])
     except Exception as e:
-        logging.info('TEMP - LOC - New getting coordinates from title failed')
+        logging.info('TEMP - LOC - getting saved coordinates from psql failed')
         logging.exception(e)
-        notify_admin('ERROR: major geocoding script failed')
+        psql_results = {}
+    for address, saved_result in psql_results.items():
+        remember_geolocation(address, saved_result)
+        saved_results[address] = saved_result
 
-    return None, None
+    coordinates = {}
+    addresses_to_geocode = []
+    for address in unique_addresses:
+        saved_status, lat, lon, saved_geocoder = saved_results.get(address, (None, None, None, None))
+
+        if lat and lon:
+            coordinates[address] = (lat, lon)
+        elif saved_status == 'fail' and saved_geocoder == 'yandex':
+            coordinates[address] = (None, None)
+        else:
+            addresses_to_geocode.append((address, saved_status, saved_geocoder))
+
+    # the queue of misses is drained one by one at the rate allowed by osm, slots are reserved once for all of them
+    osm_lease = get_geocoder_lease('osm')
+    osm_lease.reserve(db, len([x for x in addresses_to_geocode if not x[1]]))
+    for address, saved_status, saved_geocoder in addresses_to_geocode:
+        coordinates[address] = geocode_address(address, saved_status, saved_geocoder)
+
+    return coordinates
 
 
 def parse_coordinates(db: connection, search_num) -> List[Union[int, str]]:
@@ -669,7 +778,7 @@ def parse_coordinates(db: connection, search_num) -> List[Union[int, str]]:
         if not visibility_check(r, search_num):
             return [lat, lon, coord_type]
 
-        soup = BeautifulSoup(r.content, features='html.parser')
+        soup = cook_first_post_soup(r.content)
 
         # parse title
         title_code = soup.find('h2', {'class': 'topic-title'})
@@ -1091,6 +1200,119 @@ def profile_get_managers(text_of_managers: str) -> list[str]:
     return managers
 
 
+def make_requests_session() -> requests.Session:
+    """session with keep-alive connections to the forum, enough for all the parallel requests"""
+
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=FORUM_MAX_PARALLEL_REQUESTS)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+
+    return session
+
+
+def get_folder_url(folder_id) -> str:
+    return f'https://lizaalert.org/forum/viewforum.php?f={folder_id}'
+
+
+def get_comment_url(search_num, comment_num) -> str:
+    return f'https://lizaalert.org/forum/viewtopic.php?&t={search_num}&start={comment_num}'
+
+
+def fetch_forum_pages(urls: list, headers: dict[str, dict] | None = None) -> dict[str, requests.Response | None]:
+    """download several forum pages in parallel through the shared session, headers are optional per url.
+    pages which were not downloaded are None: they are requested again by the parsing functions"""
+
+    global requests_session
+
+    headers = headers or {}
+
+    def fetch_one_page(url: str) -> requests.Response | None:
+        try:
+            return requests_session.get(url, headers=headers.get(url), timeout=FORUM_REQUEST_TIMEOUT_SECONDS)  # noqa
+        except Exception as e:
+            logging.info(f'not able to download page {url}')
+            logging.exception(e)
+            return None
+
+    if not urls:
+        return {}
+
+    with ThreadPoolExecutor(max_workers=FORUM_MAX_PARALLEL_REQUESTS) as executor:
+        pages = list(executor.map(fetch_one_page, urls))
+
+    return dict(zip(urls, pages))
+
+
+def get_conditional_headers(folder_state: FolderPageState | None) -> dict:
+    """headers to get 304 Not Modified instead of the page, if the forum supports it"""
+
+    headers = {}
+    if folder_state and folder_state.etag:
+        headers['If-None-Match'] = folder_state.etag
+    if folder_state and folder_state.last_modified:
+        headers['If-Modified-Since'] = folder_state.last_modified
+
+    return headers
+
+
+def get_forumbg_hash(page_content: bytes) -> str | None:
+    """hash of the raw block with the list of topics without its volatile parts,
+    None if there is no such block on the page"""
+
+    try:
+        soup = BeautifulSoup(page_content, features='lxml', parse_only=SoupStrainer('div', {'class': 'forumbg'}))
+        for tag_name, class_name in FORUMBG_VOLATILE_TAGS:
+            for tag in soup.find_all(tag_name, class_name):
+                tag.decompose()
+        forumbg_blocks = soup.encode()
+        if not forumbg_blocks:
+            return None
+
+        return hashlib.sha256(FORUM_SESSION_ID_PATTERN.sub(b'', forumbg_blocks)).hexdigest()
+
+    except Exception as e:
+        # the page is parsed fully then
+        logging.exception(e)
+        return None
+
+
+def get_folder_page_states(db: Engine, folder_ids: list) -> dict[int, FolderPageState]:
+    """states of the folder pages after the previous processing, one query for all the folders"""
+
+    with db.connect() as conn:
+        stmt = sqlalchemy.text(
+            """SELECT folder_id, etag, last_modified, forumbg_hash, snapshot FROM forum_folder_page_state
+            WHERE folder_id = ANY(:a) /*action='get_folder_page_states' */;"""
+        )
+        rows = conn.execute(stmt, a=list(folder_ids)).fetchall()
+
+    return {row[0]: FolderPageState(*row) for row in rows}
+
+
+def save_folder_page_state(db: Engine, folder_state: FolderPageState) -> None:
+    """save the state of the folder page, to skip the folder next time if the page is the same"""
+
+    with db.connect() as conn:
+        stmt = sqlalchemy.text(
+            """INSERT INTO forum_folder_page_state (folder_id, etag, last_modified, forumbg_hash, snapshot, updated)
+            VALUES (:a, :b, :c, :d, :e, NOW())
+            ON CONFLICT (folder_id) DO UPDATE SET etag=EXCLUDED.etag, last_modified=EXCLUDED.last_modified,
+            forumbg_hash=EXCLUDED.forumbg_hash, snapshot=EXCLUDED.snapshot, updated=EXCLUDED.updated
+            /*action='save_folder_page_state' */;"""
+        )
+        conn.execute(
+            stmt,
+            a=folder_state.folder_id,
+            b=folder_state.etag,
+            c=folder_state.last_modified,
+            d=folder_state.forumbg_hash,
+            e=folder_state.snapshot,
+        )
+
+    return None
+
+
 def parse_search_profile(search_num) -> str | None:
     """get search activities list"""
 
@@ -1105,7 +1327,7 @@ def parse_search_profile(search_num) -> str | None:
         if not visibility_check(r, search_num):
             return None
 
-        soup = BeautifulSoup(r.content, features='html.parser')
+        soup = cook_first_post_soup(r.content)
 
     except Exception as e:
         logging.info(f'DBG.P.50.EXC: unable to parse a specific Topic with address: {url_to_topic} error:')
@@ -1137,8 +1359,42 @@ def parse_search_profile(search_num) -> str | None:
     return left_text
 
 
-def parse_one_folder(db: Engine, folder_id) -> Tuple[List, List[SearchSummary]]:
-    """parse forum folder with searches' summaries"""
+def get_search_title(data_block) -> str:
+    """title of the topic from its block in the folder page"""
+
+    search_title_block = data_block.find('a', 'topictitle')
+    # rare case: cleaning [size][b]...[/b][/size] tags
+    return re.sub(r'\[/?(b|size.{0,6}|color.{0,10})]', '', search_title_block.next_element)
+
+
+def recognize_titles_of_folder(db: Engine, titles: list) -> dict[str, dict]:
+    """recognize the titles in-process instead of calling title_recognize for every title,
+    unchanged titles are taken from the recognition cache"""
+
+    reco_titles = recognize_titles(db, titles)
+
+    return {title: compose_recognition_response(title, reco_title) for title, reco_title in zip(titles, reco_titles)}
+
+
+def get_addresses_to_geocode(title_reco_responses) -> list[str]:
+    """addresses of all the locations of the recognized searches and events"""
+
+    addresses = []
+    for title_reco_response in title_reco_responses:
+        if not title_reco_response or title_reco_response.get('status') != 'ok':
+            continue
+        title_reco_dict = title_reco_response['recognition']
+        if title_reco_dict.get('topic_type') not in RELEVANT_TOPIC_TYPES:
+            continue
+        addresses += [x['address'] for x in title_reco_dict.get('locations', [])]
+
+    return addresses
+
+
+def parse_one_folder(
+    db: Engine, folder_id, folder_page: requests.Response | None = None
+) -> Tuple[List, List[SearchSummary]]:
+    """parse forum folder with searches' summaries, folder_page is the page if it was already downloaded"""
 
     global requests_session
 
@@ -1150,9 +1406,12 @@ def parse_one_folder(db: Engine, folder_id) -> Tuple[List, List[SearchSummary]]:
     titles_and_num_of_replies = []
     folder_summary: list[SearchSummary] = []
     current_datetime = datetime.now()
-    url = f'https://lizaalert.org/forum/viewforum.php?f={folder_id}'
+    url = get_folder_url(folder_id)
     try:
-        r = requests_session.get(url, timeout=10)  # for every folder - req'd daily at night forum update # noqa
+        r = folder_page
+        if r is None:
+            # for every folder - req'd daily at night forum update
+            r = requests_session.get(url, timeout=FORUM_REQUEST_TIMEOUT_SECONDS)  # noqa
 
         only_tag = SoupStrainer('div', {'class': 'forumbg'})
         soup = BeautifulSoup(r.content, features='lxml', parse_only=only_tag)
@@ -1160,26 +1419,27 @@ def parse_one_folder(db: Engine, folder_id) -> Tuple[List, List[SearchSummary]]:
         search_code_blocks = soup.find_all('dl', 'row-item')
         del soup  # trying to free up memory
 
-        for i, data_block in enumerate(search_code_blocks):
-            # First block is always not one we want
-            if i == 0:
-                continue
+        # First block is always not one we want
+        # In rare cases there are aliases from other folders, which have static titles – and we're avoiding them
+        topic_blocks = [x for x in search_code_blocks[1:] if str(x).find('<dl class="row-item topic_moved">') == -1]
+
+        # all the titles of the folder are recognized at once
+        title_reco_responses = recognize_titles_of_folder(db, [get_search_title(x) for x in topic_blocks])
 
-            # In rare cases there are aliases from other folders, which have static titles – and we're avoiding them
-            if str(data_block).find('<dl class="row-item topic_moved">') > -1:
-                continue
+        # all the locations of the folder are geocoded at once
+        coordinates_by_address = get_coordinates_many(db, get_addresses_to_geocode(title_reco_responses.values()))
 
+        for data_block in topic_blocks:
             # Current block which contains everything regarding certain search
             search_title_block = data_block.find('a', 'topictitle')
-            # rare case: cleaning [size][b]...[/b][/size] tags
-            search_title = re.sub(r'\[/?(b|size.{0,6}|color.{0,10})]', '', search_title_block.next_element)
+            search_title = get_search_title(data_block)
             search_id = int(re.search(r'(?<=&t=)\d{2,8}', search_title_block['href']).group())
             search_replies_num = int(data_block.find('dd', 'posts').next_element)
             start_datetime = define_start_time_of_search(data_block)
 
             data = {'title': search_title}
             try:
-                title_reco_response = make_api_call('title_recognize', data)  # TODO can use local call in tests
+                title_reco_response = title_reco_responses.get(search_title)
 
                 if (
                     title_reco_response
@@ -1193,13 +1453,7 @@ def parse_one_folder(db: Engine, folder_id) -> Tuple[List, List[SearchSummary]]:
                 logging.info(f'{title_reco_dict=}')
 
                 # NEW exclude non-relevant searches
-                if title_reco_dict['topic_type'] in {
-                    'search',
-                    'search training',
-                    'search reverse',
-                    'search patrol',
-                    'event',
-                }:
+                if title_reco_dict['topic_type'] in RELEVANT_TOPIC_TYPES:
                     # FIXME – 06.11.2023 – work to delete function "define_family_name_from_search_title_new"
                     if title_reco_dict['topic_type'] == 'event':
                         person_fam_name = None
@@ -1243,7 +1497,7 @@ def parse_one_folder(db: Engine, folder_id) -> Tuple[List, List[SearchSummary]]:
                         list_of_location_cities = [x['address'] for x in title_reco_dict['locations']]
                         list_of_location_coords = []
                         for location_city in list_of_location_cities:
-                            city_lat, city_lon = get_coordinates(db, location_city)
+                            city_lat, city_lon = coordinates_by_address.get(location_city, (None, None))
                             if city_lat and city_lon:
                                 list_of_location_coords.append([city_lat, city_lon])
                         search_summary_object.locations = list_of_location_coords
@@ -1309,119 +1563,255 @@ def visibility_check(r, topic_id) -> bool:
     return True
 
 
-def parse_one_comment(db: Engine, search_num, comment_num) -> bool:
-    """parse all details on a specific comment in topic (by sequence number)"""
-
-    global requests_session
+def parse_comment_block(post_block, search_num, comment_num) -> ForumComment:
+    """parse all details of one comment (div.post) of the topic"""
 
-    comment_url = f'https://lizaalert.org/forum/viewtopic.php?&t={search_num}&start={comment_num}'
-    there_are_inforg_comments = False
+    comment = ForumComment(
+        comment_url=get_comment_url(search_num, comment_num), search_num=search_num, comment_num=comment_num
+    )
 
+    # finding USERNAME
+    comment_author_block = post_block.find('a', 'username')
+    if not comment_author_block:
+        comment_author_block = post_block.find('a', 'username-coloured')
     try:
-        r = requests_session.get(comment_url)  # noqa
+        comment.author_nickname = comment_author_block.text
+    except Exception as e:
+        logging.info(f'exception for search={search_num} and comment={comment_num}')
+        logging.exception(e)
+        comment.author_nickname = 'unidentified_username'
 
-        if not visibility_check(r, search_num):
-            return False
+    if comment.author_nickname[:6].lower() == 'инфорг' and comment.author_nickname != 'Инфорг кинологов':
+        comment.is_inforg = True
 
-        soup = BeautifulSoup(r.content, features='lxml')
-        search_code_blocks = soup.find('div', 'post')
+    # finding LINK to user profile
+    try:
+        comment.author_link = int(''.join(filter(str.isdigit, comment_author_block['href'][36:43])))
 
-        # finding USERNAME
-        comment_author_block = search_code_blocks.find('a', 'username')
-        if not comment_author_block:
-            comment_author_block = search_code_blocks.find('a', 'username-coloured')
+    except Exception as e:
+        logging.info(
+            'Here is an exception 9 for search '
+            + str(search_num)
+            + ', and comment '
+            + str(comment_num)
+            + ' error: '
+            + repr(e)
+        )
         try:
-            comment_author_nickname = comment_author_block.text
-        except Exception as e:
-            logging.info(f'exception for search={search_num} and comment={comment_num}')
-            logging.exception(e)
-            comment_author_nickname = 'unidentified_username'
+            comment.author_link = int(
+                ''.join(filter(str.isdigit, post_block.find('a', 'username-coloured')['href'][36:43]))
+            )
+        except Exception as e2:
+            logging.info('Here is an exception 10' + repr(e2))
+            comment.author_link = 'unidentified_link'
 
-        if comment_author_nickname[:6].lower() == 'инфорг' and comment_author_nickname != 'Инфорг кинологов':
-            there_are_inforg_comments = True
+    # finding the global comment id
+    comment.global_num = int(post_block.find('p', 'author').findNext('a')['href'][-6:])
 
-        # finding LINK to user profile
-        try:
-            comment_author_link = int(''.join(filter(str.isdigit, comment_author_block['href'][36:43])))
+    # finding TEXT of the comment
+    comment_text_0 = post_block.find('div', 'content')
+    try:
+        # external_span = comment_text_0.blockquote.extract()
+        comment_text_1 = comment_text_0.text
+    except Exception as e:
+        logging.info(f'exception for search={search_num} and comment={comment_num}')
+        logging.exception(e)
+        comment_text_1 = comment_text_0.text
+    comment.text = ' '.join(comment_text_1.split())
 
-        except Exception as e:
-            logging.info(
-                'Here is an exception 9 for search '
-                + str(search_num)
-                + ', and comment '
-                + str(comment_num)
-                + ' error: '
-                + repr(e)
-            )
+    # Define exclusions (comments of Inforg with "резерв" and "рассылка билайн"
+    if comment.is_inforg:
+        if comment.text.lower()[0:6] == 'резерв' or comment.text.lower()[0:15] == 'рассылка билайн':
+            comment.ignore = True
+
+    return comment
+
+
+def parse_comments_page(r: requests.Response, search_num, first_comment_num) -> list[ForumComment]:
+    """parse all the comments on the page of the topic, the first of them has the number first_comment_num"""
+
+    if not visibility_check(r, search_num):
+        return []
+
+    soup = cook_posts_soup(r.content)
+    post_blocks = soup.find_all('div', 'post')
+    del soup  # trying to free up memory
+
+    return [
+        parse_comment_block(post_block, search_num, first_comment_num + i) for i, post_block in enumerate(post_blocks)
+    ]
+
+
+def save_comments(conn: Connection, comments: list[ForumComment]) -> None:
+    """save all the comments at once, comments without text are skipped"""
+
+    comments_rows = []
+    for comment in comments:
+        if not comment.text:
+            continue
+        comments_rows.append(
+            {
+                'comment_url': comment.comment_url,
+                'comment_text': comment.text,
+                'comment_author_nickname': comment.author_nickname,
+                'comment_author_link': comment.author_link,
+                'search_forum_num': comment.search_num,
+                'comment_num': comment.comment_num,
+                # ignored comments of inforg are saved as already sent
+                'comment_global_num': None if comment.ignore else comment.global_num,
+                'notification_sent': 'n' if comment.ignore else None,
+            }
+        )
+
+    if comments_rows:
+        conn.execute(comments_table.insert().values(comments_rows))
+
+    return None
+
+
+def ingest_new_comments(conn: Connection, new_comments: dict[int, tuple[int, int]]) -> set[int]:
+    """download, parse and save all the new comments of the topics, returns the topics with comments of inforg.
+    new_comments is topic_id -> (number of the first new comment, number of the last one).
+    one page of the topic contains several comments: every page is downloaded once, pages of different topics
+    are downloaded in parallel"""
+
+    global requests_session
+
+    next_comment_num = {topic_id: first_and_last[0] for topic_id, first_and_last in new_comments.items()}
+    comments: list[ForumComment] = []
+
+    while next_comment_num:
+        comment_pages = fetch_forum_pages([get_comment_url(x, next_comment_num[x]) for x in next_comment_num])
+
+        for topic_id, comment_num in list(next_comment_num.items()):
+            page_comments = []
             try:
-                comment_author_link = int(
-                    ''.join(filter(str.isdigit, search_code_blocks.find('a', 'username-coloured')['href'][36:43]))
-                )
-            except Exception as e2:
-                logging.info('Here is an exception 10' + repr(e2))
-                comment_author_link = 'unidentified_link'
+                comment_page = comment_pages.get(get_comment_url(topic_id, comment_num))
+                if comment_page is None:
+                    comment_page = requests_session.get(get_comment_url(topic_id, comment_num))  # noqa
+                page_comments = parse_comments_page(comment_page, topic_id, comment_num)
+            except Exception as e:
+                logging.info(f'not able to parse comments of search={topic_id} from comment={comment_num}')
+                logging.exception(e)
 
-        # finding the global comment id
-        comment_forum_global_id = int(search_code_blocks.find('p', 'author').findNext('a')['href'][-6:])
+            last_comment_num = new_comments[topic_id][1]
+            comments += [x for x in page_comments if x.comment_num <= last_comment_num]
 
-        # finding TEXT of the comment
-        comment_text_0 = search_code_blocks.find('div', 'content')
-        try:
-            # external_span = comment_text_0.blockquote.extract()
-            comment_text_1 = comment_text_0.text
-        except Exception as e:
-            logging.info(f'exception for search={search_num} and comment={comment_num}')
-            logging.exception(e)
-            comment_text_1 = comment_text_0.text
-        comment_text = ' '.join(comment_text_1.split())
+            if page_comments and comment_num + len(page_comments) <= last_comment_num:
+                next_comment_num[topic_id] = comment_num + len(page_comments)
+            else:
+                del next_comment_num[topic_id]
 
-        # Define exclusions (comments of Inforg with "резерв" and "рассылка билайн"
-        ignore = False
-        if there_are_inforg_comments:
-            if comment_text.lower()[0:6] == 'резерв' or comment_text.lower()[0:15] == 'рассылка билайн':
-                ignore = True
+    save_comments(conn, comments)
 
-        with db.connect() as conn:
-            if comment_text:
-                if not ignore:
-                    stmt = sqlalchemy.text(
-                        """INSERT INTO comments (comment_url, comment_text, comment_author_nickname,
-                        comment_author_link, search_forum_num, comment_num, comment_global_num)
-                        VALUES (:a, :b, :c, :d, :e, :f, :g); """
-                    )
-                    conn.execute(
-                        stmt,
-                        a=comment_url,
-                        b=comment_text,
-                        c=comment_author_nickname,
-                        d=comment_author_link,
-                        e=search_num,
-                        f=comment_num,
-                        g=comment_forum_global_id,
-                    )
-                else:
-                    stmt = sqlalchemy.text(
-                        """INSERT INTO comments (comment_url, comment_text, comment_author_nickname,
-                        comment_author_link, search_forum_num, comment_num, notification_sent)
-                        VALUES (:a, :b, :c, :d, :e, :f, :g); """
-                    )
-                    conn.execute(
-                        stmt,
-                        a=comment_url,
-                        b=comment_text,
-                        c=comment_author_nickname,
-                        d=comment_author_link,
-                        e=search_num,
-                        f=comment_num,
-                        g='n',
-                    )
+    return {x.search_num for x in comments if x.is_inforg}
 
-            conn.close()
+
+def parse_one_comment(db: Engine, search_num, comment_num, comment_page: requests.Response | None = None) -> bool:
+    """parse all details on a specific comment in topic (by sequence number),
+    comment_page is the page if it was already downloaded"""
+
+    global requests_session
+
+    comment_url = get_comment_url(search_num, comment_num)
+
+    try:
+        r = comment_page
+        if r is None:
+            r = requests_session.get(comment_url)  # noqa
+
+        comments = parse_comments_page(r, search_num, comment_num)[:1]
+        with db.connect() as conn:
+            save_comments(conn, comments)
 
     except ConnectionResetError:
         logging.info('There is a connection error')
+        return False
+
+    return any(x.is_inforg for x in comments)
 
-    return there_are_inforg_comments
+
+def get_searches_by_topic_ids(conn: Connection, topic_ids: list) -> dict[int, SearchSummary]:
+    """lines of table searches for the given topics, indexed by topic_id"""
+
+    if not topic_ids:
+        return {}
+
+    sql_text = sqlalchemy.text(
+        """SELECT search_forum_num, parsed_time, status, forum_search_title, search_start_time,
+        num_of_replies, family_name, age, id, forum_folder_id,
+        topic_type, display_name, age_min, age_max, status, city_locations, topic_type_id FROM searches
+        WHERE search_forum_num = ANY(:a);"""
+    )
+    searches_by_topic_id = {}
+    for searches_line in conn.execute(sql_text, a=list(topic_ids)).fetchall():
+        search = SearchSummary()
+        (
+            search.topic_id,
+            search.parsed_time,
+            search.status,
+            search.title,
+            search.start_time,
+            search.num_of_replies,
+            search.name,
+            search.age,
+            search.searches_table_id,
+            search.folder_id,
+            search.topic_type,
+            search.display_name,
+            search.age_min,
+            search.age_max,
+            search.new_status,
+            search.locations,
+            search.topic_type_id,
+        ) = list(searches_line)
+        searches_by_topic_id[search.topic_id] = search
+
+    return searches_by_topic_id
+
+
+def get_searches_row(line: SearchSummary) -> dict:
+    """values of the line of table searches for the search from the snapshot"""
+
+    return {
+        'search_forum_num': line.topic_id,
+        'parsed_time': line.parsed_time,
+        'forum_search_title': line.title,
+        'search_start_time': line.start_time,
+        'num_of_replies': line.num_of_replies,
+        'age': line.age,
+        'family_name': line.name,
+        'forum_folder_id': line.folder_id,
+        'topic_type': line.topic_type,
+        'display_name': line.display_name,
+        'age_min': line.age_min,
+        'age_max': line.age_max,
+        'status': line.new_status,
+        'city_locations': str(line.locations),
+        'topic_type_id': line.topic_type_id,
+    }
+
+
+def save_change_log_lines(conn: Connection, change_log_lines: list) -> list[int]:
+    """save the lines to change_log with one multi-row INSERT, returns their ids"""
+
+    if not change_log_lines:
+        return []
+
+    values = [
+        {
+            'parsed_time': line.parsed_time,
+            'search_forum_num': line.topic_id,
+            'changed_field': line.changed_field,
+            'new_value': line.new_value,
+            'parameters': line.parameters,
+            'change_type': line.change_type,
+        }
+        for line in change_log_lines
+    ]
+    raw_data = conn.execute(change_log_table.insert().values(values).returning(change_log_table.c.id)).fetchall()
+
+    return [line[0] for line in raw_data]
 
 
 def update_change_log_and_searches(db: Engine, folder_num) -> List:
@@ -1466,137 +1856,88 @@ def update_change_log_and_searches(db: Engine, folder_num) -> List:
 
             curr_snapshot_list.append(snapshot_line)
 
-        # TODO - in future: should the number of searches be limited? Probably to JOIN change_log and WHERE folder=...
-        searches_full_list = conn.execute(
-            """SELECT search_forum_num, parsed_time, status, forum_search_title, search_start_time,
-            num_of_replies, family_name, age, id, forum_folder_id,
-            topic_type, display_name, age_min, age_max, status, city_locations, topic_type_id FROM searches;"""
-        ).fetchall()
-        prev_searches_list = []
-        for searches_line in searches_full_list:
-            search = SearchSummary()
-            (
-                search.topic_id,
-                search.parsed_time,
-                search.status,
-                search.title,
-                search.start_time,
-                search.num_of_replies,
-                search.name,
-                search.age,
-                search.searches_table_id,
-                search.folder_id,
-                search.topic_type,
-                search.display_name,
-                search.age_min,
-                search.age_max,
-                search.new_status,
-                search.locations,
-                search.topic_type_id,
-            ) = list(searches_line)
-            prev_searches_list.append(search)
-
-        # FIXME – temp – just to check how many lines
-        print(f'TEMP – len of prev_searches_list = {len(prev_searches_list)}')
-        if len(prev_searches_list) > 5000:
-            logging.info('TEMP - you use too big table Searches, it should be optimized')
-        # FIXME ^^^
+        # only the searches of the topics in the snapshot, even if they were in another folder before
+        prev_searches_by_topic_id = get_searches_by_topic_ids(conn, [x.topic_id for x in curr_snapshot_list])
+
+        # one pass over the snapshot: which topics are new and which were changed
+        new_topics_from_snapshot_list: list[SearchSummary] = []
+        changed_topics_list: list[tuple[SearchSummary, SearchSummary]] = []
+        for snapshot_line in curr_snapshot_list:
+            searches_line = prev_searches_by_topic_id.get(snapshot_line.topic_id)
+            if not searches_line:
+                new_topics_from_snapshot_list.append(snapshot_line)
+            elif (
+                snapshot_line.status != searches_line.status
+                or snapshot_line.title != searches_line.title
+                or snapshot_line.num_of_replies != searches_line.num_of_replies
+            ):
+                changed_topics_list.append((snapshot_line, searches_line))
 
         """1. move UPD to Change Log"""
         change_log_updates_list = []
-        there_are_inforg_comments = False
 
-        for snapshot_line in curr_snapshot_list:
-            for searches_line in prev_searches_list:
-                if snapshot_line.topic_id != searches_line.topic_id:
-                    continue
+        # all the new comments are saved at once, every page of comments is downloaded once
+        inforg_topic_ids = ingest_new_comments(
+            conn,
+            {
+                snapshot_line.topic_id: (searches_line.num_of_replies + 1, snapshot_line.num_of_replies)
+                for snapshot_line, searches_line in changed_topics_list
+                if snapshot_line.num_of_replies > searches_line.num_of_replies
+            },
+        )
 
-                if snapshot_line.status != searches_line.status:
-                    change_log_line = ChangeLogLine(
-                        parsed_time=snapshot_line.parsed_time,
-                        topic_id=snapshot_line.topic_id,
-                        changed_field='status_change',
-                        new_value=snapshot_line.status,
-                        parameters='',
-                        change_type=1,
-                    )
+        for snapshot_line, searches_line in changed_topics_list:
+            if snapshot_line.status != searches_line.status:
+                change_log_line = ChangeLogLine(
+                    parsed_time=snapshot_line.parsed_time,
+                    topic_id=snapshot_line.topic_id,
+                    changed_field='status_change',
+                    new_value=snapshot_line.status,
+                    parameters='',
+                    change_type=1,
+                )
 
-                    change_log_updates_list.append(change_log_line)
+                change_log_updates_list.append(change_log_line)
 
-                if snapshot_line.title != searches_line.title:
-                    change_log_line = ChangeLogLine(
-                        parsed_time=snapshot_line.parsed_time,
-                        topic_id=snapshot_line.topic_id,
-                        changed_field='title_change',
-                        new_value=snapshot_line.title,
-                        parameters='',
-                        change_type=2,
-                    )
+            if snapshot_line.title != searches_line.title:
+                change_log_line = ChangeLogLine(
+                    parsed_time=snapshot_line.parsed_time,
+                    topic_id=snapshot_line.topic_id,
+                    changed_field='title_change',
+                    new_value=snapshot_line.title,
+                    parameters='',
+                    change_type=2,
+                )
 
-                    change_log_updates_list.append(change_log_line)
+                change_log_updates_list.append(change_log_line)
+
+            if snapshot_line.num_of_replies > searches_line.num_of_replies:
+                change_log_line = ChangeLogLine(
+                    parsed_time=snapshot_line.parsed_time,
+                    topic_id=snapshot_line.topic_id,
+                    changed_field='replies_num_change',
+                    new_value=snapshot_line.num_of_replies,
+                    parameters='',
+                    change_type=3,
+                )
 
-                if snapshot_line.num_of_replies > searches_line.num_of_replies:
+                change_log_updates_list.append(change_log_line)
+
+                if snapshot_line.topic_id in inforg_topic_ids:
                     change_log_line = ChangeLogLine(
                         parsed_time=snapshot_line.parsed_time,
                         topic_id=snapshot_line.topic_id,
-                        changed_field='replies_num_change',
+                        changed_field='inforg_replies',
                         new_value=snapshot_line.num_of_replies,
                         parameters='',
-                        change_type=3,
+                        change_type=4,
                     )
 
                     change_log_updates_list.append(change_log_line)
 
-                    for k in range(snapshot_line.num_of_replies - searches_line.num_of_replies):
-                        flag_if_comment_was_from_inforg = parse_one_comment(
-                            db, snapshot_line.topic_id, searches_line.num_of_replies + 1 + k
-                        )
-                        if flag_if_comment_was_from_inforg:
-                            there_are_inforg_comments = True
-
-                    if there_are_inforg_comments:
-                        change_log_line = ChangeLogLine(
-                            parsed_time=snapshot_line.parsed_time,
-                            topic_id=snapshot_line.topic_id,
-                            changed_field='inforg_replies',
-                            new_value=snapshot_line.num_of_replies,
-                            parameters='',
-                            change_type=4,
-                        )
-
-                        change_log_updates_list.append(change_log_line)
-
-        if change_log_updates_list:
-            stmt = sqlalchemy.text(
-                """INSERT INTO change_log (parsed_time, search_forum_num, changed_field, new_value, parameters,
-                change_type) values (:a, :b, :c, :d, :e, :f) RETURNING id;"""
-            )
-
-            for line in change_log_updates_list:  # TODO
-                raw_data = conn.execute(
-                    stmt,
-                    a=line.parsed_time,
-                    b=line.topic_id,
-                    c=line.changed_field,
-                    d=line.new_value,
-                    e=line.parameters,
-                    f=line.change_type,
-                ).fetchone()
-                change_log_ids.append(raw_data[0])
+        change_log_ids += save_change_log_lines(conn, change_log_updates_list)
 
         """2. move ADD to Change Log """
-        new_topics_from_snapshot_list: list[SearchSummary] = []
-
-        for snapshot_line in curr_snapshot_list:
-            new_search_flag = 1
-            for searches_line in prev_searches_list:
-                if snapshot_line.topic_id == searches_line.topic_id:
-                    new_search_flag = 0
-                    break
-
-            if new_search_flag == 1:
-                new_topics_from_snapshot_list.append(snapshot_line)
-
         change_log_new_topics_list = []
 
         for snapshot_line in new_topics_from_snapshot_list:
@@ -1608,55 +1949,18 @@ def update_change_log_and_searches(db: Engine, folder_num) -> List:
                 topic_id=snapshot_line.topic_id,
                 changed_field=change_type_name,
                 new_value=snapshot_line.title,
-                parameters='',
+                parameters=None,
                 change_type=change_type_id,
             )
             change_log_new_topics_list.append(change_log_line)
 
-        if change_log_new_topics_list:
-            stmt = sqlalchemy.text(
-                """INSERT INTO change_log (parsed_time, search_forum_num, changed_field, new_value, change_type)
-                values (:a, :b, :c, :d, :e) RETURNING id;"""
-            )
-            for line in change_log_new_topics_list:
-                raw_data = conn.execute(
-                    stmt,
-                    a=line.parsed_time,
-                    b=line.topic_id,
-                    c=line.changed_field,
-                    d=line.new_value,
-                    e=line.change_type,
-                ).fetchone()
-                change_log_ids.append(raw_data[0])
+        change_log_ids += save_change_log_lines(conn, change_log_new_topics_list)
 
         """3. ADD to Searches"""
         if new_topics_from_snapshot_list:
-            stmt = sqlalchemy.text(
-                """INSERT INTO searches (search_forum_num, parsed_time, forum_search_title,
-                search_start_time, num_of_replies, age, family_name, forum_folder_id, topic_type,
-                display_name, age_min, age_max, status, city_locations, topic_type_id)
-                VALUES (:a, :b, :d, :e, :f, :g, :h, :i, :j, :k, :l, :m, :n, :o, :p); """
-            )
-            for line in new_topics_from_snapshot_list:
-                conn.execute(
-                    stmt,
-                    a=line.topic_id,
-                    b=line.parsed_time,
-                    d=line.title,
-                    e=line.start_time,
-                    f=line.num_of_replies,
-                    g=line.age,
-                    h=line.name,
-                    i=line.folder_id,
-                    j=line.topic_type,
-                    k=line.display_name,
-                    l=line.age_min,
-                    m=line.age_max,
-                    n=line.new_status,
-                    o=str(line.locations),
-                    p=line.topic_type_id,
-                )
+            conn.execute(searches_table.insert().values([get_searches_row(x) for x in new_topics_from_snapshot_list]))
 
+            for line in new_topics_from_snapshot_list:
                 search_num = line.topic_id
 
                 parsed_profile_text = parse_search_profile(search_num)
@@ -1693,82 +1997,17 @@ def update_change_log_and_searches(db: Engine, folder_num) -> List:
                     except Exception as e:
                         logging.exception(e)
 
-        """4 DEL UPD from Searches"""
-        delete_lines_from_summary_list = []
-
-        for snapshot_line in curr_snapshot_list:
-            for searches_line in prev_searches_list:
-                if snapshot_line.topic_id == searches_line.topic_id:
-                    if (
-                        snapshot_line.status != searches_line.status
-                        or snapshot_line.title != searches_line.title
-                        or snapshot_line.num_of_replies != searches_line.num_of_replies
-                    ):
-                        delete_lines_from_summary_list.append(snapshot_line)
-
-        if delete_lines_from_summary_list:
-            stmt = sqlalchemy.text("""DELETE FROM searches WHERE search_forum_num=:a;""")
-            for line in delete_lines_from_summary_list:
-                conn.execute(stmt, a=int(line.topic_id))
-
-        """5. UPD added to Searches"""
-        searches_full_list = conn.execute(
-            """SELECT search_forum_num, parsed_time, status, forum_search_title, search_start_time,
-            num_of_replies, family_name, age, id, forum_folder_id FROM searches;"""
-        ).fetchall()
-        curr_searches_list = []
-        for searches_line in searches_full_list:
-            search = SearchSummary()
-            (
-                search.topic_id,
-                search.parsed_time,
-                search.status,
-                search.title,
-                search.start_time,
-                search.num_of_replies,
-                search.name,
-                search.age,
-                search.searches_table_id,
-                search.folder_id,
-            ) = list(searches_line)
-            curr_searches_list.append(search)
-
-        new_topics_from_snapshot_list = []
-
-        for snapshot_line in curr_snapshot_list:
-            new_search_flag = 1
-            for searches_line in curr_searches_list:
-                if snapshot_line.topic_id == searches_line.topic_id:
-                    new_search_flag = 0
-                    break
-            if new_search_flag == 1:
-                new_topics_from_snapshot_list.append(snapshot_line)
-        if new_topics_from_snapshot_list:
+        """4. UPD changed in Searches"""
+        if changed_topics_list:
             stmt = sqlalchemy.text(
-                """INSERT INTO searches (search_forum_num, parsed_time, forum_search_title,
-                search_start_time, num_of_replies, age, family_name, forum_folder_id,
-                topic_type, display_name, age_min, age_max, status, city_locations, topic_type_id) values
-                (:a, :b, :d, :e, :f, :g, :h, :i, :j, :k, :l, :m, :n, :o, :p); """
+                """UPDATE searches SET parsed_time=:parsed_time, forum_search_title=:forum_search_title,
+                search_start_time=:search_start_time, num_of_replies=:num_of_replies, age=:age,
+                family_name=:family_name, forum_folder_id=:forum_folder_id, topic_type=:topic_type,
+                display_name=:display_name, age_min=:age_min, age_max=:age_max, status=:status,
+                city_locations=:city_locations, topic_type_id=:topic_type_id
+                WHERE search_forum_num=:search_forum_num; """
             )
-            for line in new_topics_from_snapshot_list:
-                conn.execute(
-                    stmt,
-                    a=line.topic_id,
-                    b=line.parsed_time,
-                    d=line.title,
-                    e=line.start_time,
-                    f=line.num_of_replies,
-                    g=line.age,
-                    h=line.name,
-                    i=line.folder_id,
-                    j=line.topic_type,
-                    k=line.display_name,
-                    l=line.age_min,
-                    m=line.age_max,
-                    n=line.new_status,
-                    o=str(line.locations),
-                    p=line.topic_type_id,
-                )
+            conn.execute(stmt, [get_searches_row(snapshot_line) for snapshot_line, _ in changed_topics_list])
 
         conn.close()
 
@@ -1781,30 +2020,14 @@ def update_change_log_and_searches(db: Engine, folder_num) -> List:
     return change_log_ids
 
 
-def process_one_folder(db: Engine, folder_to_parse: str) -> Tuple[bool, List]:
-    """process one forum folder: check for updates, upload them into cloud sql"""
-
-    def update_checker(current_hash, folder_num):
-        """compare prev snapshot and freshly-parsed snapshot, returns NO or YES and Previous hash"""
-
-        # pre-set default output from the function
-        upd_trigger = False
-
-        # read the previous snapshot from Storage and save it as output[1]
-        previous_hash = read_snapshot_from_cloud_storage('bucket_for_snapshot_storage', folder_num)
-
-        # if new snapshot differs from the old one – then let's update the old with the new one
-        if current_hash != previous_hash:
-            # update hash in Storage
-            write_snapshot_to_cloud_storage('bucket_for_snapshot_storage', current_hash, folder_num)
-
-            upd_trigger = True
-
-        logging.info(
-            f'folder = {folder_num}, update trigger = {upd_trigger}, prev snapshot as string = {previous_hash}'
-        )
-
-        return upd_trigger
+def process_one_folder(
+    db: Engine,
+    folder_to_parse: int,
+    folder_page: requests.Response | None = None,
+    folder_state: FolderPageState | None = None,
+) -> Tuple[bool, List]:
+    """process one forum folder: check for updates, upload them into cloud sql.
+    folder_state is what was saved after the previous processing of the folder"""
 
     def rewrite_snapshot_in_sql(db2: Engine, folder_num, folder_summary: list[SearchSummary]):
         """rewrite the freshly-parsed snapshot into sql table 'forum_summary_snapshot'"""
@@ -1844,9 +2067,24 @@ def process_one_folder(db: Engine, folder_to_parse: str) -> Tuple[bool, List]:
         return None
 
     change_log_ids = []
+    folder_state = folder_state or FolderPageState(folder_id=folder_to_parse)
+    new_folder_state = FolderPageState(folder_id=folder_to_parse)
+
+    # the cheap checks first: the page or the block of topics are the same as at the previous processing
+    if folder_page is not None:
+        if folder_page.status_code == 304:
+            logging.info(f'folder {folder_to_parse} has NO new updates: page is not modified')
+            return False, change_log_ids
+
+        new_folder_state.etag = folder_page.headers.get('ETag')
+        new_folder_state.last_modified = folder_page.headers.get('Last-Modified')
+        new_folder_state.forumbg_hash = get_forumbg_hash(folder_page.content)
+        if new_folder_state.forumbg_hash and new_folder_state.forumbg_hash == folder_state.forumbg_hash:
+            logging.info(f'folder {folder_to_parse} has NO new updates: list of topics is not changed')
+            return False, change_log_ids
 
     # parse a new version of summary page from the chosen folder
-    titles_and_num_of_replies, new_folder_summary = parse_one_folder(db, folder_to_parse)
+    titles_and_num_of_replies, new_folder_summary = parse_one_folder(db, folder_to_parse, folder_page)
 
     update_trigger = False
     debug_message = f'folder {folder_to_parse} has NO new updates'
@@ -1854,10 +2092,12 @@ def process_one_folder(db: Engine, folder_to_parse: str) -> Tuple[bool, List]:
     if new_folder_summary:
         # transform the current snapshot into the string to be able to compare it: string vs string
         curr_snapshot_as_one_dimensional_list = [y for x in titles_and_num_of_replies for y in x]
-        curr_snapshot_as_string = ','.join(map(str, curr_snapshot_as_one_dimensional_list))
+        new_folder_state.snapshot = ','.join(map(str, curr_snapshot_as_one_dimensional_list))
 
-        # get the prev snapshot as string from cloud storage & get the trigger if there are updates at all
-        update_trigger = update_checker(curr_snapshot_as_string, folder_to_parse)
+        update_trigger = new_folder_state.snapshot != folder_state.snapshot
+        logging.info(
+            f'folder = {folder_to_parse}, update trigger = {update_trigger}, prev snapshot = {folder_state.snapshot}'
+        )
 
         # only for case when current snapshot differs from previous
         if update_trigger:
@@ -1870,6 +2110,9 @@ def process_one_folder(db: Engine, folder_to_parse: str) -> Tuple[bool, List]:
             change_log_ids = update_change_log_and_searches(db, folder_to_parse)
             update_coordinates(db, new_folder_summary)
 
+        # saved only after the folder is fully processed: if processing failed, the folder is parsed again next time
+        save_folder_page_state(db, new_folder_state)
+
     logging.info(debug_message)
 
     return update_trigger, change_log_ids
@@ -1929,7 +2172,7 @@ def main(event, context) -> None:  # noqa
     folders_list = []
 
     analytics_func_start = datetime.now()
-    requests_session = requests.Session()
+    requests_session = make_requests_session()
 
     message_from_pubsub = process_pubsub_message_v3(event)
     list_from_pubsub = ast.literal_eval(message_from_pubsub) if message_from_pubsub else None
@@ -1950,10 +2193,21 @@ def main(event, context) -> None:  # noqa
     change_log_ids = []
 
     if folders_list:
+        folder_states = get_folder_page_states(db, folders_list)
+
+        # pages are downloaded in parallel, but folders are processed one by one: they share the db pool
+        folder_pages = fetch_forum_pages(
+            [get_folder_url(folder) for folder in folders_list],
+            {get_folder_url(folder): get_conditional_headers(folder_states.get(folder)) for folder in folders_list},
+        )
+
         for folder in folders_list:
             logging.info(f'start checking if folder {folder} has any updates')
 
-            update_trigger, one_folder_change_log_ids = process_one_folder(db, folder)
+            folder_page = folder_pages.get(get_folder_url(folder))
+            update_trigger, one_folder_change_log_ids = process_one_folder(
+                db, folder, folder_page, folder_states.get(folder)
+            )
 
             if update_trigger:
                 list_of_folders_with_updates.append(folder)
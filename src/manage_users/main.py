@@ -4,7 +4,7 @@ from datetime import datetime
 from typing import Any, Dict, Optional
 
 from _dependencies.commons import sql_connect_by_psycopg2
-from _dependencies.misc import process_pubsub_message
+from _dependencies.misc import mark_user_preferences_changed, process_pubsub_message
 
 
 def save_onboarding_step(user_id: int, step_name: str, timestamp: datetime) -> None:
@@ -59,6 +59,7 @@ def save_updated_status_for_user(action: str, user_id: int, timestamp: datetime)
             """UPDATE users SET status =%s, status_change_date=%s WHERE user_id=%s;""",
             (action_to_write, timestamp, user_id),
         )
+        mark_user_preferences_changed(cur, user_id)
         conn.commit()
 
     # compose & execute the query for USER_STATUSES_HISTORY table
@@ -100,8 +101,9 @@ def save_new_user(user_id: int, username: str, timestamp: datetime) -> None:
                     ;""",
         (user_id, username, timestamp),
     )
-    conn.commit()
     num_of_updates = cur.fetchone()[0]
+    mark_user_preferences_changed(cur, user_id)
+    conn.commit()
 
     if num_of_updates == 0:
         logging.info(f'New user {user_id}, username {username} HAVE NOT BEEN SAVED ' f'due to duplication')
@@ -157,6 +159,9 @@ def save_default_notif_settings(user_id: int) -> None:
         conn.commit()
         num_of_updates += cur.fetchone()[0]
 
+    mark_user_preferences_changed(cur, user_id)
+    conn.commit()
+
     # close connection & cursor
     cur.close()
     conn.close()
@@ -2,16 +2,18 @@
 
 import ast
 import datetime
+import heapq
 import logging
 import time
-from concurrent.futures import ThreadPoolExecutor, wait
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
 from dataclasses import dataclass, field
-from typing import Any, List
+from typing import Any, Callable, List
 
 import requests
-from psycopg2.extensions import connection, cursor
+from psycopg2.extensions import cursor
 
-from _dependencies.cloud_func_parallel_guard import check_and_save_event_id
+from _dependencies.cloud_func_parallel_guard import check_and_save_event_id, prolong_function_lease
 from _dependencies.commons import (
     Topics,
     get_app_config,
@@ -21,15 +23,17 @@ from _dependencies.commons import (
 )
 from _dependencies.misc import (
     generate_random_function_id,
-    get_change_log_update_time,
+    get_change_log_update_times,
     get_triggering_function,
     notify_admin,
     process_pubsub_message_v2,
     process_response,
     save_sending_status_to_notif_by_user,
+    save_sending_statuses_to_notif_by_user,
     send_location_to_api,
     send_message_to_api,
 )
+from _dependencies.rate_limiter import TelegramRateLimiter
 
 setup_google_logging()
 
@@ -45,7 +49,11 @@ MESSAGES_QUEUE_TO_CALL_HELPER_FUNCTION_2 = 1600
 INTERVAL_TO_CHECK_PARALLEL_FUNCTION_SECONDS = 70  # window within which we check for started parallel function
 SLEEP_TIME_FOR_NEW_NOTIFS_RECHECK_SECONDS = 5
 MESSAGES_BATCH_SIZE = 100
-WORKERS_COUNT = 4
+WORKERS_COUNT = 8  # the sending pace is defined by TelegramRateLimiter, workers just cover Telegram API latency
+MAX_FLOOD_CONTROL_RETRIES = 2  # within one batch; after that the message is left for the next batch
+# sending statuses are saved while the batch is being sent – so delivered messages are not re-sent after a crash
+STATUSES_FLUSH_BATCH_SIZE = 20
+STATUSES_FLUSH_INTERVAL_SECONDS = 1
 
 
 @dataclass
@@ -72,6 +80,13 @@ class MessageToSend:
     failed: datetime.datetime | None
 
 
+@dataclass
+class SendingResult:
+    message: MessageToSend
+    result: str | None
+    duration: float
+
+
 def check_for_notifs_to_send(cur: cursor, select_doubling: bool) -> list[MessageToSend]:
     """return a notification which should be sent"""
 
@@ -198,6 +213,106 @@ def time_is_out(start: datetime.datetime) -> bool:
     return delta.total_seconds() > SCRIPT_SOFT_TIMEOUT_SECONDS
 
 
+class NotificationDispatcher:
+    """Sends a batch of notifications via the worker pool as fast as Telegram limits allow.
+
+    Messages to different chats are sent in parallel, messages to one chat – one by one in message_id order.
+    A message hit by flood control is put back in front of its chat queue and waits for the pause Telegram asked for.
+    Results are passed to on_results in small portions as soon as they are ready. After the deadline no new messages
+    are sent, the rest of the batch is left for the next run.
+    """
+
+    def __init__(
+        self,
+        session: requests.Session,
+        executor: ThreadPoolExecutor,
+        limiter: TelegramRateLimiter,
+        bot_token: str,
+        max_in_flight: int = WORKERS_COUNT,
+    ):
+        self.session = session
+        self.executor = executor
+        self.limiter = limiter
+        self.bot_token = bot_token
+        self.max_in_flight = max_in_flight
+
+    def dispatch(
+        self,
+        messages: list[MessageToSend],
+        on_results: Callable[[list[SendingResult]], None] | None = None,
+        deadline: float | None = None,
+    ) -> list[SendingResult]:
+        chat_queues: dict[int, deque[MessageToSend]] = {}
+        for message in messages:
+            chat_queues.setdefault(message.user_id, deque()).append(message)
+
+        # (not_before, priority, chat_id): chats ready to send their next message, lower message_id goes first
+        schedule = [(0.0, queue[0].message_id, chat_id) for chat_id, queue in chat_queues.items()]
+        heapq.heapify(schedule)
+        in_flight: dict[Future, MessageToSend] = {}
+        flood_control_retries: dict[int, int] = {}
+        results: list[SendingResult] = []
+        results_to_flush: list[SendingResult] = []
+        flushed_at = time.monotonic()
+
+        while schedule or in_flight:
+            now = time.monotonic()
+            if deadline is not None and now >= deadline and schedule:
+                logging.info(f'time is out: {sum(len(x) for x in chat_queues.values())} messages left for next run')
+                schedule = []
+            while schedule and len(in_flight) < self.max_in_flight and schedule[0][0] <= now:
+                _, priority, chat_id = heapq.heappop(schedule)
+                wait_seconds = self.limiter.try_acquire(chat_id)
+                if wait_seconds:
+                    heapq.heappush(schedule, (now + wait_seconds, priority, chat_id))
+                    continue
+
+                message = chat_queues[chat_id].popleft()
+                future = self.executor.submit(_process_message_sending, self.session, self.bot_token, message)
+                in_flight[future] = message
+
+            timeout = None
+            if schedule and len(in_flight) < self.max_in_flight:
+                timeout = max(0.0, schedule[0][0] - time.monotonic())
+            if in_flight:
+                done, _ = wait(in_flight, timeout=timeout, return_when=FIRST_COMPLETED)
+            else:
+                # nothing is being sent, wait() would return at once: sleep till the limiter lets the next chat go
+                done = set()
+                if timeout:
+                    time.sleep(timeout)
+
+            for future in done:
+                message = in_flight.pop(future)
+                result, duration = future.result()
+                queue = chat_queues[message.user_id]
+
+                retries = flood_control_retries.get(message.message_id, 0)
+                if result == 'failed_flood_control' and retries < MAX_FLOOD_CONTROL_RETRIES:
+                    # limiter won't let it go till the pause registered by process_response is over
+                    flood_control_retries[message.message_id] = retries + 1
+                    queue.appendleft(message)
+                else:
+                    results.append(SendingResult(message, result, duration))
+                    results_to_flush.append(results[-1])
+
+                if queue:
+                    heapq.heappush(schedule, (0.0, queue[0].message_id, message.user_id))
+
+            now = time.monotonic()
+            flush_is_due = (
+                len(results_to_flush) >= STATUSES_FLUSH_BATCH_SIZE
+                or now - flushed_at >= STATUSES_FLUSH_INTERVAL_SECONDS
+                or not (schedule or in_flight)
+            )
+            if on_results and results_to_flush and flush_is_due:
+                on_results(results_to_flush)
+                results_to_flush = []
+                flushed_at = now
+
+        return results
+
+
 def iterate_over_notifications(
     session: requests.Session,
     function_id: int,
@@ -216,8 +331,16 @@ def iterate_over_notifications(
         # we're asking send_notification_helper to help is sending all of them
         _call_helpers_if_needed(function_id, cur)
 
+        bot_token = get_app_config().bot_api_token__prod
+        dispatcher = NotificationDispatcher(session, executor, TelegramRateLimiter(), bot_token)
+
         is_first_wait = True
         while True:
+            # heartbeat: if the lease was taken over by another function – it sends the rest of notifications
+            if not prolong_function_lease(cur, function_id, FUNC_NAME, INTERVAL_TO_CHECK_PARALLEL_FUNCTION_SECONDS):
+                logging.warning('the lease of the function is taken over by another function')
+                break
+
             # analytics on sending speed - start for every user/notification
             _process_doubling_messages(cur)
 
@@ -235,18 +358,16 @@ def iterate_over_notifications(
                 is_first_wait = False
                 continue
 
-            futures = [
-                executor.submit(
-                    _process_message_sending,
-                    session,
-                    time_analytics,
-                    set_of_change_ids,
-                    conn_psy,
-                    message_to_send,
-                )
-                for message_to_send in messages
-            ]
-            wait(futures)
+            change_log_upd_times = get_change_log_update_times(cur, {x.change_log_id for x in messages})
+
+            def save_results(sending_results: list[SendingResult]) -> None:
+                _save_sending_results(cur, time_analytics, set_of_change_ids, change_log_upd_times, sending_results)
+
+            seconds_left = SCRIPT_SOFT_TIMEOUT_SECONDS - seconds_between(time_analytics.script_start_time)
+            analytics_dispatch_start = datetime.datetime.now()
+            dispatcher.dispatch(messages, save_results, time.monotonic() + seconds_left)
+            analytics_dispatch_duration = seconds_between_round_2(analytics_dispatch_start)
+            logging.info(f'time: {analytics_dispatch_duration:.2f} – sending {len(messages)} msgs')
 
             if time_is_out(time_analytics.script_start_time):
                 if check_for_notifs_to_send(cur, select_doubling=False):
@@ -259,50 +380,49 @@ def iterate_over_notifications(
 
 def _process_message_sending(
     session: requests.Session,
-    time_analytics: TimeAnalytics,
-    set_of_change_ids: set[int],
-    conn: connection,
+    bot_token: str,
     message_to_send: MessageToSend,
-) -> None:
-    logging.info('time: -------------- loop start -------------')
+) -> tuple[str | None, float]:
     logging.info(f'{message_to_send}')
-    analytics_sm_start = datetime.datetime.now()
-    analytics_iteration_start = datetime.datetime.now()
+    analytics_pre_sending_msg = datetime.datetime.now()
 
-    with conn.cursor() as cur:
-        change_log_upd_time = get_change_log_update_time(cur, message_to_send.change_log_id)
+    try:
+        result = send_single_message(bot_token, message_to_send, session)
+    except Exception as e:
+        logging.exception(e)
+        result = None
 
-    analytics_pre_sending_msg = datetime.datetime.now()
+    analytics_send_duration = seconds_between(analytics_pre_sending_msg)
+    logging.info(f'time: {analytics_send_duration:.2f} – sending msg')
 
-    result = send_single_message(get_app_config().bot_api_token__prod, message_to_send, session)
+    return result, analytics_send_duration
 
-    analytics_send_start_finish = seconds_between_round_2(analytics_pre_sending_msg)
-    logging.info(f'time: {analytics_send_start_finish:.2f} – sending msg')
 
+def _save_sending_results(
+    cur: cursor,
+    time_analytics: TimeAnalytics,
+    set_of_change_ids: set[int],
+    change_log_upd_times: dict[int, datetime.datetime],
+    sending_results: list[SendingResult],
+) -> None:
     analytics_save_sql_start = datetime.datetime.now()
 
-    # save result of sending telegram notification into SQL notif_by_user
-    with conn.cursor() as cur:
-        save_sending_status_to_notif_by_user(cur, message_to_send.message_id, result)
+    # save results of sending telegram notifications into SQL notif_by_user
+    save_sending_statuses_to_notif_by_user(cur, [(x.message.message_id, x.result) for x in sending_results])
+
+    for sending_result in sending_results:
+        message_to_send = sending_result.message
+        time_analytics.notif_times.append(sending_result.duration)
 
-    # save metric: how long does it took from creation to completion
-    if result == 'completed':
-        _process_logs_with_completed_sending(time_analytics, message_to_send, change_log_upd_time)
-        set_of_change_ids.add(message_to_send.change_log_id)
+        # save metric: how long does it took from creation to completion
+        if sending_result.result == 'completed':
+            change_log_upd_time = change_log_upd_times.get(message_to_send.change_log_id)
+            _process_logs_with_completed_sending(time_analytics, message_to_send, change_log_upd_time)
+            set_of_change_ids.add(message_to_send.change_log_id)
 
     analytics_save_sql_duration = seconds_between_round_2(analytics_save_sql_start)
     logging.info(f'time: {analytics_save_sql_duration:.2f} – saving to sql')
 
-    analytics_doubling_checked_saved_to_sql = seconds_between_round_2(analytics_pre_sending_msg)
-    logging.info(f'time: {analytics_doubling_checked_saved_to_sql:.2f} – check -> save to sql')
-
-    # analytics on sending speed - finish for every user/notification
-    analytics_sm_duration = seconds_between(analytics_sm_start)
-    time_analytics.notif_times.append(analytics_sm_duration)
-
-    analytics_iteration_duration = seconds_between_round_2(analytics_iteration_start)
-    logging.info(f'time: {analytics_iteration_duration:.2f} – iteration duration')
-
 
 def _process_doubling_messages(cur: cursor):
     messages = check_for_notifs_to_send(cur, select_doubling=True)
@@ -448,7 +568,7 @@ def main(event, context):
 
     finish_time_analytics(time_analytics, changed_ids)
 
-    check_and_save_event_id(
+    handoff_is_requested = check_and_save_event_id(
         context,
         'finish',
         function_id,
@@ -457,6 +577,10 @@ def main(event, context):
         FUNC_NAME,
         INTERVAL_TO_CHECK_PARALLEL_FUNCTION_SECONDS,
     )
+    if handoff_is_requested:
+        # another function was triggered while this one was working and exited – new notifications could be there
+        message_for_pubsub = {'triggered_by_func_id': function_id, 'text': 'hand-off'}
+        publish_to_pubsub(Topics.topic_to_send_notifications, message_for_pubsub)
     logging.info('script finished')
 
     return 'ok'
@@ -29,6 +29,7 @@ from _dependencies.misc import (
     send_location_to_api,
     send_message_to_api,
 )
+from _dependencies.rate_limiter import get_telegram_backoff
 
 setup_google_logging()
 
@@ -167,6 +168,9 @@ def send_single_message(bot_token, user_id, message_content, message_params, mes
         if 'disable_web_page_preview' in message_params:
             message_params['disable_web_page_preview'] = message_params['disable_web_page_preview'] == 'True'
 
+    # wait for the flood control pause, if Telegram asked for it for this chat or for the whole bot
+    get_telegram_backoff().wait(user_id)
+
     try:
         response = None
         if message_type == 'text':
@@ -0,0 +1,53 @@
+import pytest
+
+from _dependencies.commons import PooledConnection, get_psycopg2_pool, sql_connect_by_psycopg2
+
+
+def _get_backend_pid(conn) -> int:
+    with conn.cursor() as cur:
+        cur.execute('SELECT pg_backend_pid();')
+        return cur.fetchone()[0]
+
+
+def test_sql_connect_by_psycopg2_reuses_connection():
+    with sql_connect_by_psycopg2() as conn:
+        pid = _get_backend_pid(conn)
+
+    conn = sql_connect_by_psycopg2()
+    assert _get_backend_pid(conn) == pid
+    assert conn.autocommit
+    conn.close()
+
+
+def test_sql_connect_by_psycopg2_replaces_dropped_connection():
+    conn = sql_connect_by_psycopg2()
+    other_conn = sql_connect_by_psycopg2()
+    pid = _get_backend_pid(conn)
+    with other_conn.cursor() as cur:
+        cur.execute('SELECT pg_terminate_backend(%s);', (pid,))
+    conn.close()
+    other_conn.close()
+
+    with sql_connect_by_psycopg2() as conn:
+        assert _get_backend_pid(conn) != pid
+
+
+def test_sql_connect_by_psycopg2_without_pool_when_exhausted(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(get_psycopg2_pool(), 'maxconn', 1)
+    pooled_conn = sql_connect_by_psycopg2()
+
+    conn = sql_connect_by_psycopg2()
+    assert not isinstance(conn, PooledConnection)
+    conn.close()
+    assert conn.closed
+    pooled_conn.close()
+
+
+def test_pooled_connection_double_close():
+    conn = sql_connect_by_psycopg2()
+    conn.close()
+    conn.close()
+
+    with sql_connect_by_psycopg2() as conn, conn.cursor() as cur:
+        cur.execute('SELECT 1;')
+        assert cur.fetchone() == (1,)
@@ -13,3 +13,10 @@ def test_clean_up_content_2():
 
     res = content.clean_up_content_2(data)
     assert res == ['some text']
+
+
+def test_sorted_out_pattern():
+    # (?i) of one pattern is not applied to the others
+    assert content.SORTED_OUT_PATTERN.search('ВСЕМ ВЫЕЗЖАЮЩИМ ИМЕТЬ СИЗ')
+    assert content.SORTED_OUT_PATTERN.search('не дошел до школы')
+    assert not content.SORTED_OUT_PATTERN.search('НЕ ДОШЕЛ ДО ШКОЛЫ')
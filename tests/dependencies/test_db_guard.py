@@ -4,11 +4,12 @@ from uuid import uuid4
 import pytest
 
 from _dependencies.cloud_func_parallel_guard import (
+    acquire_function_lease,
     check_and_save_event_id,
-    check_if_other_functions_are_working,
-    record_finish_of_function,
-    record_start_of_function,
+    prolong_function_lease,
+    release_function_lease,
 )
+from _dependencies.commons import sql_connect_by_psycopg2
 from tests.common import run_smoke
 
 
@@ -21,18 +22,18 @@ def func_name() -> str:
     return uuid4().hex[:10]
 
 
-def test_check_if_other_functions_are_working():
-    res = run_smoke(check_if_other_functions_are_working)
+def test_acquire_function_lease():
+    res = run_smoke(acquire_function_lease)
     pass
 
 
-def test_check_record_start_of_function():
-    res = run_smoke(record_start_of_function)
+def test_prolong_function_lease():
+    res = run_smoke(prolong_function_lease)
     pass
 
 
-def test_record_finish_of_function():
-    res = run_smoke(record_finish_of_function)
+def test_release_function_lease():
+    res = run_smoke(release_function_lease)
     pass
 
 
@@ -53,7 +54,7 @@ def test_check_and_save_event_id(func_name: str):
 def test_check_and_save_event_id_blocked(func_name: str):
     context = Context(event_id=123)
     event_num = 123
-    record_start_of_function(event_num, 2, 3, func_name)
+    acquire_function_lease(event_num, 2, 3, func_name, 3)
 
     res = check_and_save_event_id(
         context,
@@ -70,8 +71,18 @@ def test_check_and_save_event_id_blocked(func_name: str):
 def test_record_is_blocked(func_name: str):
     interval = 5
     event_number = 7
-    assert not check_if_other_functions_are_working(func_name, interval)
-    record_start_of_function(event_number, 2, 3, func_name)
-    assert check_if_other_functions_are_working(func_name, interval)
-    record_finish_of_function(event_number, [])
-    assert not check_if_other_functions_are_working(func_name, interval)
+    assert acquire_function_lease(event_number, 2, 3, func_name, interval)
+    assert not acquire_function_lease(event_number + 1, 4, 3, func_name, interval)
+
+    assert release_function_lease(event_number, 2, func_name, [])
+    assert acquire_function_lease(event_number + 1, 4, 3, func_name, interval)
+    assert not release_function_lease(event_number + 1, 4, func_name, [])
+
+
+def test_expired_lease_is_taken_over(func_name: str):
+    assert acquire_function_lease(7, 2, 3, func_name, 0)
+    assert acquire_function_lease(8, 4, 3, func_name, 5)
+
+    with sql_connect_by_psycopg2() as conn, conn.cursor() as cur:
+        assert not prolong_function_lease(cur, 2, func_name, 5)
+        assert prolong_function_lease(cur, 4, func_name, 5)
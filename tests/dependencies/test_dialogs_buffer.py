@@ -0,0 +1,42 @@
+from random import randint
+from unittest.mock import patch
+
+import psycopg2
+import pytest
+
+from _dependencies.commons import sql_connect_by_psycopg2
+from _dependencies.dialogs_buffer import DialogsBuffer
+
+
+@pytest.fixture
+def user_id() -> int:
+    return randint(10**9, 2 * 10**9)
+
+
+def _get_saved_dialogs(user_id: int) -> list[tuple[str, str]]:
+    with sql_connect_by_psycopg2() as conn, conn.cursor() as cur:
+        cur.execute('SELECT author, message_text FROM dialogs WHERE user_id=%s ORDER BY id;', (user_id,))
+        return cur.fetchall()
+
+
+def test_flush(user_id: int):
+    buffer = DialogsBuffer()
+    buffer.add(user_id, 'user', 'hello')
+    buffer.add(user_id, 'bot', 'hi')
+    assert _get_saved_dialogs(user_id) == []
+
+    assert buffer.flush()
+    assert _get_saved_dialogs(user_id) == [('user', 'hello'), ('bot', 'hi')]
+    assert buffer.flush()
+    assert _get_saved_dialogs(user_id) == [('user', 'hello'), ('bot', 'hi')]
+
+
+def test_failed_flush_keeps_rows(user_id: int):
+    buffer = DialogsBuffer()
+    buffer.add(user_id, 'user', 'hello')
+    with patch('_dependencies.dialogs_buffer.sql_connect_by_psycopg2', side_effect=psycopg2.OperationalError):
+        assert not buffer.flush()
+
+    buffer.add(user_id, 'bot', 'hi')
+    assert buffer.flush()
+    assert _get_saved_dialogs(user_id) == [('user', 'hello'), ('bot', 'hi')]
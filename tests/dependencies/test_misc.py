@@ -1,12 +1,15 @@
 from datetime import datetime, timedelta
-from unittest.mock import AsyncMock
+from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
 import requests
+from telegram import ReplyKeyboardMarkup
 
 from _dependencies import misc
 from _dependencies.commons import sql_connect_by_psycopg2
+from _dependencies.rate_limiter import get_telegram_backoff
 from tests.common import get_event_with_data, get_test_config
+from tests.factories.db_factories import NotifByUserFactory
 
 
 def test_notify_admin(patch_pubsub_client, bot_mock_send_message: AsyncMock):
@@ -21,6 +24,24 @@ def test_make_api_call():
     misc.make_api_call('test', {'a: 1'})
 
 
+def test_get_telegram_session():
+    assert misc.get_telegram_session() is misc.get_telegram_session()
+
+
+def test_call_telegram_api():
+    reply_markup = ReplyKeyboardMarkup([['в начало']], resize_keyboard=True)
+    params = {'chat_id': 1, 'text': 'foo', 'reply_markup': reply_markup}
+
+    with patch.object(misc, 'get_telegram_session') as get_session:
+        misc.call_telegram_api('sendMessage', 'token', params)
+
+    get_session.return_value.post.assert_called_once_with(
+        'https://api.telegram.org/bottoken/sendMessage',
+        json={'chat_id': 1, 'text': 'foo', 'reply_markup': reply_markup.to_dict()},
+    )
+    assert params['reply_markup'] is reply_markup
+
+
 @pytest.mark.parametrize(
     'minutes_ago,hours_ago,days_ago,result',
     [
@@ -55,6 +76,24 @@ def test_get_change_log_update_time():
             misc.get_change_log_update_time(cursor, 1)
 
 
+def test_get_change_log_update_times():
+    parsed_time_1 = datetime(2024, 1, 1, 10, 0)
+    parsed_time_2 = datetime(2024, 1, 2, 12, 30)
+    with sql_connect_by_psycopg2() as connection:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                """INSERT INTO change_log (parsed_time, notification_sent) VALUES (%s, 'y'), (%s, 'y') RETURNING id;""",
+                (parsed_time_1, parsed_time_2),
+            )
+            change_log_id_1, change_log_id_2 = [row[0] for row in cursor.fetchall()]
+
+            res = misc.get_change_log_update_times(cursor, {change_log_id_1, change_log_id_2})
+
+            cursor.execute('DELETE FROM change_log WHERE id = ANY(%s);', ([change_log_id_1, change_log_id_2],))
+
+    assert res == {change_log_id_1: parsed_time_1, change_log_id_2: parsed_time_2}
+
+
 def test_send_location_to_api():
     with requests.Session() as session:
         misc.send_location_to_api(
@@ -71,6 +110,42 @@ def test_save_sending_status_to_notif_by_user():
             misc.save_sending_status_to_notif_by_user(cursor, 1, 'cancelled')
 
 
+def test_save_sending_statuses_to_notif_by_user():
+    # cancelled rows are never picked up by send_notifications running in parallel tests
+    notifications = [
+        NotifByUserFactory.create_sync(mailing_id=None, cancelled=datetime.now(), completed=None, failed=None)
+        for _ in range(4)
+    ]
+    completed, failed, failed_flood_control, not_saved = [x.message_id for x in notifications]
+
+    with sql_connect_by_psycopg2() as connection:
+        with connection.cursor() as cursor:
+            misc.save_sending_statuses_to_notif_by_user(
+                cursor,
+                [
+                    (completed, 'completed'),
+                    (failed, 'failed'),
+                    (failed_flood_control, 'failed_flood_control'),
+                    (not_saved, None),
+                ],
+            )
+            cursor.execute(
+                """SELECT message_id, completed IS NOT NULL, failed IS NOT NULL
+                FROM notif_by_user WHERE message_id = ANY(%s);""",
+                ([x.message_id for x in notifications],),
+            )
+            statuses = {row[0]: (row[1], row[2]) for row in cursor.fetchall()}
+
+            cursor.execute('DELETE FROM notif_by_user WHERE message_id = ANY(%s);', (list(statuses),))
+
+    assert statuses == {
+        completed: (True, False),
+        failed: (False, True),
+        failed_flood_control: (False, True),
+        not_saved: (False, False),
+    }
+
+
 def test_evaluate_city_locations_success():
     res = misc.evaluate_city_locations('[[56.0, 64.0]]')
     assert res == [[56.0, 64.0]]
@@ -104,3 +179,35 @@ def test_process_pubsub_message_2():
 def test_process_pubsub_message_3():
     res = misc.process_pubsub_message_v3(get_event_with_data('foo'))
     assert res == 'foo'
+
+
+def _flood_control_response(retry_after: int) -> MagicMock:
+    response = MagicMock(ok=False, status_code=429, reason='Too Many Requests', headers={})
+    response.json.return_value = {
+        'ok': False,
+        'error_code': 429,
+        'description': f'Too Many Requests: retry after {retry_after}',
+        'parameters': {'retry_after': retry_after},
+    }
+    return response
+
+
+def test_get_retry_after():
+    assert misc.get_retry_after(_flood_control_response(7)) == 7
+
+
+def test_get_retry_after_no_body():
+    response = MagicMock(headers={})
+    response.json.side_effect = ValueError
+    assert misc.get_retry_after(response) is None
+
+
+def test_process_response_flood_control():
+    get_telegram_backoff.cache_clear()
+    user_id = 12345
+
+    res = misc.process_response(user_id, _flood_control_response(7))
+
+    assert res == 'failed_flood_control'
+    assert 6 < get_telegram_backoff().seconds_to_wait(user_id) <= 7
+    get_telegram_backoff.cache_clear()
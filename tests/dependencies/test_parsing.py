@@ -0,0 +1,25 @@
+from pathlib import Path
+
+from bs4 import BeautifulSoup
+
+from _dependencies import parsing
+
+
+def test_cook_posts_soup():
+    page = Path('tests/fixtures/forum_comment.html').read_bytes()
+
+    soup = parsing.cook_posts_soup(page)
+
+    assert len(soup.find_all('div', 'post')) == 3
+    assert not soup.find('div', 'forumbg')
+
+
+def test_cook_first_post_soup():
+    page = Path('tests/fixtures/forum_comment.html').read_bytes()
+    full_soup = BeautifulSoup(page, features='lxml')
+
+    soup = parsing.cook_first_post_soup(page)
+
+    assert soup.find('h2', 'topic-title').text == full_soup.find('h2', 'topic-title').text
+    assert soup.find('div', 'content').text == full_soup.find('div', 'content').text
+    assert not soup.find('div', 'post')
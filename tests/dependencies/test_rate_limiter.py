@@ -0,0 +1,56 @@
+from _dependencies.rate_limiter import TelegramBackoff, TelegramRateLimiter, TokenBucket
+
+
+def test_token_bucket():
+    bucket = TokenBucket(rate=10, capacity=2)
+    assert bucket.try_acquire() == 0
+    assert bucket.try_acquire() == 0
+    wait_seconds = bucket.try_acquire()
+    assert 0 < wait_seconds <= 0.1
+
+
+def test_token_bucket_acquire():
+    bucket = TokenBucket(rate=100, capacity=1)
+    bucket.acquire()
+    bucket.acquire()
+    assert bucket.seconds_to_token() > 0
+
+
+def test_telegram_rate_limiter_chat_limit():
+    limiter = TelegramRateLimiter(global_rate=100, chat_rate=1, chat_burst=2, backoff=TelegramBackoff())
+    assert limiter.try_acquire(1) == 0
+    assert limiter.try_acquire(1) == 0
+    assert limiter.try_acquire(1) > 0
+    # other chats are not affected
+    assert limiter.try_acquire(2) == 0
+
+
+def test_telegram_rate_limiter_global_limit():
+    limiter = TelegramRateLimiter(global_rate=2, chat_rate=1, chat_burst=1, backoff=TelegramBackoff())
+    assert limiter.try_acquire(1) == 0
+    assert limiter.try_acquire(2) == 0
+    assert limiter.try_acquire(3) > 0
+    # nothing is consumed from the chat bucket when the global limit is hit
+    assert limiter._chat_buckets[3].seconds_to_token() == 0
+
+
+def test_telegram_backoff_chat_pause():
+    backoff = TelegramBackoff(chats_for_global_pause=3)
+    backoff.register_flood_control(1, 10)
+    assert 9 < backoff.seconds_to_wait(1) <= 10
+    assert backoff.seconds_to_wait(2) == 0
+
+
+def test_telegram_backoff_global_pause():
+    backoff = TelegramBackoff(chats_for_global_pause=2)
+    backoff.register_flood_control(1, 10)
+    backoff.register_flood_control(2, 5)
+    assert backoff.seconds_to_wait(3) > 4
+
+
+def test_telegram_rate_limiter_respects_backoff():
+    backoff = TelegramBackoff()
+    limiter = TelegramRateLimiter(backoff=backoff)
+    backoff.register_flood_control(1, 10)
+    assert limiter.try_acquire(1) > 9
+    assert limiter.try_acquire(2) == 0
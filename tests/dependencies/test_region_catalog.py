@@ -0,0 +1,52 @@
+from random import randint
+from unittest.mock import patch
+
+from psycopg2.extensions import cursor
+
+from _dependencies import region_catalog
+from _dependencies.commons import sql_connect_by_psycopg2
+from _dependencies.region_catalog import REGION_CATALOG, FolderNames
+
+
+def test_region_catalog_lookups():
+    region = REGION_CATALOG.region_by_button['Владимирская обл.']
+
+    assert region.folder_ids == (123, 233)
+    assert REGION_CATALOG.region_by_main_folder[123] is region
+    assert 233 not in REGION_CATALOG.region_by_main_folder
+    assert REGION_CATALOG.fed_dist_by_region_button[region.button].button == 'Центральный ФО'
+    assert 'Прочие поиски по РФ' in REGION_CATALOG.region_keyboards_buttons
+    assert 'Центральный ФО' not in REGION_CATALOG.region_keyboards_buttons
+
+
+def test_region_catalog_reply_markups():
+    central = REGION_CATALOG.region_reply_markups['Центральный ФО']
+
+    assert REGION_CATALOG.get_reply_markup_for_region('Тульская обл.') is central
+    assert REGION_CATALOG.get_reply_markup_for_region('Прочие поиски по РФ') is REGION_CATALOG.fed_dist_reply_markup
+    assert [x.text for x in central.keyboard[-1]] == [region_catalog.BACK_TO_START_BUTTON]
+
+
+def _save_folder(cur: cursor, folder_id: int, division_name: str) -> None:
+    division_id = randint(100000, 1000000)
+    cur.execute('INSERT INTO geo_divisions (division_id, division_name) VALUES (%s, %s);', (division_id, division_name))
+    cur.execute(
+        """INSERT INTO geo_folders (folder_id, division_id, folder_type, folder_subtype)
+        VALUES (%s, %s, 'searches', 'searches all');""",
+        (folder_id, division_id),
+    )
+
+
+def test_folder_names_reloaded_by_ttl():
+    folder_id, other_folder_id = randint(100000, 1000000), randint(100000, 1000000)
+    folder_names = FolderNames()
+
+    with sql_connect_by_psycopg2() as conn, conn.cursor() as cur:
+        _save_folder(cur, folder_id, 'Тестовая обл.')
+        assert folder_names.get(cur, folder_id) == 'Тестовая обл.'
+
+        _save_folder(cur, other_folder_id, 'Другая обл.')
+        assert folder_names.get(cur, other_folder_id) == ''
+
+        with patch.object(region_catalog, 'FOLDER_NAMES_TTL_SECONDS', -1):
+            assert folder_names.get(cur, other_folder_id) == 'Другая обл.'
@@ -0,0 +1,83 @@
+import uuid
+from unittest.mock import MagicMock, patch
+
+import sqlalchemy
+
+from _dependencies import title_recognition
+from _dependencies.commons import sqlalchemy_get_pool
+
+
+def test_recognize_titles_uses_cache():
+    db = sqlalchemy_get_pool(1, 1)
+    new_title = f'Пропал Иванов Иван, 10 лет, г. Москва {uuid.uuid4().hex[:6]}'
+    titles = [new_title, 'Жив Петров Петр, 48 лет, г. Москва', new_title]
+
+    first = title_recognition.recognize_titles(db, titles)
+
+    with patch.object(title_recognition, 'recognize_title') as recognize_title:
+        second = title_recognition.recognize_titles(db, titles)
+
+    recognize_title.assert_not_called()
+    assert second == first
+    assert first[0] == first[2]
+    assert first[0]['topic_type'] == 'search'
+
+
+def test_recognize_titles_expired_cache():
+    db = sqlalchemy_get_pool(1, 1)
+    title = f'Пропал Иванов Иван, 10 лет, г. Москва {uuid.uuid4().hex[:6]}'
+    first = title_recognition.recognize_titles(db, [title])
+
+    # recognized yesterday: the age could change since then
+    with db.connect() as conn:
+        conn.execute(
+            sqlalchemy.text("""UPDATE title_recognition_cache SET created = created - interval '1 day'
+                WHERE title_hash = :a;"""),
+            a=title_recognition.get_title_hash(title, None),
+        )
+    with patch.object(title_recognition, 'recognize_title', wraps=title_recognition.recognize_title) as recognize_title:
+        second = title_recognition.recognize_titles(db, [title])
+    recognize_title.assert_called_once()
+
+    with patch.object(title_recognition, 'recognize_title') as recognize_title:
+        third = title_recognition.recognize_titles(db, [title])
+
+    recognize_title.assert_not_called()
+    assert first == second == third
+
+
+def test_recognize_titles_cache_not_available():
+    db = MagicMock()
+    db.connect.side_effect = sqlalchemy.exc.OperationalError('SELECT', {}, Exception('no connection'))
+
+    with patch.object(title_recognition, 'recognize_title', return_value={'topic_type': 'event'}):
+        res = title_recognition.recognize_titles(db, ['foo', 'bar'])
+
+    assert res == [{'topic_type': 'event'}, {'topic_type': 'event'}]
+
+
+def test_recognize_titles_without_cache():
+    with patch.object(
+        title_recognition, 'recognize_title', side_effect=[ValueError('broken'), {'topic_type': 'event'}]
+    ):
+        res = title_recognition.recognize_titles(None, ['foo', 'bar'])
+
+    assert res == [None, {'topic_type': 'event'}]
+
+
+def test_compose_recognition_response():
+    assert title_recognition.compose_recognition_response('foo', {'topic_type': 'event'}) == {
+        'status': 'ok',
+        'title': 'foo',
+        'recognition': {'topic_type': 'event'},
+    }
+    assert title_recognition.compose_recognition_response('foo', {'topic_type': 'UNRECOGNIZED'})['status'] == 'fail'
+    assert title_recognition.compose_recognition_response('foo', None)['status'] == 'fail'
+
+
+def test_get_ner_spans():
+    spans = title_recognition.get_ner_spans(['Жив Петров Петр, г. Москва', ''])
+
+    assert [(x.start, x.stop, x.type) for x in spans[0]] == [(0, 15, 'PER'), (20, 26, 'LOC')]
+    assert spans[1] == []
+    assert title_recognition.get_ner_tagger() is title_recognition.get_ner_tagger()
@@ -29,6 +29,18 @@ class BaseFactory(SQLAlchemyFactory[T]):
 
 
 class NotifByUserFactory(BaseFactory[db_models.NotifByUser]):
+    message_id = None
+    message_content = 'test notification'
     message_params = '{"foo":1}'
     change_log_id = Use(BaseFactory.__random__.randint, 1, 100000000)
     message_type = 'text'
+
+
+class UserPrefAgeFactory(BaseFactory[db_models.UserPrefAge]):
+    id = None
+    user_id = Use(BaseFactory.__random__.randint, 1, 100000000)
+
+
+class UserPrefRadiusFactory(BaseFactory[db_models.UserPrefRadiu]):
+    id = None
+    user_id = Use(BaseFactory.__random__.randint, 1, 100000000)
@@ -122,6 +122,27 @@ class Feedback(Base):
     message_id = Column(Integer)
 
 
+class FirstPostCheckSchedule(Base):
+    __tablename__ = 'first_post_check_schedule'
+
+    search_id = Column(Integer, primary_key=True)
+    last_checked = Column(DateTime)
+    num_of_checks = Column(Integer, nullable=False, server_default=text('0'))
+    num_of_changes = Column(Integer, nullable=False, server_default=text('0'))
+    last_changed = Column(DateTime)
+
+
+class ForumFolderPageState(Base):
+    __tablename__ = 'forum_folder_page_state'
+
+    folder_id = Column(Integer, primary_key=True)
+    etag = Column(String)
+    last_modified = Column(String)
+    forumbg_hash = Column(String(64))
+    snapshot = Column(String)
+    updated = Column(DateTime(True))
+
+
 class ForumSummarySnapshot(Base):
     __tablename__ = 'forum_summary_snapshot'
 
@@ -146,6 +167,15 @@ class ForumSummarySnapshot(Base):
     topic_type_id = Column(Integer)
 
 
+class FunctionLease(Base):
+    __tablename__ = 'function_leases'
+
+    function_name = Column(String(30), primary_key=True)
+    holder_id = Column(BigInteger, nullable=False)
+    expires_at = Column(DateTime(True), nullable=False)
+    handoff_requested = Column(Boolean, nullable=False, server_default=text('false'))
+
+
 class FunctionsRegistry(Base):
     __tablename__ = 'functions_registry'
 
@@ -478,7 +508,7 @@ class SearchPlace(Base):
 class Search(Base):
     __tablename__ = 'searches'
 
-    search_forum_num = Column(Integer)
+    search_forum_num = Column(Integer, index=True)
     parsed_time = Column(DateTime)
     status_short = Column(String(255))
     forum_search_title = Column(String(255))
@@ -523,6 +553,14 @@ t_temp_my_devisions = Table(
 )
 
 
+class TitleRecognitionCache(Base):
+    __tablename__ = 'title_recognition_cache'
+
+    title_hash = Column(String(64), primary_key=True)
+    recognition = Column(String)
+    created = Column(DateTime)
+
+
 class UserAttribute(Base):
     __tablename__ = 'user_attributes'
 
@@ -589,6 +627,13 @@ class UserPrefAge(Base):
     period_max = Column(Integer)
 
 
+class UserPrefChange(Base):
+    __tablename__ = 'user_pref_changes'
+
+    user_id = Column(BigInteger, primary_key=True)
+    changed_at = Column(DateTime, nullable=False, index=True)
+
+
 class UserPrefRadiu(Base):
     __tablename__ = 'user_pref_radius'
 
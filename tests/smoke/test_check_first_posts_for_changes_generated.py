@@ -4,6 +4,11 @@ from check_first_posts_for_changes import main
 from tests.common import run_smoke
 
 
+def test_check_topics_in_parallel():
+    res = run_smoke(main.check_topics_in_parallel)
+    pass
+
+
 def test_define_topic_visibility_by_content():
     res = run_smoke(main.define_topic_visibility_by_content)
     pass
@@ -14,6 +19,16 @@ def test_define_topic_visibility_by_topic_id():
     pass
 
 
+def test_get_actual_first_post_hashes():
+    res = run_smoke(main.get_actual_first_post_hashes)
+    pass
+
+
+def test_get_base_check_interval():
+    res = run_smoke(main.get_base_check_interval)
+    pass
+
+
 def test_get_status_from_content_and_send_to_topic_management():
     res = run_smoke(main.get_status_from_content_and_send_to_topic_management)
     pass
@@ -29,6 +44,16 @@ def test_parse_search():
     pass
 
 
+def test_save_checks_to_schedule():
+    res = run_smoke(main.save_checks_to_schedule)
+    pass
+
+
+def test_schedule_topics_to_check():
+    res = run_smoke(main.schedule_topics_to_check)
+    pass
+
+
 def test_sql_connect():
     res = run_smoke(main.sql_connect)
     pass
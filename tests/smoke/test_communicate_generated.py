@@ -9,21 +9,11 @@ def test_add_user_sys_role():
     pass
 
 
-def test_check_if_new_user():
-    res = run_smoke(main.check_if_new_user)
-    pass
-
-
 def test_check_if_user_has_no_regions():
     res = run_smoke(main.check_if_user_has_no_regions)
     pass
 
 
-def test_check_onboarding_step():
-    res = run_smoke(main.check_onboarding_step)
-    pass
-
-
 def test_compose_full_message_on_list_of_searches():
     res = run_smoke(main.compose_full_message_on_list_of_searches)
     pass
@@ -89,6 +79,11 @@ def test_generate_yandex_maps_place_link():
     pass
 
 
+def test_get_all_buttons():
+    res = run_smoke(main.get_all_buttons)
+    pass
+
+
 def test_get_basic_update_parameters():
     res = run_smoke(main.get_basic_update_parameters)
     pass
@@ -104,23 +99,18 @@ def test_get_last_bot_message_id():
     pass
 
 
-def test_get_last_bot_msg():
-    res = run_smoke(main.get_last_bot_msg)
-    pass
-
-
 def test_get_last_user_inline_dialogue():
     res = run_smoke(main.get_last_user_inline_dialogue)
     pass
 
 
-def test_get_param_if_exists():
-    res = run_smoke(main.get_param_if_exists)
+def test_get_message_router():
+    res = run_smoke(main.get_message_router)
     pass
 
 
-def test_get_search_follow_mode():
-    res = run_smoke(main.get_search_follow_mode)
+def test_get_param_if_exists():
+    res = run_smoke(main.get_param_if_exists)
     pass
 
 
@@ -129,13 +119,8 @@ def test_get_the_update():
     pass
 
 
-def test_get_user_reg_folders_preferences():
-    res = run_smoke(main.get_user_reg_folders_preferences)
-    pass
-
-
-def test_get_user_role():
-    res = run_smoke(main.get_user_role)
+def test_get_user_state():
+    res = run_smoke(main.get_user_state)
     pass
 
 
@@ -154,11 +139,6 @@ def test_inline_processing():
     pass
 
 
-def test_leave_chat_async():
-    res = run_smoke(main.leave_chat_async)
-    pass
-
-
 def test_main():
     res = run_smoke(main.main)
     pass
@@ -184,11 +164,6 @@ def test_manage_radius():
     pass
 
 
-def test_prepare_message_for_leave_chat_async():
-    res = run_smoke(main.prepare_message_for_leave_chat_async)
-    pass
-
-
 def test_process_block_unblock_user():
     res = run_smoke(main.process_block_unblock_user)
     pass
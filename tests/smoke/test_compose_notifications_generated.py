@@ -129,6 +129,11 @@ def test_get_list_of_admins_and_testers():
     pass
 
 
+def test_get_recipients_index():
+    res = run_smoke(main.get_recipients_index)
+    pass
+
+
 def test_iterate_over_all_users():
     res = run_smoke(main.iterate_over_all_users)
     pass
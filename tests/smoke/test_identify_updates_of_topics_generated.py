@@ -9,13 +9,38 @@ def test_define_start_time_of_search():
     pass
 
 
+def test_get_conditional_headers():
+    res = run_smoke(main.get_conditional_headers)
+    pass
+
+
 def test_get_coordinates():
     res = run_smoke(main.get_coordinates)
     pass
 
 
-def test_get_last_api_call_time_from_psql():
-    res = run_smoke(main.get_last_api_call_time_from_psql)
+def test_get_addresses_to_geocode():
+    res = run_smoke(main.get_addresses_to_geocode)
+    pass
+
+
+def test_get_comment_url():
+    res = run_smoke(main.get_comment_url)
+    pass
+
+
+def test_get_folder_url():
+    res = run_smoke(main.get_folder_url)
+    pass
+
+
+def test_get_forumbg_hash():
+    res = run_smoke(main.get_forumbg_hash)
+    pass
+
+
+def test_get_geocoder_lease():
+    res = run_smoke(main.get_geocoder_lease)
     pass
 
 
@@ -24,6 +49,11 @@ def test_get_the_list_of_ignored_folders():
     pass
 
 
+def test_make_requests_session():
+    res = run_smoke(main.make_requests_session)
+    pass
+
+
 def test_parse_coordinates():
     res = run_smoke(main.parse_coordinates)
     pass
@@ -49,28 +79,18 @@ def test_profile_get_type_of_activity():
     pass
 
 
-def test_rate_limit_for_api():
-    res = run_smoke(main.rate_limit_for_api)
-    pass
-
-
-def test_read_snapshot_from_cloud_storage():
-    res = run_smoke(main.read_snapshot_from_cloud_storage)
-    pass
-
-
 def test_read_yaml_from_cloud_storage():
     res = run_smoke(main.read_yaml_from_cloud_storage)
     pass
 
 
-def test_save_function_into_register():
-    res = run_smoke(main.save_function_into_register)
+def test_save_comments():
+    res = run_smoke(main.save_comments)
     pass
 
 
-def test_save_last_api_call_time_to_psql():
-    res = run_smoke(main.save_last_api_call_time_to_psql)
+def test_save_function_into_register():
+    res = run_smoke(main.save_function_into_register)
     pass
 
 
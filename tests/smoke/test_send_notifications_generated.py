@@ -19,6 +19,11 @@ def test__process_logs_with_completed_sending():
     pass
 
 
+def test__save_sending_results():
+    res = run_smoke(main._save_sending_results)
+    pass
+
+
 def test_check_for_notifs_to_send():
     res = run_smoke(main.check_for_notifs_to_send)
     pass
@@ -4,11 +4,21 @@ from tests.common import run_smoke
 from title_recognize import main
 
 
+def test_get_db():
+    res = run_smoke(main.get_db)
+    pass
+
+
 def test_get_requested_title():
     res = run_smoke(main.get_requested_title)
     pass
 
 
+def test_get_requested_titles():
+    res = run_smoke(main.get_requested_titles)
+    pass
+
+
 def test_main():
     res = run_smoke(main.main)
     pass
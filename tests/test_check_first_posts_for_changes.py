@@ -1,8 +1,88 @@
+import datetime
+import math
+import random
+import time
 from unittest.mock import MagicMock
 
+import pytest
+import sqlalchemy
+
+from _dependencies.commons import sqlalchemy_get_pool
 from check_first_posts_for_changes import main
 
 
 def test_main():
     main.main(MagicMock(), 'context')
     assert True
+
+
+def test_get_check_priority():
+    # NO SMOKE TEST check_first_posts_for_changes.main.get_check_priority
+    now = datetime.datetime.now()
+    never_checked = main.Search(topic_id=1, rank=0)
+    stable = main.Search(topic_id=2, rank=0, last_checked=now - datetime.timedelta(minutes=1), num_of_checks=9)
+    often_changed = main.Search(
+        topic_id=3, rank=0, last_checked=now - datetime.timedelta(minutes=1), num_of_checks=9, num_of_changes=5
+    )
+
+    assert main.get_check_priority(never_checked, 20, now) == math.inf
+    assert main.get_check_priority(stable, 20, now) == pytest.approx(1)
+    assert main.get_check_priority(often_changed, 20, now) == pytest.approx(5)
+
+
+def test_schedule_topics_to_check():
+    now = datetime.datetime.now()
+    last_checked = now - datetime.timedelta(minutes=3)
+    # 40 topics, the newest first: 2 of them are due every minute, 2 – every 2 minutes etc., 4 checks per run
+    topics = [main.Search(topic_id=i, last_checked=last_checked, num_of_checks=10) for i in range(40)]
+    topics[4].num_of_changes = 10
+    topics[35].last_checked = None
+
+    scheduled = main.schedule_topics_to_check(topics, now)
+
+    assert main.get_base_check_interval(4, 40) == 4
+    assert [x.topic_id for x in scheduled] == [35, 4, 0, 1]
+    assert main.schedule_topics_to_check([], now) == []
+
+
+def test_check_topics_in_parallel():
+    results = list(main.check_topics_in_parallel(lambda x: x * 2, [1, 2, 3, 4, 5], time.monotonic() + 10))
+    assert results == [(1, 2), (2, 4), (3, 6), (4, 8), (5, 10)]
+
+    assert list(main.check_topics_in_parallel(lambda x: x * 2, [1, 2, 3], time.monotonic() - 1)) == []
+
+
+def test_save_checks_to_schedule():
+    topic_id = random.randint(1, 100000000)
+    with sqlalchemy_get_pool(1, 1).connect() as conn:
+        main.save_checks_to_schedule(conn, [(topic_id, True)])
+        main.save_checks_to_schedule(conn, [(topic_id, False)])
+        saved = conn.execute(
+            sqlalchemy.text(
+                """SELECT num_of_checks, num_of_changes, last_changed IS NOT NULL
+                FROM first_post_check_schedule WHERE search_id=:a;"""
+            ),
+            a=topic_id,
+        ).fetchone()
+        conn.execute(sqlalchemy.text('DELETE FROM first_post_check_schedule WHERE search_id=:a;'), a=topic_id)
+
+    assert tuple(saved) == (2, 1, True)
+
+
+def test_save_new_first_posts():
+    # NO SMOKE TEST check_first_posts_for_changes.main.save_new_first_posts
+    topic_id, other_topic_id = random.randint(1, 100000000), random.randint(1, 100000000)
+    with sqlalchemy_get_pool(1, 1).connect() as conn:
+        main.save_new_first_posts(conn, [(topic_id, 'hash1', 'content 1'), (other_topic_id, 'hash', 'content')])
+        main.save_new_first_posts(conn, [(topic_id, 'hash2', 'content 2')])
+
+        hashes = main.get_actual_first_post_hashes(conn, [topic_id, other_topic_id])
+        num_of_versions = conn.execute(
+            sqlalchemy.text('SELECT COUNT(*) FROM search_first_posts WHERE search_id=:a;'), a=topic_id
+        ).scalar()
+        conn.execute(
+            sqlalchemy.text('DELETE FROM search_first_posts WHERE search_id = ANY(:a);'), a=[topic_id, other_topic_id]
+        )
+
+    assert hashes == {topic_id: 'hash2', other_topic_id: 'hash'}
+    assert num_of_versions == 2
@@ -1,7 +1,10 @@
-from unittest.mock import MagicMock, Mock
+from datetime import date
+from random import randint
+from unittest.mock import MagicMock, Mock, patch
 
 import pytest
 from psycopg2.extensions import cursor
+from telegram import Chat, Message, Update, User
 
 from _dependencies.commons import get_app_config, sql_connect_by_psycopg2
 from communicate import main
@@ -81,6 +84,66 @@ def test_save_onboarding_step():
     assert res is None
 
 
+def test_process_update_saves_dialogs(cur):
+    user_id = randint(10**9, 2 * 10**9)
+    message = Message(
+        message_id=1,
+        date=date.today(),
+        chat=Chat(id=user_id, type='private'),
+        from_user=User(id=user_id, first_name='test', is_bot=False),
+        text='foo',
+    )
+
+    with (
+        patch.object(main, 'make_api_call', MagicMock(return_value=MagicMock(ok=True))),
+        patch.object(main, 'process_sending_message_async'),
+    ):
+        main.process_update(Update(update_id=1, message=message))
+
+    # written at the end of the update, nothing is left in the buffer
+    cur.execute("""SELECT author, message_text FROM dialogs WHERE user_id=%s ORDER BY id;""", (user_id,))
+    dialogs = cur.fetchall()
+    assert dialogs[0] == ('user', 'foo')
+    assert [x[0] for x in dialogs[1:]] == ['bot']
+    assert main.get_dialogs_buffer()._rows == []
+
+
+def test_get_user_state(cur):
+    # NO SMOKE TEST communicate.main.get_user_state
+    user_id = 990001
+    for table in ('users', 'user_onboarding', 'user_regional_preferences', 'msg_from_bot'):
+        cur.execute(f'DELETE FROM {table} WHERE user_id=%s;', (user_id,))
+
+    user = main.get_user_state(cur, user_id)
+    assert user.is_new
+    assert (user.onboarding_step_id, user.onboarding_step_name) == (0, 'start')
+
+    cur.execute("""INSERT INTO users (user_id, role) VALUES (%s, 'member');""", (user_id,))
+    user = main.get_user_state(cur, user_id)
+    assert not user.is_new
+    assert user.role == 'member'
+    assert user.onboarding_step_id == 99
+
+    cur.execute(
+        """INSERT INTO user_onboarding (user_id, step_id, step_name) VALUES (%s, 10, 'role_set'), (%s, 20, 'moscow_replied');""",
+        (user_id, user_id),
+    )
+    cur.execute(
+        """INSERT INTO user_regional_preferences (user_id, forum_folder_num) VALUES (%s, 276), (%s, 41);""",
+        (user_id, user_id),
+    )
+    cur.execute("""INSERT INTO msg_from_bot (user_id, msg_type) VALUES (%s, 'radius_input');""", (user_id,))
+    main.set_search_follow_mode(cur, user_id, True)
+    main.save_last_user_inline_dialogue(cur, user_id, 55)
+
+    user = main.get_user_state(cur, user_id)
+    assert (user.onboarding_step_id, user.onboarding_step_name) == (20, 'moscow_replied')
+    assert sorted(user.regions) == [41, 276]
+    assert user.bot_request == 'radius_input'
+    assert user.search_follow_mode
+    assert user.inline_message_ids == [55]
+
+
 def test_send_message_to_api():
     # NO SMOKE TEST communicate.main.send_message_to_api
     message = 'foo'
@@ -96,3 +159,96 @@ def test_send_callback_answer_to_api():
     res = main.send_callback_answer_to_api('token', 1, message)
 
     assert res == 'failed'
+
+
+def _get_dialogue(
+    got_message: str,
+    user_regions: tuple[int, ...] = (1,),
+    onboarding_step_id: int = 80,
+    got_callback: dict | None = None,
+    bot_request_bfr_usr_msg: str | None = None,
+) -> main.Dialogue:
+    user = main.UserState(
+        is_new=False,
+        role='member',
+        onboarding_step_id=onboarding_step_id,
+        onboarding_step_name=None,
+        regions=list(user_regions),
+        bot_request=bot_request_bfr_usr_msg,
+        search_follow_mode=False,
+        inline_message_ids=[],
+    )
+    return main.Dialogue(
+        cur=MagicMock(),
+        user_id=1,
+        username='testuser',
+        got_message=got_message,
+        got_hash=got_callback.get('hash') if got_callback else None,
+        got_callback=got_callback,
+        callback_query_id=None,
+        callback_query=None,
+        bot_token='token',
+        user=user,
+    )
+
+
+@pytest.mark.parametrize(
+    'got_message, handler',
+    [
+        ('/start', main.Dialogue.reply_on_start),
+        ('в начало', main.Dialogue.reply_on_back_to_start),
+        ('ADMIN', main.Dialogue.reply_on_admin_menu),
+        ('Москва и МО: Активные Поиски', main.Dialogue.reply_on_region),
+        ('выбрать другой Федеральный Округ', main.Dialogue.reply_on_region_menu),
+        ('✅ учебные поиски', main.Dialogue.reply_on_topic_type),
+        ('foo', main.Dialogue.reply_on_unknown_command),
+    ],
+)
+def test_route_by_text(got_message: str, handler):
+    assert main.get_message_router().route(_get_dialogue(got_message)) == handler
+
+
+def test_route_during_onboarding():
+    dialogue = _get_dialogue('выбрать другой Федеральный Округ', onboarding_step_id=20)
+
+    assert main.get_message_router().route(dialogue) == main.Dialogue.reply_on_finished_onboarding
+
+
+@pytest.mark.parametrize(
+    'got_message, handler',
+    [
+        ('/start', main.Dialogue.reply_on_start),
+        ('я ищу человека', main.Dialogue.reply_on_role),
+        ('настроить бот', main.Dialogue.reply_on_settings),
+        ('🔥Карта Поисков 🔥', main.Dialogue.reply_on_missing_region),
+        ('foo', main.Dialogue.reply_on_missing_region),
+    ],
+)
+def test_route_without_regions(got_message: str, handler):
+    dialogue = _get_dialogue(got_message, user_regions=())
+
+    assert main.get_message_router().route(dialogue) == handler
+
+
+@pytest.mark.parametrize(
+    'got_message, handler',
+    [
+        ('в начало', main.Dialogue.reply_on_radius),
+        ('🔥Карта Поисков 🔥', main.Dialogue.reply_on_map),
+    ],
+)
+def test_route_by_bot_request(got_message: str, handler):
+    dialogue = _get_dialogue(got_message, bot_request_bfr_usr_msg='radius_input')
+
+    assert main.get_message_router().route(dialogue) == handler
+
+
+def test_route_by_callback():
+    router = main.get_message_router()
+    b = main.get_all_buttons()
+
+    dialogue = _get_dialogue('foo', got_callback={'action': 'search_follow_mode_on'})
+    assert router.route(dialogue) == main.Dialogue.reply_on_search_follow_mode
+
+    dialogue = _get_dialogue('foo', got_callback={'action': 'on', 'hash': b.topic_types.training.hash})
+    assert router.route(dialogue) == main.Dialogue.reply_on_topic_type
@@ -1,10 +1,14 @@
+import random
 from datetime import datetime, timedelta
-from unittest.mock import MagicMock
+from unittest.mock import MagicMock, patch
 
 import pytest
+import sqlalchemy
 
+from _dependencies.commons import sqlalchemy_get_pool
 from compose_notifications import main
 from tests.common import get_event_with_data
+from tests.factories.db_factories import UserPrefAgeFactory, UserPrefRadiusFactory
 
 
 @pytest.fixture
@@ -19,6 +23,7 @@ def line() -> main.LineInChangeLog:
     )
 
 
+@pytest.mark.xdist_group(name='compose_notifications')
 def test_main():
     # NO SMOKE TEST compose_notifications.main.main
     # TODO paste something to change_log and users
@@ -37,3 +42,233 @@ def test_enrich_new_record_with_emoji(line: main.LineInChangeLog):
     # NO SMOKE TEST compose_notifications.main.enrich_new_record_with_emoji
     res = main.enrich_new_record_with_emoji(line)
     assert res.topic_emoji
+
+
+def test_calc_distances_and_directions():
+    # NO SMOKE TEST compose_notifications.main.calc_distances_and_directions
+    moscow, saint_petersburg, kazan = [55.7558, 37.6173], [59.9343, 30.3351], [55.7963, 49.1088]
+
+    distances, directions = main.calc_distances_and_directions([saint_petersburg, kazan], [moscow, kazan])
+
+    assert distances.shape == (2, 2)
+    assert 630 < distances[0, 0] < 640
+    assert distances[1, 1] == 0
+    assert main.DIRECTION_ARROWS[directions[0, 0]] == '&#8598;&#xFE0E;'  # Saint Petersburg is north-west of Moscow
+    assert main.DIRECTION_ARROWS[directions[1, 0]] == '&#8594;&#xFE0E;'  # Kazan is east of Moscow
+
+
+def test_define_dist_and_dir_for_users():
+    # NO SMOKE TEST compose_notifications.main.define_dist_and_dir_for_users
+    users = [
+        main.User(user_id=1, user_latitude='55.7558', user_longitude='37.6173'),
+        main.User(user_id=2),
+    ]
+
+    res = main.define_dist_and_dir_for_users('59.9343', '30.3351', users)
+
+    assert set(res) == {1}
+    assert res[1] == main.define_dist_and_dir_to_search('59.9343', '30.3351', '55.7558', '37.6173')
+
+
+def test_enrich_users_list_with_age_periods_and_radius():
+    user_with_prefs = main.User(user_id=UserPrefAgeFactory.__random__.randint(1, 100000000))
+    user_without_prefs = main.User(user_id=UserPrefAgeFactory.__random__.randint(1, 100000000))
+    UserPrefAgeFactory.create_sync(user_id=user_with_prefs.user_id, period_min=0, period_max=6)
+    UserPrefAgeFactory.create_sync(user_id=user_with_prefs.user_id, period_min=60, period_max=80)
+    UserPrefRadiusFactory.create_sync(user_id=user_with_prefs.user_id, radius=100)
+
+    with sqlalchemy_get_pool(1, 1).connect() as conn:
+        list_of_users = main.enrich_users_list_with_age_periods(conn, [user_with_prefs, user_without_prefs])
+        list_of_users = main.enrich_users_list_with_radius(conn, list_of_users)
+
+    assert list_of_users == [user_with_prefs, user_without_prefs]
+    assert sorted(user_with_prefs.age_periods) == [[0, 6], [60, 80]]
+    assert user_with_prefs.radius == 100
+    assert user_without_prefs.age_periods == []
+    assert user_without_prefs.radius is None
+
+
+def test_save_notifications_to_notif_by_user():
+    # NO SMOKE TEST compose_notifications.main.save_notifications_to_notif_by_user
+    change_log_id = UserPrefAgeFactory.__random__.randint(1, 100000000)
+    notifications = [
+        {
+            'mailing_id': None,
+            'user_id': user_id,
+            'message_content': '<b>text</b>',
+            'message_text': 'text',
+            'message_type': message_type,
+            'message_params': {'parse_mode': 'HTML'},
+            'message_group_id': user_id,
+            'change_log_id': change_log_id,
+            'created': datetime.now(),
+        }
+        for user_id in range(3)
+        for message_type in ('text', 'coords')
+    ]
+
+    with (
+        patch.object(main, 'NOTIF_BY_USER_INSERT_BATCH_SIZE', 4),
+        sqlalchemy_get_pool(1, 1).connect() as conn,
+    ):
+        main.save_notifications_to_notif_by_user(conn, notifications)
+        saved = conn.execute(
+            sqlalchemy.text('SELECT user_id, message_type, message_params FROM notif_by_user WHERE change_log_id=:a'),
+            a=change_log_id,
+        ).fetchall()
+        conn.execute(sqlalchemy.text('DELETE FROM notif_by_user WHERE change_log_id=:a'), a=change_log_id)
+
+    assert len(saved) == 6
+    assert {(x[0], x[1]) for x in saved} == {(u, t) for u in range(3) for t in ('text', 'coords')}
+    assert 'HTML' in saved[0][2]
+
+
+def test_recipients_index():
+    user_id = UserPrefAgeFactory.__random__.randint(1, 100000000)
+    folder = UserPrefAgeFactory.__random__.randint(100000, 200000)
+    recipients_index = main.RecipientsIndex()
+
+    with sqlalchemy_get_pool(1, 1).connect() as conn:
+        conn.execute(
+            sqlalchemy.text('INSERT INTO users (user_id, username_telegram) VALUES (:a, :b);'), a=user_id, b='x'
+        )
+        conn.execute(
+            sqlalchemy.text('INSERT INTO user_preferences (user_id, preference, pref_id) VALUES (:a, :b, 0);'),
+            a=user_id,
+            b='new_searches',
+        )
+        for user_folder in (folder, folder + 1):
+            conn.execute(
+                sqlalchemy.text('INSERT INTO user_regional_preferences (user_id, forum_folder_num) VALUES (:a, :b);'),
+                a=user_id,
+                b=user_folder,
+            )
+        conn.execute(
+            sqlalchemy.text('INSERT INTO user_pref_topic_type (user_id, topic_type_id) VALUES (:a, 0);'), a=user_id
+        )
+
+        recipients_index.refresh(conn)
+        assert [x.user_id for x in recipients_index.get_recipients(folder, 0, 0)] == [user_id]
+        assert recipients_index.get_recipients(folder, 1, 0) == []
+        assert recipients_index.get_recipients(folder, 0, 1) == []
+        assert recipients_index.get_recipients(folder + 2, 0, 0) == []
+
+        # change made by communicate is seen on the next refresh
+        conn.execute(sqlalchemy.text('UPDATE user_preferences SET pref_id=30 WHERE user_id=:a;'), a=user_id)
+        conn.execute(
+            sqlalchemy.text('INSERT INTO user_pref_changes (user_id, changed_at) VALUES (:a, now());'), a=user_id
+        )
+        recipients_index.refresh(conn)
+
+        recipients = recipients_index.get_recipients(folder, 1, 0)
+        assert [x.user_id for x in recipients] == [user_id]
+        assert recipients[0].folders == (folder, folder + 1) or recipients[0].folders == (folder + 1, folder)
+
+
+def test_compose_users_list_from_users(line: main.LineInChangeLog):
+    recipient = main.RecipientPrefs(
+        user_id=1,
+        username_telegram='x',
+        role='member',
+        notif_pref_ids=frozenset([30]),
+        folders=(1, 2),
+        topic_type_ids=frozenset([0]),
+        latitude='55.7',
+        longitude='37.6',
+    )
+    recipients_index = MagicMock()
+    recipients_index.get_recipients.return_value = [recipient]
+
+    with (
+        patch.object(main, 'get_recipients_index', return_value=recipients_index),
+        sqlalchemy_get_pool(1, 1).connect() as conn,
+    ):
+        list_of_users = main.compose_users_list_from_users(conn, line)
+
+    assert list_of_users == [
+        main.User(
+            user_id=1,
+            username_telegram='x',
+            user_latitude='55.7',
+            user_longitude='37.6',
+            user_role='member',
+            user_in_multi_folders=True,
+            all_notifs=True,
+            user_new_search_notifs=0,
+        )
+    ]
+
+
+@pytest.mark.xdist_group(name='compose_notifications')
+def test_compose_new_records_from_change_log_skips_locked():
+    pool = sqlalchemy_get_pool(2, 2)
+    with pool.connect() as conn_1, pool.connect() as conn_2:
+        for _ in range(4):
+            conn_1.execute(
+                sqlalchemy.text('INSERT INTO change_log (search_forum_num, change_type) VALUES (:a, 3);'),
+                a=random.randint(1, 100000000),
+            )
+
+        with conn_1.begin(), conn_2.begin():
+            claimed_1 = main.compose_new_records_from_change_log(conn_1, 2)
+            claimed_2 = main.compose_new_records_from_change_log(conn_2, 2)
+
+            assert len(claimed_1) == 2
+            assert claimed_2
+            assert not {x.change_id for x in claimed_1} & {x.change_id for x in claimed_2}
+
+            for conn, claimed in ((conn_1, claimed_1), (conn_2, claimed_2)):
+                conn.execute(
+                    sqlalchemy.text("UPDATE change_log SET notification_sent='y' WHERE id = ANY(:a);"),
+                    a=[x.change_id for x in claimed],
+                )
+
+
+def compose_with_swallowed_sql_error(conn, admins_list, new_record):
+    try:
+        conn.execute(sqlalchemy.text('SELECT 1/0;'))
+    except Exception:
+        pass
+
+
+@pytest.mark.xdist_group(name='compose_notifications')
+@pytest.mark.parametrize(
+    'compose_side_effect', [ValueError('broken record'), compose_with_swallowed_sql_error], ids=['raised', 'swallowed']
+)
+def test_main_marks_failed_record(compose_side_effect):
+    with sqlalchemy_get_pool(1, 1).connect() as conn:
+        change_log_id = conn.execute(
+            sqlalchemy.text('INSERT INTO change_log (search_forum_num, change_type) VALUES (:a, 3) RETURNING id;'),
+            a=random.randint(1, 100000000),
+        ).scalar()
+
+    data = get_event_with_data({'foo': 1, 'triggered_by_func_id': '1'})
+    with (
+        patch.object(main, 'compose_notifications_for_record', side_effect=compose_side_effect),
+        patch.object(main, 'notify_admin') as notify_admin,
+        patch.object(main, 'publish_to_pubsub'),
+    ):
+        main.main(data, 'context')
+
+    with sqlalchemy_get_pool(1, 1).connect() as conn:
+        notification_sent = conn.execute(
+            sqlalchemy.text('SELECT notification_sent FROM change_log WHERE id=:a;'), a=change_log_id
+        ).scalar()
+
+    assert notification_sent == 'e'
+    notify_admin.assert_called()
+
+
+def test_compose_notifications_for_record(line: main.LineInChangeLog):
+    # NO SMOKE TEST compose_notifications.main.compose_notifications_for_record
+    line.change_type = 3
+    line.change_id = 1
+    line.processed = None
+
+    with patch.object(
+        main, 'iterate_over_all_users', side_effect=lambda conn, admins, record, users: record
+    ) as iterate:
+        with sqlalchemy_get_pool(1, 1).connect() as conn:
+            main.compose_notifications_for_record(conn, [], line)
+
+    iterate.assert_called_once()
@@ -1,13 +1,15 @@
+import random
+from datetime import datetime
 from pathlib import Path
 from unittest.mock import Mock, patch
 
 import pytest
 import requests
+import sqlalchemy
 
 from _dependencies.commons import sqlalchemy_get_pool
 from identify_updates_of_topics import main
 from tests.common import get_event_with_data
-from title_recognize.main import recognize_title
 
 
 @pytest.fixture
@@ -23,13 +25,8 @@ def patch_google_cloud_storage():
 
 @pytest.fixture(autouse=True)
 def common_patches():
-    def fake_api_call(function: str, data: dict):
-        reco_data = recognize_title(data['title'], None)
-        return {'status': 'ok', 'recognition': reco_data}
-
     with (
         patch.object(main, 'requests_session', requests.Session()),
-        patch.object(main, 'make_api_call', fake_api_call),
         # patch.object(main, 'parse_search_profile', Mock(return_value='foo')),
         patch('compose_notifications.main.check_if_need_compose_more'),  # avoid recursion in tests
     ):
@@ -53,15 +50,95 @@ def test_main():
 
 def test_get_cordinates(db):
     data = 'Москва, Ярославское шоссе 123'
-    with patch('identify_updates_of_topics.main.rate_limit_for_api'):
+    with patch.object(main, 'get_geocoder_lease'):
         res = main.get_coordinates(db, data)
     assert res == (None, None)
 
 
-def test_rate_limit_for_api(db):
-    data = 'Москва, Ярославское шоссе 123'
+def test_get_coordinates_many(db):
+    # NO SMOKE TEST identify_updates_of_topics.main.get_coordinates_many
+    suffix = random.randint(1, 100000000)
+    address_ok, address_fail = f'Город {suffix}', f'Деревня {suffix}'
+    with db.connect() as conn:
+        conn.execute(
+            sqlalchemy.text(
+                """INSERT INTO geocoding (address, status, latitude, longitude, geocoder)
+                VALUES (:a, 'ok', 55.5, 37.5, 'osm'), (:b, 'fail', NULL, NULL, 'yandex');"""
+            ),
+            a=address_ok,
+            b=address_fail,
+        )
+
+    with patch.object(main, 'get_geocoder_lease') as get_geocoder_lease:
+        res = main.get_coordinates_many(db, [address_ok, address_fail, address_ok])
+
+    get_geocoder_lease.return_value.wait.assert_not_called()
+    assert res == {address_ok: (55.5, 37.5), address_fail: (None, None)}
+
+    with db.connect() as conn:
+        conn.execute(sqlalchemy.text('DELETE FROM geocoding WHERE address = ANY(:a);'), a=[address_ok, address_fail])
+
+    # the second tier is not needed any more: results are kept in memory
+    with patch.object(main, 'get_geocoder_lease') as get_geocoder_lease:
+        res = main.get_coordinates_many(db, [address_ok])
+
+    get_geocoder_lease.return_value.wait.assert_not_called()
+    assert res == {address_ok: (55.5, 37.5)}
+
+
+def test_remember_geolocation():
+    # NO SMOKE TEST identify_updates_of_topics.main.remember_geolocation
+    with (
+        patch.object(main, 'geocoding_memory_cache', main.OrderedDict()),
+        patch.object(main, 'GEOCODING_MEMORY_CACHE_SIZE', 2),
+    ):
+        main.remember_geolocation('a', ('ok', 1, 1, 'osm'))
+        main.remember_geolocation('b', ('ok', 2, 2, 'osm'))
+        main.remember_geolocation('a', ('ok', 1, 1, 'osm'))
+        main.remember_geolocation('c', ('fail', None, None, 'yandex'))
+
+        assert list(main.geocoding_memory_cache) == ['a', 'c']
+
+
+def test_get_addresses_to_geocode():
+    responses = [
+        {'status': 'ok', 'recognition': {'topic_type': 'search', 'locations': [{'address': 'Москва'}]}},
+        {'status': 'ok', 'recognition': {'topic_type': 'info', 'locations': [{'address': 'Тверь'}]}},
+        {'status': 'fail'},
+        None,
+    ]
+    assert main.get_addresses_to_geocode(responses) == ['Москва']
+
 
-    main.rate_limit_for_api(db, data)
+def test_geocoder_lease_reserve(db):
+    # NO SMOKE TEST identify_updates_of_topics.main.GeocoderLease.reserve
+    geocoder = f'test_{random.randint(1, 100000000)}'
+    with db.connect() as conn:
+        conn.execute(
+            sqlalchemy.text('INSERT INTO geocode_last_api_call (geocoder, timestamp) VALUES (:g, NOW());'), g=geocoder
+        )
+
+    first_lease, second_lease = main.GeocoderLease(geocoder, 10), main.GeocoderLease(geocoder, 10)
+    first_lease.reserve(db, 3)
+    second_lease.reserve(db, 2)
+
+    # the second batch starts only after the slots of the first one
+    assert 0 < first_lease._first_call_at < second_lease._first_call_at
+    assert second_lease._first_call_at - first_lease._first_call_at == pytest.approx(0.3, abs=0.05)
+
+    with db.connect() as conn:
+        conn.execute(sqlalchemy.text('DELETE FROM geocode_last_api_call WHERE geocoder=:g;'), g=geocoder)
+
+
+def test_geocoder_lease_wait():
+    # NO SMOKE TEST identify_updates_of_topics.main.GeocoderLease.wait
+    lease = main.GeocoderLease('osm', 1)
+    lease._first_call_at = main.time.monotonic() + 5
+
+    with patch.object(main.time, 'sleep') as sleep:
+        lease.wait()
+
+    assert sleep.call_args[0][0] == pytest.approx(5, abs=0.1)
 
 
 def test_get_the_list_of_ignored_folders():
@@ -90,6 +167,82 @@ def test_process_one_folder(db, mock_http_get):
     assert update_trigger is True
 
 
+def test_process_one_folder_not_changed(db):
+    folder_page = Mock(status_code=200, headers={}, content=Path('tests/fixtures/forum_folder_276.html').read_bytes())
+    folder_state = main.FolderPageState(folder_id=276, forumbg_hash=main.get_forumbg_hash(folder_page.content))
+
+    with patch.object(main, 'parse_one_folder') as parse_one_folder:
+        update_trigger, changed_ids = main.process_one_folder(db, 276, folder_page, folder_state)
+        main.process_one_folder(db, 276, Mock(status_code=304), folder_state)
+
+    parse_one_folder.assert_not_called()
+    assert update_trigger is False
+    assert changed_ids == []
+
+
+def test_get_forumbg_hash():
+    page = b'<div class="forumbg"><a href="./viewtopic.php?t=1&amp;sid=0123456789abcdef0123456789abcdef">1</a></div>'
+    page_without_sid = b'<div class="forumbg"><a href="./viewtopic.php?t=1">1</a></div>'
+
+    assert main.get_forumbg_hash(page) == main.get_forumbg_hash(page_without_sid)
+    assert main.get_forumbg_hash(page) != main.get_forumbg_hash(page_without_sid.replace(b't=1', b't=2'))
+    assert main.get_forumbg_hash(b'<div class="other"></div>') is None
+
+
+def test_get_forumbg_hash_ignores_views_and_last_post():
+    page = Path('tests/fixtures/forum_folder_276.html').read_bytes()
+    page_viewed = page.replace(b'14917 <dfn>', b'14918 <dfn>')
+    page_with_last_post_changed = page.replace(b'2025-01-14T06:36:15', b'2025-01-14T07:00:00')
+    page_replied = page.replace(b'<dd class="posts">29 <dfn>', b'<dd class="posts">30 <dfn>')
+
+    assert main.get_forumbg_hash(page_viewed) == main.get_forumbg_hash(page)
+    assert main.get_forumbg_hash(page_with_last_post_changed) == main.get_forumbg_hash(page)
+    assert main.get_forumbg_hash(page_replied) != main.get_forumbg_hash(page)
+
+
+def test_save_folder_page_state(db):
+    # NO SMOKE TEST identify_updates_of_topics.main.save_folder_page_state
+    # NO SMOKE TEST identify_updates_of_topics.main.get_folder_page_states
+    folder_id = random.randint(1000000, 100000000)
+    main.save_folder_page_state(db, main.FolderPageState(folder_id=folder_id, etag='"1"', snapshot='a,1'))
+    main.save_folder_page_state(db, main.FolderPageState(folder_id=folder_id, forumbg_hash='hash', snapshot='a,2'))
+
+    folder_states = main.get_folder_page_states(db, [folder_id])
+
+    assert folder_states == {folder_id: main.FolderPageState(folder_id=folder_id, forumbg_hash='hash', snapshot='a,2')}
+    assert main.get_conditional_headers(folder_states[folder_id]) == {}
+    assert main.get_conditional_headers(main.FolderPageState(folder_id=folder_id, etag='"1"')) == {
+        'If-None-Match': '"1"'
+    }
+
+
+def test_fetch_forum_pages(mock_http_get):
+    # NO SMOKE TEST identify_updates_of_topics.main.fetch_forum_pages
+    def fake_get(url, **kwargs):
+        if url.endswith('f=2'):
+            raise requests.exceptions.Timeout()
+        return Mock(url=url)
+
+    mock_http_get.side_effect = fake_get
+    urls = [main.get_folder_url(folder) for folder in (1, 2, 3)]
+
+    pages = main.fetch_forum_pages(urls)
+
+    assert list(pages) == urls
+    assert pages[urls[0]].url == urls[0]
+    assert pages[urls[1]] is None
+    assert pages[urls[2]].url == urls[2]
+
+
+def test_parse_one_folder_with_downloaded_page(db, mock_http_get):
+    folder_page = Mock(content=Path('tests/fixtures/forum_folder_276.html').read_bytes())
+
+    summaries, details = main.parse_one_folder(db, 276, folder_page)
+
+    assert main.get_folder_url(276) not in [x.args[0] for x in mock_http_get.call_args_list if x.args]
+    assert len(summaries) == 2
+
+
 def test_main_full_scenario(mock_http_get):
     # NO SMOKE TEST identify_updates_of_topics.main.main
 
@@ -106,11 +259,6 @@ def test_set_cloud_storage():
     main.set_cloud_storage('name', 1)
 
 
-def test_write_snapshot_to_cloud_storage():
-    # NO SMOKE TEST identify_updates_of_topics.main.write_snapshot_to_cloud_storage
-    main.write_snapshot_to_cloud_storage('name', b'some', 1)
-
-
 def test_parse_one_comment(db, mock_http_get):
     # NO SMOKE TEST identify_updates_of_topics.main.parse_one_comment
     mock_http_get.return_value.content = Path('tests/fixtures/forum_comment.html').read_bytes()
@@ -119,6 +267,41 @@ def test_parse_one_comment(db, mock_http_get):
     assert there_are_inforg_comments
 
 
+def test_parse_comments_page():
+    # NO SMOKE TEST identify_updates_of_topics.main.parse_comments_page
+    # NO SMOKE TEST identify_updates_of_topics.main.parse_comment_block
+    comment_page = Mock(content=Path('tests/fixtures/forum_comment.html').read_bytes())
+
+    comments = main.parse_comments_page(comment_page, 1, 10)
+
+    assert [x.comment_num for x in comments] == [10, 11, 12]
+    assert comments[0].comment_url == main.get_comment_url(1, 10)
+    assert comments[0].is_inforg
+    assert all(x.text for x in comments)
+
+
+def test_ingest_new_comments(db, mock_http_get):
+    # NO SMOKE TEST identify_updates_of_topics.main.ingest_new_comments
+    # there are 3 comments on the page
+    mock_http_get.return_value.content = Path('tests/fixtures/forum_comment.html').read_bytes()
+    topic_id = random.randint(1000000, 100000000)
+
+    with db.connect() as conn:
+        inforg_topic_ids = main.ingest_new_comments(conn, {topic_id: (1, 5)})
+        saved_comments = conn.execute(
+            sqlalchemy.text('SELECT comment_num FROM comments WHERE search_forum_num = :a ORDER BY comment_num;'),
+            a=topic_id,
+        ).fetchall()
+        conn.execute(sqlalchemy.text('DELETE FROM comments WHERE search_forum_num = :a;'), a=topic_id)
+
+    assert [x.args[0] for x in mock_http_get.call_args_list] == [
+        main.get_comment_url(topic_id, 1),
+        main.get_comment_url(topic_id, 4),
+    ]
+    assert [x[0] for x in saved_comments] == [1, 2, 3, 4, 5]
+    assert inforg_topic_ids == {topic_id}
+
+
 def test_parse_search_profile(db, mock_http_get):
     # NO SMOKE TEST identify_updates_of_topics.main.parse_search_profile
     mock_http_get.return_value.content = Path('tests/fixtures/forum_comment.html').read_bytes()
@@ -132,6 +315,77 @@ def test_update_change_log_and_searches(db):
     pass
 
 
+def test_update_change_log_and_searches_diff(db):
+    folder_id = random.randint(100000, 100000000)
+    new_topic, changed_topic, unchanged_topic, moved_topic = [folder_id * 10 + i for i in range(4)]
+    now = datetime.now()
+    snapshot = [
+        (new_topic, 'Пропал Новый', 0, 'Ищем'),
+        (changed_topic, 'Пропал Изменённый', 5, 'Найден'),
+        (unchanged_topic, 'Пропал Старый', 1, 'Ищем'),
+        (moved_topic, 'Пропал Перемещённый', 2, 'Ищем'),
+    ]
+    with db.connect() as conn:
+        for topic_id, title, replies, status in snapshot:
+            conn.execute(
+                sqlalchemy.text(
+                    """INSERT INTO forum_summary_snapshot (search_forum_num, parsed_time, forum_search_title,
+                    num_of_replies, forum_folder_id, status, topic_type_id) VALUES (:a, :b, :c, :d, :e, :f, 0);"""
+                ),
+                a=topic_id,
+                b=now,
+                c=title,
+                d=replies,
+                e=folder_id,
+                f=status,
+            )
+        for topic_id, title, replies, status, folder in [
+            (changed_topic, 'Пропал Изменённый', 3, 'Ищем', folder_id),
+            (unchanged_topic, 'Пропал Старый', 1, 'Ищем', folder_id),
+            (moved_topic, 'Пропал Перемещённый', 2, 'Ищем', folder_id + 1),
+        ]:
+            conn.execute(
+                sqlalchemy.text(
+                    """INSERT INTO searches (search_forum_num, forum_search_title, num_of_replies, status,
+                    forum_folder_id) VALUES (:a, :b, :c, :d, :e);"""
+                ),
+                a=topic_id,
+                b=title,
+                c=replies,
+                d=status,
+                e=folder,
+            )
+
+    with (
+        patch.object(main, 'parse_search_profile', Mock(return_value='foo')),
+        patch.object(main, 'ingest_new_comments', Mock(return_value={changed_topic})) as ingest_new_comments,
+    ):
+        change_log_ids = main.update_change_log_and_searches(db, folder_id)
+
+    with db.connect() as conn:
+        changes = conn.execute(
+            sqlalchemy.text('SELECT search_forum_num, change_type FROM change_log WHERE id = ANY(:a);'),
+            a=change_log_ids,
+        ).fetchall()
+        conn.execute(sqlalchemy.text('DELETE FROM change_log WHERE id = ANY(:a);'), a=change_log_ids)
+        searches = conn.execute(
+            sqlalchemy.text(
+                """SELECT search_forum_num, num_of_replies, status, forum_folder_id FROM searches
+                WHERE search_forum_num = ANY(:a);"""
+            ),
+            a=[x[0] for x in snapshot],
+        ).fetchall()
+
+    assert sorted(changes) == sorted([(new_topic, 0), (changed_topic, 1), (changed_topic, 3), (changed_topic, 4)])
+    assert ingest_new_comments.call_args.args[1] == {changed_topic: (4, 5)}
+    assert sorted(searches) == [
+        (new_topic, 0, 'Ищем', folder_id),
+        (changed_topic, 5, 'Найден', folder_id),
+        (unchanged_topic, 1, 'Ищем', folder_id),
+        (moved_topic, 2, 'Ищем', folder_id + 1),
+    ]
+
+
 def test_visibility_check():
     # NO SMOKE TEST identify_updates_of_topics.main.visibility_check
     response = Mock()
@@ -12,5 +12,5 @@ def test_nested_async():
 
 
 async def inner():
-    process_sending_message_async(2, '')
+    process_sending_message_async(2, {'text': 'foo'})
     pass
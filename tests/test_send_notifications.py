@@ -1,4 +1,6 @@
 import datetime
+import time
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import suppress
 from random import randint
 from unittest.mock import MagicMock, patch
@@ -7,6 +9,7 @@ import pytest
 from polyfactory.factories import DataclassFactory
 
 from _dependencies.commons import sql_connect_by_psycopg2
+from _dependencies.rate_limiter import TelegramBackoff, TelegramRateLimiter
 from send_notifications import main
 from tests.factories.db_factories import NotifByUserFactory, get_session
 from tests.factories.db_models import NotifByUser
@@ -107,12 +110,111 @@ def test_finish_time_analytics():
 
 def test__process_message_sending():
     # NO SMOKE TEST send_notifications.main._process_message_sending
-    changed_ids = set()
-    with sql_connect_by_psycopg2() as conn:
-        res = main._process_message_sending(
-            MagicMock(), TimeAnalyticsFactory.build(), set(), conn, NotSentNotificationFactory.create_sync()
-        )
-    assert not changed_ids
+    with patch('send_notifications.main.process_response', MagicMock(return_value='completed')):
+        result, duration = main._process_message_sending(MagicMock(), 'foo', NotSentNotificationFactory.build())
+    assert result == 'completed'
+    assert duration >= 0
+
+
+def test_dispatcher_keeps_order_within_chat():
+    user_id = randint(0, 1000)
+    text_message = NotSentNotificationFactory.build(message_id=1, user_id=user_id, message_type='text')
+    coords_message = NotSentNotificationFactory.build(message_id=2, user_id=user_id, message_type='coords')
+    other_chat_message = NotSentNotificationFactory.build(message_id=3, user_id=user_id + 1)
+    sent_message_ids = []
+
+    def fake_sending(session, bot_token, message_to_send):
+        sent_message_ids.append(message_to_send.message_id)
+        return 'completed', 0.0
+
+    with (
+        patch('send_notifications.main._process_message_sending', fake_sending),
+        ThreadPoolExecutor(max_workers=2) as executor,
+    ):
+        limiter = TelegramRateLimiter(backoff=TelegramBackoff())
+        dispatcher = main.NotificationDispatcher(MagicMock(), executor, limiter, 'foo')
+        results = dispatcher.dispatch([text_message, coords_message, other_chat_message])
+
+    assert {x.message.message_id for x in results} == {1, 2, 3}
+    assert all(x.result == 'completed' for x in results)
+    assert sent_message_ids.index(1) < sent_message_ids.index(2)
+
+
+def test_dispatcher_requeues_message_after_flood_control():
+    user_id = randint(0, 1000)
+    message = NotSentNotificationFactory.build(message_id=1, user_id=user_id)
+    backoff = TelegramBackoff()
+    limiter = TelegramRateLimiter(backoff=backoff)
+    attempts = []
+
+    def fake_sending(session, bot_token, message_to_send):
+        attempts.append(datetime.datetime.now())
+        if len(attempts) == 1:
+            backoff.register_flood_control(message_to_send.user_id, 0.2)
+            return 'failed_flood_control', 0.0
+        return 'completed', 0.0
+
+    with (
+        patch('send_notifications.main._process_message_sending', fake_sending),
+        ThreadPoolExecutor(max_workers=2) as executor,
+    ):
+        results = main.NotificationDispatcher(MagicMock(), executor, limiter, 'foo').dispatch([message])
+
+    assert [x.result for x in results] == ['completed']
+    assert len(attempts) == 2
+    assert (attempts[1] - attempts[0]).total_seconds() >= 0.2
+
+
+def test_dispatcher_flushes_results_while_sending():
+    user_id = randint(0, 1000)
+    messages = [NotSentNotificationFactory.build(message_id=i, user_id=user_id + i) for i in range(5)]
+    flushed_portions = []
+
+    with (
+        patch('send_notifications.main._process_message_sending', MagicMock(return_value=('completed', 0.0))),
+        patch('send_notifications.main.STATUSES_FLUSH_BATCH_SIZE', 2),
+        ThreadPoolExecutor(max_workers=1) as executor,
+    ):
+        limiter = TelegramRateLimiter(backoff=TelegramBackoff())
+        dispatcher = main.NotificationDispatcher(MagicMock(), executor, limiter, 'foo', max_in_flight=1)
+        results = dispatcher.dispatch(messages, lambda x: flushed_portions.append([y.message.message_id for y in x]))
+
+    assert len(flushed_portions) > 1
+    assert sorted(sum(flushed_portions, [])) == sorted(x.message.message_id for x in results) == list(range(5))
+
+
+def test_dispatcher_stops_sending_after_deadline():
+    user_id = randint(0, 1000)
+    messages = [NotSentNotificationFactory.build(message_id=i, user_id=user_id) for i in range(3)]
+
+    with (
+        patch('send_notifications.main._process_message_sending', MagicMock(return_value=('completed', 0.0))),
+        ThreadPoolExecutor(max_workers=1) as executor,
+    ):
+        limiter = TelegramRateLimiter(backoff=TelegramBackoff())
+        dispatcher = main.NotificationDispatcher(MagicMock(), executor, limiter, 'foo')
+        results = dispatcher.dispatch(messages, deadline=time.monotonic() + 0.5)
+
+    # 1 message per second per chat with burst of 2: the 3rd one is left for the next run
+    assert [x.message.message_id for x in results] == [0, 1]
+
+
+def test_dispatcher_sleeps_while_chat_is_rate_limited():
+    user_id = randint(0, 1000)
+    messages = [NotSentNotificationFactory.build(message_id=i, user_id=user_id) for i in range(4)]
+
+    with (
+        patch('send_notifications.main._process_message_sending', MagicMock(return_value=('completed', 0.0))),
+        patch('send_notifications.main.wait', wraps=main.wait) as wait_mock,
+        patch('send_notifications.main.time.sleep', wraps=time.sleep) as sleep_mock,
+        ThreadPoolExecutor(max_workers=1) as executor,
+    ):
+        limiter = TelegramRateLimiter(global_rate=100, chat_rate=10, chat_burst=1, backoff=TelegramBackoff())
+        results = main.NotificationDispatcher(MagicMock(), executor, limiter, 'foo').dispatch(messages)
+
+    assert [x.message.message_id for x in results] == [0, 1, 2, 3]
+    # one loop iteration per sent message and per pause of the chat, not a busy loop till the pause is over
+    assert wait_mock.call_count + sleep_mock.call_count < 20
 
 
 def test_send_single_message():
@@ -1,3 +1,5 @@
+import json
+
 from flask import Flask
 
 from title_recognize import main
@@ -12,6 +14,18 @@ def test_main_positive():
     assert 'fail' not in res
 
 
+def test_main_batch():
+    app = Flask(__name__)
+    titles = ['Пропал человек', 'foo']
+
+    with app.test_request_context('/', json={'titles': titles}) as app:
+        res = json.loads(main.main(app.request))
+
+    assert res['status'] == 'ok'
+    assert [x['title'] for x in res['recognitions']] == titles
+    assert res['recognitions'][0]['status'] == 'ok'
+
+
 def test_main_wrong_request():
     app = Flask(__name__)
 
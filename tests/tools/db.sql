@@ -119,6 +119,15 @@ CREATE SEQUENCE news_id_seq
 	START 1
 	CACHE 1
 	NO CYCLE;
+-- DROP SEQUENCE notif_by_user_message_group_id_seq;
+
+CREATE SEQUENCE notif_by_user_message_group_id_seq
+	INCREMENT BY 1
+	MINVALUE 1
+	MAXVALUE 2147483647
+	START 1
+	CACHE 1
+	NO CYCLE;
 -- DROP SEQUENCE notif_by_user_message_id_seq;
 
 CREATE SEQUENCE notif_by_user_message_id_seq
@@ -596,6 +605,39 @@ CREATE TABLE feedback (
 );
 
 
+-- public.first_post_check_schedule определение
+
+-- Drop table
+
+-- DROP TABLE first_post_check_schedule;
+
+CREATE TABLE first_post_check_schedule (
+	search_id int4 NOT NULL,
+	last_checked timestamp NULL,
+	num_of_checks int4 DEFAULT 0 NOT NULL,
+	num_of_changes int4 DEFAULT 0 NOT NULL,
+	last_changed timestamp NULL,
+	CONSTRAINT first_post_check_schedule_pkey PRIMARY KEY (search_id)
+);
+
+
+-- public.forum_folder_page_state определение
+
+-- Drop table
+
+-- DROP TABLE forum_folder_page_state;
+
+CREATE TABLE forum_folder_page_state (
+	folder_id int4 NOT NULL,
+	etag varchar NULL,
+	last_modified varchar NULL,
+	forumbg_hash varchar(64) NULL,
+	snapshot varchar NULL,
+	updated timestamptz NULL,
+	CONSTRAINT forum_folder_page_state_pkey PRIMARY KEY (folder_id)
+);
+
+
 -- public.forum_summary_snapshot определение
 
 -- Drop table
@@ -626,6 +668,21 @@ CREATE TABLE forum_summary_snapshot (
 );
 
 
+-- public.function_leases определение
+
+-- Drop table
+
+-- DROP TABLE function_leases;
+
+CREATE TABLE function_leases (
+	function_name varchar(30) NOT NULL,
+	holder_id int8 NOT NULL,
+	expires_at timestamptz NOT NULL,
+	handoff_requested bool NOT NULL DEFAULT false,
+	CONSTRAINT function_leases_pkey PRIMARY KEY (function_name)
+);
+
+
 -- public.functions_registry определение
 
 -- Drop table
@@ -1127,6 +1184,7 @@ CREATE TABLE searches (
 	topic_type_id int4 NULL,
 	CONSTRAINT searches_pkey PRIMARY KEY (id)
 );
+CREATE INDEX searches_search_forum_num_idx ON public.searches USING btree (search_forum_num);
 
 
 -- public.stat_api_usage_actual_searches определение
@@ -1171,6 +1229,20 @@ CREATE TABLE temp_my_devisions (
 );
 
 
+-- public.title_recognition_cache определение
+
+-- Drop table
+
+-- DROP TABLE title_recognition_cache;
+
+CREATE TABLE title_recognition_cache (
+	title_hash varchar(64) NOT NULL,
+	recognition varchar NULL,
+	created timestamp NULL,
+	CONSTRAINT title_recognition_cache_pkey PRIMARY KEY (title_hash)
+);
+
+
 -- public.user_attributes определение
 
 -- Drop table
@@ -1267,6 +1339,20 @@ CREATE TABLE user_pref_age (
 );
 
 
+-- public.user_pref_changes определение
+
+-- Drop table
+
+-- DROP TABLE user_pref_changes;
+
+CREATE TABLE user_pref_changes (
+	user_id int8 NOT NULL,
+	changed_at timestamp NOT NULL,
+	CONSTRAINT user_pref_changes_pkey PRIMARY KEY (user_id)
+);
+CREATE INDEX user_pref_changes_changed_at_idx ON public.user_pref_changes USING btree (changed_at);
+
+
 -- public.user_pref_radius определение
 
 -- Drop table